@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+
+"""
+Importing Packages
+"""
+# general
+import datetime
+from collections import OrderedDict
+
+import numpy
+
+
+"""
+Global variables
+"""
+DEFAULT_CACHE_SIZE = 4096
+DAY_US = 86400 * 1000000
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+
+class EncoderCache(object):
+    """
+    Bounded LRU cache of the output bits of one encoder, keyed by the
+    quantized input, with hit-rate counters
+
+    :param name    : name of the cached encoder
+    :param maxSize : number of encodings kept
+    """
+
+    def __init__(self, name, maxSize=DEFAULT_CACHE_SIZE):
+        self.name = name
+        self.maxSize = maxSize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Returns the cached bits of a key, or None and counts a miss
+        """
+        bits = self.entries.pop(key, None)
+        if bits is None:
+            self.misses += 1
+            return None
+        # re-inserting moves the key to the most recently used end
+        self.entries[key] = bits
+        self.hits += 1
+        return bits
+
+    def put(self, key, bits):
+        self.entries[key] = bits
+        if len(self.entries) > self.maxSize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def summary(self):
+        """
+        Returns a dict of counters describing the cache use
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hitRate": float(self.hits) / lookups if lookups else 0.0,
+        }
+
+
+class CachedScalarEncode(object):
+    """
+    Cached replacement of the encodeIntoArray method of a NuPIC
+    ScalarEncoder or AdaptiveScalarEncoder
+
+    The encoding of a scalar is fully determined by its first active bit and,
+    for the adaptive encoder, the current range, so that is the cache key.
+    The adaptive encoder's range is updated exactly as the original method
+    does before the key is computed.
+
+    :param encoder : encoder instance to cache
+    :param cache   : EncoderCache receiving its encodings
+    """
+
+    def __init__(self, encoder, cache):
+        from nupic.encoders.scalar import ScalarEncoder
+        self.encoder = encoder
+        self.cache = cache
+        self.original = encoder.encodeIntoArray
+        self.encodeScalar = ScalarEncoder.encodeIntoArray
+        self.adaptive = hasattr(encoder, "_setMinAndMax")
+
+    def __call__(self, input, output, learn=None):
+        encoder = self.encoder
+        if not isinstance(input, (int, float)) or input != input:
+            # missing data and NaN keep their original handling
+            return self.original(input, output, learn)
+
+        if self.adaptive:
+            if learn is None:
+                learn = encoder._learningEnabled
+            encoder.recordNum += 1
+            encoder._setMinAndMax(input, learn)
+            key = (encoder.minval, encoder.maxval, encoder._getFirstOnBit(input)[0])
+        else:
+            key = encoder._getFirstOnBit(input)[0]
+
+        bits = self.cache.get(key)
+        if bits is None:
+            self.encodeScalar(encoder, input, output)
+            self.cache.put(key, output[:encoder.n].copy())
+        else:
+            output[:encoder.n] = bits
+
+
+def dateKey(timestamp, season=False, holiday=False):
+    """
+    Returns the integer key of a datetime under which its date encoding is
+    cached: weekday and time of day, plus day of year with a season encoding,
+    or the full date with a holiday encoding
+
+    :param timestamp : datetime to key
+    :param season    : whether the encoder has a season encoding
+    :param holiday   : whether the encoder has a holiday encoding
+    """
+    timeOfDay = (((timestamp.hour * 60 + timestamp.minute) * 60 + timestamp.second)
+                 * 1000000 + timestamp.microsecond)
+    if holiday:
+        return (timestamp.toordinal() - EPOCH_ORDINAL) * DAY_US + timeOfDay
+    key = timestamp.weekday() * DAY_US + timeOfDay
+    if season:
+        key += timestamp.timetuple().tm_yday * 7 * DAY_US
+    return key
+
+
+def dateKeys(timestamps, season=False, holiday=False):
+    """
+    Vectorized dateKey over an array of timestamps, returns an int64 array
+
+    :param timestamps : datetime64 array or sequence of datetime objects
+    :param season     : whether the encoder has a season encoding
+    :param holiday    : whether the encoder has a holiday encoding
+    """
+    times = numpy.asarray(timestamps, dtype="datetime64[us]")
+    days = times.astype("datetime64[D]")
+    timeOfDay = (times - days).astype(numpy.int64)
+    dayNumber = days.astype(numpy.int64)
+    if holiday:
+        return dayNumber * DAY_US + timeOfDay
+    # 1970-01-01 was a Thursday, weekday 3 counting from Monday
+    keys = ((dayNumber + 3) % 7) * DAY_US + timeOfDay
+    if season:
+        dayOfYear = (days - days.astype("datetime64[Y]")).astype(numpy.int64) + 1
+        keys += dayOfYear * 7 * DAY_US
+    return keys
+
+
+class CachedDateEncode(object):
+    """
+    Cached replacement of the encoding method of a DateEncoder
+
+    Wraps encodeIntoArray(input, output) of NuPIC's DateEncoder, or
+    encode(input) of htm.core's which returns an SDR.
+
+    :param encoder : encoder instance to cache
+    :param cache   : EncoderCache receiving its encodings
+    """
+
+    def __init__(self, encoder, cache):
+        self.encoder = encoder
+        self.cache = cache
+        self.season = getattr(encoder, "seasonEncoder", None) is not None
+        self.holiday = getattr(encoder, "holidayEncoder", None) is not None
+        self.intoArray = hasattr(encoder, "encodeIntoArray")
+        if self.intoArray:
+            self.original = encoder.encodeIntoArray
+            self.width = encoder.getWidth()
+        else:
+            self.original = encoder.encode
+            self.width = encoder.size
+
+    def __call__(self, input, output=None):
+        if not isinstance(input, datetime.datetime):
+            return self.original(input) if output is None else self.original(input, output)
+        key = dateKey(input, self.season, self.holiday)
+        bits = self.cache.get(key)
+        if bits is None:
+            bits = self._encode(input, output)
+            self.cache.put(key, bits)
+        elif self.intoArray:
+            output[:self.width] = bits
+        return None if self.intoArray else bits
+
+    def _encode(self, input, output=None):
+        """
+        Returns what is cached for an input: the output bits of NuPIC's
+        encoder, the SDR of htm.core's
+        """
+        if not self.intoArray:
+            return self.original(input)
+        if output is None:
+            output = numpy.zeros(self.width, dtype=numpy.uint8)
+        self.original(input, output)
+        return output[:self.width].copy()
+
+    def precompute(self, timestamps):
+        """
+        Encodes the dates of a whole backfill at once and loads the cache with
+        them, growing it to hold every distinct one. Only the distinct keys
+        are encoded; returns the (records, width) encodings when the encoder
+        writes arrays, None for htm.core's
+
+        :param timestamps : datetime64 array or sequence of datetime objects
+        """
+        times = numpy.asarray(timestamps, dtype="datetime64[us]")
+        keys = dateKeys(times, self.season, self.holiday)
+        unique, first, inverse = numpy.unique(keys, return_index=True,
+                                              return_inverse=True)
+        self.cache.maxSize = max(self.cache.maxSize, len(unique))
+
+        encodings = []
+        for key, index in zip(unique.tolist(), first.tolist()):
+            bits = self.cache.entries.get(key)
+            if bits is None:
+                bits = self._encode(times[index].astype(datetime.datetime))
+                self.cache.put(key, bits)
+            encodings.append(bits)
+
+        if not self.intoArray:
+            return None
+        return numpy.array(encodings, dtype=numpy.uint8)[inverse.ravel()]
+
+
+def cacheEncoders(engine, maxSize=DEFAULT_CACHE_SIZE):
+    """
+    Puts an LRU cache in front of every scalar and date encoder of an engine;
+    returns the CachedScalarEncode/CachedDateEncode wrappers by encoder name.
+    Encoders the engine already computes cheaply are left alone.
+
+    :param engine  : HTMEngine whose encoders are cached
+    :param maxSize : number of encodings kept per encoder
+    """
+    wrappers = OrderedDict()
+    for name, encoder in engine.listEncoders():
+        typeName = type(encoder).__name__
+        if name in wrappers:
+            name = "%s_%i" % (name, len(wrappers))
+        if typeName == "DateEncoder":
+            wrapper = CachedDateEncode(encoder, EncoderCache(name, maxSize))
+            if wrapper.intoArray:
+                encoder.encodeIntoArray = wrapper
+            else:
+                encoder.encode = wrapper
+        elif (typeName in ("ScalarEncoder", "AdaptiveScalarEncoder") and
+              hasattr(encoder, "_getFirstOnBit")):
+            wrapper = CachedScalarEncode(encoder, EncoderCache(name, maxSize))
+            encoder.encodeIntoArray = wrapper
+        else:
+            continue
+        wrappers[name] = wrapper
+    return wrappers
+
+
+def cacheSummary(wrappers):
+    """
+    Returns the counters of every cache by encoder name, for RunStats.attach
+    """
+    return dict((name, wrapper.cache.summary()) for name, wrapper in wrappers.items())
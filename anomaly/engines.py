@@ -0,0 +1,475 @@
+#!/usr/bin/env python
+
+"""
+Importing Packages
+"""
+# general
+import os
+import pickle
+import tempfile
+from abc import ABCMeta, abstractmethod
+
+import numpy
+
+
+"""
+Global variables
+"""
+# BacktrackingTM default, the OPF params do not set it
+TM_CONNECTED_PERMANENCE = 0.5
+# moving average rate of the values remembered per classifier bucket, as in
+# NuPIC's SDRClassifier
+ACTUAL_VALUE_ALPHA = 0.3
+
+
+# Python 2 and 3 compatible abstract base
+_ABC = ABCMeta("_ABC", (object,), {})
+
+
+class EngineResult(object):
+    """
+    Result of one engine step, shaped like the OPF ModelResult as far as the
+    runner is concerned
+
+    :param rawInput   : input record
+    :param inferences : dict with "anomalyScore" and "multiStepBestPredictions"
+    """
+
+    def __init__(self, rawInput, inferences):
+        self.rawInput = rawInput
+        self.inferences = inferences
+
+
+class PredictionShifter(object):
+    """
+    Delays multi-step predictions so that they line up with the record they
+    predict, like NuPIC's InferenceShifter, for results of any engine
+    """
+
+    def __init__(self):
+        self._history = {}
+
+    def shift(self, result):
+        """
+        Returns a result whose predictions are those made for this record
+
+        :param result : result of the current record
+        """
+        inferences = dict(result.inferences)
+        shifted = {}
+        for steps, prediction in result.inferences["multiStepBestPredictions"].items():
+            history = self._history.setdefault(steps, [None] * steps)
+            history.append(prediction)
+            shifted[steps] = history.pop(0)
+        inferences["multiStepBestPredictions"] = shifted
+        return EngineResult(result.rawInput, inferences)
+
+
+class HTMEngine(_ABC):
+    """
+    Interface of the HTM implementations runModel can drive
+
+    An engine is built from one of the MODEL_PARAMS dicts, takes input records
+    as dicts of field values and returns results carrying the anomaly score
+    and the one step prediction of the predicted field.
+    """
+
+    # whether results carry predictions, which a swarm scores the engine by
+    predicts = True
+
+    def __init__(self, modelParams, predictedField="value"):
+        self.modelParams = modelParams
+        self.predictedField = predictedField
+
+    @abstractmethod
+    def run(self, inputRecord):
+        """
+        Runs one record through the model and returns its result
+
+        :param inputRecord : dict of field name to value
+        """
+        pass
+
+    @abstractmethod
+    def enableLearning(self):
+        pass
+
+    @abstractmethod
+    def disableLearning(self):
+        pass
+
+    @abstractmethod
+    def temporalMemoryStats(self):
+        """
+        Returns (segments, synapses, active cells) of the temporal memory
+        """
+        pass
+
+    @abstractmethod
+    def serializedSize(self):
+        """
+        Returns the size in bytes of the model once serialized
+        """
+        pass
+
+    @abstractmethod
+    def getActiveColumns(self):
+        """
+        Returns the indices of the columns active at the last record
+        """
+        pass
+
+    @abstractmethod
+    def getPredictedColumns(self):
+        """
+        Returns the indices of the columns predicted for the next record
+        """
+        pass
+
+    def listEncoders(self):
+        """
+        Returns (name, encoder) pairs of the encoders feeding the model
+        """
+        return []
+
+
+class NuPICEngine(HTMEngine):
+    """
+    Engine backed by NuPIC's OPF ModelFactory, the original implementation
+    """
+
+    def __init__(self, modelParams, predictedField="value"):
+        super(NuPICEngine, self).__init__(modelParams, predictedField)
+        from nupic.frameworks.opf.model_factory import ModelFactory
+        self.model = ModelFactory.create(modelParams)
+        self.model.enableInference({
+            "predictedField": predictedField
+            })
+
+    def run(self, inputRecord):
+        return self.model.run(inputRecord)
+
+    def enableLearning(self):
+        self.model.enableLearning()
+
+    def disableLearning(self):
+        self.model.disableLearning()
+
+    def temporalMemoryStats(self):
+        tm = self.model._getTPRegion().getSelf()._tfdr
+        if hasattr(tm, "connections"):
+            return (tm.connections.numSegments(), tm.connections.numSynapses(),
+                    len(tm.getActiveCells()))
+        return (tm.getNumSegments(), tm.getNumSynapses(),
+                int(numpy.count_nonzero(tm.getActiveState())))
+
+    def serializedSize(self):
+        if hasattr(self.model, "writeToFile"):
+            with tempfile.TemporaryFile() as modelFile:
+                self.model.writeToFile(modelFile)
+                modelFile.flush()
+                return os.fstat(modelFile.fileno()).st_size
+        return len(pickle.dumps(self.model, pickle.HIGHEST_PROTOCOL))
+
+    def getActiveColumns(self):
+        return self.model._getSPRegion().getOutputData("bottomUpOut").nonzero()[0]
+
+    def getPredictedColumns(self):
+        tm = self.model._getTPRegion().getSelf()._tfdr
+        if hasattr(tm, "getPredictiveCells"):
+            return numpy.unique(numpy.asarray(tm.getPredictiveCells(), dtype=numpy.int64) //
+                                tm.getCellsPerColumn())
+        return tm.getPredictedState().max(axis=1).nonzero()[0]
+
+    def listEncoders(self):
+        sensor = self.model._getSensorRegion().getSelf()
+        encoders = []
+        for multiEncoder in (sensor.encoder, sensor.disabledEncoder):
+            if multiEncoder is not None:
+                encoders.extend((name, encoder) for name, encoder, _ in multiEncoder.encoders)
+        return encoders
+
+
+class AdaptiveScalarEncoder(object):
+    """
+    NumPy scalar encoder with the semantics of NuPIC's AdaptiveScalarEncoder:
+    w contiguous active bits out of n, over a min/max range that grows to
+    include every value seen
+
+    :param n        : number of bits
+    :param w        : number of active bits
+    :param minval   : initial minimum, learned from the data when None
+    :param maxval   : initial maximum, learned from the data when None
+    :param clipInput: accepted for compatibility, values are always clipped
+    """
+
+    def __init__(self, n, w, minval=None, maxval=None, clipInput=True):
+        if w >= n:
+            raise ValueError("w (%i) must be smaller than n (%i)" % (w, n))
+        self.n = n
+        self.w = w
+        self.size = n
+        self.minval = minval
+        self.maxval = maxval
+        self.buckets = n - w + 1
+
+    def bucketIndex(self, value, learn=True):
+        """
+        Returns the bucket of a value, adapting the range first when learning
+        """
+        if learn:
+            if self.minval is None or value < self.minval:
+                self.minval = value
+            if self.maxval is None or value > self.maxval:
+                self.maxval = value
+        if self.minval is None or self.maxval <= self.minval:
+            return 0
+        position = (value - self.minval) / float(self.maxval - self.minval)
+        return int(round(min(max(position, 0.0), 1.0) * (self.buckets - 1)))
+
+    def encode(self, value, learn=True):
+        """
+        Returns the indices of the active bits of a value
+        """
+        bucket = self.bucketIndex(value, learn)
+        return numpy.arange(bucket, bucket + self.w, dtype=numpy.uint32)
+
+
+class HtmCoreEngine(HTMEngine):
+    """
+    Engine backed by the community maintained htm.core
+
+    The OPF params are translated as follows: scalar encoders become
+    AdaptiveScalarEncoder above and date encoders htm.core's DateEncoder with
+    the same (width, radius) arguments, all non classifier-only encodings are
+    concatenated into the SP input. spParams map onto SpatialPooler with
+    numActiveColumnsPerInhArea given as localAreaDensity, tmParams onto
+    TemporalMemory (pamLength, globalDecay and maxAge have no equivalent and
+    are dropped) and clParams onto the Predictor. The anomaly score is the raw
+    anomaly computed by the TemporalMemory.
+    """
+
+    def __init__(self, modelParams, predictedField="value"):
+        super(HtmCoreEngine, self).__init__(modelParams, predictedField)
+        from htm.bindings.sdr import SDR
+        from htm.bindings.algorithms import SpatialPooler, TemporalMemory, Predictor
+
+        params = modelParams["modelParams"]
+        spParams = params["spParams"]
+        tmParams = params["tmParams"]
+        clParams = params["clParams"]
+
+        self.encoders = []
+        self.classifierEncoder = None
+        for name, spec in sorted(params["sensorParams"]["encoders"].items()):
+            if spec is None:
+                continue
+            encoder = translateEncoder(spec)
+            if spec.get("classifierOnly"):
+                self.classifierEncoder = encoder
+            else:
+                self.encoders.append((spec["fieldname"], encoder))
+        if self.classifierEncoder is None:
+            for fieldName, encoder in self.encoders:
+                if fieldName == predictedField:
+                    self.classifierEncoder = encoder
+        if self.classifierEncoder is None:
+            raise ValueError("No encoder for the predicted field %r"
+                             % predictedField)
+
+        inputWidth = sum(encoder.size for _, encoder in self.encoders)
+        columnCount = spParams["columnCount"]
+        self.inputSDR = SDR(inputWidth)
+        self.activeColumns = SDR(columnCount)
+
+        self.sp = SpatialPooler(
+            inputDimensions=[inputWidth],
+            columnDimensions=[columnCount],
+            potentialRadius=inputWidth,
+            potentialPct=spParams["potentialPct"],
+            globalInhibition=bool(spParams["globalInhibition"]),
+            localAreaDensity=spParams["numActiveColumnsPerInhArea"] / float(columnCount),
+            synPermInactiveDec=spParams["synPermInactiveDec"],
+            synPermActiveInc=spParams["synPermActiveInc"],
+            synPermConnected=spParams["synPermConnected"],
+            boostStrength=spParams["boostStrength"],
+            seed=spParams["seed"],
+            wrapAround=False)
+        self.tm = TemporalMemory(
+            columnDimensions=[columnCount],
+            cellsPerColumn=tmParams["cellsPerColumn"],
+            activationThreshold=tmParams["activationThreshold"],
+            initialPermanence=tmParams["initialPerm"],
+            connectedPermanence=TM_CONNECTED_PERMANENCE,
+            minThreshold=tmParams["minThreshold"],
+            maxNewSynapseCount=tmParams["newSynapseCount"],
+            permanenceIncrement=tmParams["permanenceInc"],
+            permanenceDecrement=tmParams["permanenceDec"],
+            predictedSegmentDecrement=0.0,
+            seed=tmParams["seed"],
+            maxSegmentsPerCell=tmParams["maxSegmentsPerCell"],
+            maxSynapsesPerSegment=tmParams["maxSynapsesPerSegment"])
+        self.predictor = Predictor(steps=[1], alpha=clParams["alpha"])
+        self.bucketValues = {}
+
+        self.learn = True
+        self.recordNum = 0
+
+    def _encode(self, inputRecord):
+        sparse = []
+        offset = 0
+        for fieldName, encoder in self.encoders:
+            value = inputRecord[fieldName]
+            if isinstance(encoder, AdaptiveScalarEncoder):
+                indices = encoder.encode(value, self.learn)
+            else:
+                indices = numpy.asarray(encoder.encode(value).sparse)
+            sparse.append(indices + offset)
+            offset += encoder.size
+        self.inputSDR.sparse = numpy.concatenate(sparse).astype(numpy.uint32)
+        return self.inputSDR
+
+    def run(self, inputRecord):
+        self.sp.compute(self._encode(inputRecord), self.learn, self.activeColumns)
+        self.tm.compute(self.activeColumns, learn=self.learn)
+        anomalyScore = float(self.tm.anomaly)
+        activeCells = self.tm.getActiveCells()
+
+        value = inputRecord[self.predictedField]
+        bucket = self.classifierEncoder.bucketIndex(value, self.learn)
+        if self.learn:
+            previous = self.bucketValues.get(bucket)
+            self.bucketValues[bucket] = (value if previous is None else
+                                         (1 - ACTUAL_VALUE_ALPHA) * previous +
+                                         ACTUAL_VALUE_ALPHA * value)
+            self.predictor.learn(self.recordNum, activeCells, [bucket])
+
+        prediction = None
+        pdf = self.predictor.infer(activeCells).get(1)
+        if pdf is not None and len(pdf):
+            best = int(numpy.argmax(pdf))
+            prediction = self.bucketValues.get(best)
+        self.recordNum += 1
+
+        return EngineResult(inputRecord, {
+            "anomalyScore": anomalyScore,
+            "multiStepBestPredictions": {1: prediction},
+        })
+
+    def enableLearning(self):
+        self.learn = True
+
+    def disableLearning(self):
+        self.learn = False
+
+    def temporalMemoryStats(self):
+        connections = self.tm.connections
+        return (connections.numSegments(), connections.numSynapses(),
+                self.tm.getActiveCells().getSum())
+
+    def serializedSize(self):
+        return sum(len(pickle.dumps(part, pickle.HIGHEST_PROTOCOL))
+                   for part in (self.sp, self.tm, self.predictor))
+
+    def getActiveColumns(self):
+        return self.activeColumns.sparse
+
+    def getPredictedColumns(self):
+        return numpy.unique(self.tm.getPredictiveCells().sparse //
+                            self.tm.getCellsPerColumn())
+
+    def listEncoders(self):
+        return list(self.encoders)
+
+
+class NumpyEngine(HTMEngine):
+    """
+    Engine backed by the pure NumPy BatchEngine of numpy_engine.py run with a
+    single stream; it computes anomaly scores only, predictions are None
+    """
+
+    predicts = False
+
+    def __init__(self, modelParams, predictedField="value"):
+        super(NumpyEngine, self).__init__(modelParams, predictedField)
+        from numpy_engine import BatchEngine
+        self.engine = BatchEngine(modelParams, 1)
+
+    def run(self, inputRecord):
+        anomalyScore = self.engine.step([inputRecord["timestamp"]],
+                                        [inputRecord[self.predictedField]])[0]
+        return EngineResult(inputRecord, {
+            "anomalyScore": float(anomalyScore),
+            "multiStepBestPredictions": {1: None},
+        })
+
+    def enableLearning(self):
+        self.engine.learn = True
+
+    def disableLearning(self):
+        self.engine.learn = False
+
+    def temporalMemoryStats(self):
+        segments, synapses, activeCells = self.engine.tm.stats()
+        return int(segments[0]), int(synapses[0]), int(activeCells[0])
+
+    def serializedSize(self):
+        return self.engine.nbytes()
+
+    def getActiveColumns(self):
+        return self.engine.activeColumns[0]
+
+    def getPredictedColumns(self):
+        tm = self.engine.tm
+        return numpy.unique(tm.segmentCell[0, :tm.activeSegments.shape[1]][tm.activeSegments[0]] //
+                            tm.cellsPerColumn)
+
+
+def translateEncoder(spec):
+    """
+    Builds the htm.core engine encoder for an OPF encoder spec
+
+    :param spec : encoder dict from the sensorParams of a params file
+    """
+    encoderType = spec["type"]
+    if encoderType in ("AdaptiveScalarEncoder", "ScalarEncoder"):
+        return AdaptiveScalarEncoder(spec["n"], spec["w"], spec.get("minval"),
+                                     spec.get("maxval"),
+                                     spec.get("clipInput", True))
+    if encoderType == "DateEncoder":
+        from htm.encoders.date import DateEncoder
+        kwargs = dict((key, spec[key]) for key in
+                      ("season", "dayOfWeek", "weekend", "holiday", "timeOfDay")
+                      if spec.get(key))
+        return DateEncoder(**kwargs)
+    raise ValueError("Encoder type %r is not supported by the htm.core engine"
+                     % encoderType)
+
+
+ENGINES = {
+    "nupic": NuPICEngine,
+    "htmcore": HtmCoreEngine,
+    "numpy": NumpyEngine,
+}
+
+
+def predictingEngines():
+    """
+    Returns the names of the engines whose results carry predictions
+    """
+    return sorted(name for name, engine in ENGINES.items()
+                  if getattr(engine, "predicts", True))
+
+
+def createEngine(name, modelParams, predictedField="value"):
+    """
+    Creates an engine by name
+
+    :param name           : one of ENGINES
+    :param modelParams    : MODEL_PARAMS dict of a params file
+    :param predictedField : field whose next value is predicted
+    """
+    if name not in ENGINES:
+        raise ValueError("Unknown engine %r, expected one of %s"
+                         % (name, ", ".join(sorted(ENGINES))))
+    return ENGINES[name](modelParams, predictedField)
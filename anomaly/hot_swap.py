@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+
+"""
+Importing Packages
+"""
+# general
+import os
+import threading
+from collections import deque
+from timeit import default_timer
+
+from engines import createEngine
+
+
+def loadParamsFile(path):
+    """
+    Returns the MODEL_PARAMS defined by a params module file, executed afresh
+    so that edits are picked up
+
+    :param path : path to the params .py file
+    """
+    namespace = {"__file__": path}
+    with open(path, "r") as paramsFile:
+        source = paramsFile.read()
+    exec(compile(source, path, "exec"), namespace)
+    return namespace["MODEL_PARAMS"]
+
+
+class HotSwapper(object):
+    """
+    Rebuilds the model when its params file changes, without stopping the run
+
+    The params file's modification time is polled every `pollInterval`
+    seconds. On a change, a new model is built in a background thread and
+    warmed by replaying the last `warmupSize` records, then the records that
+    arrived meanwhile, until it is at most `catchUp` records behind the
+    running model. At the next record boundary those few records are
+    replayed and it is swapped in, and the old model is dropped. Scoring goes
+    on with the old model until then, only sharing the interpreter with the
+    warm-up thread, which catches up faster the more slack the stream leaves.
+
+    A new model goes through prepare before it is warmed, e.g. to put the
+    encoder cache in front of its encoders as the first model had; what
+    prepare returns is handed to onSwap when the model is swapped in.
+
+    :param paramsPath   : params .py file to watch
+    :param engine       : HTM implementation, one of engines.ENGINES
+    :param warmupSize   : recent records replayed into a new model
+    :param pollInterval : seconds between checks of the params file
+    :param catchUp      : records left for the swap itself to replay
+    :param logPath      : optional csv file receiving one row per swap
+    :param prepare      : optional callable taking every new model
+    :param onSwap       : optional callable taking what prepare returned for
+                          the model swapped in
+    """
+
+    def __init__(self, paramsPath, engine="nupic", warmupSize=1000,
+                 pollInterval=5.0, logPath=None, catchUp=8, prepare=None,
+                 onSwap=None):
+        self.paramsPath = paramsPath
+        self.engine = engine
+        self.prepare = prepare
+        self.onSwap = onSwap
+        self.pollInterval = pollInterval
+        self.catchUp = catchUp
+        self.window = deque(maxlen=warmupSize)
+        self.seen = 0
+        self.lock = threading.Lock()
+
+        self.mtime = os.path.getmtime(paramsPath)
+        self.lastPoll = default_timer()
+        self.warmer = None
+        self.cancelled = None
+        self.ready = None
+        self.lag = 0
+
+        self.swaps = 0
+        self.failures = 0
+        self.replayed = 0
+        self.lastWarmSeconds = 0.0
+        self.logFile = None
+        if logPath is not None:
+            self.logFile = open(logPath, "w")
+            self.logFile.write("record,mtime,replayed,warm_s\n")
+
+    def observe(self, timestamp, value):
+        """
+        Adds a record the running model just scored to the warm-up window
+        """
+        with self.lock:
+            self.window.append((self.seen, timestamp, value))
+            self.seen += 1
+
+    def poll(self, model):
+        """
+        Returns the model to score the next record with: a warmed up
+        replacement when one is ready, the given model otherwise. Starts a
+        rebuild when the params file changed. Call at record boundaries.
+
+        :param model : model currently scoring the stream
+        """
+        if self.ready is not None:
+            with self.lock:
+                newModel, prepared, position, replayed, warmSeconds = self.ready
+                self.ready = None
+                # records scored since the warm-up thread caught up
+                pending = [entry for entry in self.window if entry[0] >= position]
+            for _, timestamp, value in pending:
+                newModel.run({"timestamp": timestamp, "value": value})
+            replayed += len(pending)
+            if self.onSwap is not None:
+                self.onSwap(prepared)
+            self.swaps += 1
+            self.replayed += replayed
+            self.lastWarmSeconds = warmSeconds
+            print("Swapped in the model of %s at record %i after replaying %i records (%.1f s)"
+                  % (self.paramsPath, self.seen, replayed, warmSeconds))
+            if self.logFile is not None:
+                self.logFile.write("%i,%f,%i,%f\n" % (self.seen, self.mtime,
+                                                      replayed, warmSeconds))
+            return newModel
+
+        now = default_timer()
+        if now - self.lastPoll >= self.pollInterval:
+            self.lastPoll = now
+            try:
+                mtime = os.path.getmtime(self.paramsPath)
+            except OSError:
+                # the file is being replaced, look again at the next poll
+                return model
+            if mtime != self.mtime:
+                self.mtime = mtime
+                self._startWarmer()
+        return model
+
+    def _startWarmer(self):
+        try:
+            modelParams = loadParamsFile(self.paramsPath)
+        except Exception as error:
+            self.failures += 1
+            print("Ignoring %s, it does not load: %s" % (self.paramsPath, error))
+            return
+
+        # a newer edit supersedes a model still warming up
+        if self.cancelled is not None:
+            self.cancelled.set()
+        self.cancelled = threading.Event()
+        with self.lock:
+            self.ready = None
+            start = self.window[0][0] if self.window else self.seen
+        self.warmer = threading.Thread(target=self._warm,
+                                       args=(modelParams, start, self.cancelled))
+        self.warmer.daemon = True
+        self.warmer.start()
+        print("%s changed, warming a new model on the last %i records"
+              % (self.paramsPath, self.seen - start))
+
+    def _warm(self, modelParams, position, cancelled):
+        """
+        Builds a model and replays records from `position` until it is close
+        behind the running model; runs in the warm-up thread
+        """
+        start = default_timer()
+        replayed = 0
+        try:
+            model = createEngine(self.engine, modelParams, "value")
+            prepared = self.prepare(model) if self.prepare is not None else None
+            record = {"timestamp": None, "value": None}
+            while not cancelled.is_set():
+                with self.lock:
+                    if cancelled.is_set():
+                        return
+                    pending = [entry for entry in self.window if entry[0] >= position]
+                    self.lag = len(pending)
+                    if len(pending) <= self.catchUp:
+                        # close enough, poll replays the rest before swapping
+                        self.ready = (model, prepared, position, replayed,
+                                      default_timer() - start)
+                        return
+                for seen, timestamp, value in pending:
+                    record["timestamp"] = timestamp
+                    record["value"] = value
+                    model.run(record)
+                    replayed += 1
+                    position = seen + 1
+        except Exception as error:
+            self.failures += 1
+            print("Could not build a model from %s: %s" % (self.paramsPath, error))
+
+    def summary(self):
+        """
+        Returns a dict of counters describing the swaps
+        """
+        return {
+            "swaps": self.swaps,
+            "failures": self.failures,
+            "replayed": self.replayed,
+            "last_warm_s": self.lastWarmSeconds,
+            "warming": self.warmer is not None and self.warmer.is_alive(),
+            "warm_lag": self.lag,
+        }
+
+    def close(self):
+        if self.cancelled is not None:
+            self.cancelled.set()
+        if self.logFile is not None:
+            self.logFile.close()
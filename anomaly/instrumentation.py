@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+
+"""
+Importing Packages
+"""
+# general
+import json
+import time
+from timeit import default_timer
+
+
+"""
+Global variables
+"""
+# stages of a record as timed by runModel, in pipeline order
+STAGES = ["parse", "run", "shift", "likelihood", "plot", "csv"]
+# sub-buckets per power of two, bounds the relative error to 1/128
+SUB_BUCKET_BITS = 7
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+# largest recordable latency is 2^40 ns, about 18 minutes
+MAX_VALUE_BITS = 40
+
+
+class LatencyHistogram(object):
+    """
+    Log-linear (HDR style) histogram of latencies
+
+    Latencies are recorded as integer nanoseconds into buckets that are linear
+    within each power of two, so recording is a couple of integer operations
+    and percentiles are accurate to within 1% whatever the range.
+    """
+
+    def __init__(self):
+        shifts = MAX_VALUE_BITS - SUB_BUCKET_BITS
+        self.counts = [0] * (SUB_BUCKET_COUNT * (shifts + 2))
+        self.total = 0
+        self.sum = 0
+        self.max = 0
+        self._maxValue = (1 << MAX_VALUE_BITS) - 1
+
+    def record(self, seconds):
+        """
+        Adds one latency
+
+        :param seconds : latency in seconds
+        """
+        value = int(seconds * 1e9)
+        if value < 0:
+            value = 0
+        elif value > self._maxValue:
+            value = self._maxValue
+        shift = value.bit_length() - SUB_BUCKET_BITS - 1
+        if shift <= 0:
+            self.counts[value] += 1
+        else:
+            self.counts[SUB_BUCKET_COUNT * shift + (value >> shift)] += 1
+        self.total += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    @staticmethod
+    def _bucketValue(index):
+        """
+        Returns the midpoint in nanoseconds of the bucket at index
+        """
+        if index < 2 * SUB_BUCKET_COUNT:
+            return index
+        shift = index // SUB_BUCKET_COUNT - 1
+        low = (index - SUB_BUCKET_COUNT * shift) << shift
+        return low + (1 << shift) // 2
+
+    def percentile(self, percent):
+        """
+        Returns the latency in seconds below which percent of records fall
+
+        :param percent : percentile between 0 and 100
+        """
+        if self.total == 0:
+            return 0.0
+        target = max(1, int(round(self.total * percent / 100.0)))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self._bucketValue(index), self.max) * 1e-9
+        return self.max * 1e-9
+
+    def mean(self):
+        if self.total == 0:
+            return 0.0
+        return self.sum * 1e-9 / self.total
+
+    def merge(self, other):
+        """
+        Adds the records of another histogram into this one
+        """
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.total += other.total
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def summary(self):
+        """
+        Returns a dict of latency statistics in milliseconds
+        """
+        return {
+            "count": self.total,
+            "mean_ms": self.mean() * 1e3,
+            "p50_ms": self.percentile(50) * 1e3,
+            "p99_ms": self.percentile(99) * 1e3,
+            "p999_ms": self.percentile(99.9) * 1e3,
+            "max_ms": self.max * 1e-6,
+        }
+
+
+class RunStats(object):
+    """
+    Per-stage latency and throughput instrumentation for runModel
+
+    The runner calls mark(stage) after each stage of a record; the time since
+    the previous mark is charged to that stage, so each stage costs a single
+    timer read. A report is printed and appended to a JSON lines file every
+    `interval` seconds and once more at exit.
+
+    :param interval : seconds between reports, 0 reports at exit only
+    :param jsonPath : optional JSON lines file receiving every report
+    :param stages   : names of the timed stages
+    """
+
+    def __init__(self, interval=10.0, jsonPath=None, stages=STAGES):
+        self.interval = interval
+        self.jsonPath = jsonPath
+        self.stages = list(stages)
+        self.histograms = dict((stage, LatencyHistogram()) for stage in stages)
+        self.recordLatency = LatencyHistogram()
+        self.records = 0
+        self.sources = []
+        self.lastReport = None
+
+        self._last = None
+        self._recordStart = None
+        self._started = None
+        self._lastReport = None
+        self._lastReportRecords = 0
+
+        if jsonPath is not None:
+            open(jsonPath, "w").close()
+
+    def attach(self, name, summary):
+        """
+        Adds the counters of another component, such as a LoadShedder, to
+        every report
+
+        :param name    : key of the counters in the report
+        :param summary : callable returning a dict of counters
+        """
+        self.sources.append((name, summary))
+
+    def start(self):
+        """
+        Starts the clocks, call right before the first record is read
+        """
+        self._last = self._recordStart = default_timer()
+        self._started = self._lastReport = self._last
+
+    def mark(self, stage):
+        """
+        Charges the time since the previous mark to a stage
+
+        :param stage : name of the stage that just finished
+        """
+        now = default_timer()
+        self.histograms[stage].record(now - self._last)
+        self._last = now
+
+    def skip(self):
+        """
+        Restarts the stage clock without charging the elapsed time
+        """
+        self._last = default_timer()
+
+    def endRecord(self):
+        """
+        Counts a finished record and reports when the interval has passed
+        """
+        now = default_timer()
+        self.recordLatency.record(now - self._recordStart)
+        self._recordStart = now
+        self.records += 1
+        if (self.interval > 0 and self.records & 0xff == 0 and
+                now - self._lastReport >= self.interval):
+            self.report()
+            self._last = self._recordStart = default_timer()
+
+    def report(self, final=False):
+        """
+        Prints the current statistics and appends them to the JSON file
+
+        :param final : True for the report at exit
+        """
+        now = default_timer()
+        elapsed = now - self._started
+        intervalElapsed = now - self._lastReport
+        intervalRecords = self.records - self._lastReportRecords
+        self._lastReport = now
+        self._lastReportRecords = self.records
+
+        result = {
+            "time": time.time(),
+            "final": final,
+            "records": self.records,
+            "elapsed_s": elapsed,
+            "records_per_s": self.records / elapsed if elapsed > 0 else 0.0,
+            "interval_records_per_s": (intervalRecords / intervalElapsed
+                                       if intervalElapsed > 0 else 0.0),
+            "stages": dict((stage, self.histograms[stage].summary())
+                           for stage in self.stages),
+            "record": self.recordLatency.summary(),
+        }
+        for name, summary in self.sources:
+            result[name] = summary()
+        self.lastReport = result
+
+        print(formatReport(result, self.stages))
+        if self.jsonPath is not None:
+            with open(self.jsonPath, "a") as jsonFile:
+                jsonFile.write(json.dumps(result, sort_keys=True) + "\n")
+        return result
+
+    def close(self):
+        return self.report(final=True)
+
+
+class NullRunStats(object):
+    """
+    Stands in for RunStats when instrumentation is off
+    """
+
+    def attach(self, name, summary):
+        pass
+
+    def start(self):
+        pass
+
+    def mark(self, stage):
+        pass
+
+    def skip(self):
+        pass
+
+    def endRecord(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def formatReport(result, stages=STAGES):
+    """
+    Formats a report dict as a printable table
+
+    :param result : dict returned by RunStats.report
+    :param stages : order in which stages are listed
+    """
+    lines = [
+        "%i records in %.1fs: %.1f records/s overall, %.1f records/s last interval"
+        % (result["records"], result["elapsed_s"], result["records_per_s"],
+           result["interval_records_per_s"]),
+        "%-12s %10s %10s %10s %10s %10s" % ("stage", "count", "p50 ms",
+                                            "p99 ms", "p999 ms", "max ms"),
+    ]
+    rows = [(stage, result["stages"][stage]) for stage in stages]
+    rows.append(("record", result["record"]))
+    for name, summary in rows:
+        lines.append("%-12s %10i %10.3f %10.3f %10.3f %10.3f"
+                     % (name, summary["count"], summary["p50_ms"],
+                        summary["p99_ms"], summary["p999_ms"],
+                        summary["max_ms"]))
+    return "\n".join(lines)
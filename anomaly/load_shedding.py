@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+
+"""
+Importing Packages
+"""
+# general
+import csv
+from timeit import default_timer
+
+
+"""
+Global variables
+"""
+# degradation ladder, each level includes everything shed by the ones before it
+LEVEL_NONE = 0
+LEVEL_SKIP_SINKS = 1
+LEVEL_INFER_ONLY = 2
+LEVEL_AGGREGATE = 3
+LEVEL_NAMES = ["none", "skip_sinks", "infer_only", "aggregate"]
+
+
+class LoadShedder(object):
+    """
+    Keeps runModel within a latency budget by shedding work deterministically
+
+    Records are assumed to arrive once every `budget` seconds. The time spent
+    on each record beyond that budget is accumulated as lag (a queue backlog)
+    and the lag selects a level on a fixed degradation ladder:
+
+        skip_sinks : stop updating the non-critical plot output
+        infer_only : run the model with learning disabled
+        aggregate  : average bursts of `aggregateSize` records into one run
+
+    A level is left again once the lag drops below half of its threshold, so
+    the runner does not flap between levels on every record.
+
+    :param budget        : seconds available per record
+    :param thresholds    : lag in seconds at which each level above is entered
+    :param aggregateSize : number of records folded into one model run
+    :param logPath       : optional csv file listing every shed record
+    """
+
+    def __init__(self, budget, thresholds=(1.0, 5.0, 20.0), aggregateSize=4,
+                 logPath=None):
+        if len(thresholds) != len(LEVEL_NAMES) - 1:
+            raise ValueError("Expected %i lag thresholds, got %i"
+                             % (len(LEVEL_NAMES) - 1, len(thresholds)))
+        if list(thresholds) != sorted(thresholds):
+            raise ValueError("Lag thresholds must be increasing")
+        if aggregateSize < 2:
+            raise ValueError("aggregateSize must be at least 2")
+
+        self.budget = float(budget)
+        self.thresholds = [float(t) for t in thresholds]
+        self.aggregateSize = aggregateSize
+        self.level = LEVEL_NONE
+        self.lag = 0.0
+        self.maxLag = 0.0
+        self.records = 0
+        self.counts = dict((name, 0) for name in LEVEL_NAMES[1:])
+        self.levelChanges = 0
+
+        self._pending = []
+        self._pendingTimestamp = None
+        self._learning = True
+        self._start = None
+
+        self.logFile = None
+        self.logWriter = None
+        if logPath is not None:
+            self.logFile = open(logPath, "w")
+            self.logWriter = csv.writer(self.logFile)
+            self.logWriter.writerow(["record", "timestamp", "action", "lag"])
+
+    def startRecord(self):
+        """
+        Marks the arrival of a record; call once per input row
+        """
+        self._start = default_timer()
+        self.records += 1
+
+    def finishRecord(self):
+        """
+        Charges the time spent on the current record against the budget and
+        moves along the degradation ladder if needed
+        """
+        elapsed = default_timer() - self._start
+        self.lag = max(0.0, self.lag + elapsed - self.budget)
+        self.maxLag = max(self.maxLag, self.lag)
+
+        level = self.level
+        while (level < LEVEL_AGGREGATE and
+               self.lag >= self.thresholds[level]):
+            level += 1
+        while (level > LEVEL_NONE and
+               self.lag < 0.5 * self.thresholds[level - 1]):
+            level -= 1
+        if level != self.level:
+            self.levelChanges += 1
+            self.level = level
+
+    def admit(self, counter, timestamp, value):
+        """
+        Decides whether a record goes through the model
+
+        Returns the (timestamp, value) pair to run, or None when the record was
+        absorbed into a pending aggregate. Any partially filled aggregate is
+        released as soon as the runner drops below the aggregate level, and
+        by flush() at the end of the stream.
+
+        :param counter   : index of the record in the input
+        :param timestamp : timestamp of the record
+        :param value     : value of the record
+        """
+        if self.level < LEVEL_AGGREGATE and not self._pending:
+            return timestamp, value
+
+        self._pending.append(value)
+        self._pendingTimestamp = timestamp
+        if (self.level >= LEVEL_AGGREGATE and
+                len(self._pending) < self.aggregateSize):
+            self._shed(counter, timestamp, "aggregate")
+            return None
+        return self.flush()
+
+    def flush(self):
+        """
+        Releases the pending aggregate, returns the (timestamp, value) pair of
+        its last timestamp and mean value, or None when nothing is pending
+        """
+        if not self._pending:
+            return None
+        mean = sum(self._pending) / float(len(self._pending))
+        self._pending = []
+        return self._pendingTimestamp, mean
+
+    def applyLearning(self, model, counter, timestamp):
+        """
+        Disables learning on the model while at or above the infer_only level
+        and turns it back on once the lag has recovered
+
+        :param model     : HTM model being run
+        :param counter   : index of the record in the input
+        :param timestamp : timestamp of the record
+        """
+        learning = self.level < LEVEL_INFER_ONLY
+        if learning != self._learning:
+            if learning:
+                model.enableLearning()
+            else:
+                model.disableLearning()
+            self._learning = learning
+        if not learning:
+            self._shed(counter, timestamp, "infer_only")
+
+    def modelSwapped(self):
+        """
+        Forgets the learning state set on the previous model, so that the
+        next applyLearning sets it on a model swapped in with learning on
+        """
+        self._learning = True
+
+    def skipSinks(self, counter, timestamp):
+        """
+        Returns True when non-critical outputs should be skipped for a record
+
+        :param counter   : index of the record in the input
+        :param timestamp : timestamp of the record
+        """
+        if self.level < LEVEL_SKIP_SINKS:
+            return False
+        self._shed(counter, timestamp, "skip_sinks")
+        return True
+
+    def _shed(self, counter, timestamp, action):
+        self.counts[action] += 1
+        if self.logWriter is not None:
+            self.logWriter.writerow([counter, timestamp, action,
+                                     "%.6f" % self.lag])
+
+    def summary(self):
+        """
+        Returns a dict describing everything traded away during the run
+        """
+        return {
+            "records": self.records,
+            "budget": self.budget,
+            "level": LEVEL_NAMES[self.level],
+            "lag": self.lag,
+            "maxLag": self.maxLag,
+            "levelChanges": self.levelChanges,
+            "shed": dict(self.counts),
+        }
+
+    def close(self):
+        if self.logFile is not None:
+            self.logFile.close()
+        print("Load shedding: max lag %.3fs, shed %s"
+              % (self.maxLag, ", ".join("%s=%i" % (name, self.counts[name])
+                                        for name in LEVEL_NAMES[1:])))
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+
+"""
+Importing Packages
+"""
+# general
+import os
+import sys
+import csv
+import resource
+from timeit import default_timer
+
+import numpy
+
+
+def peakRSS():
+    """
+    Returns the peak resident set size of this process in bytes
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # reported in kilobytes on Linux and in bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def processRSS():
+    """
+    Returns the current resident set size of this process in bytes, or the
+    peak one where /proc is not available
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (IOError, OSError):
+        return peakRSS()
+
+
+class ModelMonitor(object):
+    """
+    Samples the temporal memory growth and memory footprint of a model
+
+    Every `every` records the number of TM segments, synapses and active
+    cells, the process RSS and (every `sizeEvery` samples, as it is the
+    expensive part) the serialized model size are appended to a csv time
+    series. A straight line fitted to the recent RSS samples is extrapolated
+    `horizon` records ahead, and a warning is printed when it crosses the
+    memory budget.
+
+    :param path      : csv file receiving the time series
+    :param every     : records between samples
+    :param budget    : memory budget in bytes, None disables the warning
+    :param horizon   : records ahead the RSS growth is extrapolated
+    :param sizeEvery : samples between serialized size measurements, 0 never
+    :param fitSamples: number of recent samples the growth is fitted on
+    """
+
+    def __init__(self, path, every=1000, budget=None, horizon=1000000,
+                 sizeEvery=10, fitSamples=20):
+        self.every = every
+        self.budget = budget
+        self.horizon = horizon
+        self.sizeEvery = sizeEvery
+        self.fitSamples = fitSamples
+
+        self.records = 0
+        self.samples = []
+        self.warnings = []
+        self.lastSize = None
+        self._start = default_timer()
+
+        self.outputFile = open(path, "w")
+        self.outputWriter = csv.writer(self.outputFile)
+        self.outputWriter.writerow([
+            "record", "timestamp", "elapsed_s", "segments", "synapses",
+            "active_cells", "serialized_bytes", "rss_bytes",
+            "projected_rss_bytes"])
+
+    def update(self, model, timestamp):
+        """
+        Counts a record and samples the model when due; returns True when a
+        sample was taken
+
+        :param model     : HTM model being run
+        :param timestamp : timestamp of the record
+        """
+        self.records += 1
+        if self.records % self.every:
+            return False
+        self.sample(model, timestamp)
+        return True
+
+    def sample(self, model, timestamp):
+        """
+        Takes one sample of the model and checks it against the budget
+
+        :param model     : HTM engine being run
+        :param timestamp : timestamp of the record
+        """
+        segments, synapses, activeCells = model.temporalMemoryStats()
+        rss = processRSS()
+        if self.sizeEvery and len(self.samples) % self.sizeEvery == 0:
+            self.lastSize = model.serializedSize()
+        self.samples.append((self.records, rss))
+
+        projected = self.projectRSS(self.records + self.horizon)
+        self.outputWriter.writerow([
+            self.records, timestamp, "%.3f" % (default_timer() - self._start),
+            segments, synapses, activeCells, self.lastSize, rss,
+            "" if projected is None else int(projected)])
+        self.outputFile.flush()
+
+        if (self.budget is not None and projected is not None and
+                projected > self.budget):
+            recordsLeft = self.recordsToBudget()
+            message = ("Memory growth warning at record %i: RSS %.1f MB is "
+                       "projected to reach %.1f MB within %i records, over "
+                       "the %.1f MB budget (%s)"
+                       % (self.records, rss / 1048576.0,
+                          projected / 1048576.0, self.horizon,
+                          self.budget / 1048576.0,
+                          "already over budget" if not recordsLeft else
+                          "budget reached in ~%i records" % recordsLeft))
+            # warn once per doubling of the sample count to avoid flooding
+            if not self.warnings or len(self.samples) >= 2 * self.warnings[-1][0]:
+                print(message)
+                self.warnings.append((len(self.samples), message))
+
+    def _fit(self):
+        """
+        Returns (slope, intercept) of RSS against records over the recent
+        samples, or None with fewer than two samples
+        """
+        recent = self.samples[-self.fitSamples:]
+        if len(recent) < 2:
+            return None
+        records = numpy.array([r for r, _ in recent], dtype=numpy.float64)
+        rss = numpy.array([m for _, m in recent], dtype=numpy.float64)
+        slope, intercept = numpy.polyfit(records, rss, 1)
+        return slope, intercept
+
+    def projectRSS(self, record):
+        """
+        Returns the RSS in bytes extrapolated to a record index from the last
+        sample along the fitted growth, never below the last sample
+        """
+        fit = self._fit()
+        if fit is None:
+            return None
+        lastRecord, lastRSS = self.samples[-1]
+        return max(fit[0], 0.0) * (record - lastRecord) + lastRSS
+
+    def recordsToBudget(self):
+        """
+        Returns how many more records the growth allows before the budget is
+        reached, or None when memory is not growing
+        """
+        fit = self._fit()
+        if fit is None or self.budget is None or fit[0] <= 0:
+            return None
+        lastRecord, lastRSS = self.samples[-1]
+        return max(0, int((self.budget - lastRSS) / fit[0]) + lastRecord - self.records)
+
+    def close(self):
+        self.outputFile.close()
+        if self.samples:
+            print("Model monitor: %i samples, final RSS %.1f MB, %i growth warnings"
+                  % (len(self.samples), self.samples[-1][1] / 1048576.0,
+                     len(self.warnings)))
@@ -0,0 +1,587 @@
+#!/usr/bin/env python
+
+"""
+Importing Packages
+"""
+# general
+import numpy
+
+
+"""
+Global variables
+"""
+# segments kept per stream; the TM recycles the least recently used one when
+# the pool is full instead of capping segments per cell
+DEFAULT_SEGMENT_POOL = 4096
+# BacktrackingTM default, the OPF params do not set it
+TM_CONNECTED_PERMANENCE = 0.5
+# records over which the SP duty cycles are averaged, NuPIC's default
+DUTY_CYCLE_PERIOD = 1000
+# default radius of the date sub-encoders given only a width, as in NuPIC
+DATE_RADIUS = {"timeOfDay": 4.0, "dayOfWeek": 1.0, "weekend": 1.0, "season": 91.5}
+# (minval, maxval, periodic) of the date sub-encoders
+DATE_RANGE = {"timeOfDay": (0.0, 24.0, True), "dayOfWeek": (0.0, 7.0, True),
+              "weekend": (0.0, 1.0, False), "season": (0.0, 366.0, True)}
+
+
+class BatchScalarEncoder(object):
+    """
+    Scalar encoder for N streams at once: w contiguous active bits out of n,
+    wrapping around when periodic. With no minval/maxval the range of each
+    stream adapts to include every value seen, like NuPIC's
+    AdaptiveScalarEncoder.
+
+    :param streams  : number of streams
+    :param n        : number of bits
+    :param w        : number of active bits
+    :param minval   : minimum of the range, learned per stream when None
+    :param maxval   : maximum of the range, learned per stream when None
+    :param periodic : whether the range wraps around
+    """
+
+    def __init__(self, streams, n, w, minval=None, maxval=None, periodic=False):
+        if w >= n:
+            raise ValueError("w (%i) must be smaller than n (%i)" % (w, n))
+        self.n = n
+        self.w = w
+        self.periodic = periodic
+        self.adaptive = minval is None or maxval is None
+        self.minval = numpy.full(streams, numpy.nan if minval is None else minval)
+        self.maxval = numpy.full(streams, numpy.nan if maxval is None else maxval)
+        self.buckets = n if periodic else n - w + 1
+        self.offsets = numpy.arange(w)
+
+    def bucketIndex(self, values, learn=True):
+        """
+        Returns the bucket of each stream's value, adapting the ranges first
+        when learning
+
+        :param values : float array of one value per stream
+        :param learn  : whether adaptive ranges may grow
+        """
+        if self.adaptive and learn:
+            self.minval = numpy.fmin(self.minval, values)
+            self.maxval = numpy.fmax(self.maxval, values)
+        span = self.maxval - self.minval
+        valid = span > 0
+        position = numpy.zeros(len(values))
+        position[valid] = (values[valid] - self.minval[valid]) / span[valid]
+        if self.periodic:
+            return (numpy.floor(position * self.buckets) % self.buckets).astype(numpy.int64)
+        position = numpy.clip(position, 0.0, 1.0)
+        return numpy.round(position * (self.buckets - 1)).astype(numpy.int64)
+
+    def encode(self, values, learn=True):
+        """
+        Returns the (streams, w) indices of the active bits of each value
+        """
+        bits = self.bucketIndex(values, learn)[:, None] + self.offsets
+        if self.periodic:
+            bits %= self.n
+        return bits
+
+
+def dateFeatures(timestamps):
+    """
+    Returns the date sub-encoder inputs of an array of timestamps as a dict of
+    float arrays
+
+    :param timestamps : datetime64 array or sequence of datetime objects
+    """
+    minutes = numpy.asarray(timestamps, dtype="datetime64[m]")
+    days = minutes.astype("datetime64[D]")
+    hour = (minutes - days).astype(numpy.int64) / 60.0
+    # 1970-01-01 was a Thursday, weekday 3 counting from Monday
+    weekday = (days.astype(numpy.int64) + 3) % 7
+    dayOfYear = (days - days.astype("datetime64[Y]")).astype(numpy.int64)
+    return {
+        "timeOfDay": hour,
+        "dayOfWeek": weekday + hour / 24.0,
+        # Friday after 18:00 counts as weekend, as in NuPIC's DateEncoder
+        "weekend": ((weekday >= 5) | ((weekday == 4) & (hour > 18))).astype(numpy.float64),
+        "season": dayOfYear.astype(numpy.float64),
+    }
+
+
+class BatchDateEncoder(object):
+    """
+    Date encoder for N streams at once, concatenating the timeOfDay,
+    dayOfWeek, weekend and season encodings of an OPF DateEncoder spec
+
+    :param streams : number of streams
+    :param spec    : DateEncoder dict of a params file
+    """
+
+    def __init__(self, streams, spec):
+        if spec.get("holiday"):
+            raise ValueError("The holiday date encoding is not supported by the numpy engine")
+        self.parts = []
+        self.n = 0
+        for name in ("season", "dayOfWeek", "weekend", "timeOfDay"):
+            setting = spec.get(name)
+            if not setting:
+                continue
+            if isinstance(setting, (tuple, list)):
+                w, radius = setting
+            else:
+                w, radius = setting, DATE_RADIUS[name]
+            minval, maxval, periodic = DATE_RANGE[name]
+            n = int(round(w * (maxval - minval) / float(radius)))
+            if not periodic:
+                n += w
+            encoder = BatchScalarEncoder(streams, n, w, minval, maxval, periodic)
+            self.parts.append((name, self.n, encoder))
+            self.n += n
+        self.w = sum(encoder.w for _, _, encoder in self.parts)
+
+    def encode(self, timestamps, learn=True):
+        features = dateFeatures(timestamps)
+        return numpy.concatenate([encoder.encode(features[name], learn) + offset
+                                  for name, offset, encoder in self.parts], axis=1)
+
+
+class BatchSpatialPooler(object):
+    """
+    Global inhibition spatial pooler for N streams sharing one set of spParams
+
+    The potential pools and initial permanences are drawn once from the seed,
+    so every stream starts from the same pooler a NuPIC model with these
+    params would, and learns on its own (inputs, columns) permanence slice
+    from then on.
+
+    :param streams    : number of streams
+    :param inputWidth : number of input bits
+    :param spParams   : spParams section of a params file
+    """
+
+    def __init__(self, streams, inputWidth, spParams):
+        rng = numpy.random.RandomState(spParams.get("seed", 42))
+        self.columnCount = spParams["columnCount"]
+        self.numActive = spParams["numActiveColumnsPerInhArea"]
+        self.connectedPerm = spParams["synPermConnected"]
+        self.activeInc = spParams["synPermActiveInc"]
+        self.inactiveDec = spParams["synPermInactiveDec"]
+        self.boostStrength = spParams.get("boostStrength", 0.0)
+
+        potentialCount = int(round(spParams["potentialPct"] * inputWidth))
+        self.potential = numpy.zeros((self.columnCount, inputWidth), dtype=bool)
+        for column in range(self.columnCount):
+            self.potential[column, rng.permutation(inputWidth)[:potentialCount]] = True
+
+        # half of the potential synapses start connected, as in NuPIC
+        connected = rng.rand(self.columnCount, inputWidth) < 0.5
+        draw = rng.rand(self.columnCount, inputWidth)
+        initial = numpy.where(connected,
+                              self.connectedPerm + (1.0 - self.connectedPerm) * draw,
+                              self.connectedPerm * draw)
+        initial *= self.potential
+        # stored input major, so that the synapses onto the active input bits
+        # of every stream are contiguous rows
+        self.permanences = numpy.repeat(initial.T[None].astype(numpy.float32),
+                                        streams, axis=0)
+
+        # fixed tie breaker so that equal overlaps resolve the same way
+        self.tieBreaker = rng.rand(self.columnCount) * 0.01
+        self.targetDensity = self.numActive / float(self.columnCount)
+        self.dutyCycles = numpy.full((streams, self.columnCount), self.targetDensity)
+        self.streamIndex = numpy.arange(streams)[:, None]
+
+    def compute(self, inputBits, learn=True):
+        """
+        Returns the (streams, numActive) active columns of each stream
+
+        :param inputBits : (streams, active bits) indices of the input bits
+        :param learn     : whether to adapt the permanences
+        """
+        streams = self.streamIndex
+        # only the columns' synapses onto active bits can contribute
+        connected = self.permanences[streams, inputBits] >= self.connectedPerm
+        overlaps = connected.view(numpy.uint8).sum(axis=1, dtype=numpy.uint16)
+        overlaps = overlaps.astype(numpy.float64)
+
+        if self.boostStrength > 0:
+            overlaps *= numpy.exp((self.targetDensity - self.dutyCycles) *
+                                  self.boostStrength)
+        overlaps += self.tieBreaker
+        active = numpy.argpartition(-overlaps, self.numActive - 1,
+                                    axis=1)[:, :self.numActive]
+
+        if learn:
+            inputs = numpy.zeros(self.permanences.shape[:2], dtype=bool)
+            inputs[streams, inputBits] = True
+            delta = numpy.where(inputs, self.activeInc,
+                                -self.inactiveDec).astype(numpy.float32)
+            # (streams, numActive, inputs) slices of the active columns
+            rows = self.permanences[streams, :, active]
+            rows += delta[:, None, :] * self.potential[active]
+            numpy.clip(rows, 0.0, 1.0, out=rows)
+            self.permanences[streams, :, active] = rows
+
+            if self.boostStrength > 0:
+                activeMask = numpy.zeros(self.dutyCycles.shape)
+                activeMask[streams, active] = 1.0
+                self.dutyCycles += (activeMask - self.dutyCycles) / DUTY_CYCLE_PERIOD
+
+        return active
+
+
+class BatchTemporalMemory(object):
+    """
+    Temporal memory for N streams sharing one set of tmParams
+
+    Distal segments live in a per-stream pool of `segmentPool` slots holding
+    the owning cell and up to maxSynapsesPerSegment (presynaptic cell,
+    permanence) pairs, all stacked into (streams, pool, synapses) arrays.
+    Presynaptic cells are stored as indices into the flattened
+    (streams, cells + 1) activity array, whose last cell of every stream is
+    a sentinel that is never active and marks unused synapses, so segment
+    activity for every stream is a single gather and sum. Each stream keeps
+    one winner cell per active column.
+
+    :param streams     : number of streams
+    :param columnCount : number of columns
+    :param tmParams    : tmParams section of a params file
+    :param segmentPool : segment slots per stream
+    """
+
+    def __init__(self, streams, columnCount, tmParams, segmentPool=DEFAULT_SEGMENT_POOL):
+        self.rng = numpy.random.RandomState(tmParams.get("seed", 42))
+        self.streams = streams
+        self.columnCount = columnCount
+        self.cellsPerColumn = tmParams["cellsPerColumn"]
+        self.activationThreshold = tmParams["activationThreshold"]
+        self.minThreshold = tmParams["minThreshold"]
+        self.initialPerm = tmParams["initialPerm"]
+        self.newSynapseCount = tmParams["newSynapseCount"]
+        self.permanenceInc = tmParams["permanenceInc"]
+        self.permanenceDec = tmParams["permanenceDec"]
+        self.predictedSegmentDecrement = tmParams.get("predictedSegmentDecrement", 0.0)
+        self.connectedPerm = tmParams.get("connectedPerm", TM_CONNECTED_PERMANENCE)
+
+        self.cellCount = columnCount * self.cellsPerColumn
+        self.noCell = self.cellCount
+        self.stride = self.cellCount + 1
+        self.streamOffset = numpy.arange(streams) * self.stride
+        self.poolSize = min(segmentPool, self.cellCount * tmParams["maxSegmentsPerCell"])
+        synapses = tmParams["maxSynapsesPerSegment"]
+
+        self.segmentCell = numpy.full((streams, self.poolSize), self.noCell, dtype=numpy.int32)
+        self.segmentLastUsed = numpy.zeros((streams, self.poolSize), dtype=numpy.int64)
+        self.synapseCell = numpy.empty((streams, self.poolSize, synapses), dtype=numpy.int32)
+        self.synapseCell[:] = (self.streamOffset + self.noCell)[:, None, None]
+        self.synapsePerm = numpy.zeros((streams, self.poolSize, synapses), dtype=numpy.float32)
+        self.cellSegments = numpy.zeros((streams, self.stride), dtype=numpy.int32)
+        # slots in use are always below this mark
+        self.poolUsed = 0
+
+        self.activeCells = numpy.zeros((streams, self.stride), dtype=bool)
+        self.predictedCells = numpy.zeros((streams, self.stride), dtype=bool)
+        self.winnerCells = None
+        self.activeSegments = numpy.zeros((streams, 0), dtype=bool)
+        self.matchingSegments = numpy.zeros((streams, 0), dtype=bool)
+        self.segmentPotential = numpy.zeros((streams, 0), dtype=numpy.uint8)
+        self.iteration = 0
+        self.streamIndex = numpy.arange(streams)[:, None]
+
+    def compute(self, activeColumns, learn=True):
+        """
+        Advances every stream by one step and returns the raw anomaly score of
+        each, the fraction of its active columns that were not predicted
+
+        :param activeColumns : (streams, active) column indices
+        :param learn         : whether to grow and adapt segments
+        """
+        streams = self.streamIndex
+        cellsPerColumn = self.cellsPerColumn
+
+        cells = activeColumns[:, :, None] * cellsPerColumn + numpy.arange(cellsPerColumn)
+        predicted = self.predictedCells[streams[:, :, None], cells]
+        columnPredicted = predicted.any(axis=2)
+        anomalyScores = 1.0 - columnPredicted.mean(axis=1)
+
+        # predicted cells fire alone, unpredicted columns burst
+        activeMask = predicted | ~columnPredicted[:, :, None]
+        activeCells = numpy.zeros_like(self.activeCells)
+        activeCells[streams[:, :, None], cells] = activeMask
+
+        # winner of a bursting column: its best matching cell, else the cell
+        # with the fewest segments
+        bestKey = self._bestMatchingKeys(activeColumns)
+        hasMatch = (bestKey >= 0).any(axis=2)
+        leastUsed = (-self.cellSegments[streams[:, :, None], cells] +
+                     self.rng.rand(*cells.shape) * 0.5)
+        winnerOffset = numpy.where(columnPredicted, predicted.argmax(axis=2),
+                                   numpy.where(hasMatch, bestKey.argmax(axis=2),
+                                               leastUsed.argmax(axis=2)))
+        winnerCells = activeColumns * cellsPerColumn + winnerOffset
+
+        if learn and self.winnerCells is not None:
+            self._learn(activeColumns, activeCells, columnPredicted, hasMatch,
+                        bestKey, winnerOffset, winnerCells)
+
+        self.activeCells = activeCells
+        self.winnerCells = winnerCells
+        self._computeSegmentActivity()
+        self.iteration += 1
+        return anomalyScores
+
+    def _bestMatchingKeys(self, activeColumns):
+        """
+        Returns for each cell of the active columns, as a (streams, active,
+        cellsPerColumn) array, the key potential * poolSize + segment of its
+        best matching segment, or -1 when it has none
+        """
+        streams = self.streamIndex
+        best = numpy.full(activeColumns.shape + (self.cellsPerColumn,), -1, dtype=numpy.int64)
+        segmentStreams, segments = numpy.nonzero(self.matchingSegments)
+        if not len(segments):
+            return best
+
+        position = numpy.full((self.streams, self.columnCount + 1), -1, dtype=numpy.int64)
+        position[streams, activeColumns] = numpy.arange(activeColumns.shape[1])
+        owners = self.segmentCell[segmentStreams, segments]
+        columns = position[segmentStreams, owners // self.cellsPerColumn]
+        inActive = columns >= 0
+        keys = (self.segmentPotential[segmentStreams, segments].astype(numpy.int64) *
+                self.poolSize + segments)
+        numpy.maximum.at(best, (segmentStreams[inActive], columns[inActive],
+                                owners[inActive] % self.cellsPerColumn), keys[inActive])
+        return best
+
+    def _learn(self, activeColumns, activeCells, columnPredicted, hasMatch,
+               bestKey, winnerOffset, winnerCells):
+        streams = self.streamIndex
+        used = self.poolUsed
+
+        # reinforce the segments that correctly predicted an active cell
+        owners = self.segmentCell[:, :used]
+        correct = self.activeSegments & activeCells[streams, owners]
+        learnStreams, learnSegments = numpy.nonzero(correct)
+
+        # learn on the best matching segment of bursting winners
+        bursting = ~columnPredicted
+        matchStreams, matchColumns = numpy.nonzero(bursting & hasMatch)
+        matchSegments = bestKey[matchStreams, matchColumns,
+                                winnerOffset[matchStreams, matchColumns]] % self.poolSize
+
+        learnStreams = numpy.concatenate([learnStreams, matchStreams])
+        learnSegments = numpy.concatenate([learnSegments, matchSegments])
+        if len(learnSegments):
+            grow = (self.newSynapseCount -
+                    self.segmentPotential[learnStreams, learnSegments].astype(numpy.int64))
+            self._adapt(learnStreams, learnSegments, self.permanenceInc, self.permanenceDec)
+            self._grow(learnStreams, learnSegments, grow)
+            self.segmentLastUsed[learnStreams, learnSegments] = self.iteration
+
+        # punish segments that predicted a column that did not become active
+        if self.predictedSegmentDecrement > 0 and used:
+            columns = numpy.zeros((self.streams, self.columnCount + 1), dtype=bool)
+            columns[streams, activeColumns] = True
+            wrong = self.matchingSegments & ~columns[streams, owners // self.cellsPerColumn]
+            wrongStreams, wrongSegments = numpy.nonzero(wrong)
+            if len(wrongSegments):
+                self._adapt(wrongStreams, wrongSegments, -self.predictedSegmentDecrement, 0.0)
+
+        # bursting winners without a matching segment get a new one
+        newStreams, newColumns = numpy.nonzero(bursting & ~hasMatch)
+        if len(newStreams):
+            newSegments = self._allocate(newStreams, winnerCells[newStreams, newColumns])
+            self._grow(newStreams, newSegments,
+                       numpy.full(len(newStreams), self.newSynapseCount))
+
+    def _adapt(self, segmentStreams, segments, increment, decrement):
+        """
+        Moves the permanences of the given segments towards the previously
+        active cells and removes synapses that reach zero
+        """
+        presynaptic = self.synapseCell[segmentStreams, segments]
+        permanences = self.synapsePerm[segmentStreams, segments]
+        sentinel = (self.streamOffset[segmentStreams] + self.noCell)[:, None]
+        wasActive = numpy.take(self.activeCells, presynaptic)
+        present = presynaptic != sentinel
+        permanences += numpy.where(wasActive, increment, -decrement) * present
+        numpy.clip(permanences, 0.0, 1.0, out=permanences)
+        dead = present & (permanences <= 0.0)
+        presynaptic[dead] = numpy.broadcast_to(sentinel, presynaptic.shape)[dead]
+        self.synapseCell[segmentStreams, segments] = presynaptic
+        self.synapsePerm[segmentStreams, segments] = permanences
+
+    def _grow(self, segmentStreams, segments, counts):
+        """
+        Connects the given segments to up to counts previous winner cells they
+        are not connected to yet, replacing their weakest synapses when full
+        """
+        growing = counts > 0
+        if not growing.all():
+            segmentStreams = segmentStreams[growing]
+            segments = segments[growing]
+            counts = counts[growing]
+        presynaptic = self.synapseCell[segmentStreams, segments]
+        sentinel = (self.streamOffset[segmentStreams] + self.noCell)[:, None]
+        candidates = self.winnerCells[segmentStreams] + self.streamOffset[segmentStreams, None]
+        valid = ~(candidates[:, :, None] == presynaptic[:, None, :]).any(axis=2)
+        priority = numpy.where(valid, self.rng.rand(*candidates.shape), -1.0)
+        candidateOrder = numpy.argsort(-priority, axis=1)
+        counts = numpy.minimum(counts, valid.sum(axis=1))
+
+        slotKey = numpy.where(presynaptic == sentinel, -1.0,
+                              self.synapsePerm[segmentStreams, segments])
+        slotOrder = numpy.argsort(slotKey, axis=1)
+
+        width = min(candidates.shape[1], presynaptic.shape[1])
+        rows, ranks = numpy.nonzero(numpy.arange(width) < counts[:, None])
+        if not len(rows):
+            return
+        chosen = candidates[rows, candidateOrder[rows, ranks]]
+        slots = slotOrder[rows, ranks]
+        self.synapseCell[segmentStreams[rows], segments[rows], slots] = chosen
+        self.synapsePerm[segmentStreams[rows], segments[rows], slots] = self.initialPerm
+
+    def _allocate(self, segmentStreams, cells):
+        """
+        Returns new segment slots for the given (stream, cell) pairs, sorted by
+        stream, taking free slots first and recycling the least recently used
+        """
+        first = numpy.searchsorted(segmentStreams, segmentStreams, side="left")
+        ranks = numpy.arange(len(segmentStreams)) - first
+        needed = int(ranks.max()) + 1
+
+        streamsWithNew, rows = numpy.unique(segmentStreams, return_inverse=True)
+        # free slots sort before used ones and by index among themselves
+        key = numpy.where(self.segmentCell[streamsWithNew] == self.noCell,
+                          numpy.arange(self.poolSize) - self.poolSize,
+                          self.segmentLastUsed[streamsWithNew])
+        if needed < self.poolSize:
+            candidates = numpy.argpartition(key, needed - 1, axis=1)[:, :needed]
+        else:
+            candidates = numpy.tile(numpy.arange(self.poolSize), (len(streamsWithNew), 1))
+        order = numpy.argsort(numpy.take_along_axis(key, candidates, axis=1), axis=1)
+        slots = numpy.take_along_axis(candidates, order, axis=1)[rows, ranks]
+
+        previous = self.segmentCell[segmentStreams, slots]
+        numpy.subtract.at(self.cellSegments, (segmentStreams, previous), 1)
+        numpy.add.at(self.cellSegments, (segmentStreams, cells), 1)
+        self.cellSegments[:, self.noCell] = 0
+
+        self.segmentCell[segmentStreams, slots] = cells
+        self.segmentLastUsed[segmentStreams, slots] = self.iteration
+        self.synapseCell[segmentStreams, slots] = (self.streamOffset[segmentStreams] +
+                                                   self.noCell)[:, None]
+        self.synapsePerm[segmentStreams, slots] = 0.0
+        self.poolUsed = max(self.poolUsed, int(slots.max()) + 1)
+        return slots
+
+    def _computeSegmentActivity(self):
+        """
+        Computes which segments the current active cells activate and the
+        cells they predict for the next step
+        """
+        used = self.poolUsed
+        active = numpy.take(self.activeCells, self.synapseCell[:, :used])
+        connected = active & (self.synapsePerm[:, :used] >= self.connectedPerm)
+
+        # summing the bools as bytes avoids a conversion to int64
+        self.segmentPotential = active.view(numpy.uint8).sum(axis=2, dtype=numpy.uint8)
+        connectedCount = connected.view(numpy.uint8).sum(axis=2, dtype=numpy.uint8)
+        self.activeSegments = connectedCount >= self.activationThreshold
+        self.matchingSegments = self.segmentPotential >= self.minThreshold
+
+        self.predictedCells = numpy.zeros_like(self.activeCells)
+        segmentStreams, segments = numpy.nonzero(self.activeSegments)
+        self.predictedCells[segmentStreams, self.segmentCell[segmentStreams, segments]] = True
+
+    def stats(self):
+        """
+        Returns the (segments, synapses, active cells) count of each stream
+        """
+        sentinel = (self.streamOffset + self.noCell)[:, None, None]
+        return ((self.segmentCell != self.noCell).sum(axis=1),
+                (self.synapseCell != sentinel).sum(axis=(1, 2)),
+                self.activeCells.sum(axis=1))
+
+
+class BatchEngine(object):
+    """
+    Pure NumPy HTM for N streams sharing one params template
+
+    Encoders, spatial pooler and temporal memory keep the state of all
+    streams in stacked arrays, so step() advances every stream by one record
+    with a handful of vectorized operations instead of N model runs. Only
+    the anomaly score is computed, there is no classifier.
+
+    :param modelParams : MODEL_PARAMS dict of a params file
+    :param streams     : number of streams
+    :param segmentPool : TM segment slots per stream
+    """
+
+    def __init__(self, modelParams, streams, segmentPool=DEFAULT_SEGMENT_POOL):
+        params = modelParams["modelParams"]
+        self.streams = streams
+        self.learn = True
+
+        self.encoders = []
+        inputWidth = 0
+        for name, spec in sorted(params["sensorParams"]["encoders"].items()):
+            if spec is None or spec.get("classifierOnly"):
+                continue
+            if spec["type"] == "DateEncoder":
+                encoder = BatchDateEncoder(streams, spec)
+            elif spec["type"] in ("AdaptiveScalarEncoder", "ScalarEncoder"):
+                encoder = BatchScalarEncoder(streams, spec["n"], spec["w"],
+                                             spec.get("minval"), spec.get("maxval"),
+                                             bool(spec.get("periodic", False)))
+            else:
+                raise ValueError("Encoder type %r is not supported by the numpy engine"
+                                 % spec["type"])
+            self.encoders.append((spec["fieldname"], inputWidth, encoder))
+            inputWidth += encoder.n
+        if not self.encoders:
+            raise ValueError("The params do not encode any field into the SP input")
+
+        self.sp = BatchSpatialPooler(streams, inputWidth, params["spParams"])
+        self.tm = BatchTemporalMemory(streams, params["spParams"]["columnCount"],
+                                      params["tmParams"], segmentPool)
+        self.activeColumns = None
+
+    def step(self, timestamps, values):
+        """
+        Runs one record of every stream and returns their anomaly scores
+
+        :param timestamps : one timestamp per stream (datetime64 or datetime)
+        :param values     : one value per stream
+        """
+        fields = {
+            "timestamp": numpy.asarray(timestamps),
+            "value": numpy.asarray(values, dtype=numpy.float64),
+        }
+        inputBits = numpy.concatenate(
+            [encoder.encode(fields[fieldName], self.learn) + offset
+             for fieldName, offset, encoder in self.encoders], axis=1)
+        self.activeColumns = self.sp.compute(inputBits, self.learn)
+        return self.tm.compute(self.activeColumns, self.learn)
+
+    def run(self, timestamps, values):
+        """
+        Runs (records, streams) arrays through the engine and returns the
+        (records, streams) anomaly scores
+
+        :param timestamps : (records, streams) timestamps, or (records,) when shared
+        :param values     : (records, streams) values
+        """
+        values = numpy.asarray(values, dtype=numpy.float64)
+        timestamps = numpy.asarray(timestamps, dtype="datetime64[m]")
+        if timestamps.ndim == 1:
+            timestamps = numpy.repeat(timestamps[:, None], self.streams, axis=1)
+        scores = numpy.empty(values.shape)
+        for i in range(len(values)):
+            scores[i] = self.step(timestamps[i], values[i])
+        return scores
+
+    def nbytes(self):
+        """
+        Returns the memory held by the model state arrays
+        """
+        arrays = [self.sp.permanences, self.sp.dutyCycles, self.tm.segmentCell,
+                  self.tm.segmentLastUsed, self.tm.synapseCell, self.tm.synapsePerm,
+                  self.tm.cellSegments, self.tm.activeCells, self.tm.predictedCells]
+        return sum(array.nbytes for array in arrays)
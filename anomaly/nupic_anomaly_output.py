@@ -26,7 +26,6 @@ models.
 import csv
 from collections import deque
 from abc import ABCMeta, abstractmethod
-from nupic.algorithms import anomaly_likelihood
 # Try to import matplotlib, but we don't have to.
 try:
   import matplotlib
@@ -44,18 +43,36 @@ WEEKEND_HIGHLIGHT_COLOR = 'yellow'
 ANOMALY_THRESHOLD = 0.9
 
 
-class NuPICOutput(object):
+# Python 2 and 3 compatible abstract base
+_ABC = ABCMeta("_ABC", (object,), {})
 
-  __metaclass__ = ABCMeta
+
+
+def createAnomalyLikelihood():
+  """
+  Returns a new AnomalyLikelihood helper; NuPIC or htm.core is only imported
+  here, so that the interval helpers of this module need neither
+  """
+  try:
+    from nupic.algorithms import anomaly_likelihood
+  except ImportError:
+    # htm.core ships the same AnomalyLikelihood
+    from htm.algorithms import anomaly_likelihood
+  return anomaly_likelihood.AnomalyLikelihood()
+
+
+
+class NuPICOutput(_ABC):
 
 
   def __init__(self, name):
     self.name = name
-    self.anomalyLikelihoodHelper = anomaly_likelihood.AnomalyLikelihood()
+    self.anomalyLikelihoodHelper = createAnomalyLikelihood()
 
 
   @abstractmethod
-  def write(self, timestamp, value, predicted, anomalyScore):
+  def write(self, timestamp, value, predicted, anomalyScore,
+            anomalyLikelihood=None):
     pass
 
 
@@ -79,7 +96,7 @@ class NuPICFileOutput(NuPICOutput):
       'anomaly_score', 'anomaly_likelihood'
     ]
     outputFileName = "%s_out.csv" % self.name
-    print "Preparing to output %s data to %s" % (self.name, outputFileName)
+    print("Preparing to output %s data to %s" % (self.name, outputFileName))
     self.outputFile = open(outputFileName, "w")
     self.outputWriter = csv.writer(self.outputFile)
     self.outputWriter.writerow(headerRow)
@@ -87,11 +104,13 @@ class NuPICFileOutput(NuPICOutput):
 
 
 
-  def write(self, timestamp, value, predicted, anomalyScore):
+  def write(self, timestamp, value, predicted, anomalyScore,
+            anomalyLikelihood=None):
     if timestamp is not None:
-      anomalyLikelihood = self.anomalyLikelihoodHelper.anomalyProbability(
-        value, anomalyScore, timestamp
-      )
+      if anomalyLikelihood is None:
+        anomalyLikelihood = self.anomalyLikelihoodHelper.anomalyProbability(
+          value, anomalyScore, timestamp
+        )
       outputRow = [timestamp, value, predicted, anomalyScore, anomalyLikelihood]
       self.outputWriter.writerow(outputRow)
       self.lineCount += 1
@@ -100,7 +119,25 @@ class NuPICFileOutput(NuPICOutput):
 
   def close(self):
     self.outputFile.close()
-    print "Done. Wrote %i data lines to %s." % (self.lineCount, self.name)
+    print("Done. Wrote %i data lines to %s." % (self.lineCount, self.name))
+
+
+
+class NuPICNullOutput(NuPICOutput):
+  """
+  Discards everything written to it, standing in for the plot when running
+  headless or benchmarking.
+  """
+
+
+  def write(self, timestamp, value, predicted, anomalyScore,
+            anomalyLikelihood=None):
+    pass
+
+
+
+  def close(self):
+    pass
 
 
 
@@ -131,11 +168,13 @@ def extractWeekendHighlights(dates):
 
 
 
-def extractAnomalyIndices(anomalyLikelihood):
+def extractAnomalyIndices(anomalyLikelihood, threshold=None):
+  if threshold is None:
+    threshold = ANOMALY_THRESHOLD
   anomaliesOut = []
   anomalyStart = None
   for i, likelihood in enumerate(anomalyLikelihood):
-    if likelihood >= ANOMALY_THRESHOLD:
+    if likelihood >= threshold:
       if anomalyStart is None:
         # Mark start of anomaly
         anomalyStart = i
@@ -200,7 +239,7 @@ class NuPICPlotOutput(NuPICOutput):
 
 
   def initializeLines(self, timestamp):
-    print "initializing %s" % self.name
+    print("initializing %s" % self.name)
     anomalyRange = (0.0, 1.0)
     self.dates = deque([timestamp] * WINDOW, maxlen=WINDOW)
     self.convertedDates = deque(
@@ -253,16 +292,18 @@ class NuPICPlotOutput(NuPICOutput):
 
 
 
-  def write(self, timestamp, value, predicted, anomalyScore):
+  def write(self, timestamp, value, predicted, anomalyScore,
+            anomalyLikelihood=None):
 
     # We need the first timestamp to initialize the lines at the right X value,
     # so do that check first.
     if not self.linesInitialized:
       self.initializeLines(timestamp)
 
-    anomalyLikelihood = self.anomalyLikelihoodHelper.anomalyProbability(
-      value, anomalyScore, timestamp
-    )
+    if anomalyLikelihood is None:
+      anomalyLikelihood = self.anomalyLikelihoodHelper.anomalyProbability(
+        value, anomalyScore, timestamp
+      )
 
     self.dates.append(timestamp)
     self.convertedDates.append(date2num(timestamp))
@@ -318,3 +359,4 @@ class NuPICPlotOutput(NuPICOutput):
 
 NuPICOutput.register(NuPICFileOutput)
 NuPICOutput.register(NuPICPlotOutput)
+NuPICOutput.register(NuPICNullOutput)
@@ -0,0 +1,245 @@
+#!/usr/bin/env python
+
+"""
+Importing Packages
+"""
+# general
+import os
+import signal
+import marshal
+import cProfile
+
+
+"""
+Global variables
+"""
+PROFILE_MODES = ["cprofile", "sample"]
+# 100 Hz keeps the sampler well under 1% of the run time
+DEFAULT_SAMPLE_INTERVAL = 0.01
+# profilers between start() and pause() in this process
+_running = []
+
+
+class SamplingProfiler(object):
+    """
+    Statistical profiler sampling the main thread's stack on SIGPROF
+
+    Every `interval` seconds of CPU time the signal handler walks the
+    interrupted stack and counts it, which costs a few microseconds per sample
+    and nothing in between, so it can be left on for production runs. Only
+    the thread running the signal handler (the main thread) is sampled.
+
+    :param interval : seconds of CPU time between samples
+    """
+
+    def __init__(self, interval=DEFAULT_SAMPLE_INTERVAL):
+        if not hasattr(signal, "setitimer"):
+            raise RuntimeError("Sampling needs signal.setitimer (Unix only)")
+        self.interval = interval
+        self.samples = {}
+        self.sampleCount = 0
+        self._previousHandler = None
+
+    def start(self):
+        self._previousHandler = signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, self._previousHandler or signal.SIG_DFL)
+
+    def _sample(self, signum, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+            frame = frame.f_back
+        stack = tuple(reversed(stack))
+        self.samples[stack] = self.samples.get(stack, 0) + 1
+        self.sampleCount += 1
+
+    def writeCollapsed(self, path):
+        """
+        Writes the samples in the collapsed stack format read by flamegraph.pl
+        and speedscope
+
+        :param path : output file
+        """
+        writeCollapsed(self.samples, path)
+
+    def writePstats(self, path):
+        """
+        Writes the samples as a pstats file, with sample counts standing in
+        for call counts and sampled CPU time for the timings
+
+        :param path : output file
+        """
+        stats = {}
+        for stack, count in self.samples.items():
+            seconds = count * self.interval
+            seen = set()
+            for depth, function in enumerate(stack):
+                cc, nc, tt, ct, callers = stats.get(function,
+                                                    (0, 0, 0.0, 0.0, {}))
+                if depth == len(stack) - 1:
+                    tt += seconds
+                # recursive functions are only charged once per sample
+                if function not in seen:
+                    seen.add(function)
+                    cc += count
+                    nc += count
+                    ct += seconds
+                    if depth > 0:
+                        caller = stack[depth - 1]
+                        ccc, cnc, ctt, cct = callers.get(caller,
+                                                         (0, 0, 0.0, 0.0))
+                        callers[caller] = (ccc + count, cnc + count,
+                                           ctt + (seconds if depth == len(stack) - 1 else 0.0),
+                                           cct + seconds)
+                stats[function] = (cc, nc, tt, ct, callers)
+        with open(path, "wb") as outputFile:
+            marshal.dump(stats, outputFile)
+
+
+def writeCollapsed(stacks, path):
+    """
+    Writes stacks in the collapsed stack format read by flamegraph.pl and
+    speedscope, one "root;...;leaf count" line per distinct stack
+
+    :param stacks : dict of (filename, line, name) tuples, root first, to counts
+    :param path   : output file
+    """
+    with open(path, "w") as outputFile:
+        for stack, count in sorted(stacks.items()):
+            if count > 0:
+                outputFile.write("%s %i\n" % (";".join(
+                    "%s (%s:%i)" % (name, os.path.basename(filename), line)
+                    for filename, line, name in stack), count))
+
+
+def callGraphStacks(stats, unit=1e-6, minShare=1e-4):
+    """
+    Returns collapsed stacks estimated from cProfile stats, in microseconds
+
+    cProfile only records caller -> callee edges, not whole stacks, so the
+    time of a function is split between the stacks leading to it in
+    proportion to the time each of its callers spent in it. This is exact
+    for call trees and an estimate where a function's cost depends on who
+    calls it. Recursive calls are folded into the outermost one, and paths
+    below minShare of the total time are dropped to keep the output small.
+
+    :param stats    : the stats dict of a pstats.Stats or cProfile.Profile
+    :param unit     : seconds per count of the returned stacks
+    :param minShare : smallest fraction of the total time kept as a path
+    """
+    children = {}
+    roots = []
+    for function, (cc, nc, tt, ct, callers) in stats.items():
+        for caller, edge in callers.items():
+            # older profilers store a call count instead of the edge timings
+            edgeSeconds = edge[3] if isinstance(edge, tuple) else ct * edge / max(nc, 1)
+            children.setdefault(caller, []).append((function, edgeSeconds))
+        if not [caller for caller in callers if caller in stats]:
+            roots.append(function)
+
+    total = sum(stats[function][3] for function in roots)
+    minimum = total * minShare
+    stacks = {}
+    pending = [((function,), stats[function][3]) for function in roots]
+    while pending:
+        stack, seconds = pending.pop()
+        function = stack[-1]
+        cc, nc, tt, ct, callers = stats[function]
+        share = seconds / ct if ct > 0 else 0.0
+        stacks[stack] = stacks.get(stack, 0) + int(round(tt * share / unit))
+        for child, edgeSeconds in children.get(function, ()):
+            if child not in stack and edgeSeconds * share >= minimum:
+                pending.append((stack + (child,), edgeSeconds * share))
+    return stacks
+
+
+def pauseAll():
+    """
+    Pauses the profilers running in this process, e.g. those of the parent
+    a forked worker inherits and would never write, and which keep a profiler
+    of its own from starting on Python 3.12+
+    """
+    for profiler in list(_running):
+        profiler.pause()
+
+
+class Profiler(object):
+    """
+    Profiles the code between start() and stop(), or the block it wraps
+
+    In "cprofile" mode the code runs under the deterministic cProfile alone,
+    whose stats are written to <prefix>.pstats, and stacks estimated from its
+    caller graph (see callGraphStacks) to <prefix>.collapsed for flame
+    graphs. In "sample" mode only the low overhead sampler runs and its
+    samples are written to both files.
+
+    pause() and start() leave out the code in between, write() writes what
+    was profiled so far, e.g. from a process that will not get to stop().
+
+    :param mode     : "cprofile" or "sample"
+    :param prefix   : path prefix of the output files
+    :param interval : seconds of CPU time between samples
+    """
+
+    def __init__(self, mode, prefix, interval=DEFAULT_SAMPLE_INTERVAL):
+        if mode not in PROFILE_MODES:
+            raise ValueError("Unknown profile mode %r, expected one of %s"
+                             % (mode, ", ".join(PROFILE_MODES)))
+        self.mode = mode
+        self.prefix = prefix
+        self.sampler = SamplingProfiler(interval) if mode == "sample" else None
+        self.profile = cProfile.Profile() if mode == "cprofile" else None
+
+    def start(self):
+        if self.sampler is not None:
+            self.sampler.start()
+        if self.profile is not None:
+            self.profile.enable()
+        _running.append(self)
+
+    def pause(self):
+        if self.sampler is not None:
+            self.sampler.stop()
+        if self.profile is not None:
+            self.profile.disable()
+        if self in _running:
+            _running.remove(self)
+
+    def write(self):
+        """
+        Writes the output files, returns their paths
+        """
+        pstatsPath = self.prefix + ".pstats"
+        collapsedPath = self.prefix + ".collapsed"
+        if self.profile is not None:
+            self.profile.dump_stats(pstatsPath)
+            writeCollapsed(callGraphStacks(self.profile.stats), collapsedPath)
+        else:
+            self.sampler.writePstats(pstatsPath)
+            self.sampler.writeCollapsed(collapsedPath)
+        return pstatsPath, collapsedPath
+
+    def stop(self):
+        """
+        Stops profiling and writes the output files
+        """
+        self.pause()
+        pstatsPath, collapsedPath = self.write()
+        if self.profile is not None:
+            print("Profile (cprofile) written to %s and %s" % (pstatsPath, collapsedPath))
+        else:
+            print("Profile (sample, %i samples) written to %s and %s"
+                  % (self.sampler.sampleCount, pstatsPath, collapsedPath))
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.stop()
+        return False
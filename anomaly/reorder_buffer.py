@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+
+"""
+Importing Packages
+"""
+# general
+import csv
+import heapq
+from operator import itemgetter
+
+
+class ReorderBuffer(object):
+    """
+    Bounded buffer releasing out-of-order records in timestamp order
+
+    Records are held until the newest timestamp seen is more than `lateness`
+    ahead of them, then released oldest first. A record older than the last
+    released timestamp can no longer be put in order; it is counted as late,
+    optionally written to a csv file, and never reaches the model.
+
+    The buffer never holds more than `maxRecords` records. When it is full the
+    oldest record is released early, which keeps memory fixed at the cost of
+    possibly more late records. Each stream owns its own buffer, so the cost
+    of a push is O(log maxRecords) regardless of how many streams are running.
+
+    :param lateness   : datetime.timedelta records may arrive behind the newest
+    :param maxRecords : maximum number of records held at once
+    :param latePath   : optional csv file receiving late records
+    :param key        : function returning the timestamp of a record
+    :param fields     : header row of the late records file, one name per
+                        item of a record
+    """
+
+    def __init__(self, lateness, maxRecords=1000, latePath=None,
+                 key=itemgetter(1), fields=("record", "timestamp", "value")):
+        if maxRecords < 1:
+            raise ValueError("maxRecords must be at least 1")
+        self.lateness = lateness
+        self.maxRecords = maxRecords
+        self.key = key
+
+        self._heap = []
+        self._sequence = 0
+        self._newest = None
+        self._released = None
+
+        self.received = 0
+        self.released = 0
+        self.late = 0
+        self.overflow = 0
+        self.reordered = 0
+        self.maxDepth = 0
+
+        self.lateFile = None
+        self.lateWriter = None
+        if latePath is not None:
+            self.lateFile = open(latePath, "w")
+            self.lateWriter = csv.writer(self.lateFile)
+            self.lateWriter.writerow(list(fields))
+
+    def push(self, record):
+        """
+        Adds a record and returns the list of records now ready, in order
+
+        :param record : record to buffer
+        """
+        self.received += 1
+        timestamp = self.key(record)
+
+        if self._released is not None and timestamp < self._released:
+            self.late += 1
+            if self.lateWriter is not None:
+                self.lateWriter.writerow(list(record))
+            return []
+
+        if self._newest is None or timestamp > self._newest:
+            self._newest = timestamp
+        elif timestamp < self._newest:
+            self.reordered += 1
+
+        # the sequence number keeps equal timestamps in arrival order
+        heapq.heappush(self._heap, (timestamp, self._sequence, record))
+        self._sequence += 1
+        self.maxDepth = max(self.maxDepth, len(self._heap))
+
+        ready = []
+        watermark = self._newest - self.lateness
+        while self._heap and self._heap[0][0] <= watermark:
+            ready.append(self._pop())
+        while len(self._heap) > self.maxRecords:
+            self.overflow += 1
+            ready.append(self._pop())
+        return ready
+
+    def flush(self):
+        """
+        Releases every buffered record in order, used at the end of a stream
+        """
+        ready = []
+        while self._heap:
+            ready.append(self._pop())
+        return ready
+
+    def reorder(self, records):
+        """
+        Generator putting an iterable of records in timestamp order
+
+        :param records : iterable of records
+        """
+        for record in records:
+            for ready in self.push(record):
+                yield ready
+        for ready in self.flush():
+            yield ready
+
+    def _pop(self):
+        timestamp, _, record = heapq.heappop(self._heap)
+        self._released = timestamp
+        self.released += 1
+        return record
+
+    def summary(self):
+        """
+        Returns a dict of counters describing the reordering done
+        """
+        return {
+            "received": self.received,
+            "released": self.released,
+            "reordered": self.reordered,
+            "late": self.late,
+            "overflow": self.overflow,
+            "maxDepth": self.maxDepth,
+        }
+
+    def close(self):
+        if self.lateFile is not None:
+            self.lateFile.close()
+        print("Reorder buffer: %i records reordered, %i late, %i released early"
+              % (self.reordered, self.late, self.overflow))
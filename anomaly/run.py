@@ -8,16 +8,32 @@ import csv
 import datetime
 import nupic_anomaly_output as nupic_output
 import argparse
+import numpy
+from load_shedding import LoadShedder
+from reorder_buffer import ReorderBuffer
+from instrumentation import RunStats, NullRunStats, STAGES
+from profiling import Profiler, PROFILE_MODES, DEFAULT_SAMPLE_INTERVAL
+from model_monitor import ModelMonitor
+from encoder_cache import cacheEncoders, cacheSummary, DEFAULT_CACHE_SIZE
+from sdr_recorder import SDRRecorder
+from hot_swap import HotSwapper
 
 # model parameters
 from machine_model_params import MODEL_PARAMS as machine_model_params
 from twitter_model_params import MODEL_PARAMS as twitter_model_params
 
 # model
-from nupic.frameworks.opf.model_factory import ModelFactory
+from engines import ENGINES, createEngine
 
 # plotting
-from nupic.data.inference_shifter import InferenceShifter
+from engines import PredictionShifter
+
+# anomaly likelihood
+try:
+    from nupic.algorithms import anomaly_likelihood
+except ImportError:
+    # htm.core ships the same AnomalyLikelihood
+    from htm.algorithms import anomaly_likelihood
 
 
 """
@@ -26,79 +42,319 @@ Global variables
 DATE_FORMAT = "%m/%d/%Y %H:%M" # ex) 2/3/2001 21:45 
 
 
-def createModel(model_par):
+def createModel(model_par, engine="nupic"):
     """
     Creates the HTM model
     
     :param model_params : parameters for model
+    :param engine       : HTM implementation to use, one of engines.ENGINES
+    """
+    return createEngine(engine, model_par, "value")
+
+def cacheModel(model, maxSize, timestamps=None):
+    """
+    Puts an encoder cache in front of the encoders of a model and returns the
+    cache wrappers by encoder name
+
+    :param model      : HTM model
+    :param maxSize    : encodings cached per encoder
+    :param timestamps : dates of the dataset encoded ahead of the run, None
+                        to encode them as they come
+    """
+    caches = cacheEncoders(model, maxSize)
+    if timestamps is not None:
+        for wrapper in caches.values():
+            if hasattr(wrapper, "precompute"):
+                wrapper.precompute(timestamps)
+    return caches
+
+def readRecords(csvReader):
+    """
+    Parses csv rows into (counter, timestamp, value) records
+
+    :param csvReader : csv reader positioned after the header rows
+    """
+    counter = 0
+    for row in csvReader:
+        counter += 1
+        # print after every 100 iterations
+        if (counter % 100 == 0):
+            print("Read %i lines..." % counter)
+        timestamp = datetime.datetime.strptime(row[0], DATE_FORMAT)
+        value = float(row[1])
+        yield counter, timestamp, value
+
+def markLast(records):
     """
-    model = ModelFactory.create(model_par)
-    model.enableInference({
-        "predictedField": "value"
-        })
-    return model
+    Yields (record, last) pairs, last being True for the final record only
 
-def runModel(model, csv_path, outputCSVFile, outputPlotFile):
+    :param records : iterable of records
+    """
+    records = iter(records)
+    try:
+        previous = next(records)
+    except StopIteration:
+        return
+    for record in records:
+        yield previous, False
+        previous = record
+    yield previous, True
+
+def runModel(model, csv_path, outputCSVFile, outputPlotFile, shedder=None,
+             reorder=None, stats=None, profiler=None, monitor=None,
+             recorder=None, swapper=None):
     """
     Runs HTM model with input data
 
-    :param model    : input HTM model
+    :param model    : input HTM model, or a function building it, so that
+                      runModel holds the only reference to a model the
+                      swapper replaces
     :param csv_path : path to csv dataset file
     :param outputCSVFile : output csv file
     :param outputPlotFile: output plot file
+    :param shedder  : optional LoadShedder keeping the run within a latency budget
+    :param reorder  : optional ReorderBuffer putting late records back in order
+    :param stats    : optional RunStats timing each stage of every record
+    :param profiler : optional Profiler covering the record loop only
+    :param monitor  : optional ModelMonitor sampling model growth and memory
+    :param recorder : optional SDRRecorder tracing active and predicted columns
+    :param swapper  : optional HotSwapper replacing the model when its params change
     """
+    if stats is None:
+        stats = NullRunStats()
+    if not hasattr(model, "run"):
+        model = model()
 
     # get input csv file and read it
     inputFilePath = csv_path
-    inputFile = open(inputFilePath, "rb")
+    inputFile = open(inputFilePath, "r")
     csvReader = csv.reader(inputFile)
 
     # skip first 3 header rows
-    csvReader.next()
-    csvReader.next()
-    csvReader.next()
+    next(csvReader)
+    next(csvReader)
+    next(csvReader)
 
     # plot prediction
-    shifter = InferenceShifter()
+    shifter = PredictionShifter()
+
+    # release out-of-order records in timestamp order
+    records = readRecords(csvReader)
+    if reorder is not None:
+        records = reorder.reorder(records)
 
     # loop through data
-    counter = 0
-    for row in csvReader:
-        counter += 1
-        # print after every 100 iterations
-        if (counter % 100 == 0):
-            print("Read %i lines..." % counter)
-        timestamp = datetime.datetime.strptime(row[0], DATE_FORMAT)
-        value = float(row[1])
-        result = model.run({
-            "timestamp":timestamp,
-            "value":value
-            })
+    if profiler is not None:
+        profiler.start()
+    try:
+        stats.start()
+        for (counter, timestamp, value), last in markLast(records):
+            stats.mark("parse")
+
+            # degrade deterministically when behind the latency budget
+            if shedder is not None:
+                shedder.startRecord()
+                admitted = shedder.admit(counter, timestamp, value)
+                if admitted is None and last:
+                    # the stream ends, run what is folded into the aggregate
+                    admitted = shedder.flush()
+                if admitted is None:
+                    shedder.finishRecord()
+                    stats.endRecord()
+                    stats.skip()
+                    continue
+                timestamp, value = admitted
+                stats.skip()
+
+            # a model rebuilt from edited params takes over between records
+            if swapper is not None:
+                swapped = swapper.poll(model)
+                if shedder is not None and swapped is not model:
+                    # the new model starts out learning
+                    shedder.modelSwapped()
+                model = swapped
+
+            if shedder is not None:
+                shedder.applyLearning(model, counter, timestamp)
+                stats.skip()
+
+            result = model.run({
+                "timestamp":timestamp,
+                "value":value
+                })
+            if swapper is not None:
+                swapper.observe(timestamp, value)
+            stats.mark("run")
        
-        # plotting prediction and anomaly detection
-        plot_result = shifter.shift(result)
-        plot_prediction = plot_result.inferences["multiStepBestPredictions"][1]
-        plot_anomalyScore = plot_result.inferences["anomalyScore"]
-        outputPlotFile.write(timestamp, value, plot_prediction, plot_anomalyScore)
-
-        # output csv for anomaly detection
-        prediction = result.inferences["multiStepBestPredictions"][1]
-        anomalyScore = result.inferences["anomalyScore"]
-        outputCSVFile.write(timestamp, value, prediction, anomalyScore)
-
+            # plotting prediction and anomaly detection
+            plot_result = shifter.shift(result)
+            stats.mark("shift")
+
+            # the likelihood is computed once and shared by both outputs
+            anomalyScore = result.inferences["anomalyScore"]
+            anomalyLikelihood = outputCSVFile.anomalyLikelihoodHelper.anomalyProbability(
+                value, anomalyScore, timestamp)
+            stats.mark("likelihood")
+
+            if shedder is None or not shedder.skipSinks(counter, timestamp):
+                plot_prediction = plot_result.inferences["multiStepBestPredictions"][1]
+                plot_anomalyScore = plot_result.inferences["anomalyScore"]
+                outputPlotFile.write(timestamp, value, plot_prediction, plot_anomalyScore,
+                                     anomalyLikelihood)
+            stats.mark("plot")
+
+            # output csv for anomaly detection
+            prediction = result.inferences["multiStepBestPredictions"][1]
+            outputCSVFile.write(timestamp, value, prediction, anomalyScore,
+                                anomalyLikelihood)
+            stats.mark("csv")
+
+            if recorder is not None:
+                recorder.record(model, timestamp)
+                stats.mark("trace")
+
+            # sampling time is kept out of the stage timings
+            if monitor is not None and monitor.update(model, timestamp):
+                stats.skip()
+
+            if shedder is not None:
+                shedder.finishRecord()
+            stats.endRecord()
+    finally:
+        if profiler is not None:
+            profiler.stop()
 
     # close all files after usage
     inputFile.close()
     outputCSVFile.close()
     outputPlotFile.close()
+    if shedder is not None:
+        shedder.close()
+    if reorder is not None:
+        reorder.close()
+    if monitor is not None:
+        monitor.close()
+    if recorder is not None:
+        recorder.close()
+    if swapper is not None:
+        swapper.close()
+    stats.close()
 
     return result
 
 
-def runDataset(dataset):
+def loadArrays(csv_path):
+    """
+    Reads a dataset into columnar arrays for runBatch
+
+    Returns (timestamps, values) where timestamps is a datetime64[m] array and
+    values a float64 array.
+
+    :param csv_path : path to csv dataset file
+    """
+    inputFile = open(csv_path, "r")
+    csvReader = csv.reader(inputFile)
+
+    # skip first 3 header rows
+    next(csvReader)
+    next(csvReader)
+    next(csvReader)
+
+    timestamps = []
+    values = []
+    for row in csvReader:
+        timestamps.append(datetime.datetime.strptime(row[0], DATE_FORMAT))
+        values.append(row[1])
+    inputFile.close()
+
+    return (numpy.array(timestamps, dtype="datetime64[m]"),
+            numpy.array(values, dtype=numpy.float64))
+
+def runBatch(model, timestamps, values, likelihoodHelper=None):
+    """
+    Runs HTM model over an array of records in one call
+
+    The input dict handed to model.run is reused between records and the
+    results are written straight into preallocated arrays, so the per-record
+    cost is little more than model.run itself. Returns a dict of columnar
+    float64 arrays "anomalyScore", "prediction" and "anomalyLikelihood";
+    predictions the model could not make yet are NaN.
+
+    :param model     : input HTM model
+    :param timestamps: datetime64 array, or array of datetime objects
+    :param values    : float array of input values
+    :param likelihoodHelper: AnomalyLikelihood to continue, a new one by default
+    """
+    count = len(values)
+    if len(timestamps) != count:
+        raise ValueError("Got %i timestamps for %i values"
+                         % (len(timestamps), count))
+
+    # the DateEncoder needs datetime objects, convert them all in one pass
+    if numpy.issubdtype(numpy.asarray(timestamps).dtype, numpy.datetime64):
+        timestamps = numpy.asarray(timestamps, dtype="datetime64[us]").astype(object)
+    if likelihoodHelper is None:
+        likelihoodHelper = anomaly_likelihood.AnomalyLikelihood()
+
+    anomalyScores = numpy.empty(count, dtype=numpy.float64)
+    predictions = numpy.empty(count, dtype=numpy.float64)
+    anomalyLikelihoods = numpy.empty(count, dtype=numpy.float64)
+
+    # hoist attribute lookups out of the loop
+    run = model.run
+    anomalyProbability = likelihoodHelper.anomalyProbability
+    nan = float("nan")
+    record = {"timestamp": None, "value": None}
+
+    for i in range(count):
+        timestamp = timestamps[i]
+        value = values[i]
+        record["timestamp"] = timestamp
+        record["value"] = value
+        inferences = run(record).inferences
+
+        anomalyScore = inferences["anomalyScore"]
+        prediction = inferences["multiStepBestPredictions"][1]
+        anomalyScores[i] = anomalyScore
+        predictions[i] = nan if prediction is None else prediction
+        anomalyLikelihoods[i] = anomalyProbability(value, anomalyScore, timestamp)
+
+    return {
+        "anomalyScore": anomalyScores,
+        "prediction": predictions,
+        "anomalyLikelihood": anomalyLikelihoods,
+    }
+
+
+def runDataset(dataset, latencyBudget=0.0, lagThresholds=(1.0, 5.0, 20.0),
+               aggregateSize=4, lateness=0.0, reorderSize=1000,
+               statsInterval=None, profile=None,
+               profileInterval=DEFAULT_SAMPLE_INTERVAL, monitorEvery=0,
+               memoryBudget=None, monitorHorizon=1000000, engine="nupic",
+               encoderCache=0, precomputeDates=False, traceSDR=False,
+               hotReload=False, warmupSize=1000, reloadInterval=5.0):
     """
     Runs through the dataset given for anomaly detection
 
+    :param dataset       : dataset index, machine = 0 and twitter = 1
+    :param latencyBudget : seconds available per record, 0 disables load shedding
+    :param lagThresholds : lag in seconds entering each load shedding level
+    :param aggregateSize : records averaged per model run when aggregating
+    :param lateness      : minutes a record may arrive late, 0 disables reordering
+    :param reorderSize   : maximum number of records held for reordering
+    :param statsInterval : seconds between latency reports, None disables them
+    :param profile       : profiler mode, "cprofile" or "sample", None disables it
+    :param profileInterval: seconds of CPU time between profiler samples
+    :param monitorEvery  : records between model growth samples, 0 disables them
+    :param memoryBudget  : memory budget in MB the growth is checked against
+    :param monitorHorizon: records ahead the memory growth is extrapolated
+    :param engine        : HTM implementation to use, one of engines.ENGINES
+    :param encoderCache  : encodings cached per encoder, 0 disables the cache
+    :param precomputeDates: encode every date of the dataset before the run
+    :param traceSDR      : record active and predicted columns of every record
+    :param hotReload     : rebuild and swap in the model when its params file changes
+    :param warmupSize    : recent records replayed into a rebuilt model
+    :param reloadInterval: seconds between checks of the params file
     """
 
     # set model parameters, csv path, and output csv/plot
@@ -109,6 +365,14 @@ def runDataset(dataset):
         nupic_output.ANOMALY_THRESHOLD = 0.97
         outputCSVFile = nupic_output.NuPICFileOutput("Machine_Temp_Sys_Failure_OUTPUT_ANOMALY_CSV")
         outputPlotFile = nupic_output.NuPICPlotOutput("Machine_Temp_Sys_Failure_OUTPUT_ANOMALY_PLOT")
+        shedLog = "Machine_Temp_Sys_Failure_SHED_LOG.csv"
+        lateLog = "Machine_Temp_Sys_Failure_LATE_RECORDS.csv"
+        statsFile = "Machine_Temp_Sys_Failure_STATS.json"
+        profilePrefix = "Machine_Temp_Sys_Failure_PROFILE"
+        growthLog = "Machine_Temp_Sys_Failure_MODEL_GROWTH.csv"
+        tracePrefix = "Machine_Temp_Sys_Failure_SDR_TRACE"
+        paramsFile = "./machine_model_params.py"
+        swapLog = "Machine_Temp_Sys_Failure_SWAP_LOG.csv"
     elif(dataset == 1):
         model_par = twitter_model_params
         csv_path = "./data/Twitter_volume_GOOG.csv"
@@ -117,15 +381,100 @@ def runDataset(dataset):
         print(nupic_output.WINDOW)
         outputCSVFile = nupic_output.NuPICFileOutput("Twitter_Volume_Google_OUTPUT_ANOMALY_CSV")
         outputPlotFile = nupic_output.NuPICPlotOutput("Twitter_Volume_Google_OUTPUT_ANOMALY_PLOT")
+        shedLog = "Twitter_Volume_Google_SHED_LOG.csv"
+        lateLog = "Twitter_Volume_Google_LATE_RECORDS.csv"
+        statsFile = "Twitter_Volume_Google_STATS.json"
+        profilePrefix = "Twitter_Volume_Google_PROFILE"
+        growthLog = "Twitter_Volume_Google_MODEL_GROWTH.csv"
+        tracePrefix = "Twitter_Volume_Google_SDR_TRACE"
+        paramsFile = "./twitter_model_params.py"
+        swapLog = "Twitter_Volume_Google_SWAP_LOG.csv"
     else:
         print("No specified dataset, error will occur")
         model_params = None
 
-    # create model
-    model = createModel(model_par)
+    # optional caching of repeated encodings, in front of the encoders of
+    # every model run; caches holds those of the model currently running
+    caches = {}
+    prepareModel = None
+    if encoderCache > 0:
+        timestamps = loadArrays(csv_path)[0] if precomputeDates else None
+
+        def prepareModel(newModel):
+            return cacheModel(newModel, encoderCache, timestamps)
+
+    def swapCaches(wrappers):
+        caches.clear()
+        caches.update(wrappers)
+
+    def newModel():
+        """
+        Creates the model, called by runModel so that it holds the only
+        reference to it
+        """
+        model = createModel(model_par, engine)
+        if prepareModel is not None:
+            swapCaches(prepareModel(model))
+            if not caches:
+                print("warning: --encoderCache %i caches nothing, the %s engine has no "
+                      "scalar or date encoder it can cache" % (encoderCache, engine))
+        return model
+
+    # optional latency budget
+    shedder = None
+    if latencyBudget > 0:
+        shedder = LoadShedder(latencyBudget, lagThresholds, aggregateSize, shedLog)
+
+    # optional reordering of late records
+    reorder = None
+    if lateness > 0:
+        reorder = ReorderBuffer(datetime.timedelta(minutes=lateness), reorderSize, lateLog)
+
+    # optional trace of the active and predicted columns
+    recorder = None
+    if traceSDR:
+        recorder = SDRRecorder(tracePrefix)
+
+    # optional rebuild of the model when its params file is edited
+    swapper = None
+    if hotReload:
+        swapper = HotSwapper(paramsFile, engine, warmupSize, reloadInterval, swapLog,
+                             prepare=prepareModel,
+                             onSwap=swapCaches if prepareModel is not None else None)
+
+    # optional per-stage latency reporting
+    stats = None
+    if statsInterval is not None:
+        stats = RunStats(statsInterval, statsFile,
+                         STAGES + ["trace"] if recorder is not None else STAGES)
+        if shedder is not None:
+            stats.attach("shedding", shedder.summary)
+        if reorder is not None:
+            stats.attach("reordering", reorder.summary)
+        if encoderCache > 0:
+            stats.attach("encoder_cache", lambda: cacheSummary(caches))
+        if swapper is not None:
+            stats.attach("hot_swap", swapper.summary)
+
+    # optional profiling of the record loop
+    profiler = None
+    if profile is not None:
+        profiler = Profiler(profile, profilePrefix, profileInterval)
+
+    # optional model growth and memory monitoring
+    monitor = None
+    if monitorEvery > 0:
+        budget = memoryBudget * 1048576 if memoryBudget is not None else None
+        monitor = ModelMonitor(growthLog, monitorEvery, budget, monitorHorizon)
 
     #run model
-    runModel(model, csv_path, outputCSVFile, outputPlotFile)
+    runModel(newModel, csv_path, outputCSVFile, outputPlotFile, shedder, reorder,
+             stats, profiler, monitor, recorder, swapper)
+
+    for name, summary in sorted(cacheSummary(caches).items()):
+        print("Encoder cache %s: %.1f%% hits (%i hits, %i misses, %i evictions, %i entries)"
+              % (name, 100.0 * summary["hitRate"], summary["hits"], summary["misses"],
+                 summary["evictions"], summary["entries"]))
 
 def create_parser():
     """
@@ -149,6 +498,84 @@ def create_parser():
     # arguments for both Spatial Pooler and Temporal Memory
     parser.add_argument('--dataset', type=int, default=0,
                         help='Determines dataset being used, where machine = 0 and twitter = 1; default=0')
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='nupic',
+                        help='HTM implementation: NuPIC (Python 2), htm.core (Python 3) or the NumPy engine; default=nupic')
+
+    """
+    Load shedding arguments
+    """
+
+    parser.add_argument('--latencyBudget', type=float, default=0.0,
+                        help='Seconds available per record before the runner starts shedding load; 0 disables; default=0.0')
+    parser.add_argument('--lagThresholds', type=float, nargs=3, default=[1.0, 5.0, 20.0],
+                        help='Lag in seconds at which plotting is skipped, learning is paused and bursts are aggregated; default=1 5 20')
+    parser.add_argument('--aggregateSize', type=int, default=4,
+                        help='Number of records averaged into one model run when aggregating; default=4')
+
+    """
+    Reordering arguments
+    """
+
+    parser.add_argument('--lateness', type=float, default=0.0,
+                        help='Minutes a record may arrive behind the newest one and still be put in order; 0 disables; default=0.0')
+    parser.add_argument('--reorderSize', type=int, default=1000,
+                        help='Maximum number of records held while waiting for late ones; default=1000')
+
+    """
+    Instrumentation arguments
+    """
+
+    parser.add_argument('--stats', action='store_true',
+                        help='Time every stage of each record and report throughput and latency percentiles')
+    parser.add_argument('--statsInterval', type=float, default=10.0,
+                        help='Seconds between latency reports when --stats is given, 0 reports at exit only; default=10.0')
+
+    """
+    Profiling arguments
+    """
+
+    parser.add_argument('--profile', choices=PROFILE_MODES, default=None,
+                        help='Profile the record loop with the deterministic cProfile or the low overhead sampler; writes *_PROFILE.pstats and *_PROFILE.collapsed')
+    parser.add_argument('--profileInterval', type=float, default=DEFAULT_SAMPLE_INTERVAL,
+                        help='Seconds of CPU time between profiler samples; default=%.2f' % DEFAULT_SAMPLE_INTERVAL)
+
+    """
+    Model monitoring arguments
+    """
+
+    parser.add_argument('--monitorEvery', type=int, default=0,
+                        help='Records between samples of TM segments, synapses, active cells, model size and RSS; 0 disables; default=0')
+    parser.add_argument('--memoryBudget', type=float, default=None,
+                        help='Memory budget in MB; a warning is printed when RSS growth extrapolates past it')
+    parser.add_argument('--monitorHorizon', type=int, default=1000000,
+                        help='Records ahead the RSS growth is extrapolated to; default=1000000')
+
+    """
+    Encoder cache arguments
+    """
+
+    parser.add_argument('--encoderCache', type=int, default=0,
+                        help='Encodings kept in an LRU cache per scalar and date encoder, e.g. %i; 0 disables; default=0' % DEFAULT_CACHE_SIZE)
+    parser.add_argument('--precomputeDates', action='store_true',
+                        help='Encode every date of the dataset in one pass before the run, needs --encoderCache')
+
+    """
+    SDR trace arguments
+    """
+
+    parser.add_argument('--traceSDR', action='store_true',
+                        help='Record the active and predicted columns of every record to *_SDR_TRACE.index/.data')
+
+    """
+    Hot reload arguments
+    """
+
+    parser.add_argument('--hotReload', action='store_true',
+                        help='Rebuild the model in the background when its params file changes and swap it in without pausing the run')
+    parser.add_argument('--warmupSize', type=int, default=1000,
+                        help='Recent records replayed into a rebuilt model before it is swapped in; default=1000')
+    parser.add_argument('--reloadInterval', type=float, default=5.0,
+                        help='Seconds between checks of the params file; default=5.0')
 
     args = parser.parse_args()
     
@@ -162,4 +589,10 @@ if __name__ == "__main__":
     # create parser
     args = create_parser()
 
-    runDataset(args.dataset)
+    runDataset(args.dataset, args.latencyBudget, args.lagThresholds,
+               args.aggregateSize, args.lateness, args.reorderSize,
+               args.statsInterval if args.stats else None, args.profile,
+               args.profileInterval, args.monitorEvery, args.memoryBudget,
+               args.monitorHorizon, args.engine, args.encoderCache,
+               args.precomputeDates, args.traceSDR, args.hotReload,
+               args.warmupSize, args.reloadInterval)
@@ -0,0 +1,385 @@
+#!/usr/bin/env python
+
+"""
+Compares two result outputs of the anomaly runner
+
+Streams through two NuPICFileOutput csv files, or their binary .npy
+equivalent written by writeResults (as benchmarks/engine_comparison.py
+--resultsDir does for every engine run), a chunk at a time, so multi-GB
+outputs are compared in constant memory. Reports the first diverging record,
+the max/mean absolute difference of every column, and how the anomaly
+intervals derived with extractAnomalyIndices differ. Exits with status 1 when
+the outputs differ beyond the tolerance.
+
+Usage (cd into the anomaly folder):
+    python run_diff.py base_out.csv head_out.csv --threshold 0.97
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import sys
+import csv
+import json
+import argparse
+
+import numpy
+
+import nupic_anomaly_output as nupic_output
+
+
+"""
+Global variables
+"""
+COLUMNS = ["value", "prediction", "anomaly_score", "anomaly_likelihood"]
+# binary equivalent of the NuPICFileOutput csv, one record per row
+RESULT_DTYPE = numpy.dtype([("timestamp", "datetime64[us]"), ("value", "<f8"),
+                            ("prediction", "<f8"), ("anomaly_score", "<f8"),
+                            ("anomaly_likelihood", "<f8")])
+DEFAULT_CHUNK_SIZE = 65536
+
+
+def writeResults(path, timestamps, values, results):
+    """
+    Writes the arrays returned by runBatch as a .npy file of RESULT_DTYPE
+    records, the binary equivalent of the NuPICFileOutput csv
+
+    :param path       : .npy file to write
+    :param timestamps : datetime64 array of the records
+    :param values     : float array of input values
+    :param results    : dict returned by runBatch
+    """
+    records = numpy.empty(len(values), dtype=RESULT_DTYPE)
+    records["timestamp"] = timestamps
+    records["value"] = values
+    records["prediction"] = results["prediction"]
+    records["anomaly_score"] = results["anomalyScore"]
+    records["anomaly_likelihood"] = results["anomalyLikelihood"]
+    numpy.save(path, records)
+
+
+def parseFloats(strings):
+    """
+    Returns a float64 array of csv fields, NaN where a field is empty
+    """
+    parsed = numpy.empty(len(strings))
+    for i, string in enumerate(strings):
+        parsed[i] = float(string) if string not in ("", "None") else numpy.nan
+    return parsed
+
+
+def readChunks(path, chunkSize=DEFAULT_CHUNK_SIZE):
+    """
+    Yields the records of a result output as dicts of column arrays of at
+    most chunkSize rows, timestamps as datetime64[us]
+
+    :param path      : NuPICFileOutput csv or .npy file of RESULT_DTYPE
+    :param chunkSize : rows per chunk
+    """
+    if path.endswith(".npy"):
+        records = numpy.load(path, mmap_mode="r")
+        for start in range(0, len(records), chunkSize):
+            chunk = records[start:start + chunkSize]
+            columns = dict((name, numpy.asarray(chunk[name])) for name in COLUMNS)
+            columns["timestamp"] = numpy.asarray(chunk["timestamp"], dtype="datetime64[us]")
+            yield columns
+        return
+
+    with open(path, "r") as inputFile:
+        csvReader = csv.reader(inputFile)
+        header = next(csvReader)
+        positions = [header.index(name) for name in ["timestamp"] + COLUMNS]
+        while True:
+            rows = [row for _, row in zip(range(chunkSize), csvReader)]
+            if not rows:
+                return
+            fields = list(zip(*rows))
+            columns = {"timestamp": numpy.array(fields[positions[0]],
+                                                dtype="datetime64[us]")}
+            for name, position in zip(COLUMNS, positions[1:]):
+                columns[name] = parseFloats(fields[position])
+            yield columns
+            if len(rows) < chunkSize:
+                return
+
+
+class IntervalStream(object):
+    """
+    Derives the anomaly intervals of a likelihood column fed a chunk at a
+    time, giving the same intervals as extractAnomalyIndices over the whole
+    column: chunks are run through extractAnomalyIndices and an interval still
+    open at the end of a chunk is joined with its continuation
+
+    :param threshold : likelihood at or above which a record is anomalous
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.intervals = []
+        self.offset = 0
+        self.openStart = None
+
+    def feed(self, likelihood):
+        chunkIntervals = [(start, end) for start, end, _, _ in
+                          nupic_output.extractAnomalyIndices(likelihood, self.threshold)]
+        if self.openStart is not None:
+            if chunkIntervals and chunkIntervals[0][0] == 0:
+                # the open interval continues into this chunk
+                start, end = chunkIntervals.pop(0)
+                chunkIntervals.insert(0, (self.openStart - self.offset, end))
+            else:
+                self.intervals.append((self.openStart, self.offset))
+            self.openStart = None
+
+        last = len(likelihood) - 1
+        if chunkIntervals and likelihood[last] >= self.threshold:
+            # capped at the end of the chunk, it may go on in the next one
+            self.openStart = chunkIntervals.pop()[0] + self.offset
+        self.intervals.extend((start + self.offset, end + self.offset)
+                              for start, end in chunkIntervals)
+        self.offset += len(likelihood)
+
+    def close(self):
+        """
+        Returns all intervals, capping one still open at the last record as
+        extractAnomalyIndices does
+        """
+        if self.openStart is not None:
+            self.intervals.append((self.openStart, self.offset - 1))
+            self.openStart = None
+        return self.intervals
+
+
+class ColumnDiff(object):
+    """
+    Running max/mean absolute difference and first divergence of one column
+
+    :param name      : column name
+    :param tolerance : absolute difference above which records diverge
+    """
+
+    def __init__(self, name, tolerance):
+        self.name = name
+        self.tolerance = tolerance
+        self.compared = 0
+        self.numeric = 0
+        self.differing = 0
+        self.nanMismatches = 0
+        self.maxAbs = 0.0
+        self.sumAbs = 0.0
+        self.firstDivergence = None
+
+    def update(self, offset, base, head):
+        baseNaN = numpy.isnan(base)
+        headNaN = numpy.isnan(head)
+        both = ~baseNaN & ~headNaN
+        difference = numpy.abs(base[both] - head[both])
+        nanMismatch = baseNaN != headNaN
+
+        diverging = nanMismatch.copy()
+        diverging[both] = difference > self.tolerance
+        self.compared += len(base)
+        self.numeric += len(difference)
+        self.differing += int(numpy.count_nonzero(diverging))
+        self.nanMismatches += int(numpy.count_nonzero(nanMismatch))
+        if len(difference):
+            self.maxAbs = max(self.maxAbs, float(difference.max()))
+            self.sumAbs += float(difference.sum())
+        if self.firstDivergence is None and diverging.any():
+            position = int(numpy.argmax(diverging))
+            self.firstDivergence = (offset + position, float(base[position]),
+                                    float(head[position]))
+
+    def summary(self):
+        return {
+            "compared": self.compared,
+            "differing": self.differing,
+            "nan_mismatches": self.nanMismatches,
+            "max_abs_diff": self.maxAbs,
+            "mean_abs_diff": self.sumAbs / self.numeric if self.numeric else 0.0,
+            "first_divergence": self.firstDivergence,
+        }
+
+
+def compareIntervals(base, head):
+    """
+    Returns how two lists of (start, end) anomaly intervals disagree
+    """
+    def overlapping(interval, others):
+        return [other for other in others
+                if other[0] <= interval[1] and interval[0] <= other[1]]
+
+    onlyBase = [interval for interval in base if not overlapping(interval, head)]
+    onlyHead = [interval for interval in head if not overlapping(interval, base)]
+    shifted = []
+    for interval in base:
+        matches = overlapping(interval, head)
+        if matches and matches[0] != interval:
+            shifted.append((interval, matches[0]))
+    return {
+        "base_intervals": len(base),
+        "head_intervals": len(head),
+        "only_base": onlyBase,
+        "only_head": onlyHead,
+        "shifted": shifted,
+        "identical": base == head,
+    }
+
+
+def diffRuns(basePath, headPath, threshold=nupic_output.ANOMALY_THRESHOLD,
+             tolerance=0.0, chunkSize=DEFAULT_CHUNK_SIZE):
+    """
+    Compares two result outputs chunk by chunk and returns a report dict
+
+    :param basePath  : output of the reference run
+    :param headPath  : output of the run being checked
+    :param threshold : likelihood threshold of the anomaly intervals
+    :param tolerance : absolute difference above which values diverge
+    :param chunkSize : records held in memory per file
+    """
+    columns = [ColumnDiff(name, tolerance) for name in COLUMNS]
+    baseIntervals = IntervalStream(threshold)
+    headIntervals = IntervalStream(threshold)
+    firstTimestampDivergence = None
+    flaggedDisagreements = 0
+    compared = 0
+    baseExtra = headExtra = 0
+
+    baseChunks = readChunks(basePath, chunkSize)
+    headChunks = readChunks(headPath, chunkSize)
+    while True:
+        base = next(baseChunks, None)
+        head = next(headChunks, None)
+        if base is None or head is None:
+            break
+        rows = min(len(base["timestamp"]), len(head["timestamp"]))
+        baseExtra += len(base["timestamp"]) - rows
+        headExtra += len(head["timestamp"]) - rows
+
+        sameTime = base["timestamp"][:rows] == head["timestamp"][:rows]
+        if firstTimestampDivergence is None and not sameTime.all():
+            position = int(numpy.argmin(sameTime))
+            firstTimestampDivergence = (compared + position,
+                                        str(base["timestamp"][position]),
+                                        str(head["timestamp"][position]))
+        for column in columns:
+            column.update(compared, base[column.name][:rows], head[column.name][:rows])
+
+        baseLikelihood = base["anomaly_likelihood"][:rows]
+        headLikelihood = head["anomaly_likelihood"][:rows]
+        flaggedDisagreements += int(numpy.count_nonzero(
+            (baseLikelihood >= threshold) != (headLikelihood >= threshold)))
+        baseIntervals.feed(baseLikelihood)
+        headIntervals.feed(headLikelihood)
+        compared += rows
+
+    # count whatever is left of the longer output
+    for chunk in baseChunks:
+        baseExtra += len(chunk["timestamp"])
+    for chunk in headChunks:
+        headExtra += len(chunk["timestamp"])
+    if base is not None:
+        baseExtra += len(base["timestamp"])
+    if head is not None:
+        headExtra += len(head["timestamp"])
+
+    summaries = dict((column.name, column.summary()) for column in columns)
+    divergences = [(column.firstDivergence[0], column.name) for column in columns
+                   if column.firstDivergence is not None]
+    if firstTimestampDivergence is not None:
+        divergences.append((firstTimestampDivergence[0], "timestamp"))
+    firstDivergence = min(divergences) if divergences else None
+
+    intervals = compareIntervals(baseIntervals.close(), headIntervals.close())
+    return {
+        "base": basePath,
+        "head": headPath,
+        "compared": compared,
+        "base_extra_records": baseExtra,
+        "head_extra_records": headExtra,
+        "tolerance": tolerance,
+        "threshold": threshold,
+        "first_divergence": firstDivergence,
+        "first_timestamp_divergence": firstTimestampDivergence,
+        "columns": summaries,
+        "flagged_disagreements": flaggedDisagreements,
+        "intervals": intervals,
+        "identical": (firstDivergence is None and baseExtra == 0 and headExtra == 0
+                      and intervals["identical"]),
+    }
+
+
+def printReport(report):
+    print("Compared %i records of %s and %s (tolerance %g)"
+          % (report["compared"], report["base"], report["head"], report["tolerance"]))
+    if report["base_extra_records"] or report["head_extra_records"]:
+        print("Length differs: %i extra records in base, %i in head"
+              % (report["base_extra_records"], report["head_extra_records"]))
+    if report["first_divergence"] is None:
+        print("No divergence")
+    else:
+        position, name = report["first_divergence"]
+        if name == "timestamp":
+            detail = report["first_timestamp_divergence"][1:]
+        else:
+            detail = report["columns"][name]["first_divergence"][1:]
+        print("First divergence at record %i in %s: %s vs %s"
+              % (position, name, detail[0], detail[1]))
+
+    print("%-20s %10s %10s %14s %14s" % ("column", "differing", "NaN diff",
+                                         "max |diff|", "mean |diff|"))
+    for name in COLUMNS:
+        summary = report["columns"][name]
+        print("%-20s %10i %10i %14.6g %14.6g"
+              % (name, summary["differing"], summary["nan_mismatches"],
+                 summary["max_abs_diff"], summary["mean_abs_diff"]))
+
+    intervals = report["intervals"]
+    print("Anomaly intervals at likelihood >= %g: %i in base, %i in head, "
+          "%i records flagged differently"
+          % (report["threshold"], intervals["base_intervals"],
+             intervals["head_intervals"], report["flagged_disagreements"]))
+    for interval in intervals["only_base"]:
+        print("  only in base: records %i-%i" % interval)
+    for interval in intervals["only_head"]:
+        print("  only in head: records %i-%i" % interval)
+    for baseInterval, headInterval in intervals["shifted"]:
+        print("  moved: records %i-%i in base, %i-%i in head"
+              % (baseInterval + headInterval))
+
+
+def create_parser():
+    """
+    Creates parser for command line inputs
+    """
+    parser = argparse.ArgumentParser(description='Compares two result outputs of the anomaly runner in constant memory')
+    parser.add_argument('base', help='Reference output, a *_out.csv or .npy file')
+    parser.add_argument('head', help='Output to check, a *_out.csv or .npy file')
+    parser.add_argument('--threshold', type=float, default=nupic_output.ANOMALY_THRESHOLD,
+                        help='Likelihood threshold of the anomaly intervals; default=%g' % nupic_output.ANOMALY_THRESHOLD)
+    parser.add_argument('--tolerance', type=float, default=0.0,
+                        help='Absolute difference allowed before values count as diverging; default=0')
+    parser.add_argument('--chunkSize', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help='Records read at a time from each output; default=%i' % DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--json', default=None,
+                        help='Optional JSON file receiving the report')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = create_parser()
+    for path in (args.base, args.head):
+        if not os.path.exists(path):
+            print("No such output: %s" % path)
+            sys.exit(2)
+
+    report = diffRuns(args.base, args.head, args.threshold, args.tolerance,
+                      args.chunkSize)
+    printReport(report)
+    if args.json is not None:
+        with open(args.json, "w") as jsonFile:
+            json.dump(report, jsonFile, indent=2, sort_keys=True)
+
+    sys.exit(0 if report["identical"] else 1)
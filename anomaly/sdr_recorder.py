@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+
+"""
+Importing Packages
+"""
+# general
+import os
+import struct
+import datetime
+
+import numpy
+
+
+"""
+Global variables
+"""
+INDEX_SUFFIX = ".index"
+DATA_SUFFIX = ".data"
+# one row per record: timestamp in microseconds since the epoch, position of
+# its first column index in the data file and the number of active and
+# predicted columns stored there, in that order
+INDEX_DTYPE = numpy.dtype([("timestamp", "<i8"), ("offset", "<i8"),
+                           ("active", "<u4"), ("predicted", "<u4")])
+INDEX_ROW = struct.Struct("<qqII")
+# column indices, models have fewer than 65536 columns
+DATA_DTYPE = numpy.dtype("<u2")
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+class SDRRecorder(object):
+    """
+    Appends the active and predicted columns of every record to a trace
+
+    Column indices are written as uint16 lists to `prefix.data` and a fixed
+    size row per record to `prefix.index`, so SDRTrace can memory-map both and
+    load any time range without reading the rest. The predicted columns of a
+    record are those the model predicted for it at the previous record, so
+    its raw anomaly score is the fraction of active columns not among them.
+
+    The first record has no predicted columns unless the recorder is given
+    the model before it runs, e.g. when appending to the trace of a model
+    restored from a checkpoint, whose predictions for it are then recorded.
+
+    :param prefix     : path prefix of the trace files
+    :param append     : continue an existing trace instead of replacing it
+    :param flushEvery : records between flushes making the trace readable
+    :param model      : optional model about to run the first record
+    """
+
+    def __init__(self, prefix, append=False, flushEvery=1024, model=None):
+        mode = "ab" if append else "wb"
+        self.prefix = prefix
+        self.flushEvery = flushEvery
+        self.dataFile = open(prefix + DATA_SUFFIX, mode)
+        self.indexFile = open(prefix + INDEX_SUFFIX, mode)
+        self.offset = os.path.getsize(prefix + DATA_SUFFIX) // DATA_DTYPE.itemsize
+        self.records = os.path.getsize(prefix + INDEX_SUFFIX) // INDEX_DTYPE.itemsize
+        self.predicted = numpy.zeros(0, dtype=DATA_DTYPE)
+        if model is not None:
+            self.predicted = numpy.asarray(model.getPredictedColumns(), dtype=DATA_DTYPE)
+
+    def record(self, model, timestamp):
+        """
+        Appends the columns of the record the model just ran
+
+        :param model     : HTM engine being run
+        :param timestamp : timestamp of the record
+        """
+        active = numpy.asarray(model.getActiveColumns(), dtype=DATA_DTYPE)
+        predicted = self.predicted
+
+        delta = timestamp - EPOCH
+        micros = (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+        self.dataFile.write(active.tobytes())
+        self.dataFile.write(predicted.tobytes())
+        self.indexFile.write(INDEX_ROW.pack(micros, self.offset, len(active),
+                                            len(predicted)))
+        self.offset += len(active) + len(predicted)
+        self.records += 1
+
+        self.predicted = numpy.asarray(model.getPredictedColumns(), dtype=DATA_DTYPE)
+        if self.records % self.flushEvery == 0:
+            self.flush()
+
+    def flush(self):
+        # data first, so that every indexed row is readable
+        self.dataFile.flush()
+        self.indexFile.flush()
+
+    def summary(self):
+        """
+        Returns a dict of counters describing the trace
+        """
+        return {
+            "records": self.records,
+            "columns": self.offset,
+            "bytes": (self.offset * DATA_DTYPE.itemsize +
+                      self.records * INDEX_DTYPE.itemsize),
+        }
+
+    def close(self):
+        self.flush()
+        self.dataFile.close()
+        self.indexFile.close()
+        print("SDR trace: %i records, %.1f KB written to %s%s/%s"
+              % (self.records, self.summary()["bytes"] / 1024.0, self.prefix,
+                 INDEX_SUFFIX, DATA_SUFFIX))
+
+
+def _memmap(path, dtype):
+    """
+    Maps the whole items of a file read-only, an empty array for an empty file
+    """
+    count = os.path.getsize(path) // dtype.itemsize
+    if count == 0:
+        return numpy.zeros(0, dtype=dtype)
+    return numpy.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+
+class SDRTrace(object):
+    """
+    Read-only view of a trace written by SDRRecorder
+
+    Both files are memory-mapped, so opening a trace and loading a time range
+    only touches the pages of that range. A trace still being written can be
+    opened; it shows the records flushed so far.
+
+    :param prefix : path prefix of the trace files
+    """
+
+    def __init__(self, prefix):
+        self.index = _memmap(prefix + INDEX_SUFFIX, INDEX_DTYPE)
+        self.data = _memmap(prefix + DATA_SUFFIX, DATA_DTYPE)
+        # ignore rows whose columns did not reach the data file yet
+        ends = self.index["offset"] + self.index["active"] + self.index["predicted"]
+        self.index = self.index[:numpy.searchsorted(ends, len(self.data), side="right")]
+        self.timestamps = self.index["timestamp"].astype("datetime64[us]")
+
+    def __len__(self):
+        return len(self.index)
+
+    def record(self, position):
+        """
+        Returns (timestamp, active columns, predicted columns) of one record
+
+        :param position : record number in the trace
+        """
+        row = self.index[position]
+        offset = int(row["offset"])
+        middle = offset + int(row["active"])
+        return (self.timestamps[position], self.data[offset:middle],
+                self.data[middle:middle + int(row["predicted"])])
+
+    def span(self, start=None, end=None):
+        """
+        Returns the (first, last + 1) record numbers of a time range
+
+        :param start : first timestamp included, the start of the trace if None
+        :param end   : last timestamp included, the end of the trace if None
+        """
+        first = 0 if start is None else int(numpy.searchsorted(
+            self.timestamps, numpy.datetime64(start, "us"), side="left"))
+        last = len(self) if end is None else int(numpy.searchsorted(
+            self.timestamps, numpy.datetime64(end, "us"), side="right"))
+        return first, max(first, last)
+
+    def load(self, start=None, end=None):
+        """
+        Returns (timestamps, active, predicted) of the records of a time
+        range, the latter two as lists of column index arrays
+
+        :param start : first timestamp included, the start of the trace if None
+        :param end   : last timestamp included, the end of the trace if None
+        """
+        first, last = self.span(start, end)
+        active = []
+        predicted = []
+        for position in range(first, last):
+            _, activeColumns, predictedColumns = self.record(position)
+            active.append(activeColumns)
+            predicted.append(predictedColumns)
+        return self.timestamps[first:last], active, predicted
+
+    def matrix(self, start=None, end=None, columnCount=2048):
+        """
+        Returns (timestamps, active, predicted) of a time range with active
+        and predicted as dense (records, columnCount) boolean matrices, ready
+        to plot
+
+        :param start       : first timestamp included
+        :param end         : last timestamp included
+        :param columnCount : number of columns of the model
+        """
+        first, last = self.span(start, end)
+        rows = self.index[first:last]
+        active = numpy.zeros((last - first, columnCount), dtype=bool)
+        predicted = numpy.zeros((last - first, columnCount), dtype=bool)
+        if last > first:
+            lo = int(rows["offset"][0])
+            hi = int(rows["offset"][-1] + rows["active"][-1] + rows["predicted"][-1])
+            block = numpy.asarray(self.data[lo:hi], dtype=numpy.int64)
+
+            # label every stored index with its record and whether it is active
+            counts = (rows["active"] + rows["predicted"]).astype(numpy.int64)
+            recordOf = numpy.repeat(numpy.arange(last - first), counts)
+            starts = rows["offset"].astype(numpy.int64) - lo
+            positionInRecord = numpy.arange(len(block)) - numpy.repeat(starts, counts)
+            isActive = positionInRecord < numpy.repeat(rows["active"].astype(numpy.int64), counts)
+            active[recordOf[isActive], block[isActive]] = True
+            predicted[recordOf[~isActive], block[~isActive]] = True
+        return self.timestamps[first:last], active, predicted
@@ -0,0 +1,343 @@
+#!/usr/bin/env python
+
+"""
+Shadow (A/B) evaluation of several params sets on one stream
+
+The input csv is parsed once and its records are fanned out in batches to
+one worker process per candidate params set, so the candidates run in
+parallel on exactly the same records. Every worker writes its own
+NuPICFileOutput csv, row aligned with the others, and reports its latency
+and detections, which are printed side by side against the first candidate.
+
+Usage (cd into the anomaly folder):
+    python shadow.py --dataset 0 --candidates machine_model_params machine_model_temp
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import sys
+import csv
+import json
+import argparse
+import importlib
+import multiprocessing
+from array import array
+from timeit import default_timer
+
+try:
+    from Queue import Empty, Full
+except ImportError:
+    from queue import Empty, Full
+
+import numpy
+
+import nupic_anomaly_output as nupic_output
+from instrumentation import LatencyHistogram
+from engines import ENGINES
+from run_diff import compareIntervals
+from model_monitor import peakRSS
+import run
+
+
+"""
+Global variables
+"""
+# csv path, default candidates, likelihood threshold and output prefix per
+# dataset index, as in run.py
+DATASETS = {
+    0: ("./data/machine_temperature_system_failure.csv",
+        ["machine_model_params", "machine_model_temp"], 0.97,
+        "Machine_Temp_Sys_Failure_SHADOW"),
+    1: ("./data/Twitter_volume_GOOG.csv",
+        ["twitter_model_params"], 0.9,
+        "Twitter_Volume_Google_SHADOW"),
+}
+DEFAULT_BATCH_SIZE = 256
+# batches queued per worker, bounds the memory held ahead of a slow candidate
+QUEUE_BATCHES = 8
+
+
+def loadParams(candidate):
+    """
+    Returns the MODEL_PARAMS of a params module, given by module name or by
+    path to its .py file
+
+    :param candidate : e.g. machine_model_temp or ../myswarm/model_params.py
+    """
+    if candidate.endswith(".py"):
+        sys.path.insert(0, os.path.dirname(os.path.abspath(candidate)))
+        candidate = os.path.splitext(os.path.basename(candidate))[0]
+    return importlib.import_module(candidate).MODEL_PARAMS
+
+
+def candidateLabel(candidate):
+    return os.path.splitext(os.path.basename(candidate))[0]
+
+
+def shadowWorker(candidate, engine, outputName, batches, results):
+    """
+    Runs one candidate over the batches of records it receives until None,
+    writing its output csv, then puts (label, summary, likelihoods) on the
+    results queue; meant to run in its own process
+
+    :param candidate  : params module name or path
+    :param engine     : HTM implementation, one of engines.ENGINES
+    :param outputName : name of the NuPICFileOutput of the candidate
+    :param batches    : queue of lists of (timestamp, value) records
+    :param results    : queue receiving the results
+    """
+    label = candidateLabel(candidate)
+    start = default_timer()
+    model = run.createModel(loadParams(candidate), engine)
+    createSeconds = default_timer() - start
+
+    outputCSVFile = nupic_output.NuPICFileOutput(outputName)
+    anomalyProbability = outputCSVFile.anomalyLikelihoodHelper.anomalyProbability
+    latency = LatencyHistogram()
+    likelihoods = array("d")
+    errorSum = 0.0
+    errorCount = 0
+    previousPrediction = None
+    record = {"timestamp": None, "value": None}
+
+    runSeconds = 0.0
+    while True:
+        batch = batches.get()
+        if batch is None:
+            break
+        for timestamp, value in batch:
+            start = default_timer()
+            record["timestamp"] = timestamp
+            record["value"] = value
+            inferences = model.run(record).inferences
+            anomalyScore = inferences["anomalyScore"]
+            anomalyLikelihood = anomalyProbability(value, anomalyScore, timestamp)
+            elapsed = default_timer() - start
+            latency.record(elapsed)
+            runSeconds += elapsed
+
+            prediction = inferences["multiStepBestPredictions"][1]
+            outputCSVFile.write(timestamp, value, prediction, anomalyScore,
+                                anomalyLikelihood)
+            likelihoods.append(anomalyLikelihood)
+
+            # the prediction made at the previous record is for this one
+            if previousPrediction is not None:
+                errorSum += abs(previousPrediction - value)
+                errorCount += 1
+            previousPrediction = prediction
+    outputCSVFile.close()
+
+    results.put((label, {
+        "candidate": candidate,
+        "output": "%s_out.csv" % outputName,
+        "records": len(likelihoods),
+        "create_s": createSeconds,
+        "run_s": runSeconds,
+        "records_per_s": len(likelihoods) / runSeconds if runSeconds else 0.0,
+        "latency": latency.summary(),
+        "prediction_mae": errorSum / errorCount if errorCount else None,
+        "peak_rss_mb": peakRSS() / 1048576.0,
+    }, numpy.frombuffer(likelihoods, dtype=numpy.float64)))
+
+
+def sendBatch(queue, process, batch):
+    """
+    Queues a batch for a worker, failing instead of blocking forever when
+    the worker died
+    """
+    while True:
+        try:
+            queue.put(batch, timeout=1.0)
+            return
+        except Full:
+            if not process.is_alive():
+                raise RuntimeError("Shadow worker %s exited with status %s"
+                                   % (process.name, process.exitcode))
+
+
+def receiveResult(results, workers, collected):
+    """
+    Returns the next (label, summary, likelihoods) of the results queue,
+    failing instead of blocking forever when a worker died before posting
+    its results
+    """
+    while True:
+        try:
+            return results.get(timeout=1.0)
+        except Empty:
+            dead = [process for _, process in workers
+                    if process.name not in collected and process.exitcode is not None]
+            if dead:
+                # results posted right before the exit
+                try:
+                    return results.get(timeout=1.0)
+                except Empty:
+                    raise RuntimeError("Shadow worker %s exited with status %s"
+                                       % (dead[0].name, dead[0].exitcode))
+
+
+def detections(likelihood, threshold):
+    """
+    Returns the (start, end) anomaly intervals and the mask of flagged
+    records of a likelihood column
+    """
+    intervals = [(start, end) for start, end, _, _ in
+                 nupic_output.extractAnomalyIndices(likelihood, threshold)]
+    mask = numpy.zeros(len(likelihood), dtype=bool)
+    for start, end in intervals:
+        mask[start:end + 1] = True
+    return intervals, mask
+
+
+def runShadow(csvPath, candidates, outputPrefix, threshold, engine="nupic",
+              batchSize=DEFAULT_BATCH_SIZE):
+    """
+    Runs every candidate over the dataset in parallel and returns a dict of
+    per-candidate summaries and their comparison with the first candidate
+
+    :param csvPath      : path to csv dataset file
+    :param candidates   : params module names or paths, the first is the baseline
+    :param outputPrefix : prefix of the per-candidate output csv files
+    :param threshold    : likelihood threshold of the anomaly intervals
+    :param engine       : HTM implementation, one of engines.ENGINES
+    :param batchSize    : records per batch sent to the workers
+    """
+    labels = [candidateLabel(candidate) for candidate in candidates]
+    if len(set(labels)) != len(labels):
+        raise ValueError("Candidate names must be unique, got %s" % labels)
+
+    results = multiprocessing.Queue()
+    workers = []
+    for candidate, label in zip(candidates, labels):
+        batches = multiprocessing.Queue(QUEUE_BATCHES)
+        process = multiprocessing.Process(
+            target=shadowWorker, name=label,
+            args=(candidate, engine, "%s_%s" % (outputPrefix, label), batches, results))
+        process.start()
+        workers.append((batches, process))
+
+    # parse once, fan out to every candidate
+    start = default_timer()
+    inputFile = open(csvPath, "r")
+    csvReader = csv.reader(inputFile)
+
+    # skip first 3 header rows
+    next(csvReader)
+    next(csvReader)
+    next(csvReader)
+
+    batch = []
+    for counter, timestamp, value in run.readRecords(csvReader):
+        batch.append((timestamp, value))
+        if len(batch) == batchSize:
+            for batches, process in workers:
+                sendBatch(batches, process, batch)
+            batch = []
+    inputFile.close()
+    for batches, process in workers:
+        if batch:
+            sendBatch(batches, process, batch)
+        sendBatch(batches, process, None)
+
+    # collect before joining, workers exit once their results are read
+    collected = {}
+    for _ in workers:
+        label, summary, likelihood = receiveResult(results, workers, collected)
+        collected[label] = (summary, likelihood)
+    for _, process in workers:
+        process.join()
+    wallSeconds = default_timer() - start
+
+    baseIntervals, baseMask = detections(collected[labels[0]][1], threshold)
+    summaries = []
+    for label in labels:
+        summary, likelihood = collected[label]
+        intervals, mask = detections(likelihood, threshold)
+        union = int(numpy.count_nonzero(baseMask | mask))
+        summary["label"] = label
+        summary["intervals"] = len(intervals)
+        summary["flagged_records"] = int(numpy.count_nonzero(mask))
+        summary["vs_baseline"] = {
+            "flagged_disagreements": int(numpy.count_nonzero(baseMask != mask)),
+            "detection_jaccard": (int(numpy.count_nonzero(baseMask & mask)) / float(union)
+                                  if union else 1.0),
+            "intervals": compareIntervals(baseIntervals, intervals),
+        }
+        summaries.append(summary)
+
+    return {
+        "input": csvPath,
+        "engine": engine,
+        "threshold": threshold,
+        "baseline": labels[0],
+        "wall_s": wallSeconds,
+        "candidates": summaries,
+    }
+
+
+def printComparison(report):
+    print("Shadow run of %i candidates on %s in %.1f s (baseline %s, likelihood >= %g)"
+          % (len(report["candidates"]), report["input"], report["wall_s"],
+             report["baseline"], report["threshold"]))
+    print("%-24s %9s %10s %9s %9s %9s %10s %9s %9s %9s"
+          % ("candidate", "create s", "records/s", "mean ms", "p99 ms", "max ms",
+             "pred MAE", "intervals", "jaccard", "disagree"))
+    for summary in report["candidates"]:
+        latency = summary["latency"]
+        versus = summary["vs_baseline"]
+        print("%-24s %9.2f %10.1f %9.3f %9.3f %9.3f %10s %9i %9.3f %9i"
+              % (summary["label"], summary["create_s"], summary["records_per_s"],
+                 latency["mean_ms"], latency["p99_ms"], latency["max_ms"],
+                 "-" if summary["prediction_mae"] is None
+                 else "%.4g" % summary["prediction_mae"],
+                 summary["intervals"], versus["detection_jaccard"],
+                 versus["flagged_disagreements"]))
+    for summary in report["candidates"][1:]:
+        intervals = summary["vs_baseline"]["intervals"]
+        for start, end in intervals["only_base"]:
+            print("  %s misses records %i-%i" % (summary["label"], start, end))
+        for start, end in intervals["only_head"]:
+            print("  %s adds records %i-%i" % (summary["label"], start, end))
+
+
+def create_parser():
+    """
+    Creates parser for command line inputs
+    """
+    parser = argparse.ArgumentParser(description='Runs several params sets side by side on one stream')
+    parser.add_argument('--dataset', type=int, default=0,
+                        help='Determines dataset being used, where machine = 0 and twitter = 1; default=0')
+    parser.add_argument('--input', default=None,
+                        help='Dataset csv to use instead of the one of --dataset')
+    parser.add_argument('--candidates', nargs='+', default=None,
+                        help='Params modules or .py files to compare, the first is the baseline; default depends on --dataset')
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='nupic',
+                        help='HTM implementation shared by the candidates; default=nupic')
+    parser.add_argument('--threshold', type=float, default=None,
+                        help='Likelihood threshold of the anomaly intervals; default depends on --dataset')
+    parser.add_argument('--batchSize', type=int, default=DEFAULT_BATCH_SIZE,
+                        help='Records per batch sent to the workers; default=%i' % DEFAULT_BATCH_SIZE)
+    parser.add_argument('--output', default=None,
+                        help='Optional JSON file receiving the comparison')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = create_parser()
+    csvPath, candidates, threshold, outputPrefix = DATASETS[args.dataset]
+    if args.input is not None:
+        csvPath = args.input
+        outputPrefix = os.path.splitext(os.path.basename(args.input))[0] + "_SHADOW"
+
+    report = runShadow(csvPath, args.candidates or candidates, outputPrefix,
+                       args.threshold if args.threshold is not None else threshold,
+                       args.engine, args.batchSize)
+    printComparison(report)
+    if args.output is not None:
+        with open(args.output, "w") as outputFile:
+            json.dump(report, outputFile, indent=2, sort_keys=True)
+        print("Comparison written to %s" % args.output)
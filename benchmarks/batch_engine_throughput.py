@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+
+"""
+Throughput of the vectorized NumPy engine as the number of streams grows
+
+Scores N seeded synthetic streams sharing one bundled params template with a
+single BatchEngine for each N of the sweep, and reports stream-records per
+second, time per step and the memory held by the model state. With
+--independent the same N streams are also run through N separate single
+stream engines stepped one after the other, which is how many streams are
+scored today, for comparison.
+
+Usage (from the repository root):
+    python benchmarks/batch_engine_throughput.py --streams 1 10 50 100 --records 500
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import sys
+import json
+import argparse
+from timeit import default_timer
+
+import numpy
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCHMARK_DIR), "anomaly"))
+
+from numpy_engine import BatchEngine, DEFAULT_SEGMENT_POOL
+from synthetic_stream import generateStream
+import machine_model_params
+import twitter_model_params
+
+
+"""
+Global variables
+"""
+PARAMS_SETS = {
+    "machine": machine_model_params.MODEL_PARAMS,
+    "twitter": twitter_model_params.MODEL_PARAMS,
+}
+
+
+def makeStreams(streams, records, cadence):
+    """
+    Returns shared datetime64 timestamps and a (records, streams) array of
+    values, one differently seeded synthetic stream per column
+    """
+    timestamps = None
+    values = numpy.empty((records, streams))
+    for stream in range(streams):
+        streamTimestamps, streamValues, _ = generateStream(records, cadence, seed=stream)
+        values[:, stream] = streamValues
+        if timestamps is None:
+            timestamps = numpy.asarray(streamTimestamps, dtype="datetime64[m]")
+    return timestamps, values
+
+
+def timeBatched(modelParams, timestamps, values, segmentPool):
+    """
+    Returns (seconds, state bytes) of scoring all streams with one engine
+    """
+    engine = BatchEngine(modelParams, values.shape[1], segmentPool)
+    start = default_timer()
+    engine.run(timestamps, values)
+    return default_timer() - start, engine.nbytes()
+
+
+def timeIndependent(modelParams, timestamps, values, segmentPool):
+    """
+    Returns (seconds, state bytes) of scoring each stream with its own
+    single stream engine, stepping the engines one after the other
+    """
+    engines = [BatchEngine(modelParams, 1, segmentPool) for _ in range(values.shape[1])]
+    start = default_timer()
+    for i in range(len(values)):
+        for stream, engine in enumerate(engines):
+            engine.step(timestamps[i:i + 1], values[i, stream:stream + 1])
+    return default_timer() - start, sum(engine.nbytes() for engine in engines)
+
+
+def create_parser():
+    """
+    Creates parser for command line inputs
+    """
+    parser = argparse.ArgumentParser(description='Throughput of the NumPy engine against the number of streams')
+    parser.add_argument('--params', choices=sorted(PARAMS_SETS), default='twitter',
+                        help='Params template shared by the streams; default=twitter')
+    parser.add_argument('--streams', type=int, nargs='+', default=[1, 10, 50, 100],
+                        help='Stream counts to sweep; default=1 10 50 100')
+    parser.add_argument('--records', type=int, default=500,
+                        help='Records per stream; default=500')
+    parser.add_argument('--cadence', type=int, default=5,
+                        help='Minutes between records; default=5')
+    parser.add_argument('--segmentPool', type=int, default=DEFAULT_SEGMENT_POOL,
+                        help='TM segment slots per stream; default=%i' % DEFAULT_SEGMENT_POOL)
+    parser.add_argument('--independent', action='store_true',
+                        help='Also time N independent single stream engines')
+    parser.add_argument('--output', default=None,
+                        help='Optional JSON file receiving the results')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = create_parser()
+    modelParams = PARAMS_SETS[args.params]
+
+    rows = []
+    print("%8s %16s %12s %12s %18s" % ("streams", "records/s", "ms/step",
+                                       "state MB", "independent rec/s"))
+    for streams in args.streams:
+        timestamps, values = makeStreams(streams, args.records, args.cadence)
+        seconds, stateBytes = timeBatched(modelParams, timestamps, values,
+                                          args.segmentPool)
+        row = {
+            "streams": streams,
+            "records_per_s": streams * args.records / seconds,
+            "ms_per_step": 1000.0 * seconds / args.records,
+            "state_mb": stateBytes / 1048576.0,
+            "independent_records_per_s": None,
+        }
+        if args.independent:
+            seconds, _ = timeIndependent(modelParams, timestamps, values,
+                                         args.segmentPool)
+            row["independent_records_per_s"] = streams * args.records / seconds
+        rows.append(row)
+        print("%8i %16.1f %12.3f %12.1f %18s"
+              % (streams, row["records_per_s"], row["ms_per_step"], row["state_mb"],
+                 "-" if row["independent_records_per_s"] is None
+                 else "%.1f" % row["independent_records_per_s"]))
+
+    if args.output is not None:
+        with open(args.output, "w") as outputFile:
+            json.dump({"params": args.params, "records": args.records,
+                       "results": rows}, outputFile, indent=2, sort_keys=True)
+        print("Results written to %s" % args.output)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+
+"""
+Microbenchmark of the per-record Python overhead of the runners
+
+Compares the per-record driver used by runModel (a fresh input dict, repeated
+lookups into result.inferences and a likelihood call per record) against
+runBatch. By default both drive a constant stand-in model so that the time
+measured is the driver overhead alone; --real runs the machine params instead.
+
+Usage (from the repository root):
+    python benchmarks/bench_batch_overhead.py --records 20000
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import sys
+import argparse
+import datetime
+from timeit import default_timer
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "anomaly"))
+import run
+from run import anomaly_likelihood
+from engines import EngineResult
+
+
+class ConstantModel(object):
+    """
+    Stand-in model returning the same result for every record
+    """
+
+    def __init__(self):
+        self.result = EngineResult(None, {
+            "anomalyScore": 0.5,
+            "multiStepBestPredictions": {1: 1.0},
+        })
+
+    def run(self, inputRecord):
+        return self.result
+
+
+def makeArrays(records):
+    """
+    Builds 5-minute timestamps and a sinusoid of the requested length
+    """
+    start = numpy.datetime64("2014-01-01T00:00", "m")
+    timestamps = start + numpy.arange(records) * numpy.timedelta64(5, "m")
+    values = 50.0 + 10.0 * numpy.sin(numpy.arange(records) * 2 * numpy.pi / 288)
+    return timestamps, values
+
+
+def runPerRecord(model, timestamps, values):
+    """
+    Per-record driver equivalent to the inner loop of runModel
+    """
+    likelihoodHelper = anomaly_likelihood.AnomalyLikelihood()
+    scores = []
+    for timestamp, value in zip(timestamps.astype(datetime.datetime),
+                                values.tolist()):
+        result = model.run({
+            "timestamp": timestamp,
+            "value": value
+            })
+        prediction = result.inferences["multiStepBestPredictions"][1]
+        anomalyScore = result.inferences["anomalyScore"]
+        likelihood = likelihoodHelper.anomalyProbability(value, anomalyScore,
+                                                         timestamp)
+        scores.append((prediction, anomalyScore, likelihood))
+    return scores
+
+
+def timeDriver(driver, model, timestamps, values, repeats):
+    """
+    Returns the best per-record time in microseconds over several repeats
+    """
+    best = None
+    for _ in range(repeats):
+        start = default_timer()
+        driver(model, timestamps, values)
+        elapsed = default_timer() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(values) * 1e6
+
+
+def create_parser():
+    """
+    Creates parser for command line inputs
+    """
+    parser = argparse.ArgumentParser(description='Per-record overhead of runModel style driving vs runBatch')
+    parser.add_argument('--records', type=int, default=20000,
+                        help='Number of synthetic records; default=20000')
+    parser.add_argument('--repeats', type=int, default=3,
+                        help='Repeats per driver, the best one is reported; default=3')
+    parser.add_argument('--real', action='store_true',
+                        help='Use the machine params model instead of a constant stand-in')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = create_parser()
+    timestamps, values = makeArrays(args.records)
+
+    def makeModel():
+        if args.real:
+            return run.createModel(run.machine_model_params)
+        return ConstantModel()
+
+    perRecord = timeDriver(runPerRecord, makeModel(), timestamps, values,
+                           args.repeats)
+    batched = timeDriver(run.runBatch, makeModel(), timestamps, values,
+                         args.repeats)
+
+    print("records            : %i" % args.records)
+    print("per-record driver  : %.2f us/record" % perRecord)
+    print("runBatch           : %.2f us/record" % batched)
+    print("saved              : %.2f us/record (%.1f%%)"
+          % (perRecord - batched, 100.0 * (perRecord - batched) / perRecord))
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+"""
+Compares two benchmark result files written by run_benchmarks.py
+
+Prints the change of every metric from the baseline to the candidate and
+exits with status 1 when any metric regressed by more than the tolerance, so
+it can gate a commit in CI.
+
+Usage (from the repository root):
+    python benchmarks/compare_benchmarks.py base.json head.json --tolerance 5
+"""
+
+"""
+Importing Packages
+"""
+# general
+import sys
+import json
+import argparse
+
+
+"""
+Global variables
+"""
+# (name, path into a params result, True when higher is better)
+METRICS = [
+    ("records/s", ("records_per_s",), True),
+    ("p50 ms", ("record_latency", "p50_ms"), False),
+    ("p99 ms", ("record_latency", "p99_ms"), False),
+    ("p999 ms", ("record_latency", "p999_ms"), False),
+    ("run p99 ms", ("stages", "run", "p99_ms"), False),
+    ("peak RSS MB", ("peak_rss_bytes",), False),
+]
+
+
+def lookup(result, path):
+    for key in path:
+        result = result[key]
+    return result
+
+
+def compareBenchmarks(baseline, candidate, tolerance):
+    """
+    Returns a list of (params, metric, base, head, change %, regressed) rows
+
+    :param baseline  : results dict of the baseline
+    :param candidate : results dict of the candidate
+    :param tolerance : percent a metric may get worse before it counts as a
+                       regression
+    """
+    rows = []
+    for paramsName in sorted(baseline["results"]):
+        if paramsName not in candidate["results"]:
+            continue
+        base = baseline["results"][paramsName]
+        head = candidate["results"][paramsName]
+        for name, path, higherIsBetter in METRICS:
+            baseValue = lookup(base, path)
+            headValue = lookup(head, path)
+            if name == "peak RSS MB":
+                baseValue /= 1048576.0
+                headValue /= 1048576.0
+            change = (100.0 * (headValue - baseValue) / baseValue
+                      if baseValue else 0.0)
+            worse = -change if higherIsBetter else change
+            rows.append((paramsName, name, baseValue, headValue, change,
+                         worse > tolerance))
+    return rows
+
+
+def create_parser():
+    """
+    Creates parser for command line inputs
+    """
+    parser = argparse.ArgumentParser(description='Compares two benchmark result files')
+    parser.add_argument('baseline', help='Results of the baseline commit')
+    parser.add_argument('candidate', help='Results of the candidate commit')
+    parser.add_argument('--tolerance', type=float, default=5.0,
+                        help='Percent a metric may get worse before it is reported as a regression; default=5.0')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = create_parser()
+    with open(args.baseline) as baselineFile:
+        baseline = json.load(baselineFile)
+    with open(args.candidate) as candidateFile:
+        candidate = json.load(candidateFile)
+
+    for label, benchmark in (("baseline", baseline), ("candidate", candidate)):
+        meta = benchmark["meta"]
+        print("%-9s: commit %s, %i records, python %s"
+              % (label, meta["commit"], meta["records"], meta["python"]))
+    if baseline["meta"]["records"] != candidate["meta"]["records"]:
+        print("warning: the runs used different stream lengths")
+
+    rows = compareBenchmarks(baseline, candidate, args.tolerance)
+    print("%-10s %-12s %12s %12s %9s" % ("params", "metric", "baseline",
+                                         "candidate", "change"))
+    for paramsName, name, baseValue, headValue, change, regressed in rows:
+        print("%-10s %-12s %12.3f %12.3f %+8.1f%%%s"
+              % (paramsName, name, baseValue, headValue, change,
+                 "  REGRESSION" if regressed else ""))
+
+    sys.exit(1 if any(row[-1] for row in rows) else 0)
@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+
+"""
+Head-to-head comparison of the HTM engines
+
+Runs every engine of anomaly/engines.py over the bundled datasets, each in a
+fresh process of its own interpreter (NuPIC needs Python 2.7 while htm.core
+is built for Python 3), and compares them on throughput and on parity of the
+anomaly scores, likelihoods and detected anomaly intervals. With the NAB label
+file the NAB-style detection score of each engine is reported as well. With
+--resultsDir the output of every run is kept as a .npy file that
+anomaly/run_diff.py compares record by record.
+
+Usage (from the repository root):
+    python benchmarks/engine_comparison.py --nupicPython python2.7 --htmcorePython python3
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+from timeit import default_timer
+
+import numpy
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCHMARK_DIR), "anomaly"))
+
+from model_size_sweep import DATASETS, loadWindows, nabScore
+from model_monitor import peakRSS
+
+
+"""
+Global variables
+"""
+ENGINE_NAMES = ["nupic", "htmcore"]
+COLUMNS = ["anomalyScore", "prediction", "anomalyLikelihood"]
+
+
+def runEngine(engineName, datasetName, outputPath, resultsDir=None):
+    """
+    Runs one engine on one dataset and saves its output columns and timings
+    to a .npz file; invoked in a child process by --worker
+
+    :param engineName  : one of ENGINE_NAMES
+    :param datasetName : one of DATASETS
+    :param outputPath  : .npz file receiving the results
+    :param resultsDir  : folder receiving the run's <engine>_<dataset>_out.npy
+                         file for run_diff.py, None to skip it
+    """
+    import run
+    csvPath, paramsName, _ = DATASETS[datasetName]
+    modelParams = {
+        "machine": run.machine_model_params,
+        "twitter": run.twitter_model_params,
+    }[paramsName]
+
+    timestamps, values = run.loadArrays(csvPath)
+    start = default_timer()
+    model = run.createModel(modelParams, engineName)
+    createSeconds = default_timer() - start
+    start = default_timer()
+    results = run.runBatch(model, timestamps, values)
+    runSeconds = default_timer() - start
+
+    numpy.savez(outputPath, values=values,
+                create_s=createSeconds, run_s=runSeconds,
+                peak_rss_mb=peakRSS() / 1048576.0,
+                **results)
+    if resultsDir is not None:
+        from run_diff import writeResults
+        writeResults(os.path.join(resultsDir, "%s_%s_out.npy" % (engineName, datasetName)),
+                     timestamps, values, results)
+
+
+def flaggedRecords(likelihood, threshold):
+    """
+    Returns the boolean mask of records inside a detected anomaly interval and
+    the intervals, using the same interval extraction as the plot output
+    """
+    import nupic_anomaly_output as nupic_output
+    intervals = nupic_output.extractAnomalyIndices(likelihood, threshold)
+    mask = numpy.zeros(len(likelihood), dtype=bool)
+    for start, end, _, _ in intervals:
+        mask[start:end + 1] = True
+    return mask, intervals
+
+
+def compareRuns(base, other, threshold):
+    """
+    Returns the parity metrics of two engine runs over the same dataset
+
+    :param base      : loaded .npz of the reference engine
+    :param other     : loaded .npz of the compared engine
+    :param threshold : likelihood threshold of the dataset
+    """
+    baseScore = base["anomalyScore"]
+    otherScore = other["anomalyScore"]
+    baseMask, baseIntervals = flaggedRecords(base["anomalyLikelihood"], threshold)
+    otherMask, otherIntervals = flaggedRecords(other["anomalyLikelihood"], threshold)
+    union = int(numpy.count_nonzero(baseMask | otherMask))
+
+    return {
+        "score_correlation": float(numpy.corrcoef(baseScore, otherScore)[0, 1]),
+        "score_mean_abs_diff": float(numpy.mean(numpy.abs(baseScore - otherScore))),
+        "likelihood_mean_abs_diff": float(numpy.mean(numpy.abs(
+            base["anomalyLikelihood"] - other["anomalyLikelihood"]))),
+        "detection_agreement": float(numpy.mean(baseMask == otherMask)),
+        "detection_jaccard": (int(numpy.count_nonzero(baseMask & otherMask)) / float(union)
+                              if union else 1.0),
+        "intervals": [len(baseIntervals), len(otherIntervals)],
+    }
+
+
+def predictionError(run):
+    """
+    Returns the mean absolute error of the one step predictions
+    """
+    valid = ~numpy.isnan(run["prediction"])
+    return float(numpy.mean(numpy.abs(run["prediction"][valid] -
+                                      run["values"][valid])))
+
+
+def create_parser():
+    """
+    Creates parser for command line inputs
+    """
+    parser = argparse.ArgumentParser(description='Throughput and score parity of the HTM engines')
+    parser.add_argument('--datasets', nargs='+', choices=sorted(DATASETS), default=sorted(DATASETS),
+                        help='Datasets to run; default=machine twitter')
+    parser.add_argument('--engines', nargs='+', choices=ENGINE_NAMES, default=ENGINE_NAMES,
+                        help='Engines to compare, the first one is the reference; default=nupic htmcore')
+    for engineName in ENGINE_NAMES:
+        parser.add_argument('--%sPython' % engineName, default=sys.executable,
+                            help='Interpreter running the %s engine; default=this one' % engineName)
+    parser.add_argument('--labels', default=None,
+                        help='NAB labels/combined_windows.json used for scoring')
+    parser.add_argument('--output', default='engine_comparison.json',
+                        help='JSON file receiving the results; default=engine_comparison.json')
+    parser.add_argument('--resultsDir', default=None,
+                        help='Folder receiving the output of every run as <engine>_<dataset>_out.npy for anomaly/run_diff.py')
+    parser.add_argument('--worker', nargs=3, metavar=('ENGINE', 'DATASET', 'OUTPUT'),
+                        help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = create_parser()
+    if args.worker:
+        runEngine(*args.worker, resultsDir=args.resultsDir)
+        sys.exit(0)
+
+    if args.resultsDir is not None and not os.path.isdir(args.resultsDir):
+        os.makedirs(args.resultsDir)
+
+    workDir = tempfile.mkdtemp(prefix="htm_engines_")
+    report = {}
+    try:
+        for datasetName in args.datasets:
+            csvPath, _, threshold = DATASETS[datasetName]
+            runs = {}
+            for engineName in args.engines:
+                print("Running %s engine on %s..." % (engineName, datasetName))
+                outputPath = os.path.join(workDir, "%s_%s.npz" % (engineName, datasetName))
+                command = [getattr(args, engineName + "Python"), os.path.abspath(__file__),
+                           "--worker", engineName, datasetName, outputPath]
+                if args.resultsDir is not None:
+                    command += ["--resultsDir", os.path.abspath(args.resultsDir)]
+                status = subprocess.call(command)
+                if status != 0:
+                    print("%s engine failed on %s, skipping it" % (engineName, datasetName))
+                    continue
+                with numpy.load(outputPath) as result:
+                    runs[engineName] = dict(result)
+
+            windows = loadWindows(args.labels, csvPath) if args.labels else None
+            entry = {"engines": {}, "parity": {}}
+            for engineName, result in sorted(runs.items()):
+                records = len(result["values"])
+                score = None
+                if windows is not None:
+                    import run
+                    timestamps, _ = run.loadArrays(csvPath)
+                    score = nabScore(timestamps, result["anomalyLikelihood"] >= threshold,
+                                     windows)
+                entry["engines"][engineName] = {
+                    "records": records,
+                    "create_s": float(result["create_s"]),
+                    "records_per_s": records / float(result["run_s"]),
+                    "peak_rss_mb": float(result["peak_rss_mb"]),
+                    "prediction_mae": predictionError(result),
+                    "nab_score": score,
+                }
+
+            reference = args.engines[0]
+            for engineName in args.engines[1:]:
+                if reference in runs and engineName in runs:
+                    entry["parity"][engineName] = compareRuns(runs[reference],
+                                                              runs[engineName],
+                                                              threshold)
+            report[datasetName] = entry
+
+            print("%-8s %-8s %12s %10s %12s %8s"
+                  % ("dataset", "engine", "records/s", "RSS MB", "pred MAE", "NAB"))
+            for engineName, metrics in sorted(entry["engines"].items()):
+                print("%-8s %-8s %12.1f %10.1f %12.4f %8s"
+                      % (datasetName, engineName, metrics["records_per_s"],
+                         metrics["peak_rss_mb"], metrics["prediction_mae"],
+                         "-" if metrics["nab_score"] is None else "%.1f" % metrics["nab_score"]))
+            for engineName, parity in sorted(entry["parity"].items()):
+                print("%s vs %s: score correlation %.3f, mean |score diff| %.4f, "
+                      "mean |likelihood diff| %.4f, detections agree on %.1f%% of "
+                      "records (Jaccard %.3f), %i vs %i intervals"
+                      % (engineName, reference, parity["score_correlation"],
+                         parity["score_mean_abs_diff"],
+                         parity["likelihood_mean_abs_diff"],
+                         100.0 * parity["detection_agreement"],
+                         parity["detection_jaccard"],
+                         parity["intervals"][0], parity["intervals"][1]))
+    finally:
+        shutil.rmtree(workDir)
+
+    with open(args.output, "w") as outputFile:
+        json.dump(report, outputFile, indent=2, sort_keys=True)
+    print("Results written to %s" % args.output)
@@ -0,0 +1,355 @@
+#!/usr/bin/env python
+
+"""
+Model size vs. accuracy sweep
+
+Varies columnCount, cellsPerColumn, maxSegmentsPerCell and
+maxSynapsesPerSegment of the bundled params over a grid, runs every
+configuration on the bundled datasets in parallel (one fresh process per run,
+so peak RSS is per run) and writes a csv table plus a Pareto plot of
+throughput, memory and NAB-style detection score.
+
+NAB scores need the NAB label file (labels/combined_windows.json of the NAB
+repository), without it only throughput and memory are reported.
+
+Usage (from the repository root):
+    python benchmarks/model_size_sweep.py --labels ~/NAB/labels/combined_windows.json
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import sys
+import csv
+import copy
+import json
+import math
+import argparse
+import itertools
+import multiprocessing
+from timeit import default_timer
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ANOMALY_DIR = os.path.join(os.path.dirname(BENCHMARK_DIR), "anomaly")
+sys.path.insert(0, ANOMALY_DIR)
+
+from model_monitor import peakRSS
+
+
+"""
+Global variables
+"""
+# name -> (csv path, params set, likelihood threshold), as used by run.py
+DATASETS = {
+    "machine": (os.path.join(ANOMALY_DIR, "data", "machine_temperature_system_failure.csv"),
+                "machine", 0.97),
+    "twitter": (os.path.join(ANOMALY_DIR, "data", "Twitter_volume_GOOG.csv"),
+                "twitter", 0.9),
+}
+GRID = {
+    "columnCount": [512, 1024, 2048],
+    "cellsPerColumn": [8, 16, 32],
+    "maxSegmentsPerCell": [32, 128],
+    "maxSynapsesPerSegment": [16, 32],
+}
+# NAB standard application profile
+NAB_TP_WEIGHT = 1.0
+NAB_FP_WEIGHT = 0.11
+NAB_FN_WEIGHT = 1.0
+
+
+def scaleParams(modelParams, columnCount, cellsPerColumn, maxSegmentsPerCell,
+                maxSynapsesPerSegment):
+    """
+    Returns a copy of the model params resized to the given configuration
+
+    The number of active columns is scaled with columnCount to keep the 2%
+    sparsity of the bundled params, and newSynapseCount, activationThreshold
+    and minThreshold are scaled down with it (or with maxSynapsesPerSegment)
+    so that segments can still become active in the smaller models.
+    """
+    modelParams = copy.deepcopy(modelParams)
+    spParams = modelParams["modelParams"]["spParams"]
+    tmParams = modelParams["modelParams"]["tmParams"]
+
+    baseActive = spParams["numActiveColumnsPerInhArea"]
+    active = max(1, int(round(baseActive * columnCount /
+                              float(spParams["columnCount"]))))
+    spParams["columnCount"] = columnCount
+    spParams["numActiveColumnsPerInhArea"] = active
+
+    baseSynapses = tmParams["newSynapseCount"]
+    newSynapses = min(baseSynapses, active, maxSynapsesPerSegment)
+    ratio = newSynapses / float(baseSynapses)
+    tmParams["columnCount"] = columnCount
+    tmParams["inputWidth"] = columnCount
+    tmParams["cellsPerColumn"] = cellsPerColumn
+    tmParams["maxSegmentsPerCell"] = maxSegmentsPerCell
+    tmParams["maxSynapsesPerSegment"] = maxSynapsesPerSegment
+    tmParams["newSynapseCount"] = newSynapses
+    tmParams["activationThreshold"] = max(1, int(round(tmParams["activationThreshold"] * ratio)))
+    tmParams["minThreshold"] = max(1, int(round(tmParams["minThreshold"] * ratio)))
+    return modelParams
+
+
+def loadWindows(labelsPath, csvPath):
+    """
+    Returns the NAB anomaly windows of a dataset as (start, end) datetime64
+    pairs, or None when the dataset is not in the label file
+
+    :param labelsPath : NAB combined_windows.json
+    :param csvPath    : dataset csv, matched by file name
+    """
+    import numpy
+    with open(labelsPath) as labelsFile:
+        labels = json.load(labelsFile)
+    name = os.path.basename(csvPath)
+    for key, windows in labels.items():
+        if os.path.basename(key) == name:
+            return [(numpy.datetime64(start.replace(" ", "T")[:19]),
+                     numpy.datetime64(end.replace(" ", "T")[:19]))
+                    for start, end in windows]
+    return None
+
+
+def scaledSigmoid(position):
+    """
+    NAB scoring curve, 1 at the start of a window, 0 at its end and -1 far
+    after it
+    """
+    if position > 3.0:
+        return -1.0
+    return 2.0 / (1.0 + math.exp(5.0 * position)) - 1.0
+
+
+def nabScore(timestamps, detections, windows):
+    """
+    Returns the normalized NAB-style score (0 = null detector, 100 = perfect)
+
+    Only the first detection inside a window counts, weighted by how early it
+    came; detections outside windows are false positives weighted by how far
+    they are from the preceding window; missed windows cost NAB_FN_WEIGHT.
+
+    :param timestamps : datetime64 array of the records
+    :param detections : boolean array, True where an anomaly was flagged
+    :param windows    : list of (start, end) datetime64 pairs
+    """
+    import numpy
+    if not windows:
+        return None
+    indices = numpy.arange(len(timestamps))
+    bounds = [(int(numpy.searchsorted(timestamps, start, "left")),
+               int(numpy.searchsorted(timestamps, end, "right")) - 1)
+              for start, end in windows]
+
+    score = 0.0
+    detected = indices[detections]
+    for start, end in bounds:
+        inside = detected[(detected >= start) & (detected <= end)]
+        if len(inside):
+            length = max(1, end - start)
+            score += NAB_TP_WEIGHT * scaledSigmoid(-(end - inside[0]) / float(length))
+        else:
+            score -= NAB_FN_WEIGHT
+
+    for index in detected:
+        if any(start <= index <= end for start, end in bounds):
+            continue
+        previous = [(start, end) for start, end in bounds if end < index]
+        if previous:
+            start, end = previous[-1]
+            length = max(1, end - start)
+            score += NAB_FP_WEIGHT * scaledSigmoid((index - end) / float(length))
+        else:
+            score -= NAB_FP_WEIGHT
+
+    perfect = NAB_TP_WEIGHT * len(bounds)
+    null = -NAB_FN_WEIGHT * len(bounds)
+    return 100.0 * (score - null) / (perfect - null)
+
+
+def runConfig(task):
+    """
+    Runs one configuration on one dataset, meant to run in a fresh process
+
+    :param task : (config dict, dataset name, labels path or None)
+    """
+    import run
+    config, datasetName, labelsPath = task
+    csvPath, paramsName, threshold = DATASETS[datasetName]
+    baseParams = {
+        "machine": run.machine_model_params,
+        "twitter": run.twitter_model_params,
+    }[paramsName]
+
+    timestamps, values = run.loadArrays(csvPath)
+    model = run.createModel(scaleParams(baseParams, **config))
+    start = default_timer()
+    results = run.runBatch(model, timestamps, values)
+    elapsed = default_timer() - start
+
+    score = None
+    if labelsPath is not None:
+        windows = loadWindows(labelsPath, csvPath)
+        if windows is not None:
+            score = nabScore(timestamps, results["anomalyLikelihood"] >= threshold,
+                             windows)
+
+    row = dict(config)
+    row.update({
+        "dataset": datasetName,
+        "records": len(values),
+        "records_per_s": len(values) / elapsed,
+        "peak_rss_mb": peakRSS() / 1048576.0,
+        "nab_score": score,
+    })
+    print("%s %s: %.1f records/s, score %s" % (datasetName, config,
+                                                row["records_per_s"], score))
+    return row
+
+
+def paretoFront(points):
+    """
+    Returns the indices of the points no other point beats on every
+    objective; each point is a tuple of objectives to maximize
+    """
+    front = []
+    for i, point in enumerate(points):
+        dominated = False
+        for j, other in enumerate(points):
+            if (i != j and all(o >= p for o, p in zip(other, point)) and
+                    any(o > p for o, p in zip(other, point))):
+                dominated = True
+                break
+        if not dominated:
+            front.append(i)
+    return front
+
+
+def summarize(rows, keys):
+    """
+    Averages the per-dataset rows of every configuration
+
+    Returns a list of dicts with the configuration, mean records/s, max peak
+    RSS, mean NAB score (None when unlabeled) and a "pareto" flag.
+    """
+    configs = {}
+    for row in rows:
+        configs.setdefault(tuple(row[key] for key in keys), []).append(row)
+
+    summary = []
+    for config, configRows in sorted(configs.items()):
+        scores = [row["nab_score"] for row in configRows
+                  if row["nab_score"] is not None]
+        entry = dict(zip(keys, config))
+        entry.update({
+            "records_per_s": sum(row["records_per_s"] for row in configRows) / len(configRows),
+            "peak_rss_mb": max(row["peak_rss_mb"] for row in configRows),
+            "nab_score": sum(scores) / len(scores) if scores else None,
+        })
+        summary.append(entry)
+
+    objectives = [(entry["records_per_s"], -entry["peak_rss_mb"],
+                   entry["nab_score"] if entry["nab_score"] is not None else 0.0)
+                  for entry in summary]
+    front = set(paretoFront(objectives))
+    for i, entry in enumerate(summary):
+        entry["pareto"] = i in front
+    return summary
+
+
+def writeTable(path, rows, columns):
+    outputFile = open(path, "w")
+    writer = csv.writer(outputFile)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([row[column] for column in columns])
+    outputFile.close()
+
+
+def plotPareto(path, summary):
+    """
+    Plots NAB score against throughput and memory, Pareto configurations in red
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(1, 2, figsize=(14, 6))
+    for axis, key, label in ((axes[0], "records_per_s", "records / s"),
+                             (axes[1], "peak_rss_mb", "peak RSS (MB)")):
+        for entry in summary:
+            score = entry["nab_score"] if entry["nab_score"] is not None else 0.0
+            axis.scatter(entry[key], score,
+                         color="red" if entry["pareto"] else "gray")
+            if entry["pareto"]:
+                axis.annotate("%(columnCount)i/%(cellsPerColumn)i/"
+                              "%(maxSegmentsPerCell)i/%(maxSynapsesPerSegment)i"
+                              % entry, (entry[key], score), fontsize=7)
+        axis.set_xlabel(label)
+        axis.set_ylabel("NAB score")
+    axes[0].set_title("columns/cells/segments/synapses, Pareto front in red")
+    plt.tight_layout()
+    plt.savefig(path)
+
+
+def create_parser():
+    """
+    Creates parser for command line inputs
+    """
+    parser = argparse.ArgumentParser(description='Sweep of model size against throughput, memory and detection score')
+    parser.add_argument('--datasets', nargs='+', choices=sorted(DATASETS), default=sorted(DATASETS),
+                        help='Datasets to run; default=machine twitter')
+    parser.add_argument('--labels', default=None,
+                        help='NAB labels/combined_windows.json used for scoring')
+    for key, values in sorted(GRID.items()):
+        parser.add_argument('--' + key, type=int, nargs='+', default=values,
+                            help='Values of %s to sweep; default=%s' % (key, " ".join(str(v) for v in values)))
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(),
+                        help='Number of parallel runs; default=cpu count')
+    parser.add_argument('--output', default='model_size_sweep',
+                        help='Prefix of the csv tables and plot; default=model_size_sweep')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = create_parser()
+    keys = sorted(GRID)
+    configs = [dict(zip(keys, values)) for values in
+               itertools.product(*[getattr(args, key) for key in keys])]
+    tasks = [(config, dataset, args.labels)
+             for config in configs for dataset in args.datasets]
+    print("Running %i configurations on %i datasets with %i workers"
+          % (len(configs), len(args.datasets), args.workers))
+
+    # one process per run so that ru_maxrss is the peak of that run alone
+    pool = multiprocessing.Pool(args.workers, maxtasksperchild=1)
+    rows = pool.map(runConfig, tasks, chunksize=1)
+    pool.close()
+    pool.join()
+
+    writeTable(args.output + "_runs.csv", rows,
+               keys + ["dataset", "records", "records_per_s", "peak_rss_mb",
+                       "nab_score"])
+    summary = summarize(rows, keys)
+    writeTable(args.output + ".csv", summary,
+               keys + ["records_per_s", "peak_rss_mb", "nab_score", "pareto"])
+
+    print("%8s %6s %9s %9s %12s %10s %10s %7s"
+          % ("columns", "cells", "segments", "synapses", "records/s",
+             "RSS MB", "NAB", "pareto"))
+    for entry in summary:
+        print("%8i %6i %9i %9i %12.1f %10.1f %10s %7s"
+              % (entry["columnCount"], entry["cellsPerColumn"],
+                 entry["maxSegmentsPerCell"], entry["maxSynapsesPerSegment"],
+                 entry["records_per_s"], entry["peak_rss_mb"],
+                 "-" if entry["nab_score"] is None else "%.1f" % entry["nab_score"],
+                 "*" if entry["pareto"] else ""))
+
+    try:
+        plotPareto(args.output + ".png", summary)
+        print("Pareto plot written to %s.png" % args.output)
+    except ImportError:
+        print("matplotlib not available, skipping the Pareto plot")
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+
+"""
+End-to-end throughput, latency and memory benchmark of the anomaly runner
+
+Drives createModel/runModel from anomaly/run.py over a seeded synthetic
+stream with each bundled params set, each in a fresh process so that the
+peak RSS of one run does not leak into the next. Results are printed and
+saved as JSON; compare_benchmarks.py compares two such files.
+
+Usage (from the repository root):
+    python benchmarks/run_benchmarks.py --records 5000 --output bench.json
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+import multiprocessing
+
+try:
+    from Queue import Empty
+except ImportError:
+    from queue import Empty
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "anomaly"))
+
+from synthetic_stream import generateStream, writeStream
+from model_monitor import peakRSS
+
+
+"""
+Global variables
+"""
+PARAMS_SETS = ["machine", "twitter"]
+# seconds between checks that a benchmark process is still alive
+POLL_INTERVAL = 1.0
+
+
+def gitCommit():
+    """
+    Returns the commit being benchmarked, or None outside a git checkout
+    """
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_DIR,
+            stderr=open(os.devnull, "w")).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmarkParams(paramsName, csvPath, workDir, queue):
+    """
+    Runs one params set over the stream and puts its results on the queue;
+    meant to run in its own process
+
+    :param paramsName : "machine" or "twitter"
+    :param csvPath    : synthetic stream csv
+    :param workDir    : directory receiving the model output
+    :param queue      : multiprocessing queue receiving the results dict
+    """
+    import run
+    import nupic_anomaly_output as nupic_output
+    from instrumentation import RunStats
+
+    modelParams = {
+        "machine": run.machine_model_params,
+        "twitter": run.twitter_model_params,
+    }[paramsName]
+
+    os.chdir(workDir)
+    rssBefore = peakRSS()
+    createStart = time.time()
+    model = run.createModel(modelParams)
+    createSeconds = time.time() - createStart
+
+    stats = RunStats(interval=0)
+    outputCSVFile = nupic_output.NuPICFileOutput(paramsName + "_benchmark")
+    outputPlotFile = nupic_output.NuPICNullOutput(paramsName + "_benchmark")
+    run.runModel(model, csvPath, outputCSVFile, outputPlotFile, stats=stats)
+
+    report = stats.lastReport
+    queue.put({
+        "records": report["records"],
+        "create_s": createSeconds,
+        "elapsed_s": report["elapsed_s"],
+        "records_per_s": report["records_per_s"],
+        "record_latency": report["record"],
+        "stages": report["stages"],
+        "peak_rss_bytes": peakRSS(),
+        "peak_rss_before_model_bytes": rssBefore,
+    })
+
+
+def waitResult(process, queue, pollInterval=POLL_INTERVAL):
+    """
+    Returns the results a benchmark process posts on its queue, None when
+    the process exits without posting any, e.g. after an import error or an
+    out of memory kill
+    """
+    while True:
+        try:
+            return queue.get(timeout=pollInterval)
+        except Empty:
+            if process.exitcode is not None:
+                break
+    # results posted right before the exit
+    try:
+        return queue.get(timeout=pollInterval)
+    except Empty:
+        return None
+
+
+def runBenchmarks(records, cadence, seed, paramsSets):
+    """
+    Returns the results dict of a full benchmark run
+
+    :param records   : number of synthetic records
+    :param cadence   : minutes between records
+    :param seed      : random seed of the stream
+    :param paramsSets: names of the params sets to run
+    """
+    workDir = tempfile.mkdtemp(prefix="htm_benchmark_")
+    try:
+        csvPath = os.path.join(workDir, "synthetic.csv")
+        timestamps, values, anomalies = generateStream(records, cadence, seed)
+        writeStream(csvPath, timestamps, values)
+
+        results = {}
+        failed = {}
+        for paramsName in paramsSets:
+            print("Benchmarking %s params on %i records..."
+                  % (paramsName, records))
+            queue = multiprocessing.Queue()
+            process = multiprocessing.Process(
+                target=benchmarkParams,
+                args=(paramsName, csvPath, workDir, queue))
+            process.start()
+            result = waitResult(process, queue)
+            process.join()
+            if result is None:
+                failed[paramsName] = "process exited with code %s" % process.exitcode
+                print("Benchmark of %s params failed: %s" % (paramsName, failed[paramsName]))
+            else:
+                results[paramsName] = result
+    finally:
+        shutil.rmtree(workDir)
+
+    return {
+        "meta": {
+            "commit": gitCommit(),
+            "time": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "records": records,
+            "cadence_minutes": cadence,
+            "seed": seed,
+        },
+        "results": results,
+        "failed": failed,
+    }
+
+
+def printResults(benchmark):
+    """
+    Prints a summary table of a results dict
+    """
+    print("%-10s %12s %10s %10s %10s %12s"
+          % ("params", "records/s", "p50 ms", "p99 ms", "p999 ms",
+             "peak RSS MB"))
+    for paramsName, result in sorted(benchmark["results"].items()):
+        latency = result["record_latency"]
+        print("%-10s %12.1f %10.3f %10.3f %10.3f %12.1f"
+              % (paramsName, result["records_per_s"], latency["p50_ms"],
+                 latency["p99_ms"], latency["p999_ms"],
+                 result["peak_rss_bytes"] / 1048576.0))
+    for paramsName, reason in sorted(benchmark.get("failed", {}).items()):
+        print("%-10s failed: %s" % (paramsName, reason))
+
+
+def create_parser():
+    """
+    Creates parser for command line inputs
+    """
+    parser = argparse.ArgumentParser(description='End-to-end benchmark of createModel/runModel on a synthetic stream')
+    parser.add_argument('--records', type=int, default=5000,
+                        help='Number of synthetic records; default=5000')
+    parser.add_argument('--cadence', type=int, default=5,
+                        help='Minutes between records; default=5')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='Random seed of the stream; default=42')
+    parser.add_argument('--params', nargs='+', choices=PARAMS_SETS, default=PARAMS_SETS,
+                        help='Params sets to benchmark; default=machine twitter')
+    parser.add_argument('--output', default='benchmark_results.json',
+                        help='JSON file receiving the results; default=benchmark_results.json')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = create_parser()
+    benchmark = runBenchmarks(args.records, args.cadence, args.seed,
+                              args.params)
+    printResults(benchmark)
+    with open(args.output, "w") as outputFile:
+        json.dump(benchmark, outputFile, indent=2, sort_keys=True)
+    print("Results written to %s" % args.output)
+    if benchmark["failed"]:
+        sys.exit(1)
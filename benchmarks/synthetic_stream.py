@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+
+"""
+Seeded synthetic stream generator for the benchmarks
+
+A stream is the sum of a slow sinusoid, daily and weekly seasonality and
+gaussian noise, with random level shifts and spikes on top. The same seed
+always gives the same stream, whatever the length or cadence.
+
+Usage (from the repository root):
+    python benchmarks/synthetic_stream.py --records 20000 --cadence 5 out.csv
+"""
+
+"""
+Importing Packages
+"""
+# general
+import csv
+import math
+import random
+import argparse
+import datetime
+
+
+"""
+Global variables
+"""
+# must match DATE_FORMAT in anomaly/run.py
+DATE_FORMAT = "%m/%d/%Y %H:%M"
+START = datetime.datetime(2014, 1, 1)
+
+
+def generateStream(records, cadence=5, seed=42, start=START, base=50.0,
+                   amplitude=5.0, period=2000, dailyAmplitude=10.0,
+                   weeklyAmplitude=5.0, noise=1.0, shiftRate=0.0005,
+                   shiftSize=15.0, spikeRate=0.001, spikeSize=30.0):
+    """
+    Returns (timestamps, values, anomalies) lists for a synthetic stream;
+    anomalies holds the indices of the injected level shifts and spikes
+
+    :param records        : number of records
+    :param cadence        : minutes between records
+    :param seed           : random seed
+    :param start          : timestamp of the first record
+    :param base           : mean level of the stream
+    :param amplitude      : amplitude of the slow sinusoid
+    :param period         : period of the slow sinusoid in records
+    :param dailyAmplitude : amplitude of the daily seasonality
+    :param weeklyAmplitude: amplitude of the weekly seasonality
+    :param noise          : standard deviation of the gaussian noise
+    :param shiftRate      : probability of a level shift at each record
+    :param shiftSize      : standard deviation of the level shifts
+    :param spikeRate      : probability of a spike at each record
+    :param spikeSize      : size of the spikes
+    """
+    rng = random.Random(seed)
+    step = datetime.timedelta(minutes=cadence)
+    day = 24 * 60.0
+    week = 7 * day
+
+    timestamps = []
+    values = []
+    anomalies = []
+    level = 0.0
+    for i in range(records):
+        minutes = i * cadence
+        value = (base + level +
+                 amplitude * math.sin(2 * math.pi * i / period) +
+                 dailyAmplitude * math.sin(2 * math.pi * minutes / day) +
+                 weeklyAmplitude * math.sin(2 * math.pi * minutes / week) +
+                 rng.gauss(0.0, noise))
+
+        if rng.random() < shiftRate:
+            level += rng.gauss(0.0, shiftSize)
+            anomalies.append(i)
+        elif rng.random() < spikeRate:
+            value += spikeSize * rng.choice((-1, 1))
+            anomalies.append(i)
+
+        timestamps.append(start + i * step)
+        values.append(value)
+
+    return timestamps, values, anomalies
+
+
+def writeStream(path, timestamps, values):
+    """
+    Writes a stream as a csv with the 3 NuPIC header rows read by runModel
+
+    :param path      : output csv file
+    :param timestamps: list of datetimes
+    :param values    : list of values
+    """
+    outputFile = open(path, "w")
+    writer = csv.writer(outputFile)
+    writer.writerow(["timestamp", "value"])
+    writer.writerow(["datetime", "float"])
+    writer.writerow(["T", ""])
+    for timestamp, value in zip(timestamps, values):
+        writer.writerow([timestamp.strftime(DATE_FORMAT), "%.4f" % value])
+    outputFile.close()
+
+
+def create_parser():
+    """
+    Creates parser for command line inputs
+    """
+    parser = argparse.ArgumentParser(description='Writes a seeded synthetic stream as a NuPIC csv')
+    parser.add_argument('output', help='Output csv file')
+    parser.add_argument('--records', type=int, default=20000,
+                        help='Number of records; default=20000')
+    parser.add_argument('--cadence', type=int, default=5,
+                        help='Minutes between records; default=5')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='Random seed; default=42')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = create_parser()
+    timestamps, values, anomalies = generateStream(args.records, args.cadence,
+                                                   args.seed)
+    writeStream(args.output, timestamps, values)
+    print("Wrote %i records with %i injected anomalies to %s"
+          % (len(values), len(anomalies), args.output))
@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+
+"""
+Persistent cache of swarm evaluations
+
+Results of the local swarm are stored in a SQLite file under the canonical
+hash of the model params they were run with, the fingerprint of the dataset
+(contents, last record and aggregation), the range of records run, the
+engine and the metric. A swarm re-run after a small change of permutations.py,
+or another swarm over the same data, takes every evaluation it already has
+from the cache instead of running the model again.
+
+Usage (cd into the myswarm folder):
+    python eval_cache.py inspect
+    python eval_cache.py evict --unusedDays 30
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+
+
+"""
+Global variables
+"""
+DEFAULT_CACHE_NAME = "swarm_eval_cache.db"
+# floats are hashed at this many significant digits, so that values equal up
+# to float noise share a key
+FLOAT_DIGITS = 12
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS evaluations (
+    params TEXT NOT NULL,
+    dataset TEXT NOT NULL,
+    first INTEGER NOT NULL,
+    last INTEGER NOT NULL,
+    engine TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL,
+    seconds REAL,
+    created REAL,
+    used REAL,
+    hits INTEGER DEFAULT 0,
+    metrics TEXT,
+    PRIMARY KEY (params, dataset, first, last, engine, metric)
+)
+"""
+
+
+def canonical(value):
+    """
+    Returns a JSON-able copy of a params structure with a single spelling
+    per value: dict keys as sorted strings, tuples as lists, unicode and
+    bytes as str and floats at FLOAT_DIGITS significant digits
+    """
+    if isinstance(value, dict):
+        return dict((str(key), canonical(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return [canonical(item) for item in value]
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, float):
+        if value == int(value) and abs(value) < 2 ** 53:
+            return int(value)
+        return float("%.*g" % (FLOAT_DIGITS, value))
+    if isinstance(value, int):
+        return value
+    return str(value)
+
+
+def paramsHash(params):
+    """
+    Returns the canonical hash of a MODEL_PARAMS dict
+    """
+    text = json.dumps(canonical(params), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def datasetFingerprint(csvPath, lastRecord=None, aggregationInfo=None,
+                       predictedField="value"):
+    """
+    Returns the hash of a dataset's contents and of how it is read
+
+    :param csvPath         : dataset csv
+    :param lastRecord      : records read, all when None
+    :param aggregationInfo : aggregationInfo applied to the records
+    :param predictedField  : field the models predict
+    """
+    digest = hashlib.sha256()
+    with open(csvPath, "rb") as dataFile:
+        for block in iter(lambda: dataFile.read(1 << 20), b""):
+            digest.update(block)
+    digest.update(json.dumps(canonical([lastRecord, aggregationInfo, predictedField]),
+                             sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def connect(path):
+    connection = sqlite3.connect(path)
+    connection.execute(SCHEMA)
+    columns = [row[1] for row in connection.execute("PRAGMA table_info(evaluations)")]
+    if "metrics" not in columns:
+        # caches written before the report metrics were stored
+        connection.execute("ALTER TABLE evaluations ADD COLUMN metrics TEXT")
+    connection.commit()
+    return connection
+
+
+class EvalCache(object):
+    """
+    Cached evaluations of one swarm's dataset, engine and metric
+
+    :param path         : SQLite file, created when missing
+    :param dataset      : datasetFingerprint of the swarm's stream
+    :param engine       : engine name the models run on
+    :param metric       : metric spec string the value is computed with
+    :param totalRecords : records in the stream, the range of full runs
+    """
+
+    def __init__(self, path, dataset, engine, metric, totalRecords):
+        self.path = path
+        self.connection = connect(path)
+        self.dataset = dataset
+        self.engine = engine
+        self.metric = metric
+        self.totalRecords = totalRecords
+        self.hits = 0
+        self.misses = 0
+
+    def recordRange(self, records=None):
+        """
+        Returns the (first, last) records run for a task's records, all when None
+        """
+        return 0, self.totalRecords if records is None else min(records, self.totalRecords)
+
+    def _key(self, params, records):
+        return ((paramsHash(params), self.dataset) + self.recordRange(records) +
+                (self.engine, self.metric))
+
+    def get(self, params, records=None, reportMetrics=()):
+        """
+        Returns (metric, seconds, report metrics dict) of a cached evaluation,
+        None on a miss; an evaluation without every one of reportMetrics is
+        a miss
+
+        :param params        : MODEL_PARAMS of the candidate
+        :param records       : records of the stream run, all when None
+        :param reportMetrics : error metrics the result must report
+        """
+        key = self._key(params, records)
+        row = self.connection.execute(
+            "SELECT value, seconds, metrics FROM evaluations WHERE params = ? AND "
+            "dataset = ? AND first = ? AND last = ? AND engine = ? AND metric = ?",
+            key).fetchone()
+        metrics = json.loads(row[2]) if row is not None and row[2] else {}
+        if row is None or any(name not in metrics for name in reportMetrics):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.connection.execute(
+            "UPDATE evaluations SET hits = hits + 1, used = ? WHERE params = ? AND "
+            "dataset = ? AND first = ? AND last = ? AND engine = ? AND metric = ?",
+            (time.time(),) + key)
+        self.connection.commit()
+        return row[0], row[1], metrics
+
+    def put(self, params, records, value, seconds, metrics=None):
+        """
+        Stores the metric of an evaluation
+
+        :param params  : MODEL_PARAMS of the candidate
+        :param records : records of the stream run, all when None
+        :param value   : metric value, None when the model made no prediction
+        :param seconds : time the evaluation took
+        :param metrics : dict of the report metrics of the evaluation
+        """
+        now = time.time()
+        self.connection.execute(
+            "INSERT OR REPLACE INTO evaluations (params, dataset, first, last, engine, "
+            "metric, value, seconds, created, used, hits, metrics) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0, ?)",
+            self._key(params, records) + (value, seconds, now, now,
+                                          json.dumps(metrics) if metrics else None))
+        self.connection.commit()
+
+    def summary(self):
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses,
+                "hitRate": float(self.hits) / lookups if lookups else 0.0}
+
+    def close(self):
+        self.connection.close()
+
+
+def inspect(path):
+    """
+    Prints the entries of a cache file per dataset, engine and metric
+    """
+    connection = connect(path)
+    rows = connection.execute(
+        "SELECT dataset, engine, metric, COUNT(*), SUM(hits), SUM(seconds), "
+        "MIN(created), MAX(used) FROM evaluations GROUP BY dataset, engine, metric "
+        "ORDER BY MAX(used) DESC").fetchall()
+    connection.close()
+    total = sum(row[3] for row in rows)
+    print("%s: %i evaluations, %.1f KB" % (path, total, os.path.getsize(path) / 1024.0))
+    for dataset, engine, metric, count, hits, seconds, created, used in rows:
+        print("  dataset %s  engine %s  %s" % (dataset[:12], engine, metric))
+        print("    %i evaluations of %.1f s in total, %i hits, created %s, last used %s"
+              % (count, seconds or 0.0, hits or 0,
+                 time.strftime("%Y-%m-%d %H:%M", time.localtime(created)),
+                 time.strftime("%Y-%m-%d %H:%M", time.localtime(used))))
+
+
+def evict(path, unusedDays=None, dataset=None, engine=None, evictAll=False):
+    """
+    Deletes cache entries and returns how many were deleted
+
+    :param path       : cache file
+    :param unusedDays : delete entries not used for this many days
+    :param dataset    : delete entries of datasets whose fingerprint starts with this
+    :param engine     : delete entries of this engine
+    :param evictAll   : delete every entry
+    """
+    conditions = []
+    arguments = []
+    if unusedDays is not None:
+        conditions.append("used < ?")
+        arguments.append(time.time() - unusedDays * 86400)
+    if dataset is not None:
+        conditions.append("dataset LIKE ?")
+        arguments.append(dataset + "%")
+    if engine is not None:
+        conditions.append("engine = ?")
+        arguments.append(engine)
+    if not conditions and not evictAll:
+        raise ValueError("Nothing to evict, give a condition or --all")
+
+    connection = connect(path)
+    query = "DELETE FROM evaluations"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    deleted = connection.execute(query, arguments).rowcount
+    connection.commit()
+    connection.execute("VACUUM")
+    connection.close()
+    return deleted
+
+
+def create_parser():
+    """
+    Creates parser for command line inputs
+    """
+    parser = argparse.ArgumentParser(description='Inspects and evicts cached swarm evaluations')
+    parser.add_argument('action', choices=['inspect', 'evict'],
+                        help='Print the cache contents or delete entries')
+    parser.add_argument('--cache', default=DEFAULT_CACHE_NAME,
+                        help='Cache file; default=%s' % DEFAULT_CACHE_NAME)
+    parser.add_argument('--unusedDays', type=float, default=None,
+                        help='Evict entries not used for this many days')
+    parser.add_argument('--dataset', default=None,
+                        help='Evict entries of the dataset whose fingerprint starts with this')
+    parser.add_argument('--engine', default=None,
+                        help='Evict entries of this engine')
+    parser.add_argument('--all', dest='evictAll', action='store_true',
+                        help='Evict every entry')
+    args = parser.parse_args()
+    if (args.action == 'evict' and not args.evictAll and args.unusedDays is None and
+            args.dataset is None and args.engine is None):
+        parser.error("evict needs --unusedDays, --dataset, --engine or --all")
+    return args
+
+
+if __name__ == "__main__":
+    args = create_parser()
+    if not os.path.exists(args.cache):
+        print("No cache at %s" % args.cache)
+    elif args.action == "inspect":
+        inspect(args.cache)
+    else:
+        deleted = evict(args.cache, args.unusedDays, args.dataset, args.engine,
+                        args.evictAll)
+        print("Evicted %i evaluations from %s" % (deleted, args.cache))
@@ -0,0 +1,797 @@
+#!/usr/bin/env python
+
+"""
+Local swarm executor
+
+Evaluates candidate model params drawn from a permutations.py or
+*_search_def.json on a multiprocessing pool and keeps the results in a
+SQLite file, so a swarm needs neither NuPIC's MySQL job tables nor any other
+service. Each candidate runs over the swarm's stream and is scored with the
+metric named by `minimize` (or `maximize`). The best params are written to
+model_0/model_params.py and all trials to <label>_Report.csv, next to the
+swarm definition, as the NuPIC swarm does.
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import sys
+import csv
+import json
+import time
+import pprint
+import socket
+import subprocess
+import datetime
+import traceback
+import multiprocessing
+from timeit import default_timer
+
+try:
+    from Queue import Queue, Empty
+    from multiprocessing.queues import SimpleQueue
+except ImportError:
+    from queue import Queue, Empty
+    from multiprocessing import SimpleQueue
+
+import numpy
+
+# models are created through the anomaly runner's engines
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "anomaly"))
+from engines import createEngine, predictingEngines
+from profiling import Profiler, pauseAll
+
+from search_space import loadSearchSpace, PermutationSampler
+from results_store import ResultsStore
+from eval_cache import EvalCache, datasetFingerprint, DEFAULT_CACHE_NAME
+from swarm_prep import prepareSwarm, SwarmPrep
+from swarm_journal import SwarmJournal, readJournal, journalResults
+from work_queue import QueueExecutor
+from prescreen import PreScreen
+from swarm_metrics import SwarmMetrics
+from successive_halving import SuccessiveHalving, Hyperband, rankKey
+from tpe_search import TPESearch
+from warm_start import loadSeeds, narrowSpace, defaultWarmModels, WarmStart, DEFAULT_MARGIN
+
+
+"""
+Global variables
+"""
+DATE_FORMAT = "%m/%d/%Y %H:%M" # ex) 2/3/2001 21:45
+AGGREGATION_FUNCTIONS = {
+    "sum": numpy.sum,
+    "mean": numpy.mean,
+    "avg": numpy.mean,
+    "max": numpy.max,
+    "min": numpy.min,
+    "first": lambda values: values[0],
+    "last": lambda values: values[-1],
+}
+# state of a pool worker, set once by initWorker
+_worker = {}
+
+
+def readStream(csvPath, lastRecord=None):
+    """
+    Returns (timestamps, values) of a dataset csv with 3 header rows, as a
+    list of datetime objects and a float64 array
+
+    :param csvPath    : path to csv dataset file
+    :param lastRecord : number of records read, all when None
+    """
+    timestamps = []
+    values = []
+    with open(csvPath, "r") as inputFile:
+        csvReader = csv.reader(inputFile)
+
+        # skip first 3 header rows
+        next(csvReader)
+        next(csvReader)
+        next(csvReader)
+
+        for row in csvReader:
+            if lastRecord is not None and len(values) >= lastRecord:
+                break
+            timestamps.append(datetime.datetime.strptime(row[0], DATE_FORMAT))
+            values.append(float(row[1]))
+    return timestamps, numpy.array(values, dtype=numpy.float64)
+
+
+def aggregationPeriod(aggregationInfo):
+    """
+    Returns the aggregation period of an aggregationInfo dict as a
+    timedelta, None when records are not aggregated
+    """
+    if aggregationInfo is None:
+        return None
+    if aggregationInfo.get("months", 0) or aggregationInfo.get("years", 0):
+        raise ValueError("Aggregation by months or years is not supported")
+    period = datetime.timedelta(
+        weeks=aggregationInfo.get("weeks", 0), days=aggregationInfo.get("days", 0),
+        hours=aggregationInfo.get("hours", 0), minutes=aggregationInfo.get("minutes", 0),
+        seconds=aggregationInfo.get("seconds", 0),
+        milliseconds=aggregationInfo.get("milliseconds", 0),
+        microseconds=aggregationInfo.get("microseconds", 0))
+    return period if period > datetime.timedelta(0) else None
+
+
+def aggregate(timestamps, values, aggregationInfo, valueField="value"):
+    """
+    Aggregates records into consecutive periods starting at the first record,
+    like NuPIC's stream aggregator; returns (timestamps, values)
+
+    :param timestamps      : list of datetime objects
+    :param values          : float array
+    :param aggregationInfo : aggregationInfo dict of the model params
+    :param valueField      : field whose aggregation function applies to values
+    """
+    period = aggregationPeriod(aggregationInfo)
+    if period is None or len(values) == 0:
+        return timestamps, values
+    functions = dict(aggregationInfo.get("fields", []))
+    function = AGGREGATION_FUNCTIONS[functions.get(valueField, "mean")]
+
+    aggregatedTimestamps = []
+    aggregatedValues = []
+    start = 0
+    windowEnd = timestamps[0] + period
+    for i in range(1, len(values) + 1):
+        if i == len(values) or timestamps[i] >= windowEnd:
+            aggregatedTimestamps.append(timestamps[start])
+            aggregatedValues.append(function(values[start:i]))
+            if i < len(values):
+                # skip empty periods
+                while timestamps[i] >= windowEnd:
+                    windowEnd += period
+                start = i
+    return aggregatedTimestamps, numpy.array(aggregatedValues, dtype=numpy.float64)
+
+
+def streamSettings(space, csvPath=None, lastRecord=None):
+    """
+    Returns (csv path, last record, aggregationInfo) of the swarm's stream
+
+    :param space      : SearchSpace of the swarm
+    :param csvPath    : dataset csv, the swarm's stream source by default
+    :param lastRecord : records read from the csv, the stream's last_record by
+                        default, -1 for all
+    """
+    sourcePath, sourceLastRecord = space.source()
+    if lastRecord is None:
+        lastRecord = sourceLastRecord
+    elif lastRecord < 0:
+        lastRecord = None
+    aggregationInfo = space.permutations.get("aggregationInfo",
+                                             space.baseParams.get("aggregationInfo"))
+    return csvPath or sourcePath, lastRecord, aggregationInfo
+
+
+def loadStream(settings, predictedField="value"):
+    """
+    Returns the aggregated (timestamps, values) of the swarm's stream
+
+    :param settings       : (csv path, last record, aggregationInfo) of streamSettings
+    :param predictedField : field the aggregation function is looked up for
+    """
+    csvPath, lastRecord, aggregationInfo = settings
+    timestamps, values = readStream(csvPath, lastRecord)
+    return aggregate(timestamps, values, aggregationInfo, predictedField)
+
+
+def initWorker(settings, engine, predictedField, metricSpec, prepDir=None, reportMetrics=(),
+               profile=None, started=None):
+    """
+    Loads the stream once per pool worker, attaching to the swarm preparation
+    in prepDir when given rather than reading the csv; reportMetrics are the
+    error metrics trials report besides metricSpec's, profile a (mode,
+    prefix, interval) tuple to profile the trials with, writing
+    <prefix>_worker<pid> files, and started a queue told the (trial, pid) of
+    every trial the worker starts
+    """
+    profiler = None
+    if profile is not None:
+        mode, prefix, interval = profile
+        pauseAll()
+        profiler = Profiler(mode, "%s_worker%i" % (prefix, os.getpid()), interval)
+    prep = None
+    if prepDir is not None:
+        prep = SwarmPrep(prepDir)
+        timestamps, values = prep.timestamps, prep.values
+    else:
+        timestamps, values = loadStream(settings, predictedField)
+        timestamps = numpy.array(timestamps, dtype="datetime64[us]")
+    _worker.update(timestamps=timestamps, values=values, engine=engine,
+                   predictedField=predictedField, metricSpec=metricSpec, prep=prep,
+                   reportMetrics=list(reportMetrics or ()), profiler=profiler,
+                   started=started)
+
+
+def evaluateCandidate(task):
+    """
+    Runs one candidate over the worker's stream and returns its result dict;
+    errors are reported in the result rather than raised
+
+    :param task : dict with trial, perm, params and records, the number of
+                  records to run, all when None
+    """
+    start = default_timer()
+    result = {"trial": task["trial"], "perm": task["perm"], "metric": None,
+              "records": 0, "seconds": 0.0, "status": "completed", "error": None}
+    if _worker.get("started") is not None:
+        _worker["started"].put((task["trial"], os.getpid()))
+    profiler = _worker.get("profiler")
+    if profiler is not None:
+        profiler.start()
+    try:
+        timestamps = _worker["timestamps"]
+        values = _worker["values"]
+        count = len(values) if task.get("records") is None else min(task["records"], len(values))
+        model = createEngine(_worker["engine"], task["params"], _worker["predictedField"])
+        if _worker["prep"] is not None:
+            _worker["prep"].preload(model, task["params"])
+
+        field = _worker["predictedField"]
+        steps = _worker["metricSpec"]["steps"][0]
+        metrics = SwarmMetrics(_worker["metricSpec"], _worker["reportMetrics"])
+        record = {"timestamp": None, field: None}
+        for i in range(count):
+            # models take datetime objects and python floats
+            record["timestamp"] = timestamps[i].item()
+            record[field] = value = values[i].item()
+            metrics.update(value,
+                           model.run(record).inferences["multiStepBestPredictions"].get(steps))
+        result["records"] = count
+        result["metric"] = metrics.value()
+        if _worker["reportMetrics"]:
+            result["metrics"] = metrics.values(_worker["reportMetrics"])
+    except Exception:
+        result["status"] = "error"
+        result["error"] = traceback.format_exc()
+    result["seconds"] = default_timer() - start
+    if profiler is not None:
+        # the pool is terminated rather than closed, so every trial writes
+        profiler.pause()
+        profiler.write()
+    return result
+
+
+class RandomSearch(object):
+    """
+    Proposes maxModels permutations drawn uniformly from the search space,
+    each run over the whole stream
+
+    :param space        : SearchSpace of the swarm
+    :param maxModels    : number of candidates evaluated
+    :param totalRecords : records in the swarm's stream
+    :param seed         : random seed
+    :param options      : dict of strategy options, unused
+    """
+
+    def __init__(self, space, maxModels, totalRecords, seed=42, options=None):
+        self.sampler = PermutationSampler(space, seed)
+        self.maxModels = maxModels
+        self.proposed = 0
+
+    def propose(self):
+        """
+        Returns the next task dict to evaluate, None when there is none to
+        start before more results come in
+        """
+        if self.done():
+            return None
+        perm = self.sampler.sample()
+        if perm is None:
+            self.maxModels = self.proposed
+            return None
+        self.proposed += 1
+        return self.sampler.task(perm)
+
+    def observe(self, result):
+        """
+        Takes the result of an evaluated task
+        """
+        pass
+
+    def done(self):
+        """
+        Returns whether every task has been proposed
+        """
+        return self.proposed >= self.maxModels
+
+
+STRATEGIES = {
+    "random": RandomSearch,
+    "halving": SuccessiveHalving,
+    "hyperband": Hyperband,
+    "tpe": TPESearch,
+}
+
+
+class ConvergenceCurve(object):
+    """
+    Best metric of a swarm against the evaluations and model-records spent
+
+    Only candidates run on the whole stream count towards the best metric,
+    so strategies running prefixes compare fairly with full runs.
+
+    :param totalRecords : records in the swarm's stream
+    :param maximize     : whether higher metrics are better
+    """
+
+    def __init__(self, totalRecords, maximize=False):
+        self.totalRecords = totalRecords
+        self.maximize = maximize
+        self.evaluations = 0
+        self.modelRecords = 0
+        self.best = None
+        self.start = default_timer()
+        self.rows = []
+
+    def add(self, result):
+        """
+        Takes a result in the order it arrived
+        """
+        self.evaluations += 1
+        self.modelRecords += result["records"] or 0
+        if (result["records"] >= self.totalRecords and
+                not rankKey(result)[0] and
+                (self.best is None or
+                 rankKey(result, self.maximize) < rankKey(self.best, self.maximize))):
+            self.best = result
+        self.rows.append((self.evaluations, self.modelRecords,
+                          default_timer() - self.start,
+                          None if self.best is None else self.best["metric"],
+                          None if self.best is None else self.best["trial"]))
+
+    def write(self, path):
+        with open(path, "w") as curveFile:
+            writer = csv.writer(curveFile)
+            writer.writerow(["evaluations", "model_records", "seconds", "best_metric",
+                             "best_trial"])
+            for evaluations, modelRecords, seconds, metric, trial in self.rows:
+                writer.writerow([evaluations, modelRecords, "%.3f" % seconds, metric, trial])
+
+
+class PoolExecutor(object):
+    """
+    Runs the tasks of runLocalSwarm on a local process pool
+
+    A pool replaces a worker process that dies, killed for memory say, but
+    loses the task it was running. Workers tell which trial they start, so
+    the trial of a dead worker is reported as failed instead of awaited.
+
+    :param maxWorkers   : pool size
+    :param initArgs     : arguments of initWorker
+    :param pollInterval : seconds between checks of the workers
+    """
+
+    def __init__(self, maxWorkers, initArgs, pollInterval=1.0):
+        # written synchronously, so a worker dying right after telling its
+        # trial has told it
+        self.started = SimpleQueue()
+        self.pool = multiprocessing.Pool(maxWorkers, initializer=initWorker,
+                                         initargs=tuple(initArgs) + (self.started,))
+        self.pollInterval = pollInterval
+        self.finished = Queue()
+        self.tasks = {}
+        # pid of the worker running each started trial
+        self.running = {}
+        self.delivered = set()
+
+    def submit(self, task):
+        self.tasks[task["trial"]] = task
+        if sys.version_info[0] >= 3:
+            # a result that cannot be sent back fails its trial
+            self.pool.apply_async(
+                evaluateCandidate, (task,), callback=self.finished.put,
+                error_callback=lambda error: self.finished.put(
+                    self._failed(task, "Trial raised %r in the pool" % (error,))))
+        else:
+            self.pool.apply_async(evaluateCandidate, (task,), callback=self.finished.put)
+
+    def _failed(self, task, error):
+        return {"trial": task["trial"], "perm": task["perm"], "metric": None,
+                "records": 0, "seconds": 0.0, "status": "error", "error": error}
+
+    def _checkWorkers(self):
+        """
+        Fails the trials whose worker process died
+        """
+        while not self.started.empty():
+            trial, pid = self.started.get()
+            if trial not in self.delivered:
+                self.running[trial] = pid
+        processes = dict((process.pid, process) for process in self.pool._pool)
+        for trial, pid in list(self.running.items()):
+            process = processes.get(pid)
+            if process is None or process.exitcode is not None:
+                del self.running[trial]
+                self.finished.put(self._failed(
+                    self.tasks[trial], "Worker process %i died running the trial%s"
+                    % (pid, "" if process is None else " (exit code %s)" % process.exitcode)))
+
+    def put(self, result):
+        """
+        Hands back a result obtained without the pool
+        """
+        self.finished.put(result)
+
+    def get(self):
+        """
+        Returns the next result, waiting for one
+        """
+        while True:
+            try:
+                result = self.finished.get(timeout=self.pollInterval)
+            except Empty:
+                self._checkWorkers()
+                continue
+            if result["trial"] in self.delivered:
+                # a result posted after its worker was reported dead
+                continue
+            self.delivered.add(result["trial"])
+            self.running.pop(result["trial"], None)
+            self.tasks.pop(result["trial"], None)
+            return result
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+
+def workerConfig(space, settings, engine, prepDir=None, reportMetrics=()):
+    """
+    Returns the setup of distributed workers, with absolute paths
+    """
+    csvPath, lastRecord, aggregationInfo = settings
+    return {"swarm": "%s:%i:%f" % (socket.gethostname(), os.getpid(), time.time()),
+            "settings": [os.path.abspath(csvPath), lastRecord, aggregationInfo],
+            "engine": engine, "predictedField": space.predictedField,
+            "metricSpec": space.metricSpec,
+            "prepDir": None if prepDir is None else os.path.abspath(prepDir),
+            "reportMetrics": list(reportMetrics or ())}
+
+
+def spawnWorkers(queuePath, count):
+    """
+    Starts swarm_worker.py processes serving a work queue on this host;
+    returns them
+    """
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "swarm_worker.py")
+    with open(os.devnull, "w") as devnull:
+        return [subprocess.Popen([sys.executable, script, queuePath], stdout=devnull)
+                for _ in range(count)]
+
+
+def cachedResult(task, cache, reportMetrics=()):
+    """
+    Returns the result of a task found in the evaluation cache with every
+    one of reportMetrics, None on a miss
+    """
+    cached = cache.get(task["params"], task.get("records"), reportMetrics)
+    if cached is None:
+        return None
+    metric, seconds, metrics = cached
+    result = {"trial": task["trial"], "perm": task["perm"], "metric": metric,
+              "records": cache.recordRange(task.get("records"))[1], "seconds": 0.0,
+              "status": "completed", "error": None, "cached": seconds}
+    if reportMetrics:
+        result["metrics"] = dict((name, metrics[name]) for name in reportMetrics)
+    return result
+
+
+def journaledTask(task, entry):
+    """
+    Returns whether a proposed task is the one a journal start entry records
+    """
+    return (json.dumps(task["perm"], sort_keys=True) == json.dumps(entry["perm"], sort_keys=True)
+            and task.get("records") == entry.get("records"))
+
+
+def resumeStrategy(strategy, journal, curve=None):
+    """
+    Drives a strategy through the proposals and results of a journal in the
+    order they happened, so that it stands where the interrupted swarm
+    stood; returns the tasks that were running, with their trial numbers
+
+    :param strategy : search strategy built with the options of the journaled swarm
+    :param journal  : SwarmJournal of the swarm
+    :param curve    : ConvergenceCurve receiving the journaled results, None for none
+    """
+    tasks = {}
+    finished = set()
+    for entry in journal.entries:
+        trial = entry["trial"]
+        if entry["event"] == "start":
+            if trial in tasks:
+                # run again after an earlier restart
+                continue
+            task = strategy.propose()
+            if task is None or not journaledTask(task, entry):
+                raise ValueError("The swarm does not propose the trials of %s again; resume "
+                                 "it with the options it was started with, or start over "
+                                 "with --fresh" % journal.path)
+            task["trial"] = trial
+            tasks[trial] = task
+        elif entry["event"] == "finish" and trial in tasks and trial not in finished:
+            finished.add(trial)
+            result = journalResults({trial: entry})[0]
+            # JSON turned the permutation's tuples into lists
+            result["perm"] = tasks[trial]["perm"]
+            strategy.observe(result)
+            if curve is not None:
+                curve.add(result)
+    if tasks:
+        print("Replayed %i trials of %s, %i finished"
+              % (len(tasks), journal.path, len(finished)))
+    return [task for trial, task in sorted(tasks.items()) if trial not in finished]
+
+
+def runLocalSwarm(space, store, strategy, settings, maxWorkers=4, engine="nupic",
+                  cache=None, curve=None, prepDir=None, journal=None, queuePath=None,
+                  reportMetrics=(), profile=None):
+    """
+    Evaluates the tasks proposed by a search strategy on a process pool, or
+    on the workers of a work queue, keeping up to maxWorkers of them running,
+    and stores every result
+
+    :param space      : SearchSpace of the swarm
+    :param store      : ResultsStore receiving the results
+    :param strategy   : search strategy with propose(), observe(result) and done()
+    :param settings   : stream settings of streamSettings
+    :param maxWorkers : pool size
+    :param engine     : HTM implementation, one of engines.ENGINES
+    :param cache      : EvalCache answering the tasks it already holds, None for none
+    :param curve      : ConvergenceCurve receiving every result, None for none
+    :param prepDir    : swarm preparation the workers attach to, None to have
+                        each worker read the stream
+    :param journal    : SwarmJournal of the swarm, replayed into the strategy
+                        before it proposes anything, None for none
+    :param queuePath  : work queue file served by swarm_worker.py processes,
+                        None to run on a local pool
+    :param reportMetrics : error metrics every trial reports besides the
+                           optimized one
+    :param profile    : (mode, prefix, interval) of the profiler of each pool
+                        worker, None for none
+    """
+    if queuePath is not None:
+        executor = QueueExecutor(queuePath, workerConfig(space, settings, engine, prepDir,
+                                                         reportMetrics))
+    else:
+        executor = PoolExecutor(maxWorkers, (settings, engine, space.predictedField,
+                                             space.metricSpec, prepDir, reportMetrics,
+                                             profile))
+    trial = store.nextTrial()
+    if journal is not None:
+        trial = max(trial, journal.nextTrial())
+    # trials interrupted by a restart run again first, under their number
+    interrupted = resumeStrategy(strategy, journal, curve) if journal is not None else []
+    submitted = 0
+    running = 0
+    modelRecords = 0
+    params = {}
+    start = default_timer()
+    try:
+        while True:
+            while running < maxWorkers and (interrupted or not strategy.done()):
+                if interrupted:
+                    task = interrupted.pop(0)
+                else:
+                    task = strategy.propose()
+                    if task is None:
+                        break
+                    task["trial"] = trial
+                    trial += 1
+                running += 1
+                submitted += 1
+                if journal is not None:
+                    journal.start(task)
+                result = (cachedResult(task, cache, reportMetrics) if cache is not None
+                          else None)
+                if result is not None:
+                    executor.put(result)
+                    continue
+                params[task["trial"]] = task["params"]
+                executor.submit(task)
+            if running == 0:
+                break
+
+            result = executor.get()
+            running -= 1
+            if curve is not None:
+                curve.add(result)
+            if journal is not None:
+                journal.finish(result)
+            if "cached" in result:
+                print("Trial %i: %s = %s on %i records from the cache, %.1f s saved"
+                      % (result["trial"], space.metricSpec["errorMetric"],
+                         result["metric"], result["records"], result["cached"] or 0.0))
+                store.add(result)
+                strategy.observe(result)
+                continue
+            modelRecords += result["records"]
+            if cache is not None and result["status"] == "completed":
+                cache.put(params.pop(result["trial"]), result["records"],
+                          result["metric"], result["seconds"], result.get("metrics"))
+            store.add(result)
+            strategy.observe(result)
+            if result["status"] == "error":
+                print("Trial %i failed:\n%s" % (result["trial"], result["error"]))
+            else:
+                print("Trial %i: %s = %s on %i records in %.1f s"
+                      % (result["trial"], space.metricSpec["errorMetric"],
+                         result["metric"], result["records"], result["seconds"]))
+    finally:
+        executor.close()
+
+    print("Evaluated %i models on %i model-records in %.1f s with %i %s"
+          % (submitted, modelRecords, default_timer() - start, maxWorkers,
+             "trials in flight" if queuePath is not None else "workers"))
+    if cache is not None:
+        print("Evaluation cache: %(hits)i hits, %(misses)i misses" % cache.summary())
+
+
+def rankResults(results, maximize=False):
+    """
+    Returns the completed trials with a metric, best first; trials run on
+    more records rank ahead, so a prefix run never beats a full one
+    """
+    ranked = [result for result in results
+              if result["status"] == "completed" and result["metric"] is not None]
+    ranked.sort(key=lambda result: (-result["records"],
+                                    -result["metric"] if maximize else result["metric"]))
+    return ranked
+
+
+def writeModelParams(path, params):
+    """
+    Writes a MODEL_PARAMS module, as the swarm writes model_0/model_params.py
+    """
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    with open(path, "w") as paramsFile:
+        paramsFile.write("MODEL_PARAMS = %s\n" % pprint.pformat(params))
+
+
+def writeReport(path, results, maximize=False):
+    """
+    Writes every trial to a csv file, best first
+    """
+    ranked = rankResults(results, maximize)
+    ranked += [result for result in results if result not in ranked]
+    names = sorted(set(name for result in ranked for name in result["perm"]))
+    metricNames = sorted(set(name for result in ranked for name in result.get("metrics") or {}))
+    with open(path, "w") as reportFile:
+        writer = csv.writer(reportFile)
+        writer.writerow(["trial", "status", "metric", "records", "seconds"] + metricNames + names)
+        for result in ranked:
+            metrics = result.get("metrics") or {}
+            writer.writerow([result["trial"], result["status"], result["metric"],
+                             result["records"], "%.3f" % result["seconds"]] +
+                            [metrics.get(name) for name in metricNames] +
+                            [result["perm"].get(name) for name in names])
+
+
+def printLeaderboard(results, metricName, maximize=False, count=10):
+    ranked = rankResults(results, maximize)
+    errors = len([result for result in results if result["status"] == "error"])
+    print("%i trials on %i model-records, %i failed; best %s:"
+          % (len(results), sum(result["records"] or 0 for result in results),
+             errors, metricName))
+    for result in ranked[:count]:
+        print("  trial %4i  %s = %.6g  (%i records, %.1f s)%s"
+              % (result["trial"], metricName, result["metric"], result["records"],
+                 result["seconds"],
+                 "".join("  %s = %s" % (name, "%.6g" % value if value is not None else None)
+                         for name, value in sorted((result.get("metrics") or {}).items()))))
+        for name in sorted(result["perm"]):
+            print("      %s = %r" % (name, result["perm"][name]))
+
+    return ranked
+
+
+def runLocal(fileArgPath, options):
+    """
+    Entry point of run_swarm.py --local
+
+    :param fileArgPath : absolute path of the permutations.py or search definition
+    :param options     : dict of the parsed run_swarm.py options
+    """
+    permWorkDir = os.path.dirname(fileArgPath)
+    outputLabel = os.path.splitext(os.path.basename(fileArgPath))[0]
+    space = loadSearchSpace(fileArgPath, options.get("baseParams"))
+    storePath = options.get("store") or os.path.join(
+        permWorkDir, outputLabel + "_local_swarm.db")
+    journalPath = options.get("journal") or os.path.join(
+        permWorkDir, outputLabel + "_journal.jsonl")
+    metricName = space.metricSpec["errorMetric"]
+
+    if options["action"] == "run":
+        settings = streamSettings(space, options.get("input"), options.get("lastRecord"))
+        timestamps, values = loadStream(settings, space.predictedField)
+        maxModels = options.get("maxPermutations") or space.maxModels
+        seed = options.get("seed", 42)
+        if options.get("warmStart"):
+            # the strategy searches around the seeds over the models they leave
+            seeds = loadSeeds(space, options["warmStart"])
+            margin = options.get("warmMargin") or DEFAULT_MARGIN
+            searchSpace = narrowSpace(space, seeds, margin)
+            warmModels = options.get("warmModels") or defaultWarmModels(seeds, maxModels)
+            strategy = STRATEGIES[options.get("strategy", "random")](
+                searchSpace, max(0, maxModels - warmModels), len(values), seed, options)
+            strategy = WarmStart(strategy, searchSpace, seeds, warmModels, seed, margin)
+        else:
+            strategy = STRATEGIES[options.get("strategy", "random")](
+                space, maxModels, len(values), seed, options)
+        prescreen = None
+        if options.get("prescreen"):
+            strategy = prescreen = PreScreen(strategy, space, values, options)
+        engine = options.get("engine", "nupic")
+        if engine not in predictingEngines():
+            raise ValueError("Engine %r makes no predictions to score the %s metric with; "
+                             "use one of %s" % (engine, space.metricSpec["errorMetric"],
+                                                ", ".join(predictingEngines())))
+        curve = ConvergenceCurve(len(values), space.maximize)
+        fingerprint = datasetFingerprint(*settings, predictedField=space.predictedField)
+        prepDir = None
+        if options.get("prep"):
+            prepDir = os.path.join(permWorkDir, outputLabel + "_prep")
+            prepareSwarm(prepDir, space, timestamps, values, fingerprint, engine)
+        cache = None
+        if not options.get("noEvalCache"):
+            cachePath = options.get("evalCache") or os.path.join(
+                permWorkDir, DEFAULT_CACHE_NAME)
+            cache = EvalCache(cachePath, fingerprint, engine, space.metric, len(values))
+        journal = SwarmJournal(journalPath, options.get("fresh", False))
+        if journal.finished or journal.started:
+            print("Resuming from %s: %i trials finished, %i interrupted"
+                  % (journalPath, len(journal.finished), len(journal.interrupted())))
+        store = ResultsStore(storePath)
+        queuePath = options.get("queue")
+        workers = []
+        if queuePath is not None:
+            queuePath = os.path.abspath(queuePath)
+            workers = spawnWorkers(queuePath, options.get("spawnWorkers") or 0)
+        try:
+            runLocalSwarm(space, store, strategy, settings, options["maxWorkers"],
+                          engine, cache, curve, prepDir, journal, queuePath,
+                          options.get("reportMetrics") or (), options.get("profile"))
+        finally:
+            for worker in workers:
+                worker.wait()
+            store.close()
+            journal.close()
+            if cache is not None:
+                cache.close()
+            curvePath = os.path.join(permWorkDir, "%s_%s_Convergence.csv"
+                                     % (outputLabel, options.get("strategy", "random")))
+            curve.write(curvePath)
+            print("Convergence curve written to %s" % curvePath)
+            if prescreen is not None:
+                print("Pre-screen: %(screened)i candidates screened, %(rejectedByEncoder)i "
+                      "rejected by encoder resolution, %(rejectedByScreen)i by the screen "
+                      "trial (cutoff %(cutoff)s, rank correlation %(correlation).2f); "
+                      "%(savedRuns)i full runs and %(savedRecords)i model-records saved"
+                      % prescreen.summary())
+    elif options["action"] != "report":
+        raise ValueError("Action %r is not available with --local" % options["action"])
+
+    if os.path.exists(journalPath):
+        results = readJournal(journalPath)
+    else:
+        # swarms run before the journal only have the results store
+        store = ResultsStore(storePath)
+        results = store.results()
+        store.close()
+    ranked = printLeaderboard(results, metricName, space.maximize)
+    writeReport(os.path.join(permWorkDir, outputLabel + "_Report.csv"),
+                results, space.maximize)
+    if ranked:
+        bestPath = os.path.join(permWorkDir, "model_0", "model_params.py")
+        writeModelParams(bestPath, space.modelParams(ranked[0]["perm"]))
+        print("Best model params written to %s" % bestPath)
+    return journalPath
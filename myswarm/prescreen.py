@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+
+"""
+Pre-screening of local swarm candidates
+
+permutationFilter only sees a permutation, so it cannot tell a poor
+candidate from a good one. The pre-screen wraps a search strategy and
+checks every candidate it proposes for a run over the whole stream before
+the run starts:
+
+1. Encoder resolution: a scalar encoder of the predicted field whose buckets
+   over the observed value range are coarser than RESOLUTION_LIMIT standard
+   deviations cannot resolve the values it has to predict, and is rejected
+   without any run.
+2. Small-data trial: the candidate runs on the first screenRecords records.
+   Once enough screened candidates also finished their full run, the cutoff
+   is learned from them: if the screen metrics rank the full metrics (Spearman
+   correlation of at least MIN_CORRELATION), candidates whose screen metric is
+   not in the best keep fraction of all screened so far are rejected. While
+   the screen does not rank the candidates, everyone is admitted.
+
+Rejected candidates are reported to the strategy as results with status
+"rejected", which counts them as failed.
+"""
+
+"""
+Importing Packages
+"""
+# general
+import numpy
+
+from successive_halving import sameTask
+
+
+"""
+Global variables
+"""
+# coarsest bucket of the predicted field's encoder, in standard deviations
+RESOLUTION_LIMIT = 0.5
+# fraction of the stream a candidate is screened on
+DEFAULT_SCREEN_FRACTION = 0.1
+MIN_SCREEN_RECORDS = 50
+# fraction of the screened candidates admitted once the cutoff is learned
+DEFAULT_KEEP = 0.5
+# screened candidates with a full run before the cutoff is learned
+DEFAULT_WARMUP = 8
+MIN_CORRELATION = 0.3
+SCALAR_ENCODERS = ("ScalarEncoder", "AdaptiveScalarEncoder")
+
+
+def rankCorrelation(x, y):
+    """
+    Returns the Spearman rank correlation of two sequences, without ties
+    correction
+    """
+    if len(x) < 3:
+        return 0.0
+    rankX = numpy.argsort(numpy.argsort(x)).astype(numpy.float64)
+    rankY = numpy.argsort(numpy.argsort(y)).astype(numpy.float64)
+    if rankX.std() == 0 or rankY.std() == 0:
+        return 0.0
+    return float(numpy.corrcoef(rankX, rankY)[0, 1])
+
+
+def encoderResolution(spec, valueRange):
+    """
+    Returns the width of one bucket of a scalar encoder spec over a value
+    range, None when it cannot be told
+    """
+    if spec.get("resolution"):
+        return float(spec["resolution"])
+    if spec.get("radius"):
+        return float(spec["radius"]) / spec["w"]
+    n, w = spec.get("n"), spec.get("w")
+    if not n or not w or n <= w:
+        return None
+    minval, maxval = spec.get("minval"), spec.get("maxval")
+    if minval is not None and maxval is not None and maxval > minval:
+        valueRange = maxval - minval
+    if spec.get("periodic"):
+        return valueRange / float(n)
+    return valueRange / float(n - w)
+
+
+class PreScreen(object):
+    """
+    Search strategy wrapper screening candidates before their full run
+
+    :param strategy     : strategy whose full-stream tasks are screened;
+                          tasks on a prefix of the stream pass unchanged
+    :param space        : SearchSpace of the swarm
+    :param values       : float array of the swarm's stream
+    :param options      : dict with optional screenRecords, screenKeep and
+                          screenWarmup
+    """
+
+    def __init__(self, strategy, space, values, options=None):
+        options = options or {}
+        self.strategy = strategy
+        self.space = space
+        self.totalRecords = len(values)
+        self.screenRecords = options.get("screenRecords") or max(
+            min(MIN_SCREEN_RECORDS, self.totalRecords // 4),
+            int(DEFAULT_SCREEN_FRACTION * self.totalRecords))
+        self.screenRecords = max(1, min(self.totalRecords, self.screenRecords))
+        self.keep = options.get("screenKeep") or DEFAULT_KEEP
+        self.warmup = options.get("screenWarmup") or DEFAULT_WARMUP
+        self.valueRange = float(numpy.max(values) - numpy.min(values)) if len(values) else 0.0
+        self.valueStd = float(numpy.std(values)) if len(values) else 0.0
+
+        self.screening = []
+        self.admitted = []
+        self.running = []
+        # screen metrics of every screened candidate and, of those admitted,
+        # (screen metric, full metric) once the full run finished
+        self.screenMetrics = []
+        self.pairs = []
+        self.rejectedByEncoder = 0
+        self.rejectedByScreen = 0
+        self.cutoff = None
+
+    def propose(self):
+        """
+        Returns an admitted candidate's full task, or a screening task of the
+        strategy's next candidate
+        """
+        if self.admitted:
+            task = self.admitted.pop(0)
+            self.running.append(task)
+            return task
+        while True:
+            task = self.strategy.propose()
+            if task is None or task.get("records") is not None:
+                return task
+            reason = self.encoderCheck(task["params"])
+            if reason is None:
+                break
+            self.rejectedByEncoder += 1
+            self.strategy.observe(self._rejection(task, reason))
+        screen = dict(task, records=self.screenRecords)
+        self.screening.append((screen, task))
+        return screen
+
+    def encoderCheck(self, params):
+        """
+        Returns why the predicted field's encoder is too coarse, None if it is not
+        """
+        if self.valueStd == 0:
+            return None
+        encoders = params["modelParams"]["sensorParams"]["encoders"]
+        for name, spec in sorted(encoders.items()):
+            if (spec is None or spec.get("type") not in SCALAR_ENCODERS or
+                    spec.get("fieldname") != self.space.predictedField):
+                continue
+            resolution = encoderResolution(spec, self.valueRange)
+            if resolution is not None and resolution > RESOLUTION_LIMIT * self.valueStd:
+                return ("Encoder %s buckets of %.4g are coarser than %.2g standard deviations"
+                        % (name, resolution, RESOLUTION_LIMIT))
+        return None
+
+    def _rejection(self, task, reason, records=0):
+        return {"trial": task.get("trial"), "perm": task["perm"], "metric": None,
+                "records": records, "seconds": 0.0, "status": "rejected", "error": reason}
+
+    def _learnCutoff(self):
+        if len(self.pairs) < self.warmup:
+            return None
+        screens = [screen for screen, _ in self.pairs]
+        fulls = [full for _, full in self.pairs]
+        if rankCorrelation(screens, fulls) < MIN_CORRELATION:
+            return None
+        quantile = self.keep if not self.space.maximize else 1.0 - self.keep
+        return float(numpy.percentile(self.screenMetrics, 100.0 * quantile))
+
+    def _passes(self, metric):
+        if metric is None:
+            return False
+        if self.cutoff is None:
+            return True
+        return metric >= self.cutoff if self.space.maximize else metric <= self.cutoff
+
+    def observe(self, result):
+        """
+        Takes the result of a screening, full or pass-through task
+        """
+        for i, (screen, task) in enumerate(self.screening):
+            if sameTask(screen, result):
+                del self.screening[i]
+                if result["status"] == "completed" and result["metric"] is not None:
+                    self.screenMetrics.append(result["metric"])
+                    self.cutoff = self._learnCutoff()
+                if self._passes(result["metric"] if result["status"] == "completed" else None):
+                    task["screenMetric"] = result["metric"]
+                    self.admitted.append(task)
+                else:
+                    self.rejectedByScreen += 1
+                    self.strategy.observe(self._rejection(
+                        result, "Screen %s = %s on %i records, cutoff %s"
+                        % (self.space.metricSpec["errorMetric"], result["metric"],
+                           result["records"], self.cutoff), result["records"]))
+                return
+
+        for i, task in enumerate(self.running):
+            if sameTask(task, result):
+                del self.running[i]
+                if result["status"] == "completed" and result["metric"] is not None:
+                    self.pairs.append((task["screenMetric"], result["metric"]))
+                break
+        self.strategy.observe(result)
+
+    def done(self):
+        return (self.strategy.done() and not self.screening and not self.admitted and
+                not self.running)
+
+    def summary(self):
+        """
+        Returns the counts of screened, rejected and admitted candidates and
+        the full evaluations saved
+        """
+        rejected = self.rejectedByEncoder + self.rejectedByScreen
+        screened = len(self.screenMetrics) + self.rejectedByEncoder
+        return {
+            "screened": screened,
+            "rejectedByEncoder": self.rejectedByEncoder,
+            "rejectedByScreen": self.rejectedByScreen,
+            "fullRuns": len(self.pairs),
+            "savedRuns": rejected,
+            "savedRecords": rejected * self.totalRecords -
+                            len(self.screenMetrics) * self.screenRecords,
+            "cutoff": self.cutoff,
+            "correlation": rankCorrelation([screen for screen, _ in self.pairs],
+                                           [full for _, full in self.pairs]),
+        }
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+
+"""
+Importing Packages
+"""
+# general
+import json
+import time
+import sqlite3
+
+
+"""
+Global variables
+"""
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trials (
+    trial INTEGER PRIMARY KEY,
+    perm TEXT NOT NULL,
+    metric REAL,
+    records INTEGER,
+    seconds REAL,
+    status TEXT NOT NULL,
+    error TEXT,
+    finished REAL,
+    metrics TEXT
+)
+"""
+
+
+class ResultsStore(object):
+    """
+    SQLite file holding the evaluated trials of a local swarm
+
+    Every result is committed as soon as it arrives, so the file is a
+    complete record of the trials finished so far; no server is involved.
+
+    :param path : SQLite file, created when missing
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(SCHEMA)
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(trials)")]
+        if "metrics" not in columns:
+            # stores written before the report metrics were stored
+            self.connection.execute("ALTER TABLE trials ADD COLUMN metrics TEXT")
+        self.connection.commit()
+
+    def nextTrial(self):
+        """
+        Returns the number the next trial should get
+        """
+        row = self.connection.execute("SELECT MAX(trial) FROM trials").fetchone()
+        return 0 if row[0] is None else row[0] + 1
+
+    def add(self, result):
+        """
+        Stores one evaluated trial
+
+        :param result : dict with trial, perm, metric, records, seconds, status,
+                        error and optionally the report metrics dict
+        """
+        metrics = result.get("metrics")
+        self.connection.execute(
+            "INSERT OR REPLACE INTO trials (trial, perm, metric, records, seconds, "
+            "status, error, finished, metrics) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (result["trial"], json.dumps(result["perm"], sort_keys=True),
+             result["metric"], result["records"], result["seconds"],
+             result["status"], result.get("error"), time.time(),
+             json.dumps(metrics, sort_keys=True) if metrics else None))
+        self.connection.commit()
+
+    def results(self):
+        """
+        Returns every stored trial as a result dict, in trial order
+        """
+        rows = self.connection.execute(
+            "SELECT trial, perm, metric, records, seconds, status, error, metrics "
+            "FROM trials ORDER BY trial")
+        return [{"trial": trial, "perm": json.loads(perm), "metric": metric,
+                 "records": records, "seconds": seconds, "status": status,
+                 "error": error, "metrics": json.loads(metrics) if metrics else None}
+                for trial, perm, metric, records, seconds, status, error, metrics in rows]
+
+    def close(self):
+        self.connection.close()
@@ -28,8 +28,26 @@ import optparse
 import logging
 logging.basicConfig()
 
-from nupic.swarming import permutations_runner
-from nupic.swarming.permutations_runner import DEFAULT_OPTIONS
+try:
+  from nupic.swarming import permutations_runner
+  from nupic.swarming.permutations_runner import DEFAULT_OPTIONS
+except ImportError:
+  # --local runs without NuPIC, with the same option defaults
+  permutations_runner = None
+  DEFAULT_OPTIONS = {"replaceReport": False, "action": "run",
+                     "maxPermutations": None, "exports": None,
+                     "useTerminators": False, "maxWorkers": 4,
+                     "timeout": None, "overwrite": False,
+                     "genTopNDescriptions": 1}
+
+# the profiler is shared with the anomaly runner
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "anomaly"))
+from profiling import Profiler, PROFILE_MODES, DEFAULT_SAMPLE_INTERVAL
+from engines import predictingEngines
+
+import local_swarm
+from swarm_metrics import ERROR_METRICS
 
 
 def runPermutations(args):
@@ -155,6 +173,152 @@ def runPermutations(args):
          " placed into it's own subdirectory under the base description file."
          "[default: %default].")
 
+  parser.add_option(
+    "--profile", dest="profile", default=None, type="choice",
+    choices=PROFILE_MODES,
+    help="Profile the search with the deterministic cProfile or the low "
+         "overhead sampler, writing <label>_PROFILE.pstats and "
+         "<label>_PROFILE.collapsed next to the permutations script. With "
+         "--local each pool worker writes the profile of the models it "
+         "evaluated to <label>_PROFILE_worker<pid>.pstats and .collapsed; "
+         "--queue workers and NuPIC's own workers are not profiled. "
+         "[default: %default].")
+
+  parser.add_option(
+    "--profileInterval", dest="profileInterval",
+    default=DEFAULT_SAMPLE_INTERVAL, type="float",
+    help="Seconds of CPU time between profiler samples. "
+         "[default: %default].")
+
+  parser.add_option(
+    "--local", dest="local", action="store_true", default=False,
+    help="Evaluate the models on a local process pool of --maxWorkers "
+         "workers and keep the results in a SQLite file instead of NuPIC's "
+         "job database. Supports the 'run' and 'report' actions. "
+         "[default: %default].")
+
+  parser.add_option(
+    "--strategy", dest="strategy", default="random", type="choice",
+    choices=sorted(local_swarm.STRATEGIES),
+    help="Search strategy of --local. [default: %default].")
+
+  parser.add_option(
+    "--eta", dest="eta", default=None, type="int",
+    help="Fraction 1/eta of the candidates kept by each halving round, and "
+         "factor the records grow by, of the halving and hyperband "
+         "strategies. [default: 3].")
+
+  parser.add_option(
+    "--minRecords", dest="minRecords", default=None, type="int",
+    help="Records of the first halving round; by default the stream is "
+         "split so that there are 4 rounds.")
+
+  parser.add_option(
+    "--startupModels", dest="startupModels", default=None, type="int",
+    help="Random candidates the tpe strategy evaluates before modelling the "
+         "search space; a tenth of the models, at least 10, by default.")
+
+  parser.add_option(
+    "--warmStart", dest="warmStart", action="append", default=None,
+    help="MODEL_PARAMS file, e.g. machine_model_params.py, the --local swarm "
+         "starts from: it runs the seeds and candidates close to them first, "
+         "then searches ranges narrowed around them. May be repeated.")
+
+  parser.add_option(
+    "--warmModels", dest="warmModels", default=None, type="int",
+    help="Seeds and candidates close to them evaluated by --warmStart; 5 per "
+         "seed, at most half the models, by default.")
+
+  parser.add_option(
+    "--warmMargin", dest="warmMargin", default=None, type="float",
+    help="Fraction of each variable's range kept around the --warmStart "
+         "seeds on either side. [default: 0.15].")
+
+  parser.add_option(
+    "--prescreen", dest="prescreen", action="store_true", default=False,
+    help="Screen --local candidates by their encoder resolution and a run on "
+         "--screenRecords records before their full run.")
+
+  parser.add_option(
+    "--screenRecords", dest="screenRecords", default=None, type="int",
+    help="Records of the --prescreen trial; a tenth of the stream, at least "
+         "50, by default.")
+
+  parser.add_option(
+    "--screenKeep", dest="screenKeep", default=None, type="float",
+    help="Fraction of the screened candidates admitted to a full run once "
+         "the --prescreen cutoff is learned. [default: 0.5].")
+
+  parser.add_option(
+    "--reportMetrics", dest="reportMetrics", default=None,
+    help="Comma separated error metrics, of %s, every --local trial reports "
+         "besides the one it optimizes." % ", ".join(ERROR_METRICS))
+
+  parser.add_option(
+    "--engine", dest="engine", default="nupic", type="choice",
+    choices=predictingEngines(),
+    help="HTM implementation evaluating the models of --local, one that "
+         "predicts the predicted field. [default: %default].")
+
+  parser.add_option(
+    "--seed", dest="seed", default=42, type="int",
+    help="Random seed of the --local search. [default: %default].")
+
+  parser.add_option(
+    "--store", dest="store", default=None, type="string",
+    help="SQLite file of the --local results; <label>_local_swarm.db next "
+         "to the permutations script by default.")
+
+  parser.add_option(
+    "--journal", dest="journal", default=None, type="string",
+    help="Append-only journal of the --local trials, resumed by the next "
+         "run; <label>_journal.jsonl next to the permutations script by "
+         "default.")
+
+  parser.add_option(
+    "--fresh", dest="fresh", action="store_true", default=False,
+    help="Start a new --local journal rather than resuming the existing one.")
+
+  parser.add_option(
+    "--queue", dest="queue", default=None, type="string",
+    help="Work queue file on a shared filesystem: --local queues its trials "
+         "there for swarm_worker.py processes on any host, keeping "
+         "--maxWorkers of them in flight, instead of running a local pool.")
+
+  parser.add_option(
+    "--spawnWorkers", dest="spawnWorkers", default=0, type="int",
+    help="swarm_worker.py processes started on this host to serve --queue. "
+         "[default: %default].")
+
+  parser.add_option(
+    "--input", dest="input", default=None, type="string",
+    help="Dataset csv evaluated by --local instead of the stream source of "
+         "the swarm description.")
+
+  parser.add_option(
+    "--lastRecord", dest="lastRecord", default=None, type="int",
+    help="Records of the dataset used by --local, -1 for all; the stream's "
+         "last_record by default.")
+
+  parser.add_option(
+    "--baseParams", dest="baseParams", default=None, type="string",
+    help="Params .py file whose MODEL_PARAMS the --local permutations are "
+         "applied to; the config of description.py by default.")
+
+  parser.add_option(
+    "--prep", dest="prep", action="store_true", default=False,
+    help="Aggregate the --local stream and encode its dates once, into "
+         "<label>_prep/ memory-mapped by every worker.")
+
+  parser.add_option(
+    "--evalCache", dest="evalCache", default=None, type="string",
+    help="SQLite file of evaluations reused across --local swarms; "
+         "swarm_eval_cache.db next to the permutations script by default.")
+
+  parser.add_option(
+    "--noEvalCache", dest="noEvalCache", action="store_true", default=False,
+    help="Evaluate every --local candidate even when the cache holds it.")
+
   (options, positionalArgs) = parser.parse_args(args)
 
   # Get the permutations script's filepath
@@ -174,12 +338,48 @@ def runPermutations(args):
   fileExtension = os.path.splitext(basename)[1]
   optionsDict = vars(options)
 
-  if fileExtension == ".json":
-    returnValue = permutations_runner.runWithJsonFile(
-      fileArgPath, optionsDict, outputLabel, permWorkDir)
-  else:
-    returnValue = permutations_runner.runWithPermutationsScript(
-      fileArgPath, optionsDict, outputLabel, permWorkDir)
+  # the local executor options are handled here rather than by permutations_runner
+  localOptions = dict((name, optionsDict.pop(name)) for name in
+                      ("local", "strategy", "eta", "minRecords", "startupModels",
+                       "prescreen", "screenRecords", "screenKeep", "reportMetrics",
+                       "warmStart", "warmModels", "warmMargin",
+                       "engine", "seed", "store", "journal", "fresh", "queue",
+                       "spawnWorkers", "input", "lastRecord", "baseParams",
+                       "prep", "evalCache", "noEvalCache"))
+  if localOptions["reportMetrics"]:
+    localOptions["reportMetrics"] = [name.strip() for name in
+                                     localOptions["reportMetrics"].split(",")]
+    for name in localOptions["reportMetrics"]:
+      if name not in ERROR_METRICS:
+        parser.error("Unknown --reportMetrics metric %r, choose from %s"
+                     % (name, ", ".join(ERROR_METRICS)))
+  if not localOptions["local"] and permutations_runner is None:
+    parser.error("NuPIC is not installed, use --local to run the swarm "
+                 "without it.")
+
+  # profiling options are handled here rather than by permutations_runner
+  profile = optionsDict.pop("profile")
+  profileInterval = optionsDict.pop("profileInterval")
+  profiler = None
+  if profile is not None:
+    profilePrefix = os.path.join(permWorkDir, outputLabel + "_PROFILE")
+    profiler = Profiler(profile, profilePrefix, profileInterval)
+    localOptions["profile"] = (profile, profilePrefix, profileInterval)
+    profiler.start()
+
+  try:
+    if localOptions["local"]:
+      localOptions.update(optionsDict)
+      returnValue = local_swarm.runLocal(fileArgPath, localOptions)
+    elif fileExtension == ".json":
+      returnValue = permutations_runner.runWithJsonFile(
+        fileArgPath, optionsDict, outputLabel, permWorkDir)
+    else:
+      returnValue = permutations_runner.runWithPermutationsScript(
+        fileArgPath, optionsDict, outputLabel, permWorkDir)
+  finally:
+    if profiler is not None:
+      profiler.stop()
 
   return returnValue
 
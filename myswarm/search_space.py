@@ -0,0 +1,558 @@
+#!/usr/bin/env python
+
+"""
+Reads swarm definitions without NuPIC
+
+Parses the permutations.py / description.py pair written by NuPIC's
+experiment generator, or a *_search_def.json, into a SearchSpace: the base
+MODEL_PARAMS, the permutation variables and the metric to optimize. The
+Permute* classes mirror nupic.swarming.permutation_helpers so that
+permutations.py files run unchanged.
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import re
+import ast
+import copy
+import json
+import random
+from collections import OrderedDict
+
+
+"""
+Global variables
+"""
+# permutations.py star-imports these, they are provided by this module instead
+HELPERS_IMPORT = re.compile(r"^\s*from\s+nupic\.swarming\.permutation_helpers\s+import\s+\*",
+                            re.MULTILINE)
+# the metric optimized by the experiment generator's permutations.py
+DEFAULT_METRIC = ("multiStepBestPredictions:multiStep:errorMetric='altMAPE':"
+                  "steps=\\[%s\\]:window=1000:field=%s")
+# models searched per swarmSize of a search definition; "medium" is what the
+# experiment generator wrote into permutations.py
+SWARM_SIZE_MODELS = {"small": 20, "medium": 200, "large": 1000}
+
+
+class PermuteVariable(object):
+    """
+    Base of the values a swarm chooses for one parameter
+    """
+
+    def sample(self, rng):
+        """
+        Returns a value drawn uniformly from the variable's range
+
+        :param rng : random.Random instance
+        """
+        raise NotImplementedError()
+
+
+class PermuteFloat(PermuteVariable):
+    """
+    Float between min and max, on a grid of stepSize when given
+
+    The particle swarm settings are accepted and ignored.
+    """
+
+    def __init__(self, min, max, stepSize=None, inertia=None, cogRate=None,
+                 socRate=None):
+        self.min = min
+        self.max = max
+        self.stepSize = stepSize
+
+    def clip(self, value):
+        value = min(self.max, max(self.min, value))
+        if self.stepSize is not None:
+            value = self.min + round((value - self.min) / self.stepSize) * self.stepSize
+        return value
+
+    def sample(self, rng):
+        return self.clip(rng.uniform(self.min, self.max))
+
+    def __repr__(self):
+        return "PermuteFloat(min=%r, max=%r, stepSize=%r)" % (self.min, self.max,
+                                                             self.stepSize)
+
+
+class PermuteInt(PermuteFloat):
+    """
+    Integer between min and max inclusive, on a grid of stepSize
+    """
+
+    def __init__(self, min, max, stepSize=1, inertia=None, cogRate=None,
+                 socRate=None):
+        super(PermuteInt, self).__init__(min, max, stepSize)
+
+    def clip(self, value):
+        return int(super(PermuteInt, self).clip(value))
+
+    def sample(self, rng):
+        return self.clip(rng.uniform(self.min - 0.5, self.max + 0.5))
+
+    def __repr__(self):
+        return "PermuteInt(min=%r, max=%r, stepSize=%r)" % (self.min, self.max,
+                                                           self.stepSize)
+
+
+class PermuteChoices(PermuteVariable):
+    """
+    One of a list of values
+    """
+
+    def __init__(self, choices, fixEarly=False, inertia=None, cogRate=None,
+                 socRate=None):
+        self.choices = list(choices)
+
+    def sample(self, rng):
+        return rng.choice(self.choices)
+
+    def __repr__(self):
+        return "PermuteChoices(choices=%r)" % (self.choices,)
+
+
+class PermuteEncoder(object):
+    """
+    Encoder whose arguments may be permutation variables, resolved into an
+    encoder params dict like NuPIC's PermuteEncoder.getDict
+    """
+
+    def __init__(self, fieldName, encoderClass, name=None, **kwArgs):
+        self.fieldName = fieldName
+        self.encoderClass = encoderClass
+        self.name = name
+        self.kwArgs = kwArgs
+
+    def getDict(self, encoderName, values):
+        """
+        Returns the encoder params dict
+
+        :param encoderName : key of the encoder in the encoders dict
+        :param values      : chosen values of the encoder's variables by argument
+        """
+        encoder = {"fieldname": self.fieldName,
+                   "name": self.name if self.name is not None else encoderName}
+        for argument, value in self.kwArgs.items():
+            encoder[argument] = values.get(argument, value)
+        if "." in self.encoderClass:
+            # e.g. DateEncoder.timeOfDay becomes timeOfDay=(w, radius)
+            encoder["type"], subEncoder = self.encoderClass.split(".")
+            encoder[subEncoder] = (encoder.pop("w"), encoder.pop("radius"))
+        else:
+            encoder["type"] = self.encoderClass
+        return encoder
+
+
+class SearchSpace(object):
+    """
+    Permutation variables of a swarm over a base MODEL_PARAMS
+
+    Variables are named by their path in the permutations dict joined with
+    ":", as NuPIC does, e.g. modelParams:tmParams:pamLength. A permutation is
+    a dict of such names to chosen values.
+
+    :param permutations   : permutations dict of permutations.py
+    :param baseParams     : MODEL_PARAMS the permutations are applied to
+    :param metric         : metric spec string to optimize
+    :param maximize       : whether the metric is maximized rather than minimized
+    :param predictedField : field whose next value is predicted
+    :param maxModels      : number of models the swarm may evaluate
+    :param permutationFilter: callable rejecting permutations, or None
+    :param streams        : stream definitions of the dataset
+    :param iterationCount : records per model, -1 for all
+    :param baseDir        : directory relative sources are resolved against
+    """
+
+    def __init__(self, permutations, baseParams, metric, maximize=False,
+                 predictedField="value", maxModels=200, permutationFilter=None,
+                 streams=None, iterationCount=-1, baseDir="."):
+        self.permutations = permutations
+        self.baseParams = baseParams
+        self.metric = metric
+        self.metricSpec = parseMetric(metric)
+        self.maximize = maximize
+        self.predictedField = predictedField
+        self.maxModels = maxModels
+        self.permutationFilter = permutationFilter
+        self.streams = streams or []
+        self.iterationCount = iterationCount
+        self.baseDir = baseDir
+
+        self.variables = OrderedDict()
+        self._encoders = OrderedDict()
+        self._collect(permutations, ())
+
+    def _collect(self, node, path):
+        for key in sorted(node):
+            value = node[key]
+            if isinstance(value, PermuteVariable):
+                self.variables[":".join(path + (key,))] = value
+            elif isinstance(value, PermuteEncoder):
+                self._encoders[":".join(path + (key,))] = value
+                for argument in sorted(value.kwArgs):
+                    if isinstance(value.kwArgs[argument], PermuteVariable):
+                        name = ":".join(path + (key, argument))
+                        self.variables[name] = value.kwArgs[argument]
+            elif isinstance(value, dict):
+                self._collect(value, path + (key,))
+
+    @property
+    def encoders(self):
+        """
+        PermuteEncoder of the permutations by ":"-joined name
+        """
+        return self._encoders
+
+    def sample(self, rng):
+        """
+        Returns a permutation drawn uniformly from every variable's range
+
+        :param rng : random.Random instance
+        """
+        return OrderedDict((name, variable.sample(rng))
+                           for name, variable in self.variables.items())
+
+    def sampleAdmitted(self, rng, attempts=1000):
+        """
+        Returns a sampled permutation accepted by permutationFilter, or None
+        when none was found within the number of attempts
+        """
+        for _ in range(attempts):
+            perm = self.sample(rng)
+            if self.admits(perm):
+                return perm
+        return None
+
+    def admits(self, perm):
+        """
+        Returns whether permutationFilter accepts a permutation; it sees the
+        chosen values by short name and the encoders by name, as in NuPIC
+        """
+        if self.permutationFilter is None:
+            return True
+        view = {}
+        for name, value in perm.items():
+            view[name.split(":")[-1]] = value
+        for name, encoder in self._encoders.items():
+            view[name.split(":")[-1]] = self._encoderDict(name, encoder, perm)
+        return bool(self.permutationFilter(view))
+
+    def _encoderDict(self, name, encoder, perm):
+        prefix = name + ":"
+        values = dict((key[len(prefix):], value) for key, value in perm.items()
+                      if key.startswith(prefix))
+        return encoder.getDict(name.split(":")[-1], values)
+
+    def resolve(self, perm):
+        """
+        Returns the permutations dict with every variable and encoder replaced
+        by its chosen value
+
+        :param perm : permutation dict
+        """
+        def substitute(node, path):
+            resolved = {}
+            for key, value in node.items():
+                name = ":".join(path + (key,))
+                if isinstance(value, PermuteVariable):
+                    resolved[key] = perm[name]
+                elif isinstance(value, PermuteEncoder):
+                    resolved[key] = self._encoderDict(name, value, perm)
+                elif isinstance(value, dict):
+                    resolved[key] = substitute(value, path + (key,))
+                else:
+                    resolved[key] = value
+            return resolved
+        return substitute(self.permutations, ())
+
+    def modelParams(self, perm):
+        """
+        Returns the MODEL_PARAMS of a permutation, the base params with the
+        resolved permutations merged in
+
+        :param perm : permutation dict
+        """
+        params = copy.deepcopy(self.baseParams)
+        mergeParams(params, self.resolve(perm))
+        encoders = params["modelParams"]["sensorParams"]["encoders"]
+        # fields left out of the model have their encoder set to None
+        for name in list(encoders):
+            if encoders[name] is None:
+                del encoders[name]
+        return params
+
+    def source(self):
+        """
+        Returns (csv path, last record or None) of the first stream
+        """
+        stream = self.streams[0]
+        path = stream["source"]
+        if path.startswith("file://"):
+            path = path[len("file://"):]
+        if not os.path.isabs(path) and not os.path.exists(path):
+            path = os.path.join(self.baseDir, path)
+        return path, stream.get("last_record")
+
+
+class PermutationSampler(object):
+    """
+    Draws distinct permutations admitted by the swarm's permutationFilter
+
+    :param space : SearchSpace of the swarm
+    :param seed  : random seed
+    """
+
+    def __init__(self, space, seed=42, attempts=1000):
+        self.space = space
+        self.rng = random.Random(seed)
+        self.attempts = attempts
+        self.seen = set()
+
+    def drawn(self, perm):
+        """
+        Returns whether a permutation was drawn before
+        """
+        return json.dumps(perm, sort_keys=True) in self.seen
+
+    def add(self, perm):
+        """
+        Marks a permutation as drawn; returns False if it already was
+        """
+        if self.drawn(perm):
+            return False
+        self.seen.add(json.dumps(perm, sort_keys=True))
+        return True
+
+    def sample(self):
+        """
+        Returns a permutation not drawn before, None when none was found
+        """
+        for _ in range(self.attempts):
+            perm = self.space.sampleAdmitted(self.rng, self.attempts)
+            if perm is None:
+                return None
+            if self.add(perm):
+                return perm
+        return None
+
+    def task(self, perm, records=None):
+        """
+        Returns the task dict evaluating a permutation
+
+        :param perm    : permutation dict
+        :param records : records of the stream to run, all when None
+        """
+        return {"perm": perm, "params": self.space.modelParams(perm),
+                "records": records}
+
+
+def mergeParams(params, overlay):
+    """
+    Recursively writes the values of overlay into params
+    """
+    for key, value in overlay.items():
+        if isinstance(value, dict) and isinstance(params.get(key), dict):
+            mergeParams(params[key], value)
+        else:
+            params[key] = copy.deepcopy(value)
+
+
+def parseMetric(metric):
+    """
+    Returns the parts of a metric spec string such as
+    multiStepBestPredictions:multiStep:errorMetric='altMAPE':steps=\\[1\\]:window=1000:field=value
+    as a dict with inferenceElement, metric, errorMetric, steps, window, field
+    """
+    parts = metric.replace("\\", "").split(":")
+    spec = {"inferenceElement": parts[0], "metric": parts[1],
+            "errorMetric": "altMAPE", "steps": [1], "window": 1000, "field": "value"}
+    for part in parts[2:]:
+        key, _, value = part.partition("=")
+        try:
+            spec[key] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            spec[key] = value
+    if not isinstance(spec["steps"], list):
+        spec["steps"] = [spec["steps"]]
+    return spec
+
+
+def _literalAssignments(path):
+    """
+    Returns the ast nodes assigned to top level names of a python file
+    """
+    with open(path, "r") as sourceFile:
+        tree = ast.parse(sourceFile.read(), path)
+    assignments = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    assignments[target.id] = node.value
+    return assignments
+
+
+def _dictItem(node, key):
+    """
+    Returns the value node of a key of a dict display node, None if absent
+    """
+    if not isinstance(node, ast.Dict):
+        return None
+    for keyNode, valueNode in zip(node.keys, node.values):
+        if keyNode is None:
+            continue
+        try:
+            if ast.literal_eval(keyNode) == key:
+                return valueNode
+        except ValueError:
+            continue
+    return None
+
+
+def loadDescription(path):
+    """
+    Returns (MODEL_PARAMS, streams, iterationCount) of an experiment
+    description.py, read without executing it since it imports NuPIC
+
+    :param path : path to description.py
+    """
+    assignments = _literalAssignments(path)
+    config = ast.literal_eval(assignments["config"])
+    dataset = _dictItem(assignments.get("control"), "dataset")
+    streams = ast.literal_eval(_dictItem(dataset, "streams"))
+    iterationNode = _dictItem(assignments.get("control"), "iterationCount")
+    iterationCount = ast.literal_eval(iterationNode) if iterationNode is not None else -1
+
+    baseParams = dict((key, config[key]) for key in
+                      ("model", "version", "aggregationInfo", "predictAheadTime",
+                       "modelParams") if key in config)
+    return baseParams, streams, iterationCount
+
+
+def loadParamsFile(path):
+    """
+    Returns the MODEL_PARAMS of a params .py file, e.g. model_0/model_params.py
+    """
+    return ast.literal_eval(_literalAssignments(path)["MODEL_PARAMS"])
+
+
+def loadPermutations(path, baseParamsPath=None):
+    """
+    Returns the SearchSpace of a permutations.py and the description.py next
+    to it
+
+    :param path           : path to permutations.py
+    :param baseParamsPath : optional params .py file replacing the
+                            description's model params
+    """
+    with open(path, "r") as permutationsFile:
+        source = HELPERS_IMPORT.sub("pass", permutationsFile.read())
+    namespace = {"PermuteFloat": PermuteFloat, "PermuteInt": PermuteInt,
+                 "PermuteChoices": PermuteChoices, "PermuteEncoder": PermuteEncoder,
+                 "PermuteVariable": PermuteVariable, "__file__": path}
+    exec(compile(source, path, "exec"), namespace)
+
+    baseDir = os.path.dirname(os.path.abspath(path))
+    baseParams, streams, iterationCount = loadDescription(
+        os.path.join(baseDir, "description.py"))
+    if baseParamsPath is not None:
+        baseParams = loadParamsFile(baseParamsPath)
+
+    maximize = "maximize" in namespace
+    return SearchSpace(namespace["permutations"], baseParams,
+                       namespace["maximize"] if maximize else namespace["minimize"],
+                       maximize, namespace.get("predictedField", "value"),
+                       namespace.get("maxModels") or SWARM_SIZE_MODELS["medium"],
+                       namespace.get("permutationFilter"), streams,
+                       iterationCount, baseDir)
+
+
+def permutationsFromSearchDef(searchDef):
+    """
+    Returns the permutations dict the experiment generator writes for a
+    search definition: every included field encoded, with the generator's
+    ranges for the encoders and the SP, TM and classifier parameters
+    """
+    encoders = {}
+    predictedField = searchDef["inferenceArgs"]["predictedField"]
+    for field in searchDef["includedFields"]:
+        name = field["fieldName"]
+        if field["fieldType"] == "datetime":
+            encoders[name + "_timeOfDay"] = PermuteEncoder(
+                fieldName=name, encoderClass="DateEncoder.timeOfDay",
+                radius=PermuteFloat(0.5, 12), w=21)
+            encoders[name + "_dayOfWeek"] = PermuteEncoder(
+                fieldName=name, encoderClass="DateEncoder.dayOfWeek",
+                radius=PermuteFloat(1, 6), w=21)
+            encoders[name + "_weekend"] = PermuteEncoder(
+                fieldName=name, encoderClass="DateEncoder.weekend",
+                radius=PermuteChoices([1]), w=21)
+        elif field["fieldType"] in ("float", "int"):
+            encoders[name] = PermuteEncoder(
+                fieldName=name, encoderClass="AdaptiveScalarEncoder",
+                n=PermuteInt(22, 521), w=21, clipInput=True)
+        else:
+            encoders[name] = PermuteEncoder(
+                fieldName=name, encoderClass="SDRCategoryEncoder",
+                n=PermuteInt(48, 521), w=21)
+    encoders["_classifierInput"] = dict(
+        classifierOnly=True, fieldname=predictedField, w=21, clipInput=True,
+        type="AdaptiveScalarEncoder", n=PermuteInt(28, 521))
+
+    permutations = {
+        "modelParams": {
+            "inferenceType": PermuteChoices(["NontemporalMultiStep", "TemporalMultiStep"]),
+            "sensorParams": {"encoders": encoders},
+            "spParams": {"synPermInactiveDec": PermuteFloat(0.0003, 0.1)},
+            "tmParams": {"activationThreshold": PermuteInt(12, 16),
+                         "minThreshold": PermuteInt(9, 12),
+                         "pamLength": PermuteInt(1, 5)},
+            "clParams": {"alpha": PermuteFloat(0.0001, 0.1)},
+        },
+    }
+    aggregation = searchDef.get("streamDef", {}).get("aggregation")
+    if aggregation is not None:
+        aggregationInfo = dict(aggregation)
+        aggregationInfo["fields"] = [tuple(field) for field in aggregation["fields"]]
+        permutations["aggregationInfo"] = aggregationInfo
+    return permutations
+
+
+def loadSearchDef(path, baseParamsPath=None):
+    """
+    Returns the SearchSpace of a *_search_def.json. The base model params are
+    those of baseParamsPath, or of the description.py next to the file.
+
+    :param path           : path to the search definition
+    :param baseParamsPath : optional params .py file with the base model params
+    """
+    with open(path, "r") as searchDefFile:
+        searchDef = json.load(searchDefFile)
+
+    baseDir = os.path.dirname(os.path.abspath(path))
+    if baseParamsPath is not None:
+        baseParams = loadParamsFile(baseParamsPath)
+    else:
+        baseParams, _, _ = loadDescription(os.path.join(baseDir, "description.py"))
+
+    predictedField = searchDef["inferenceArgs"]["predictedField"]
+    steps = ",".join(str(step) for step in searchDef["inferenceArgs"].get("predictionSteps", [1]))
+    return SearchSpace(permutationsFromSearchDef(searchDef), baseParams,
+                       DEFAULT_METRIC % (steps, predictedField), False,
+                       predictedField,
+                       SWARM_SIZE_MODELS.get(searchDef.get("swarmSize"),
+                                             SWARM_SIZE_MODELS["medium"]),
+                       None, searchDef["streamDef"]["streams"],
+                       searchDef.get("iterationCount", -1), baseDir)
+
+
+def loadSearchSpace(path, baseParamsPath=None):
+    """
+    Returns the SearchSpace of a permutations.py or *_search_def.json
+    """
+    if path.endswith(".json"):
+        return loadSearchDef(path, baseParamsPath)
+    return loadPermutations(path, baseParamsPath)
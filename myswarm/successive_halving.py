@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+
+"""
+Successive halving and Hyperband schedulers for the local swarm
+
+Successive halving runs every candidate on a short prefix of the stream,
+keeps the best 1/eta of them and runs those again on eta times more records,
+until the survivors run on the whole stream. Hyperband runs several such
+brackets, from many candidates on a tiny prefix to a few candidates on the
+whole stream, hedging against a prefix too short to rank candidates.
+"""
+
+"""
+Importing Packages
+"""
+# general
+import json
+import math
+
+from search_space import PermutationSampler
+
+
+"""
+Global variables
+"""
+DEFAULT_ETA = 3
+# rounds of a successive halving bracket when no minimum budget is given
+DEFAULT_ROUNDS = 4
+
+
+def defaultMinRecords(totalRecords, eta=DEFAULT_ETA, rounds=DEFAULT_ROUNDS):
+    """
+    Returns the first round budget giving `rounds` rounds up to the whole stream
+    """
+    return max(1, int(totalRecords / float(eta ** (rounds - 1))))
+
+
+def rankKey(result, maximize=False):
+    """
+    Sort key of results, best first, failed and unscored ones last
+    """
+    if result["status"] != "completed" or result["metric"] is None:
+        return (True, 0.0)
+    return (False, -result["metric"] if maximize else result["metric"])
+
+
+def sameTask(task, result):
+    """
+    Returns whether a result is that of a proposed task: by trial number when
+    both have one, by permutation otherwise
+    """
+    if task.get("trial") is not None and result.get("trial") is not None:
+        return task["trial"] == result["trial"]
+    return json.dumps(task["perm"], sort_keys=True) == json.dumps(result["perm"], sort_keys=True)
+
+
+class SuccessiveHalving(object):
+    """
+    Successive halving over maxModels sampled candidates
+
+    Rounds are synchronous: the next round starts once every run of the
+    current one finished.
+
+    :param space        : SearchSpace of the swarm
+    :param maxModels    : candidates of the first round
+    :param totalRecords : records in the swarm's stream, the last round's budget
+    :param seed         : random seed
+    :param options      : dict with optional eta and minRecords, the first
+                          round's budget
+    """
+
+    def __init__(self, space, maxModels, totalRecords, seed=42, options=None):
+        options = options or {}
+        self.space = space
+        self.sampler = PermutationSampler(space, seed)
+        self.totalRecords = totalRecords
+        self.eta = options.get("eta") or DEFAULT_ETA
+        self.minRecords = min(totalRecords, options.get("minRecords") or
+                              defaultMinRecords(totalRecords, self.eta))
+        self.brackets = self.makeBrackets(maxModels)
+        self.queue = []
+        self.pending = 0
+        self.results = []
+        self.budget = None
+        self._nextBracket()
+
+    def makeBrackets(self, maxModels):
+        """
+        Returns the (candidates, first round budget) of every bracket
+        """
+        return [(maxModels, self.minRecords)]
+
+    def _nextBracket(self):
+        while self.brackets and not self.queue:
+            count, budget = self.brackets.pop(0)
+            perms = []
+            for _ in range(count):
+                perm = self.sampler.sample()
+                if perm is None:
+                    break
+                perms.append(perm)
+            print("Bracket of %i candidates starting on %i records" % (len(perms), budget))
+            self._startRound(perms, budget)
+
+    def _startRound(self, perms, budget):
+        self.budget = budget
+        self.results = []
+        self.queue = [self.sampler.task(perm, budget) for perm in perms]
+        self.pending = len(self.queue)
+
+    def propose(self):
+        """
+        Returns the next task of the current round, None while the round's
+        last runs are still going
+        """
+        if not self.queue:
+            return None
+        return self.queue.pop(0)
+
+    def observe(self, result):
+        """
+        Takes a result; the round's survivors move on once all are in
+        """
+        self.results.append(result)
+        self.pending -= 1
+        if self.pending > 0:
+            return
+
+        if self.budget >= self.totalRecords:
+            self._nextBracket()
+            return
+        ranked = sorted(self.results, key=lambda result: rankKey(result, self.space.maximize))
+        keep = max(1, len(ranked) // self.eta)
+        survivors = [result["perm"] for result in ranked[:keep]
+                     if not rankKey(result)[0]]
+        if not survivors:
+            self._nextBracket()
+            return
+        budget = self.budget * self.eta
+        if len(survivors) == 1 or budget * self.eta > self.totalRecords:
+            # the last round runs on the whole stream
+            budget = self.totalRecords
+        print("Keeping %i of %i candidates for %i records"
+              % (len(survivors), len(ranked), budget))
+        self._startRound(survivors, budget)
+
+    def done(self):
+        return not self.queue and self.pending == 0 and not self.brackets
+
+
+class Hyperband(SuccessiveHalving):
+    """
+    Hyperband: successive halving brackets from many candidates on
+    minRecords records down to a few candidates on the whole stream, with at
+    most maxModels candidates over all brackets
+    """
+
+    def makeBrackets(self, maxModels):
+        ratio = self.totalRecords / float(self.minRecords)
+        sMax = int(math.floor(math.log(ratio) / math.log(self.eta) + 1e-9)) if ratio > 1 else 0
+        brackets = []
+        for s in range(sMax, -1, -1):
+            count = int(math.ceil((sMax + 1) / float(s + 1) * self.eta ** s))
+            brackets.append([count, max(1, int(self.totalRecords / float(self.eta ** s)))])
+
+        # scale the brackets down to the candidates allowed
+        total = sum(count for count, _ in brackets)
+        if total > maxModels:
+            for bracket in brackets:
+                bracket[0] = max(1, int(bracket[0] * maxModels / float(total)))
+        return [tuple(bracket) for bracket in brackets]
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+
+"""
+Append-only journal of a local swarm
+
+Every trial writes a "start" line when it is submitted and a "finish" line
+with its result when it completes, as JSON lines flushed to disk one by
+one. After an interruption the journal tells which trials finished, which
+were running and never finished, and what every finished one scored, in the
+order it happened, so a restarted swarm resumes where it stopped and a
+report needs nothing but the journal.
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import json
+import time
+
+
+"""
+Global variables
+"""
+RESULT_FIELDS = ("trial", "perm", "metric", "records", "seconds", "status", "error",
+                 "metrics")
+
+
+def readEntries(path):
+    """
+    Returns the entries of a journal file in the order they were written
+    """
+    entries = []
+    with open(path, "r") as journalFile:
+        for line in journalFile:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                # a line cut short by the interruption
+                continue
+    return entries
+
+
+def replayJournal(entries):
+    """
+    Returns (start entries, finish entries) of journal entries by trial
+    """
+    started = {}
+    finished = {}
+    for entry in entries:
+        if entry["event"] == "start":
+            started[entry["trial"]] = entry
+        elif entry["event"] == "finish":
+            finished[entry["trial"]] = entry
+    return started, finished
+
+
+def journalResults(finished):
+    """
+    Returns the result dicts of finish entries, in trial order
+    """
+    return [dict((key, entry.get(key)) for key in RESULT_FIELDS)
+            for _, entry in sorted(finished.items())]
+
+
+def readJournal(path):
+    """
+    Returns the results of every finished trial of a journal file
+    """
+    return journalResults(replayJournal(readEntries(path))[1])
+
+
+class SwarmJournal(object):
+    """
+    Journal file of one swarm, replayed when opened
+
+    :param path  : JSON lines file, created when missing
+    :param fresh : whether an existing journal is discarded rather than
+                   resumed
+    """
+
+    def __init__(self, path, fresh=False):
+        self.path = path
+        self.entries = []
+        self.started = {}
+        self.finished = {}
+        if os.path.exists(path) and not fresh:
+            self.entries = readEntries(path)
+            self.started, self.finished = replayJournal(self.entries)
+        self.journalFile = open(path, "w" if fresh else "a")
+
+    def interrupted(self):
+        """
+        Returns the start entries of trials that never finished
+        """
+        return [entry for trial, entry in sorted(self.started.items())
+                if trial not in self.finished]
+
+    def nextTrial(self):
+        """
+        Returns the number the next new trial should get
+        """
+        trials = list(self.started) + list(self.finished)
+        return max(trials) + 1 if trials else 0
+
+    def _write(self, entry):
+        self.journalFile.write(json.dumps(entry, sort_keys=True) + "\n")
+        self.journalFile.flush()
+        os.fsync(self.journalFile.fileno())
+
+    def start(self, task):
+        """
+        Journals a submitted task with its permutation and model params
+        """
+        entry = {"event": "start", "trial": task["trial"], "perm": task["perm"],
+                 "params": task["params"], "records": task.get("records"),
+                 "time": time.time()}
+        self.started[task["trial"]] = entry
+        self._write(entry)
+
+    def finish(self, result):
+        """
+        Journals the result of a task
+        """
+        entry = dict((key, result.get(key)) for key in RESULT_FIELDS)
+        entry.update(event="finish", time=time.time())
+        self.finished[result["trial"]] = entry
+        self._write(entry)
+
+    def results(self):
+        """
+        Returns the result of every finished trial, in trial order
+        """
+        return journalResults(self.finished)
+
+    def close(self):
+        self.journalFile.close()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+
+"""
+Incremental metrics of a local swarm trial
+
+The OPF metrics manager of a NuPIC swarm recomputes every logged metric
+('loggedMetrics': ['.*']) over its window at every record. Here a trial
+keeps the last `window` (actual, prediction) pairs in a ring buffer, and
+running sums over it for the live metrics only: the metric the swarm
+minimizes and those requested for the report. Each record costs O(1) per
+live metric; any other supported metric is computed lazily from the ring
+buffer when asked for, once, at the end of the trial.
+
+The running sums are recomputed exactly each time the ring wraps, which
+bounds their floating point drift at an amortized O(1) cost.
+"""
+
+"""
+Importing Packages
+"""
+# general
+import math
+
+import numpy
+
+
+"""
+Global variables
+"""
+# running sums each error metric needs
+METRIC_SUMS = {
+    "aae": ("absError",),
+    "altMAPE": ("absError", "absActual"),
+    "rmse": ("squaredError",),
+}
+ERROR_METRICS = tuple(sorted(METRIC_SUMS))
+
+
+def metricValue(errorMetric, sums, count):
+    """
+    Returns an error metric from the sums over a window of count pairs,
+    None when it is undefined
+
+    :param errorMetric : one of ERROR_METRICS
+    :param sums        : dict of the running sums the metric needs
+    :param count       : pairs in the window
+    """
+    if count == 0:
+        return None
+    if errorMetric == "altMAPE":
+        return 100.0 * sums["absError"] / sums["absActual"] if sums["absActual"] > 0 else None
+    if errorMetric == "aae":
+        return sums["absError"] / count
+    if errorMetric == "rmse":
+        return math.sqrt(max(sums["squaredError"], 0.0) / count)
+    raise ValueError("Unsupported errorMetric %r" % errorMetric)
+
+
+def windowSums(actual, predicted):
+    """
+    Returns every running sum over arrays of actual values and predictions
+    """
+    errors = numpy.abs(actual - predicted)
+    return {"absError": float(numpy.sum(errors)),
+            "absActual": float(numpy.sum(numpy.abs(actual))),
+            "squaredError": float(numpy.sum(errors ** 2))}
+
+
+class SwarmMetrics(object):
+    """
+    Windowed multiStep error metrics of one model, updated record by record
+
+    :param metricSpec    : dict from search_space.parseMetric, the metric
+                           the swarm optimizes
+    :param reportMetrics : other error metrics kept live for the report
+    """
+
+    def __init__(self, metricSpec, reportMetrics=()):
+        self.errorMetric = metricSpec["errorMetric"]
+        self.steps = metricSpec["steps"][0]
+        self.window = metricSpec["window"]
+        self.live = [self.errorMetric] + [name for name in reportMetrics
+                                          if name != self.errorMetric]
+        for name in self.live:
+            if name not in METRIC_SUMS:
+                raise ValueError("Unsupported errorMetric %r" % name)
+        self.sumNames = sorted(set(part for name in self.live for part in METRIC_SUMS[name]))
+        self.sums = dict((name, 0.0) for name in self.sumNames)
+
+        self.absError = "absError" in self.sums
+        self.absActual = "absActual" in self.sums
+        self.squaredError = "squaredError" in self.sums
+
+        # predictions waiting `steps` records for their actual value, in a
+        # ring of their own
+        self.pending = [None] * self.steps
+        self.pendingPosition = 0
+        self.actual = [0.0] * self.window
+        self.predicted = [0.0] * self.window
+        self.count = 0
+        self.position = 0
+
+    def update(self, actual, prediction):
+        """
+        Takes the actual value of a record and the prediction made at it,
+        None when the model made none
+        """
+        pendingPosition = self.pendingPosition
+        predicted = self.pending[pendingPosition]
+        self.pending[pendingPosition] = prediction
+        self.pendingPosition = pendingPosition + 1 if pendingPosition + 1 < self.steps else 0
+        if predicted is None or predicted != predicted:
+            return
+
+        position = self.position
+        error = abs(actual - predicted)
+        sums = self.sums
+        if self.count == self.window:
+            oldActual = self.actual[position]
+            oldError = abs(oldActual - self.predicted[position])
+            if self.absError:
+                sums["absError"] += error - oldError
+            if self.absActual:
+                sums["absActual"] += abs(actual) - abs(oldActual)
+            if self.squaredError:
+                sums["squaredError"] += error * error - oldError * oldError
+        else:
+            self.count += 1
+            if self.absError:
+                sums["absError"] += error
+            if self.absActual:
+                sums["absActual"] += abs(actual)
+            if self.squaredError:
+                sums["squaredError"] += error * error
+        self.actual[position] = actual
+        self.predicted[position] = predicted
+        if position + 1 < self.window:
+            self.position = position + 1
+        else:
+            self.position = 0
+            self._resum()
+
+    def _resum(self):
+        actual, predicted = self._pairs()
+        exact = windowSums(actual, predicted)
+        for name in self.sumNames:
+            self.sums[name] = exact[name]
+
+    def _pairs(self):
+        return (numpy.array(self.actual[:self.count], dtype=numpy.float64),
+                numpy.array(self.predicted[:self.count], dtype=numpy.float64))
+
+    def value(self, errorMetric=None):
+        """
+        Returns an error metric over the window, the optimized one by default;
+        a metric that is not live is computed from the ring buffer
+        """
+        errorMetric = errorMetric or self.errorMetric
+        if errorMetric in self.live:
+            return metricValue(errorMetric, self.sums, self.count)
+        if errorMetric not in METRIC_SUMS:
+            raise ValueError("Unsupported errorMetric %r" % errorMetric)
+        return metricValue(errorMetric, windowSums(*self._pairs()), self.count)
+
+    def values(self, errorMetrics=None):
+        """
+        Returns a dict of error metrics, the live ones by default
+        """
+        return dict((name, self.value(name)) for name in (errorMetrics or self.live))
@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+
+"""
+Shared preparation of a local swarm's stream
+
+The stream is read and aggregated once and published as .npy files that
+every pool worker memory-maps read-only, instead of each worker reading and
+aggregating the csv. The date encoders get the same treatment: their output
+only depends on a date key (weekday and time of day, see
+encoder_cache.dateKey), of which an aggregated stream has few distinct ones.
+The distinct keys are published, and for the NuPIC engine so are the
+encodings of every candidate (w, radius) of a date encoder whose variables
+take a finite set of values. A worker loads them into the encoder caches of
+each model it creates, so no date is encoded during a trial; radii drawn from
+a continuous range are encoded for the distinct dates only.
+
+A manifest.json lists the files and the fingerprint of what they were built
+from, so an unchanged preparation is reused by the next swarm.
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import sys
+import json
+import hashlib
+import itertools
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "anomaly"))
+from encoder_cache import dateKeys, cacheEncoders, CachedDateEncode
+
+from search_space import PermuteVariable, PermuteFloat, PermuteChoices
+
+
+"""
+Global variables
+"""
+MANIFEST_NAME = "manifest.json"
+DATE_SUB_ENCODERS = ("season", "dayOfWeek", "weekend", "holiday", "timeOfDay")
+# encodings are not precomputed for larger candidate grids
+MAX_PREP_CANDIDATES = 64
+
+
+def candidateValues(value):
+    """
+    Returns the finite list of values a date encoder argument takes, None
+    for a continuous range
+
+    :param value : constant or permutation variable
+    """
+    if not isinstance(value, PermuteVariable):
+        return [value]
+    if isinstance(value, PermuteChoices):
+        return list(value.choices)
+    if isinstance(value, PermuteFloat) and value.stepSize:
+        count = int(round((value.max - value.min) / float(value.stepSize))) + 1
+        if count <= MAX_PREP_CANDIDATES:
+            return sorted(set(value.clip(value.min + i * value.stepSize)
+                              for i in range(count)))
+    return None
+
+
+def dateEncoderCandidates(space):
+    """
+    Returns (encoder name, sub-encoder, w candidates, radius candidates) of
+    every single-part date encoder of the swarm; candidates are None when
+    continuous
+
+    :param space : SearchSpace of the swarm
+    """
+    found = []
+    permuted = set()
+    for name, encoder in space.encoders.items():
+        permuted.add(name.split(":")[-1])
+        if not encoder.encoderClass.startswith("DateEncoder."):
+            continue
+        encoderName = encoder.name if encoder.name is not None else name.split(":")[-1]
+        found.append((encoderName, encoder.encoderClass.split(".")[1],
+                      candidateValues(encoder.kwArgs.get("w")),
+                      candidateValues(encoder.kwArgs.get("radius"))))
+
+    encoders = space.baseParams["modelParams"]["sensorParams"]["encoders"]
+    for key, spec in sorted(encoders.items()):
+        if key in permuted or spec is None or spec.get("type") != "DateEncoder":
+            continue
+        parts = [part for part in DATE_SUB_ENCODERS if spec.get(part)]
+        if len(parts) == 1 and isinstance(spec[parts[0]], (tuple, list)):
+            w, radius = spec[parts[0]]
+            found.append((spec.get("name", key), parts[0], [w], [radius]))
+    return found
+
+
+def nupicDateEncoder(subEncoder, w, radius, name):
+    """
+    Builds the NuPIC DateEncoder the OPF builds for a single-part spec
+    """
+    from nupic.encoders.date import DateEncoder
+    return DateEncoder(name=name, **{subEncoder: (w, radius)})
+
+
+def tableName(encoderName, w, radius):
+    return "table_%s_%s_%s.npy" % (encoderName, w, repr(float(radius)).replace(".", "p"))
+
+
+def prepKey(fingerprint, engine, candidates):
+    text = json.dumps([fingerprint, engine, repr(candidates)])
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def prepareSwarm(prepDir, space, timestamps, values, fingerprint, engine="nupic"):
+    """
+    Writes the aggregated stream, the distinct date keys and the candidate
+    date encodings to prepDir unless an identical preparation is there;
+    returns the manifest
+
+    :param prepDir     : directory of the preparation, created when missing
+    :param space       : SearchSpace of the swarm
+    :param timestamps  : aggregated timestamps, datetime objects
+    :param values      : aggregated float array
+    :param fingerprint : eval_cache.datasetFingerprint of the stream
+    :param engine      : HTM implementation the models run on
+    """
+    candidates = dateEncoderCandidates(space)
+    key = prepKey(fingerprint, engine, candidates)
+    manifestPath = os.path.join(prepDir, MANIFEST_NAME)
+    if os.path.exists(manifestPath):
+        with open(manifestPath, "r") as manifestFile:
+            manifest = json.load(manifestFile)
+        if manifest["key"] == key:
+            print("Reusing the swarm preparation in %s" % prepDir)
+            return manifest
+    if not os.path.isdir(prepDir):
+        os.makedirs(prepDir)
+
+    times = numpy.array(timestamps, dtype="datetime64[us]")
+    numpy.save(os.path.join(prepDir, "timestamps.npy"), times)
+    numpy.save(os.path.join(prepDir, "values.npy"), numpy.asarray(values, dtype=numpy.float64))
+
+    # distinct date keys of every (season, holiday) layout
+    dates = {}
+    for season, holiday in itertools.product((False, True), repeat=2):
+        keys, first = numpy.unique(dateKeys(times, season, holiday), return_index=True)
+        label = "%i%i" % (season, holiday)
+        numpy.save(os.path.join(prepDir, "keys_%s.npy" % label), keys)
+        numpy.save(os.path.join(prepDir, "dates_%s.npy" % label), times[first])
+        dates[label] = times[first]
+
+    tables = []
+    if engine == "nupic":
+        for encoderName, subEncoder, ws, radii in candidates:
+            if ws is None or radii is None:
+                continue
+            label = "%i%i" % (subEncoder == "season", subEncoder == "holiday")
+            distinct = dates[label].astype(object)
+            for w, radius in itertools.product(ws, radii):
+                encoder = nupicDateEncoder(subEncoder, w, radius, encoderName)
+                table = numpy.zeros((len(distinct), encoder.getWidth()), dtype=numpy.uint8)
+                for row, date in enumerate(distinct):
+                    encoder.encodeIntoArray(date, table[row])
+                fileName = tableName(encoderName, w, radius)
+                numpy.save(os.path.join(prepDir, fileName), table)
+                tables.append({"encoder": encoderName, "subEncoder": subEncoder,
+                               "w": w, "radius": radius, "keys": label, "file": fileName})
+
+    manifest = {"key": key, "fingerprint": fingerprint, "engine": engine,
+                "records": len(values), "tables": tables}
+    with open(manifestPath, "w") as manifestFile:
+        json.dump(manifest, manifestFile, indent=2, sort_keys=True)
+    print("Prepared %i records and %i date encoding tables in %s"
+          % (len(values), len(tables), prepDir))
+    return manifest
+
+
+class SwarmPrep(object):
+    """
+    Read-only view of a preparation, attached once per pool worker
+
+    :param prepDir : directory written by prepareSwarm
+    """
+
+    def __init__(self, prepDir):
+        self.prepDir = prepDir
+        with open(os.path.join(prepDir, MANIFEST_NAME), "r") as manifestFile:
+            self.manifest = json.load(manifestFile)
+        # shared by the workers through the page cache, trials convert the
+        # record they run rather than copying the stream
+        self.values = self._load("values.npy")
+        self.timestamps = self._load("timestamps.npy")
+        self.tables = dict(((table["encoder"], table["w"], float(table["radius"])), table)
+                           for table in self.manifest["tables"])
+        self._arrays = {}
+
+    def _load(self, fileName):
+        return numpy.load(os.path.join(self.prepDir, fileName), mmap_mode="r")
+
+    def array(self, fileName):
+        if fileName not in self._arrays:
+            self._arrays[fileName] = self._load(fileName)
+        return self._arrays[fileName]
+
+    def preload(self, model, params):
+        """
+        Puts encoder caches in front of a model's encoders and fills those of
+        its date encoders with the prepared encodings; returns the wrappers
+
+        :param model  : engine created for the params
+        :param params : MODEL_PARAMS of the model
+        """
+        specs = {}
+        for key, spec in params["modelParams"]["sensorParams"]["encoders"].items():
+            if spec is not None and spec.get("type") == "DateEncoder":
+                specs[spec.get("name", key)] = spec
+
+        wrappers = cacheEncoders(model)
+        for name, wrapper in wrappers.items():
+            if not isinstance(wrapper, CachedDateEncode):
+                continue
+            label = "%i%i" % (wrapper.season, wrapper.holiday)
+            table = None
+            spec = specs.get(name)
+            if spec is not None and wrapper.intoArray:
+                parts = [part for part in DATE_SUB_ENCODERS if spec.get(part)]
+                if len(parts) == 1 and isinstance(spec[parts[0]], (tuple, list)):
+                    w, radius = spec[parts[0]]
+                    table = self.tables.get((name, w, float(radius)))
+            if table is None:
+                # encodes the distinct dates only
+                wrapper.precompute(self.array("dates_%s.npy" % label))
+                continue
+            keys = self.array("keys_%s.npy" % table["keys"])
+            encodings = self.array(table["file"])
+            wrapper.cache.maxSize = max(wrapper.cache.maxSize, len(keys))
+            for row, key in enumerate(keys.tolist()):
+                wrapper.cache.put(key, encodings[row])
+        return wrappers
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+
+"""
+Worker of a distributed swarm
+
+Claims the trials of a swarm from its work queue, runs them and posts the
+results back, renewing the lease of the running trial by heartbeats. Start
+as many as wanted, on any host that sees the queue file:
+
+    python swarm_worker.py /shared/permutations_queue.db
+
+A worker exits once the swarm it served is over, or keeps serving the next
+swarms of the queue with --stay.
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import time
+import socket
+import argparse
+import threading
+
+import local_swarm
+from work_queue import WorkQueue, DEFAULT_LEASE, DEFAULT_POLL_INTERVAL
+
+
+class Heartbeat(threading.Thread):
+    """
+    Renews a worker's lease on its running trial every interval seconds,
+    over a connection of its own
+
+    :param queuePath : queue file
+    :param trial     : trial run by the worker
+    :param worker    : worker id
+    :param lease     : seconds the lease is renewed for
+    """
+
+    def __init__(self, queuePath, trial, worker, lease=DEFAULT_LEASE):
+        super(Heartbeat, self).__init__()
+        self.daemon = True
+        self.queuePath = queuePath
+        self.trial = trial
+        self.worker = worker
+        self.lease = lease
+        self.stopped = threading.Event()
+        self.lost = False
+
+    def run(self):
+        queue = WorkQueue(self.queuePath)
+        try:
+            while not self.stopped.wait(self.lease / 4.0):
+                if not queue.heartbeat(self.trial, self.worker, self.lease):
+                    self.lost = True
+        finally:
+            queue.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def serve(queuePath, worker=None, lease=DEFAULT_LEASE, pollInterval=DEFAULT_POLL_INTERVAL,
+          stay=False):
+    """
+    Runs the trials of a queue until its swarm is over; returns the number
+    of trials run
+
+    :param queuePath    : queue file
+    :param worker       : id of the worker, host:pid by default
+    :param lease        : seconds a trial is held without a heartbeat
+    :param pollInterval : seconds between polls of an empty queue
+    :param stay         : whether to keep serving the next swarms
+    """
+    worker = worker or "%s:%i" % (socket.gethostname(), os.getpid())
+    queue = WorkQueue(queuePath)
+    swarm = None
+    running = False
+    served = 0
+    try:
+        while True:
+            config = queue.getConfig("worker")
+            state = queue.getConfig("state")
+            if config is not None and config["swarm"] != swarm:
+                # a new swarm, whose stream is loaded once
+                local_swarm.initWorker(config["settings"], config["engine"],
+                                       config["predictedField"], config["metricSpec"],
+                                       config["prepDir"], config.get("reportMetrics"))
+                swarm = config["swarm"]
+                running = False
+            # a swarm that was over before the worker saw it run is an
+            # earlier one, the worker waits for the next
+            running = running or state == "running"
+            task = queue.claim(worker, swarm, lease) if swarm is not None else None
+            if task is None:
+                if state == "finished" and running and not stay:
+                    break
+                time.sleep(pollInterval)
+                continue
+
+            heartbeat = Heartbeat(queuePath, task["trial"], worker, lease)
+            heartbeat.start()
+            try:
+                result = local_swarm.evaluateCandidate(task)
+            finally:
+                heartbeat.stop()
+            result["worker"] = worker
+            queue.complete(result, swarm)
+            served += 1
+            print("Trial %i: %s on %i records in %.1f s%s"
+                  % (task["trial"], result["status"], result["records"], result["seconds"],
+                     ", after its lease was lost" if heartbeat.lost else ""))
+    finally:
+        queue.close()
+    return served
+
+
+def create_parser():
+    """
+    Creates parser for command line inputs
+    """
+    parser = argparse.ArgumentParser(description='Runs the trials of a distributed swarm')
+    parser.add_argument('queue', help='Work queue file of the swarm')
+    parser.add_argument('--worker', default=None,
+                        help='Worker id; host:pid by default')
+    parser.add_argument('--lease', type=float, default=DEFAULT_LEASE,
+                        help='Seconds a trial is held without a heartbeat; default=%.0f'
+                             % DEFAULT_LEASE)
+    parser.add_argument('--pollInterval', type=float, default=DEFAULT_POLL_INTERVAL,
+                        help='Seconds between polls of an empty queue')
+    parser.add_argument('--stay', action='store_true',
+                        help='Keep serving the next swarms of the queue')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = create_parser()
+    served = serve(os.path.abspath(args.queue), args.worker, args.lease, args.pollInterval,
+                   args.stay)
+    print("Worker ran %i trials" % served)
@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+
+"""
+Tree-structured Parzen estimator search for the local swarm
+
+After a few random candidates, the evaluated ones are split into the best
+gamma fraction and the rest. Each variable of the permutations gets a Parzen
+density for either group: Gaussian kernels over the normalized range of
+PermuteFloat and PermuteInt, smoothed counts over the choices of
+PermuteChoices. Candidates are drawn from the good densities and the one
+with the highest ratio of good to bad density is proposed, which moves the
+search to promising regions in far fewer model runs than sampling at random.
+
+Proposals are made while earlier ones are still running on the pool; those
+pending candidates count as bad ones (the "constant liar"), so a batch
+proposed for parallel workers spreads out instead of piling onto one point.
+"""
+
+"""
+Importing Packages
+"""
+# general
+import math
+import random
+from collections import OrderedDict
+
+from search_space import PermutationSampler, PermuteFloat, PermuteChoices
+from successive_halving import rankKey
+
+
+"""
+Global variables
+"""
+DEFAULT_GAMMA = 0.25
+# candidates drawn from the good densities per proposal
+DEFAULT_CANDIDATES = 24
+# random candidates before the densities are used
+MIN_STARTUP_MODELS = 10
+
+
+class ParzenFloat(object):
+    """
+    Mixture of a uniform prior and Gaussian kernels over points of a
+    PermuteFloat or PermuteInt, in [0, 1] coordinates of its range
+
+    Each kernel is as wide as the larger gap to its neighbours, as in
+    hyperopt, so sparse regions keep a wide density.
+    """
+
+    def __init__(self, variable, values):
+        self.variable = variable
+        span = float(variable.max - variable.min) or 1.0
+        self.points = sorted((value - variable.min) / span for value in values)
+        self.sigmas = []
+        minSigma = 1.0 / min(100.0, len(self.points) + 1.0)
+        bounds = [0.0] + self.points + [1.0]
+        for i in range(1, len(bounds) - 1):
+            gap = max(bounds[i] - bounds[i - 1], bounds[i + 1] - bounds[i])
+            self.sigmas.append(min(1.0, max(minSigma, gap)))
+
+    def sample(self, rng):
+        component = rng.randint(0, len(self.points))
+        if component == len(self.points):
+            x = rng.random()
+        else:
+            x = rng.gauss(self.points[component], self.sigmas[component])
+        span = self.variable.max - self.variable.min
+        return self.variable.clip(self.variable.min + min(1.0, max(0.0, x)) * span)
+
+    def logDensity(self, value):
+        span = float(self.variable.max - self.variable.min) or 1.0
+        x = (value - self.variable.min) / span
+        density = 1.0
+        for point, sigma in zip(self.points, self.sigmas):
+            density += (math.exp(-0.5 * ((x - point) / sigma) ** 2) /
+                        (sigma * math.sqrt(2.0 * math.pi)))
+        return math.log(density / (len(self.points) + 1.0))
+
+
+class ParzenChoices(object):
+    """
+    Categorical density over a PermuteChoices, counts plus one per choice
+    """
+
+    def __init__(self, variable, values):
+        self.variable = variable
+        self.weights = [1.0] * len(variable.choices)
+        for value in values:
+            self.weights[variable.choices.index(value)] += 1.0
+        self.total = sum(self.weights)
+
+    def sample(self, rng):
+        threshold = rng.random() * self.total
+        for choice, weight in zip(self.variable.choices, self.weights):
+            threshold -= weight
+            if threshold < 0:
+                return choice
+        return self.variable.choices[-1]
+
+    def logDensity(self, value):
+        return math.log(self.weights[self.variable.choices.index(value)] / self.total)
+
+
+def parzen(variable, values):
+    if isinstance(variable, PermuteFloat):
+        return ParzenFloat(variable, values)
+    if isinstance(variable, PermuteChoices):
+        return ParzenChoices(variable, values)
+    raise TypeError("No density for %r" % (variable,))
+
+
+class TPESearch(object):
+    """
+    Proposes maxModels permutations with the tree-structured Parzen
+    estimator, each run over the whole stream
+
+    :param space        : SearchSpace of the swarm
+    :param maxModels    : number of candidates evaluated
+    :param totalRecords : records in the swarm's stream
+    :param seed         : random seed
+    :param options      : dict with optional startupModels, the random
+                          candidates first evaluated, gamma and candidates
+    """
+
+    def __init__(self, space, maxModels, totalRecords, seed=42, options=None):
+        options = options or {}
+        self.space = space
+        self.sampler = PermutationSampler(space, seed)
+        self.rng = random.Random(seed + 1)
+        self.maxModels = maxModels
+        self.startupModels = options.get("startupModels") or max(
+            MIN_STARTUP_MODELS, maxModels // 10)
+        self.gamma = options.get("gamma") or DEFAULT_GAMMA
+        self.candidates = options.get("candidates") or DEFAULT_CANDIDATES
+        self.proposed = 0
+        self.pending = {}
+        self.observed = []
+
+    def propose(self):
+        """
+        Returns the next task dict to evaluate, None once maxModels are proposed
+        """
+        if self.done():
+            return None
+        perm = None
+        if len(self.observed) >= self.startupModels:
+            perm = self._suggest()
+        if perm is None:
+            perm = self.sampler.sample()
+        if perm is None:
+            self.maxModels = self.proposed
+            return None
+        self.proposed += 1
+        self.pending[self._key(perm)] = perm
+        return self.sampler.task(perm)
+
+    def _key(self, perm):
+        return tuple(repr(perm[name]) for name in self.space.variables)
+
+    def _suggest(self):
+        ranked = sorted(self.observed, key=lambda result: rankKey(result, self.space.maximize))
+        scored = [result for result in ranked if not rankKey(result)[0]]
+        goodCount = max(1, int(math.ceil(self.gamma * len(scored))))
+        good = [result["perm"] for result in scored[:goodCount]]
+        # failed and still running candidates count as bad ones
+        bad = ([result["perm"] for result in ranked[goodCount:]] +
+               list(self.pending.values()))
+        if not bad:
+            return None
+
+        densities = []
+        for name, variable in self.space.variables.items():
+            densities.append((name,
+                              parzen(variable, [perm[name] for perm in good]),
+                              parzen(variable, [perm[name] for perm in bad])))
+
+        best = None
+        bestScore = None
+        for _ in range(self.candidates):
+            perm = OrderedDict((name, goodDensity.sample(self.rng))
+                               for name, goodDensity, _ in densities)
+            if self.sampler.drawn(perm) or not self.space.admits(perm):
+                continue
+            score = sum(goodDensity.logDensity(perm[name]) - badDensity.logDensity(perm[name])
+                        for name, goodDensity, badDensity in densities)
+            if bestScore is None or score > bestScore:
+                best = perm
+                bestScore = score
+        if best is not None:
+            self.sampler.add(best)
+        return best
+
+    def observe(self, result):
+        """
+        Takes the result of an evaluated task
+        """
+        self.pending.pop(self._key(result["perm"]), None)
+        self.observed.append(result)
+
+    def prior(self, result):
+        """
+        Takes the result of a candidate evaluated outside the strategy, such
+        as a warm start seed; it counts towards the startup models
+        """
+        self.observed.append(result)
+
+    def done(self):
+        """
+        Returns whether every task has been proposed
+        """
+        return self.proposed >= self.maxModels
@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+
+"""
+Warm start of a local swarm from tuned MODEL_PARAMS
+
+A stream similar to one already swarmed (the machine or Twitter streams of
+machine_model_params.py and twitter_model_params.py) need not start its
+swarm from random candidates. The values each seed MODEL_PARAMS file gives
+the permutation variables are read back into a permutation. The swarm then
+runs the seeds themselves, followed by candidates drawn close to them, and
+its search strategy samples from ranges narrowed around the seeds:
+
+- a PermuteFloat or PermuteInt keeps the span of the seed values, widened
+  by margin times its original span on either side;
+- a PermuteChoices keeps its choices, as a category cannot be narrowed
+  without losing some of them.
+
+A variable a seed leaves undefined, such as the n of an encoder the seed
+model did not use, is not narrowed and is sampled as usual.
+"""
+
+"""
+Importing Packages
+"""
+# general
+import copy
+import math
+import random
+from collections import OrderedDict
+
+from search_space import (SearchSpace, PermutationSampler, PermuteFloat, PermuteInt,
+                          PermuteChoices, PermuteEncoder, loadParamsFile)
+from successive_halving import sameTask
+
+
+"""
+Global variables
+"""
+# fraction of a variable's span kept around the seed values on either side
+DEFAULT_MARGIN = 0.15
+# candidates drawn close to each seed after the seed itself
+NEIGHBOURS_PER_SEED = 4
+# chance a neighbour keeps the seed's choice of a PermuteChoices
+KEEP_CHOICE = 0.8
+
+
+def seedValue(params, name, encoder=None):
+    """
+    Returns the value MODEL_PARAMS give a permutation variable, None when
+    they do not define it
+
+    :param params  : MODEL_PARAMS dict
+    :param name    : ":"-joined variable name, e.g. modelParams:tmParams:pamLength
+    :param encoder : PermuteEncoder the variable is an argument of, if any
+    """
+    path = name.split(":")
+    if encoder is not None:
+        path, argument = path[:-1], path[-1]
+    node = params
+    for key in path:
+        if not isinstance(node, dict) or node.get(key) is None:
+            return None
+        node = node[key]
+    if encoder is None:
+        return node
+    if "." in encoder.encoderClass and argument in ("w", "radius"):
+        # DateEncoder.timeOfDay keeps (w, radius) under timeOfDay
+        subEncoder = node.get(encoder.encoderClass.split(".")[1])
+        if not isinstance(subEncoder, (tuple, list)):
+            return None
+        return subEncoder[0] if argument == "w" else subEncoder[1]
+    return node.get(argument)
+
+
+def encoderArguments(space):
+    """
+    Returns the PermuteEncoder of every variable that is an encoder argument
+    """
+    arguments = {}
+    for encoderName, encoder in space.encoders.items():
+        for name in space.variables:
+            if name.startswith(encoderName + ":"):
+                arguments[name] = encoder
+    return arguments
+
+
+def seedPermutation(space, params):
+    """
+    Returns the permutation of a seed's MODEL_PARAMS, with None for every
+    variable they do not define; values out of a variable's range are
+    clipped to it
+
+    :param space  : SearchSpace of the swarm
+    :param params : MODEL_PARAMS of the seed
+    """
+    arguments = encoderArguments(space)
+    perm = OrderedDict()
+    for name, variable in space.variables.items():
+        value = seedValue(params, name, arguments.get(name))
+        if isinstance(variable, PermuteChoices):
+            value = value if value in variable.choices else None
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = variable.clip(value)
+        else:
+            value = None
+        perm[name] = value
+    return perm
+
+
+def loadSeeds(space, paths):
+    """
+    Returns the seed permutations of MODEL_PARAMS files
+
+    :param space : SearchSpace of the swarm
+    :param paths : params .py files, e.g. machine_model_params.py
+    """
+    seeds = []
+    for path in paths:
+        perm = seedPermutation(space, loadParamsFile(path))
+        known = len([value for value in perm.values() if value is not None])
+        print("Seed %s defines %i of %i variables" % (path, known, len(perm)))
+        seeds.append(perm)
+    return seeds
+
+
+def narrowVariable(variable, values, margin=DEFAULT_MARGIN):
+    """
+    Returns a variable with its range narrowed around seed values, the
+    variable itself when there is none or it is a PermuteChoices
+    """
+    values = [value for value in values if value is not None]
+    if not values or not isinstance(variable, PermuteFloat):
+        return variable
+    width = margin * (variable.max - variable.min)
+    low = max(variable.min, min(values) - width)
+    high = min(variable.max, max(values) + width)
+    if isinstance(variable, PermuteInt):
+        return PermuteInt(int(math.floor(low)), int(math.ceil(high)), variable.stepSize)
+    if variable.stepSize is not None:
+        # stays on the variable's grid
+        low = variable.clip(low)
+        high = variable.clip(high)
+    return PermuteFloat(low, high, variable.stepSize)
+
+
+def narrowSpace(space, seeds, margin=DEFAULT_MARGIN):
+    """
+    Returns a copy of a SearchSpace whose variables are narrowed around the
+    seed permutations
+
+    :param space  : SearchSpace of the swarm
+    :param seeds  : seed permutations of loadSeeds
+    :param margin : fraction of each variable's span kept around the seeds
+    """
+    narrowed = dict((name, narrowVariable(variable, [seed[name] for seed in seeds], margin))
+                    for name, variable in space.variables.items())
+
+    def substitute(node, path):
+        resolved = {}
+        for key, value in node.items():
+            name = ":".join(path + (key,))
+            if name in narrowed:
+                resolved[key] = narrowed[name]
+            elif isinstance(value, PermuteEncoder):
+                encoder = copy.copy(value)
+                encoder.kwArgs = dict((argument, narrowed.get(name + ":" + argument, value))
+                                      for argument, value in value.kwArgs.items())
+                resolved[key] = encoder
+            elif isinstance(value, dict):
+                resolved[key] = substitute(value, path + (key,))
+            else:
+                resolved[key] = value
+        return resolved
+
+    return SearchSpace(substitute(space.permutations, ()), space.baseParams, space.metric,
+                       space.maximize, space.predictedField, space.maxModels,
+                       space.permutationFilter, space.streams, space.iterationCount,
+                       space.baseDir)
+
+
+def defaultWarmModels(seeds, maxModels):
+    return min(maxModels // 2, len(seeds) * (1 + NEIGHBOURS_PER_SEED))
+
+
+class WarmStart(object):
+    """
+    Search strategy wrapper evaluating the seeds and candidates close to
+    them before the strategy's own
+
+    The strategy is expected to search the narrowed space over the models
+    left. The warm results are handed to its prior(result) method when it
+    has one, as TPESearch does, so that it learns from them too.
+
+    :param strategy   : strategy run after the warm candidates
+    :param space      : narrowed SearchSpace of narrowSpace
+    :param seeds      : seed permutations of loadSeeds
+    :param warmModels : seeds and neighbours evaluated, all seeds at least
+    :param seed       : random seed
+    :param margin     : fraction of each variable's span neighbours spread over
+    """
+
+    def __init__(self, strategy, space, seeds, warmModels, seed=42, margin=DEFAULT_MARGIN):
+        self.strategy = strategy
+        self.space = space
+        self.seeds = seeds
+        self.sampler = PermutationSampler(space, seed)
+        self.rng = random.Random(seed + 2)
+        self.margin = margin
+        self.warmModels = max(warmModels, len(seeds)) if seeds else 0
+        self.proposed = 0
+        self.running = []
+
+    def _neighbour(self, seedPerm):
+        """
+        Returns a permutation close to a seed permutation; variables the seed
+        does not define are sampled from their range
+        """
+        perm = OrderedDict()
+        for name, variable in self.space.variables.items():
+            value = seedPerm[name]
+            if value is None:
+                perm[name] = variable.sample(self.rng)
+            elif isinstance(variable, PermuteChoices):
+                perm[name] = (value if self.rng.random() < KEEP_CHOICE
+                              else variable.sample(self.rng))
+            else:
+                sigma = 0.5 * self.margin * (variable.max - variable.min)
+                perm[name] = variable.clip(self.rng.gauss(value, sigma))
+        return perm
+
+    def _warmPermutation(self):
+        if self.proposed < len(self.seeds):
+            seedPerm = self.seeds[self.proposed]
+            perm = OrderedDict((name, value if value is not None else variable.sample(self.rng))
+                               for (name, value), variable in
+                               zip(seedPerm.items(), self.space.variables.values()))
+            if self.space.admits(perm) and self.sampler.add(perm):
+                return perm
+        for _ in range(self.sampler.attempts):
+            perm = self._neighbour(self.seeds[self.proposed % len(self.seeds)])
+            if self.space.admits(perm) and self.sampler.add(perm):
+                return perm
+        return None
+
+    def propose(self):
+        """
+        Returns the next seed or neighbour task, then the strategy's tasks
+        """
+        if self.proposed < self.warmModels:
+            perm = self._warmPermutation()
+            if perm is not None:
+                self.proposed += 1
+                task = self.sampler.task(perm)
+                self.running.append(task)
+                return task
+            self.warmModels = self.proposed
+        return self.strategy.propose()
+
+    def observe(self, result):
+        """
+        Takes the result of a warm or strategy task
+        """
+        for i, task in enumerate(self.running):
+            if sameTask(task, result):
+                del self.running[i]
+                prior = getattr(self.strategy, "prior", None)
+                if prior is not None:
+                    prior(result)
+                return
+        self.strategy.observe(result)
+
+    def done(self):
+        return (self.proposed >= self.warmModels and not self.running and
+                self.strategy.done())
@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+
+"""
+Work queue of a distributed swarm
+
+A SQLite file on a filesystem shared by every host holds the trials of a
+swarm. The coordinator queues tasks and collects their results; workers on
+any host claim a task under a lease, renew the lease by heartbeats while the
+model runs and post the result back. A task whose lease expires, because its
+worker died or lost the filesystem, is queued again, up to MAX_ATTEMPTS
+times before it is reported as failed.
+
+SQLite locking needs a filesystem with working POSIX locks (a local disk,
+or NFSv4 with locking enabled); every host must see the dataset and the
+swarm preparation at the same paths.
+"""
+
+"""
+Importing Packages
+"""
+# general
+import json
+import time
+import sqlite3
+from collections import deque
+
+
+"""
+Global variables
+"""
+DEFAULT_LEASE = 60.0 # seconds a claimed task is held without a heartbeat
+DEFAULT_POLL_INTERVAL = 0.5
+MAX_ATTEMPTS = 3
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    trial INTEGER PRIMARY KEY,
+    swarm TEXT NOT NULL,
+    task TEXT NOT NULL,
+    status TEXT NOT NULL,
+    worker TEXT,
+    lease REAL,
+    attempts INTEGER DEFAULT 0,
+    result TEXT,
+    collected INTEGER DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS config (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class WorkQueue(object):
+    """
+    Connection to the queue file, from the coordinator or a worker
+
+    :param path : SQLite file, created when missing
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # writers wait for each other rather than failing on a busy file
+        self.connection = sqlite3.connect(path, timeout=60.0, isolation_level=None)
+        self.connection.executescript(SCHEMA)
+
+    def _transaction(self, statements):
+        """
+        Runs statements(cursor) in an immediate transaction, so that two
+        workers never claim the same task; returns what it returns
+        """
+        cursor = self.connection.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            value = statements(cursor)
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        cursor.execute("COMMIT")
+        return value
+
+    def setConfig(self, name, value):
+        self.connection.execute("INSERT OR REPLACE INTO config VALUES (?, ?)",
+                                (name, json.dumps(value)))
+
+    def getConfig(self, name, default=None):
+        row = self.connection.execute("SELECT value FROM config WHERE name = ?",
+                                      (name,)).fetchone()
+        return default if row is None else json.loads(row[0])
+
+    # coordinator side
+
+    def reset(self):
+        """
+        Empties the queue of an earlier swarm
+        """
+        self.connection.execute("DELETE FROM tasks")
+        self.connection.execute("DELETE FROM config")
+
+    def submit(self, task, swarm):
+        """
+        Queues a task dict with trial, perm, params and records
+
+        :param task  : task dict
+        :param swarm : id of the swarm the task belongs to
+        """
+        self.connection.execute(
+            "INSERT OR REPLACE INTO tasks (trial, swarm, task, status) "
+            "VALUES (?, ?, ?, 'queued')", (task["trial"], swarm, json.dumps(task)))
+
+    def requeueExpired(self):
+        """
+        Queues again the tasks whose lease expired and fails those out of
+        attempts; returns the trials queued again
+        """
+        def requeue(cursor):
+            rows = cursor.execute(
+                "SELECT trial, worker, attempts, task FROM tasks "
+                "WHERE status = 'leased' AND lease < ?", (time.time(),)).fetchall()
+            requeued = []
+            for trial, worker, attempts, task in rows:
+                if attempts >= MAX_ATTEMPTS:
+                    task = json.loads(task)
+                    result = {"trial": trial, "perm": task["perm"], "metric": None,
+                              "records": 0, "seconds": 0.0, "status": "error",
+                              "error": "Lease lost %i times, last by worker %s"
+                                       % (attempts, worker)}
+                    cursor.execute("UPDATE tasks SET status = 'done', result = ? "
+                                   "WHERE trial = ?", (json.dumps(result), trial))
+                else:
+                    cursor.execute("UPDATE tasks SET status = 'queued', worker = NULL "
+                                   "WHERE trial = ?", (trial,))
+                    requeued.append((trial, worker))
+            return requeued
+        return self._transaction(requeue)
+
+    def collect(self):
+        """
+        Returns the results posted since the last call
+        """
+        def collectResults(cursor):
+            rows = cursor.execute("SELECT trial, result FROM tasks WHERE status = 'done' "
+                                  "AND collected = 0 ORDER BY trial").fetchall()
+            cursor.executemany("UPDATE tasks SET collected = 1 WHERE trial = ?",
+                               [(trial,) for trial, _ in rows])
+            return [json.loads(result) for _, result in rows]
+        return self._transaction(collectResults)
+
+    def counts(self):
+        """
+        Returns the number of tasks by status
+        """
+        return dict(self.connection.execute(
+            "SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall())
+
+    # worker side
+
+    def claim(self, worker, swarm, lease=DEFAULT_LEASE):
+        """
+        Leases the oldest queued task of a swarm to a worker; returns it,
+        None when there is none
+        """
+        def claimTask(cursor):
+            row = cursor.execute("SELECT trial, task FROM tasks WHERE status = 'queued' "
+                                 "AND swarm = ? ORDER BY trial LIMIT 1", (swarm,)).fetchone()
+            if row is None:
+                return None
+            cursor.execute("UPDATE tasks SET status = 'leased', worker = ?, lease = ?, "
+                           "attempts = attempts + 1 WHERE trial = ?",
+                           (worker, time.time() + lease, row[0]))
+            return json.loads(row[1])
+        return self._transaction(claimTask)
+
+    def heartbeat(self, trial, worker, lease=DEFAULT_LEASE):
+        """
+        Renews a worker's lease on a task; returns False when the lease was
+        lost and the task queued again
+        """
+        cursor = self.connection.execute(
+            "UPDATE tasks SET lease = ? WHERE trial = ? AND worker = ? AND status = 'leased'",
+            (time.time() + lease, trial, worker))
+        return cursor.rowcount > 0
+
+    def complete(self, result, swarm):
+        """
+        Posts the result of a task of a swarm; a result arriving after the
+        task was queued again still counts, the first one posted wins
+        """
+        self.connection.execute(
+            "UPDATE tasks SET status = 'done', result = ? WHERE trial = ? AND swarm = ? "
+            "AND status != 'done'", (json.dumps(result), result["trial"], swarm))
+
+    def close(self):
+        self.connection.close()
+
+
+class QueueExecutor(object):
+    """
+    Runs the tasks of runLocalSwarm on the workers serving a WorkQueue
+
+    :param path         : queue file on the shared filesystem
+    :param workerConfig : dict the workers set themselves up with
+    :param pollInterval : seconds between polls for results
+    """
+
+    def __init__(self, path, workerConfig, pollInterval=DEFAULT_POLL_INTERVAL):
+        self.queue = WorkQueue(path)
+        self.queue.reset()
+        self.swarm = workerConfig["swarm"]
+        self.queue.setConfig("worker", workerConfig)
+        self.queue.setConfig("state", "running")
+        self.pollInterval = pollInterval
+        self.ready = deque()
+        self.perms = {}
+
+    def submit(self, task):
+        # results come back through JSON, which turns tuples into lists, so
+        # they are handed back with the permutation as proposed
+        self.perms[task["trial"]] = task["perm"]
+        self.queue.submit(task, self.swarm)
+
+    def put(self, result):
+        """
+        Hands back a result obtained without a worker
+        """
+        self.ready.append(result)
+
+    def get(self):
+        """
+        Returns the next result, waiting for the workers to post one
+        """
+        while not self.ready:
+            for trial, worker in self.queue.requeueExpired():
+                print("Lease of trial %i expired on worker %s, queued again" % (trial, worker))
+            for result in self.queue.collect():
+                result["perm"] = self.perms.pop(result["trial"], result["perm"])
+                self.ready.append(result)
+            if not self.ready:
+                time.sleep(self.pollInterval)
+        return self.ready.popleft()
+
+    def close(self):
+        # idle workers exit once the swarm is over
+        self.queue.setConfig("state", "finished")
+        self.queue.close()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+
+"""
+Tests of the encoder caches of the anomaly runner
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import sys
+import random
+import datetime
+import unittest
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "anomaly"))
+from encoder_cache import (EncoderCache, CachedDateEncode, dateKey, dateKeys,
+                           cacheEncoders, cacheSummary)
+
+
+"""
+Global variables
+"""
+START = datetime.datetime(2014, 2, 14, 0, 0)
+WIDTH = 32
+
+
+class DateEncoder(object):
+    """
+    Stand-in NuPIC DateEncoder writing a hash of the weekday and time of day,
+    and of the day of the year with a season encoding
+    """
+
+    def __init__(self, season=False):
+        self.seasonEncoder = object() if season else None
+        self.holidayEncoder = None
+        self.calls = 0
+
+    def getWidth(self):
+        return WIDTH
+
+    def encodeIntoArray(self, input, output):
+        self.calls += 1
+        output[:WIDTH] = 0
+        output[(input.weekday() * 7 + input.hour * 3 + input.minute) % WIDTH] = 1
+        if self.seasonEncoder is not None:
+            output[input.timetuple().tm_yday % WIDTH] = 1
+
+
+class ScalarEncoder(object):
+    """
+    Stand-in encoder of a type the cache leaves alone without NuPIC's internals
+    """
+
+
+class Engine(object):
+
+    def __init__(self, encoders):
+        self.encoders = encoders
+
+    def listEncoders(self):
+        return self.encoders
+
+
+def timestamps(count, minutes=5):
+    return [START + datetime.timedelta(minutes=minutes * i) for i in range(count)]
+
+
+class EncoderCacheTest(unittest.TestCase):
+
+    def test_lru(self):
+        cache = EncoderCache("value", maxSize=2)
+        cache.put(1, "a")
+        cache.put(2, "b")
+        self.assertEqual(cache.get(1), "a")
+        # 2 is now the least recently used
+        cache.put(3, "c")
+        self.assertIsNone(cache.get(2))
+        self.assertEqual(cache.get(3), "c")
+        self.assertEqual(cache.summary(), {"entries": 2, "hits": 2, "misses": 1,
+                                           "evictions": 1, "hitRate": 2 / 3.0})
+
+
+class DateKeyTest(unittest.TestCase):
+
+    def test_vectorized_keys_match(self):
+        rng = random.Random(4)
+        times = [START + datetime.timedelta(seconds=rng.randint(0, 3 * 365 * 86400),
+                                            microseconds=rng.randint(0, 999999))
+                 for _ in range(500)]
+        for season, holiday in [(False, False), (True, False), (False, True)]:
+            self.assertEqual(dateKeys(times, season, holiday).tolist(),
+                             [dateKey(time, season, holiday) for time in times])
+
+    def test_same_weekday_and_time(self):
+        nextWeek = START + datetime.timedelta(days=7)
+        self.assertEqual(dateKey(START), dateKey(nextWeek))
+        self.assertNotEqual(dateKey(START, season=True), dateKey(nextWeek, season=True))
+        self.assertNotEqual(dateKey(START, holiday=True), dateKey(nextWeek, holiday=True))
+
+
+class CachedDateEncodeTest(unittest.TestCase):
+
+    def encodings(self, encoder, times):
+        output = numpy.zeros(WIDTH, dtype=numpy.uint8)
+        rows = []
+        for time in times:
+            encoder.encodeIntoArray(time, output)
+            rows.append(output.copy())
+        return numpy.array(rows)
+
+    def test_cached_encodings_match(self):
+        # three weeks of records, the last two repeat the first
+        times = timestamps(3 * 7 * 288)
+        expected = self.encodings(DateEncoder(), times)
+        encoder = DateEncoder()
+        wrappers = cacheEncoders(Engine([("timestamp", encoder)]))
+        numpy.testing.assert_array_equal(self.encodings(encoder, times), expected)
+        self.assertEqual(encoder.calls, 7 * 288)
+        self.assertEqual(cacheSummary(wrappers)["timestamp"]["hits"], 2 * 7 * 288)
+
+    def test_precompute(self):
+        times = timestamps(2000, minutes=7)
+        encoder = DateEncoder(season=True)
+        expected = self.encodings(DateEncoder(season=True), times)
+        wrapper = cacheEncoders(Engine([("timestamp", encoder)]), maxSize=10)["timestamp"]
+        numpy.testing.assert_array_equal(wrapper.precompute(times), expected)
+        # grown to hold every distinct date, so the run only hits
+        self.assertEqual(wrapper.cache.maxSize, 2000)
+        numpy.testing.assert_array_equal(self.encodings(encoder, times), expected)
+        self.assertEqual(wrapper.cache.misses, 0)
+
+    def test_other_inputs_are_not_cached(self):
+        encoder = DateEncoder()
+        wrapper = CachedDateEncode(encoder, EncoderCache("timestamp"))
+        original = []
+        wrapper.original = lambda input, output: original.append(input)
+        wrapper(None, numpy.zeros(WIDTH, dtype=numpy.uint8))
+        self.assertEqual(original, [None])
+        self.assertEqual(wrapper.cache.summary()["entries"], 0)
+
+    def test_other_encoders_are_left_alone(self):
+        wrappers = cacheEncoders(Engine([("value", ScalarEncoder()),
+                                          ("timestamp", DateEncoder())]))
+        self.assertEqual(list(wrappers), ["timestamp"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+
+"""
+Tests of the cross-swarm evaluation cache
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "myswarm"))
+from eval_cache import EvalCache, canonical, paramsHash, datasetFingerprint, evict
+
+
+"""
+Global variables
+"""
+METRIC = "multiStepBestPredictions:multiStep:errorMetric='altMAPE':steps=[1]"
+PARAMS = {"modelParams": {"tmParams": {"pamLength": 3, "permanenceInc": 0.1},
+                          "sensorParams": {"encoders": {"value": {"w": 21}}}}}
+
+
+class CanonicalTest(unittest.TestCase):
+
+    def test_spellings_hash_alike(self):
+        other = {"modelParams": {"sensorParams": {"encoders": {"value": {"w": 21.0}}},
+                                 "tmParams": {"permanenceInc": 0.1 + 1e-14,
+                                              "pamLength": 3}}}
+        self.assertEqual(paramsHash(PARAMS), paramsHash(other))
+        self.assertEqual(canonical((1, 2.0, None, True)), [1, 2, None, True])
+
+    def test_values_differ(self):
+        other = {"modelParams": {"tmParams": {"pamLength": 4, "permanenceInc": 0.1},
+                                 "sensorParams": {"encoders": {"value": {"w": 21}}}}}
+        self.assertNotEqual(paramsHash(PARAMS), paramsHash(other))
+
+
+class EvalCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workDir = tempfile.mkdtemp(prefix="eval_cache_")
+        self.path = os.path.join(self.workDir, "cache.db")
+        self.csvPath = os.path.join(self.workDir, "stream.csv")
+        with open(self.csvPath, "w") as csvFile:
+            csvFile.write("timestamp,value\ndatetime,float\nT,\n1/1/2014 0:00,1.0\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.workDir)
+
+    def test_fingerprint(self):
+        first = datasetFingerprint(self.csvPath)
+        self.assertEqual(first, datasetFingerprint(self.csvPath))
+        self.assertNotEqual(first, datasetFingerprint(self.csvPath, lastRecord=10))
+        with open(self.csvPath, "a") as csvFile:
+            csvFile.write("1/1/2014 0:05,2.0\n")
+        self.assertNotEqual(first, datasetFingerprint(self.csvPath))
+
+    def test_hit_and_miss(self):
+        cache = EvalCache(self.path, "dataset", "nupic", METRIC, 1000)
+        self.assertIsNone(cache.get(PARAMS))
+        cache.put(PARAMS, None, 12.5, 3.0, {"aae": 1.5})
+        cache.close()
+
+        cache = EvalCache(self.path, "dataset", "nupic", METRIC, 1000)
+        self.assertEqual(cache.get(PARAMS), (12.5, 3.0, {"aae": 1.5}))
+        # all records and the whole stream are the same range
+        self.assertEqual(cache.get(PARAMS, 5000), (12.5, 3.0, {"aae": 1.5}))
+        self.assertIsNone(cache.get(PARAMS, 100))
+        self.assertIsNone(cache.get(PARAMS, reportMetrics=["rmse"]))
+        self.assertEqual(cache.summary()["hits"], 2)
+        self.assertEqual(cache.summary()["misses"], 2)
+        cache.close()
+
+    def test_other_swarms_miss(self):
+        cache = EvalCache(self.path, "dataset", "nupic", METRIC, 1000)
+        cache.put(PARAMS, None, 12.5, 3.0)
+        for other in [EvalCache(self.path, "other", "nupic", METRIC, 1000),
+                      EvalCache(self.path, "dataset", "htmcore", METRIC, 1000),
+                      EvalCache(self.path, "dataset", "nupic", METRIC.replace("altMAPE", "aae"),
+                                1000)]:
+            self.assertIsNone(other.get(PARAMS))
+            other.close()
+        cache.close()
+
+    def test_evict(self):
+        cache = EvalCache(self.path, "dataset", "nupic", METRIC, 1000)
+        cache.put(PARAMS, None, 12.5, 3.0)
+        cache.put(PARAMS, 100, 20.0, 0.5)
+        cache.close()
+        self.assertRaises(ValueError, evict, self.path)
+        self.assertEqual(evict(self.path, engine="htmcore"), 0)
+        self.assertEqual(evict(self.path, dataset="data"), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+
+"""
+Tests of swapping in a model rebuilt from an edited params file
+"""
+
+"""
+Importing Packages
+"""
+# general
+import gc
+import os
+import sys
+import time
+import shutil
+import weakref
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "anomaly"))
+import engines
+from hot_swap import HotSwapper
+
+
+class CountingModel(object):
+    """
+    Stand-in engine counting the records it ran
+    """
+
+    def __init__(self, modelParams, predictedField="value"):
+        self.modelParams = modelParams
+        self.records = []
+
+    def run(self, inputRecord):
+        self.records.append(inputRecord["value"])
+
+
+class HotSwapperTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workDir = tempfile.mkdtemp(prefix="hot_swap_")
+        self.paramsPath = os.path.join(self.workDir, "model_params.py")
+        self.writeParams(1)
+        engines.ENGINES["counting"] = CountingModel
+        self.prepared = []
+        self.swappedIn = []
+        self.swapper = HotSwapper(self.paramsPath, "counting", warmupSize=5,
+                                  pollInterval=0.0, prepare=self.prepare,
+                                  onSwap=self.swappedIn.append)
+
+    def tearDown(self):
+        self.swapper.close()
+        del engines.ENGINES["counting"]
+        shutil.rmtree(self.workDir)
+
+    def writeParams(self, version):
+        with open(self.paramsPath, "w") as paramsFile:
+            paramsFile.write("MODEL_PARAMS = {'version': %i}\n" % version)
+        # mtimes of a quick rewrite may compare equal
+        stamp = time.time() + version
+        os.utime(self.paramsPath, (stamp, stamp))
+
+    def prepare(self, model):
+        self.prepared.append(model)
+        return "caches of version %i" % model.modelParams["version"]
+
+    def swap(self, model):
+        """
+        Polls until the rebuilt model is swapped in
+        """
+        for _ in range(100):
+            newModel = self.swapper.poll(model)
+            if newModel is not model:
+                return newModel
+            if self.swapper.warmer is not None:
+                self.swapper.warmer.join()
+        self.fail("No model was swapped in")
+
+    def test_swap(self):
+        model = CountingModel({"version": 1})
+        for value in range(8):
+            model.run({"timestamp": None, "value": value})
+            self.swapper.observe(None, value)
+        self.assertIs(self.swapper.poll(model), model)
+
+        self.writeParams(2)
+        newModel = self.swap(model)
+        self.assertEqual(newModel.modelParams, {"version": 2})
+        # warmed on the last warmupSize records
+        self.assertEqual(newModel.records, [3, 4, 5, 6, 7])
+        self.assertEqual(self.prepared, [newModel])
+        self.assertEqual(self.swappedIn, ["caches of version 2"])
+        self.assertEqual(self.swapper.summary()["swaps"], 1)
+
+    def test_old_model_is_freed(self):
+        model = CountingModel({"version": 1})
+        self.swapper.observe(None, 0.0)
+        old = weakref.ref(model)
+        self.writeParams(2)
+        model = self.swap(model)
+        del self.prepared[:]
+        gc.collect()
+        self.assertIsNone(old())
+
+    def test_params_that_do_not_load(self):
+        model = CountingModel({"version": 1})
+        with open(self.paramsPath, "w") as paramsFile:
+            paramsFile.write("MODEL_PARAMS = {\n")
+        os.utime(self.paramsPath, (time.time() + 5, time.time() + 5))
+        self.assertIs(self.swapper.poll(model), model)
+        self.assertEqual(self.swapper.summary()["failures"], 1)
+        self.assertEqual(self.swappedIn, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+
+"""
+Tests of the latency histogram of the anomaly runner
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import sys
+import random
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "anomaly"))
+from instrumentation import LatencyHistogram
+
+
+def exactPercentile(latencies, percent):
+    ordered = sorted(latencies)
+    target = max(1, int(round(len(ordered) * percent / 100.0)))
+    return ordered[target - 1]
+
+
+class LatencyHistogramTest(unittest.TestCase):
+
+    def test_percentiles_within_one_percent(self):
+        rng = random.Random(7)
+        # from microseconds to seconds
+        latencies = [10 ** rng.uniform(-6, 0) for _ in range(20000)]
+        histogram = LatencyHistogram()
+        for latency in latencies:
+            histogram.record(latency)
+        for percent in [1, 50, 90, 99, 99.9, 100]:
+            expected = exactPercentile(latencies, percent)
+            self.assertLess(abs(histogram.percentile(percent) - expected), 0.01 * expected)
+        self.assertEqual(histogram.total, len(latencies))
+        self.assertLess(abs(histogram.mean() - sum(latencies) / len(latencies)),
+                        1e-9 * len(latencies))
+        self.assertLessEqual(histogram.percentile(100), max(latencies))
+
+    def test_small_values_are_exact(self):
+        histogram = LatencyHistogram()
+        for nanoseconds in range(1, 101):
+            histogram.record(nanoseconds * 1e-9 + 1e-12)
+        self.assertAlmostEqual(histogram.percentile(50), 50e-9)
+        self.assertAlmostEqual(histogram.percentile(100), 100e-9)
+
+    def test_merge(self):
+        rng = random.Random(8)
+        first = LatencyHistogram()
+        second = LatencyHistogram()
+        both = LatencyHistogram()
+        for i in range(5000):
+            latency = rng.expovariate(1000.0)
+            (first if i % 2 else second).record(latency)
+            both.record(latency)
+        first.merge(second)
+        self.assertEqual(first.counts, both.counts)
+        self.assertEqual(first.summary(), both.summary())
+
+    def test_out_of_range(self):
+        histogram = LatencyHistogram()
+        histogram.record(-1.0)
+        histogram.record(1e6)
+        self.assertEqual(histogram.total, 2)
+        self.assertEqual(histogram.percentile(50), 0.0)
+        # clamped to the largest recordable latency
+        self.assertEqual(histogram.max, (1 << 40) - 1)
+        largest = ((1 << 40) - 1) * 1e-9
+        self.assertLess(abs(histogram.percentile(100) - largest), 0.01 * largest)
+
+    def test_empty(self):
+        histogram = LatencyHistogram()
+        self.assertEqual(histogram.percentile(99), 0.0)
+        self.assertEqual(histogram.mean(), 0.0)
+        self.assertEqual(histogram.summary()["count"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+
+"""
+Tests of the degradation ladder of the load shedder
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import csv
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "anomaly"))
+import load_shedding
+from load_shedding import (LoadShedder, LEVEL_NONE, LEVEL_SKIP_SINKS,
+                           LEVEL_INFER_ONLY, LEVEL_AGGREGATE)
+
+
+class FakeTimer(object):
+    """
+    Clock advanced by hand
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class LearningModel(object):
+
+    def __init__(self):
+        self.learning = True
+
+    def enableLearning(self):
+        self.learning = True
+
+    def disableLearning(self):
+        self.learning = False
+
+
+class LoadShedderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.timer = FakeTimer()
+        self.defaultTimer = load_shedding.default_timer
+        load_shedding.default_timer = self.timer
+        self.shedder = LoadShedder(1.0, thresholds=(1.0, 5.0, 20.0), aggregateSize=3)
+
+    def tearDown(self):
+        load_shedding.default_timer = self.defaultTimer
+
+    def spend(self, seconds):
+        self.shedder.startRecord()
+        self.timer.now += seconds
+        self.shedder.finishRecord()
+
+    def test_ladder_and_hysteresis(self):
+        self.spend(1.5)
+        self.assertEqual(self.shedder.level, LEVEL_NONE)
+        self.spend(1.5)
+        self.assertEqual(self.shedder.level, LEVEL_SKIP_SINKS)
+        self.spend(5.0)
+        self.assertEqual(self.shedder.level, LEVEL_INFER_ONLY)
+        self.spend(16.0)
+        self.assertEqual(self.shedder.level, LEVEL_AGGREGATE)
+        self.assertEqual(self.shedder.lag, 20.0)
+        # levels are left below half of their threshold
+        self.spend(0.0)
+        self.assertEqual(self.shedder.level, LEVEL_AGGREGATE)
+        for _ in range(10):
+            self.spend(0.0)
+        self.assertEqual(self.shedder.level, LEVEL_INFER_ONLY)
+        for _ in range(7):
+            self.spend(0.0)
+        self.assertEqual(self.shedder.level, LEVEL_SKIP_SINKS)
+        for _ in range(2):
+            self.spend(0.0)
+        self.assertEqual(self.shedder.level, LEVEL_NONE)
+        self.assertEqual(self.shedder.maxLag, 20.0)
+
+    def test_aggregate(self):
+        self.shedder.level = LEVEL_AGGREGATE
+        self.assertIsNone(self.shedder.admit(1, "t1", 1.0))
+        self.assertIsNone(self.shedder.admit(2, "t2", 2.0))
+        self.assertEqual(self.shedder.admit(3, "t3", 6.0), ("t3", 3.0))
+        self.assertEqual(self.shedder.counts["aggregate"], 2)
+
+    def test_partial_aggregate_released_below_the_level(self):
+        self.shedder.level = LEVEL_AGGREGATE
+        self.assertIsNone(self.shedder.admit(1, "t1", 1.0))
+        self.shedder.level = LEVEL_INFER_ONLY
+        self.assertEqual(self.shedder.admit(2, "t2", 3.0), ("t2", 2.0))
+        self.assertEqual(self.shedder.admit(3, "t3", 5.0), ("t3", 5.0))
+
+    def test_flush_trailing_records(self):
+        self.shedder.level = LEVEL_AGGREGATE
+        self.assertIsNone(self.shedder.admit(1, "t1", 1.0))
+        self.assertIsNone(self.shedder.admit(2, "t2", 4.0))
+        self.assertEqual(self.shedder.flush(), ("t2", 2.5))
+        self.assertIsNone(self.shedder.flush())
+
+    def test_learning(self):
+        model = LearningModel()
+        self.shedder.level = LEVEL_INFER_ONLY
+        self.shedder.applyLearning(model, 1, "t1")
+        self.assertFalse(model.learning)
+        self.shedder.level = LEVEL_SKIP_SINKS
+        self.shedder.applyLearning(model, 2, "t2")
+        self.assertTrue(model.learning)
+        self.assertEqual(self.shedder.counts["infer_only"], 1)
+
+    def test_bad_settings(self):
+        self.assertRaises(ValueError, LoadShedder, 1.0, thresholds=(1.0, 5.0))
+        self.assertRaises(ValueError, LoadShedder, 1.0, thresholds=(5.0, 1.0, 20.0))
+        self.assertRaises(ValueError, LoadShedder, 1.0, aggregateSize=1)
+
+
+class ShedLogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workDir = tempfile.mkdtemp(prefix="load_shedding_")
+
+    def tearDown(self):
+        shutil.rmtree(self.workDir)
+
+    def test_log(self):
+        logPath = os.path.join(self.workDir, "shed.csv")
+        shedder = LoadShedder(1.0, logPath=logPath)
+        self.assertFalse(shedder.skipSinks(1, "t1"))
+        shedder.level = LEVEL_SKIP_SINKS
+        self.assertTrue(shedder.skipSinks(2, "t2"))
+        shedder.close()
+        with open(logPath) as logFile:
+            rows = list(csv.reader(logFile))
+        self.assertEqual(rows, [["record", "timestamp", "action", "lag"],
+                                ["2", "t2", "skip_sinks", "0.000000"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+
+"""
+Tests of the stream aggregation and the trials of the local swarm
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import sys
+import shutil
+import datetime
+import tempfile
+import unittest
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "myswarm"))
+import engines
+import local_swarm
+from local_swarm import aggregate, aggregationPeriod, initWorker, evaluateCandidate
+
+
+"""
+Global variables
+"""
+START = datetime.datetime(2014, 2, 14, 0, 0)
+
+
+def fiveMinuteStream(count, skip=()):
+    """
+    Returns (timestamps, values) of records every 5 minutes, values 0, 1, ...,
+    leaving out the record indices in skip
+    """
+    indices = [i for i in range(count) if i not in skip]
+    return ([START + datetime.timedelta(minutes=5 * i) for i in indices],
+            numpy.array(indices, dtype=numpy.float64))
+
+
+class AggregationPeriodTest(unittest.TestCase):
+
+    def test_period(self):
+        self.assertEqual(aggregationPeriod({"hours": 1, "minutes": 30}),
+                         datetime.timedelta(minutes=90))
+
+    def test_no_aggregation(self):
+        self.assertIsNone(aggregationPeriod(None))
+        self.assertIsNone(aggregationPeriod({"hours": 0, "fields": []}))
+
+    def test_months_are_refused(self):
+        self.assertRaises(ValueError, aggregationPeriod, {"months": 1})
+
+
+class AggregateTest(unittest.TestCase):
+
+    def test_hourly_mean(self):
+        timestamps, values = fiveMinuteStream(30)
+        aggregatedTimestamps, aggregatedValues = aggregate(timestamps, values, {"hours": 1})
+        self.assertEqual(aggregatedTimestamps, [START, START + datetime.timedelta(hours=1),
+                                                START + datetime.timedelta(hours=2)])
+        numpy.testing.assert_allclose(aggregatedValues, [5.5, 17.5, 26.5])
+
+    def test_field_function(self):
+        timestamps, values = fiveMinuteStream(24)
+        _, aggregatedValues = aggregate(timestamps, values,
+                                        {"hours": 1, "fields": [("value", "sum")]})
+        numpy.testing.assert_allclose(aggregatedValues, [66.0, 210.0])
+        _, aggregatedValues = aggregate(timestamps, values,
+                                        {"hours": 1, "fields": [("value", "max")]})
+        numpy.testing.assert_allclose(aggregatedValues, [11.0, 23.0])
+
+    def test_empty_periods_are_skipped(self):
+        # nothing between 01:00 and 03:00
+        timestamps, values = fiveMinuteStream(48, skip=range(12, 36))
+        aggregatedTimestamps, aggregatedValues = aggregate(timestamps, values, {"hours": 1})
+        self.assertEqual(aggregatedTimestamps, [START, START + datetime.timedelta(hours=3)])
+        numpy.testing.assert_allclose(aggregatedValues, [5.5, 41.5])
+
+    def test_without_aggregation(self):
+        timestamps, values = fiveMinuteStream(5)
+        self.assertIs(aggregate(timestamps, values, None)[1], values)
+        self.assertEqual(aggregate([], numpy.array([]), {"hours": 1})[0], [])
+
+
+class LastValueModel(object):
+    """
+    Stand-in engine predicting the value it was just given
+    """
+
+    def __init__(self, modelParams, predictedField="value"):
+        self.predictedField = predictedField
+
+    def run(self, inputRecord):
+        result = lambda: None
+        result.inferences = {"multiStepBestPredictions": {1: inputRecord[self.predictedField]}}
+        return result
+
+
+class EvaluateCandidateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workDir = tempfile.mkdtemp(prefix="local_swarm_")
+        self.csvPath = os.path.join(self.workDir, "stream.csv")
+        with open(self.csvPath, "w") as csvFile:
+            csvFile.write("timestamp,value\ndatetime,float\nT,\n")
+            for i in range(40):
+                timestamp = START + datetime.timedelta(minutes=5 * i)
+                csvFile.write("%s,%i\n" % (timestamp.strftime(local_swarm.DATE_FORMAT), i))
+        engines.ENGINES["last_value"] = LastValueModel
+        self.metricSpec = {"errorMetric": "aae", "steps": [1], "window": 1000}
+
+    def tearDown(self):
+        local_swarm._worker.clear()
+        del engines.ENGINES["last_value"]
+        shutil.rmtree(self.workDir)
+
+    def evaluate(self, records=None):
+        return evaluateCandidate({"trial": 0, "perm": {}, "params": {},
+                                  "records": records})
+
+    def test_trial(self):
+        initWorker((self.csvPath, None, None), "last_value", "value", self.metricSpec)
+        result = self.evaluate()
+        self.assertEqual(result["status"], "completed", result["error"])
+        self.assertEqual(result["records"], 40)
+        # every prediction is one behind
+        self.assertAlmostEqual(result["metric"], 1.0)
+        self.assertEqual(self.evaluate(10)["records"], 10)
+
+    def test_profiled_trials(self):
+        prefix = os.path.join(self.workDir, "stream_PROFILE")
+        initWorker((self.csvPath, None, None), "last_value", "value", self.metricSpec,
+                   profile=("cprofile", prefix, 0.01))
+        self.assertEqual(self.evaluate()["status"], "completed")
+        workerPrefix = "%s_worker%i" % (prefix, os.getpid())
+        for extension in [".pstats", ".collapsed"]:
+            self.assertTrue(os.path.exists(workerPrefix + extension))
+        with open(workerPrefix + ".collapsed") as collapsedFile:
+            self.assertIn("run (test_local_swarm.py", collapsedFile.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
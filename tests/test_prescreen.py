@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+
+"""
+Tests of the pre-screening of local swarm candidates
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import sys
+import unittest
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "myswarm"))
+from search_space import SearchSpace, DEFAULT_METRIC
+from prescreen import PreScreen, rankCorrelation, encoderResolution
+
+
+"""
+Global variables
+"""
+BASE_PARAMS = {"modelParams": {"sensorParams": {"encoders": {}}}}
+
+
+def candidate(index, n=400):
+    """
+    Full-stream task whose metric is its index, with a value encoder of n bits
+    """
+    encoders = {"value": {"type": "ScalarEncoder", "fieldname": "value", "name": "value",
+                          "n": n, "w": 21, "minval": 0.0, "maxval": 100.0}}
+    return {"trial": None, "perm": {"index": index}, "records": None,
+            "params": {"modelParams": {"sensorParams": {"encoders": encoders}}}}
+
+
+class ListStrategy(object):
+    """
+    Stand-in strategy proposing a fixed list of tasks and keeping the results
+    """
+
+    def __init__(self, tasks):
+        self.tasks = list(tasks)
+        self.results = []
+
+    def propose(self):
+        return self.tasks.pop(0) if self.tasks else None
+
+    def observe(self, result):
+        self.results.append(result)
+
+    def done(self):
+        return not self.tasks
+
+
+def run(screen):
+    """
+    Runs every proposed task at once, the metric of a candidate being its index
+    """
+    while not screen.done():
+        task = screen.propose()
+        if task is None:
+            raise AssertionError("Nothing to propose before the swarm is done")
+        screen.observe({"trial": None, "perm": task["perm"], "records": task["records"],
+                        "metric": float(task["perm"]["index"]), "status": "completed"})
+
+
+class HelpersTest(unittest.TestCase):
+
+    def test_rank_correlation(self):
+        self.assertAlmostEqual(rankCorrelation([1, 2, 3, 4], [10, 20, 30, 40]), 1.0)
+        self.assertAlmostEqual(rankCorrelation([1, 2, 3, 4], [4, 3, 2, 1]), -1.0)
+        self.assertEqual(rankCorrelation([1, 2], [1, 2]), 0.0)
+
+    def test_encoder_resolution(self):
+        self.assertEqual(encoderResolution({"resolution": 0.5}, 10.0), 0.5)
+        self.assertEqual(encoderResolution({"radius": 21.0, "w": 21}, 10.0), 1.0)
+        self.assertEqual(encoderResolution({"n": 121, "w": 21}, 10.0), 0.1)
+        self.assertEqual(encoderResolution({"n": 121, "w": 21, "minval": 0,
+                                            "maxval": 50}, 10.0), 0.5)
+        self.assertEqual(encoderResolution({"n": 100, "w": 21, "periodic": True}, 10.0), 0.1)
+        self.assertIsNone(encoderResolution({"n": 21, "w": 21}, 10.0))
+
+
+class PreScreenTest(unittest.TestCase):
+
+    def setUp(self):
+        self.space = SearchSpace({}, BASE_PARAMS, DEFAULT_METRIC % (1, "value"))
+        self.values = numpy.random.RandomState(1).uniform(0.0, 100.0, 1000)
+
+    def test_coarse_encoder_rejected_without_a_run(self):
+        strategy = ListStrategy([candidate(0, n=25), candidate(1)])
+        screen = PreScreen(strategy, self.space, self.values)
+        task = screen.propose()
+        self.assertEqual(task["perm"], {"index": 1})
+        self.assertEqual(task["records"], screen.screenRecords)
+        self.assertEqual(strategy.results[0]["status"], "rejected")
+        self.assertEqual(screen.rejectedByEncoder, 1)
+
+    def test_cutoff_learned_from_ranked_screens(self):
+        # good candidates first, so the poor ones come after the warm-up
+        order = list(range(0, 20, 2)) + list(range(19, 0, -2))
+        strategy = ListStrategy([candidate(index) for index in order])
+        screen = PreScreen(strategy, self.space, self.values,
+                           {"screenRecords": 100, "screenKeep": 0.5, "screenWarmup": 4})
+        run(screen)
+        self.assertIsNotNone(screen.cutoff)
+        rejected = [result["perm"]["index"] for result in strategy.results
+                    if result["status"] == "rejected"]
+        completed = [result["perm"]["index"] for result in strategy.results
+                     if result["status"] == "completed"]
+        # the warm-up runs everyone, then the cutoff keeps the better half
+        self.assertEqual(completed[:4], [0, 2, 4, 6])
+        self.assertIn(19, rejected)
+        self.assertNotIn(1, rejected)
+        self.assertEqual(sorted(rejected + completed), list(range(20)))
+        summary = screen.summary()
+        self.assertEqual(summary["rejectedByScreen"], len(rejected))
+        self.assertAlmostEqual(summary["correlation"], 1.0)
+
+    def test_everyone_admitted_while_the_screen_does_not_rank(self):
+        strategy = ListStrategy([candidate(index) for index in range(12)])
+        screen = PreScreen(strategy, self.space, self.values,
+                           {"screenRecords": 100, "screenWarmup": 4})
+        # screen metrics ranking the full ones backwards
+        while not screen.done():
+            task = screen.propose()
+            index = task["perm"]["index"]
+            metric = float(index if task["records"] is None else 11 - index)
+            screen.observe({"trial": None, "perm": task["perm"], "records": task["records"],
+                            "metric": metric, "status": "completed"})
+        self.assertEqual(screen.rejectedByScreen, 0)
+        self.assertEqual(len(strategy.results), 12)
+
+    def test_partial_tasks_pass_unscreened(self):
+        task = dict(candidate(0), records=50)
+        strategy = ListStrategy([task])
+        screen = PreScreen(strategy, self.space, self.values)
+        self.assertIs(screen.propose(), task)
+
+
+if __name__ == "__main__":
+    unittest.main()
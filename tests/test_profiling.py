@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+
+"""
+Tests of the collapsed stacks estimated from the cProfile caller graph
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "anomaly"))
+from profiling import Profiler, callGraphStacks
+
+
+"""
+Global variables
+"""
+MAIN = ("run.py", 1, "main")
+PARSE = ("run.py", 10, "parse")
+SCORE = ("run.py", 20, "score")
+LEAF = ("run.py", 30, "leaf")
+
+
+def work(count):
+    return sum(i * i for i in range(count))
+
+
+class CallGraphStacksTest(unittest.TestCase):
+
+    def test_time_split_between_callers(self):
+        # main spends 1 s itself, leaf costs 3 s through parse and 1 s
+        # through score, each of which spends 1 s itself
+        stats = {
+            MAIN: (1, 1, 1.0, 7.0, {}),
+            PARSE: (1, 1, 1.0, 4.0, {MAIN: (1, 1, 1.0, 4.0)}),
+            SCORE: (1, 1, 1.0, 2.0, {MAIN: (1, 1, 1.0, 2.0)}),
+            LEAF: (4, 4, 4.0, 4.0, {PARSE: (3, 3, 3.0, 3.0),
+                                    SCORE: (1, 1, 1.0, 1.0)}),
+        }
+        stacks = callGraphStacks(stats, unit=1.0)
+        self.assertEqual(stacks, {
+            (MAIN,): 1,
+            (MAIN, PARSE): 1,
+            (MAIN, PARSE, LEAF): 3,
+            (MAIN, SCORE): 1,
+            (MAIN, SCORE, LEAF): 1,
+        })
+
+    def test_recursion_is_folded(self):
+        stats = {
+            MAIN: (1, 1, 0.0, 2.0, {}),
+            LEAF: (1, 5, 2.0, 2.0, {MAIN: (1, 1, 0.5, 2.0), LEAF: (4, 4, 1.5, 1.5)}),
+        }
+        self.assertEqual(callGraphStacks(stats, unit=1.0),
+                         {(MAIN,): 0, (MAIN, LEAF): 2})
+
+
+class ProfilerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workDir = tempfile.mkdtemp(prefix="profiling_")
+
+    def tearDown(self):
+        shutil.rmtree(self.workDir)
+
+    def test_cprofile_writes_both_files(self):
+        profiler = Profiler("cprofile", os.path.join(self.workDir, "run_PROFILE"))
+        profiler.start()
+        work(20000)
+        profiler.pause()
+        pstatsPath, collapsedPath = profiler.write()
+        self.assertTrue(os.path.getsize(pstatsPath) > 0)
+        with open(collapsedPath) as collapsedFile:
+            lines = collapsedFile.read().splitlines()
+        self.assertTrue([line for line in lines if "work (test_profiling.py" in line])
+        for line in lines:
+            self.assertGreater(int(line.rsplit(" ", 1)[1]), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
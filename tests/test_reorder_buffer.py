@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+
+"""
+Tests of the reorder buffer putting late records back in order
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import csv
+import sys
+import random
+import shutil
+import datetime
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "anomaly"))
+from reorder_buffer import ReorderBuffer
+
+
+"""
+Global variables
+"""
+START = datetime.datetime(2014, 2, 14, 0, 0)
+
+
+def record(counter, minutes, value=0.0):
+    return counter, START + datetime.timedelta(minutes=minutes), value
+
+
+class ReorderBufferTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workDir = tempfile.mkdtemp(prefix="reorder_buffer_")
+
+    def tearDown(self):
+        shutil.rmtree(self.workDir)
+
+    def test_shuffled_within_the_lateness(self):
+        rng = random.Random(3)
+        records = [record(i, 5 * i) for i in range(200)]
+        # every record moved at most 3 positions
+        arrived = sorted(records, key=lambda r: r[0] + rng.uniform(0, 3))
+        buffer = ReorderBuffer(datetime.timedelta(minutes=15))
+        self.assertEqual(list(buffer.reorder(arrived)), records)
+        self.assertEqual(buffer.late, 0)
+        self.assertEqual(buffer.released, 200)
+        self.assertGreater(buffer.reordered, 0)
+
+    def test_equal_timestamps_keep_their_order(self):
+        records = [record(1, 0), record(2, 0), record(3, 0)]
+        buffer = ReorderBuffer(datetime.timedelta(minutes=5))
+        self.assertEqual(list(buffer.reorder(records)), records)
+
+    def test_late_records_are_logged(self):
+        latePath = os.path.join(self.workDir, "late.csv")
+        buffer = ReorderBuffer(datetime.timedelta(minutes=5), latePath=latePath)
+        arrived = [record(1, 0), record(2, 10), record(3, 20), record(4, 1, 7.5)]
+        self.assertEqual([r[0] for r in buffer.reorder(arrived)], [1, 2, 3])
+        buffer.close()
+        self.assertEqual(buffer.late, 1)
+        with open(latePath) as lateFile:
+            rows = list(csv.reader(lateFile))
+        self.assertEqual(rows, [["record", "timestamp", "value"],
+                                ["4", str(START + datetime.timedelta(minutes=1)), "7.5"]])
+
+    def test_overflow_releases_early(self):
+        buffer = ReorderBuffer(datetime.timedelta(days=1), maxRecords=2)
+        ready = []
+        for i in range(5):
+            ready.extend(buffer.push(record(i, i)))
+        self.assertEqual([r[0] for r in ready], [0, 1, 2])
+        self.assertEqual(buffer.overflow, 3)
+        self.assertEqual([r[0] for r in buffer.flush()], [3, 4])
+        self.assertEqual(buffer.maxDepth, 3)
+
+    def test_bad_size(self):
+        self.assertRaises(ValueError, ReorderBuffer, datetime.timedelta(0), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+"""
+Tests of the SQLite results store of the local swarm
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "myswarm"))
+from results_store import ResultsStore
+
+
+def result(trial, metric, metrics=None):
+    return {"trial": trial, "perm": {"w": trial}, "metric": metric, "records": 100,
+            "seconds": 1.5, "status": "completed", "error": None, "metrics": metrics}
+
+
+class ResultsStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workDir = tempfile.mkdtemp(prefix="results_store_")
+        self.path = os.path.join(self.workDir, "swarm.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.workDir)
+
+    def test_round_trip(self):
+        store = ResultsStore(self.path)
+        self.assertEqual(store.nextTrial(), 0)
+        store.add(result(1, 2.5, {"aae": 1.25, "rmse": 3.0}))
+        store.add(result(0, 4.0))
+        store.close()
+
+        store = ResultsStore(self.path)
+        self.assertEqual(store.nextTrial(), 2)
+        self.assertEqual(store.results(), [result(0, 4.0), result(1, 2.5, {"aae": 1.25,
+                                                                           "rmse": 3.0})])
+        store.close()
+
+    def test_store_without_metrics_column(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute("CREATE TABLE trials (trial INTEGER PRIMARY KEY, perm TEXT "
+                           "NOT NULL, metric REAL, records INTEGER, seconds REAL, "
+                           "status TEXT NOT NULL, error TEXT, finished REAL)")
+        connection.execute("INSERT INTO trials VALUES (0, '{\"w\": 0}', 4.0, 100, 1.5, "
+                           "'completed', NULL, 0.0)")
+        connection.commit()
+        connection.close()
+
+        store = ResultsStore(self.path)
+        store.add(result(1, 2.5, {"aae": 1.25}))
+        self.assertEqual(store.results(), [result(0, 4.0), result(1, 2.5, {"aae": 1.25})])
+        store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
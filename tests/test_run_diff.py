@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+
+"""
+Tests of the chunked comparison of run_diff
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "anomaly"))
+import run_diff
+import nupic_anomaly_output as nupic_output
+
+
+"""
+Global variables
+"""
+THRESHOLD = 0.9
+
+
+def wholeColumnIntervals(likelihood):
+    return [(start, end) for start, end, _, _ in
+            nupic_output.extractAnomalyIndices(likelihood, THRESHOLD)]
+
+
+def streamedIntervals(likelihood, chunkSize):
+    stream = run_diff.IntervalStream(THRESHOLD)
+    for start in range(0, len(likelihood), chunkSize):
+        stream.feed(likelihood[start:start + chunkSize])
+    return stream.close()
+
+
+class IntervalStreamTest(unittest.TestCase):
+
+    def test_random_columns(self):
+        rng = numpy.random.RandomState(11)
+        for _ in range(20):
+            # runs of anomalous records of random lengths
+            likelihood = numpy.repeat(rng.uniform(0.5, 1.0, 60), rng.randint(1, 8, 60))
+            for chunkSize in [1, 2, 3, 7, 50, len(likelihood)]:
+                self.assertEqual(streamedIntervals(likelihood, chunkSize),
+                                 wholeColumnIntervals(likelihood))
+
+    def test_interval_across_chunks(self):
+        likelihood = numpy.array([0.1, 0.95, 0.95, 0.95, 0.95, 0.1, 0.1])
+        self.assertEqual(streamedIntervals(likelihood, 2), [(1, 5)])
+
+    def test_interval_open_at_the_end(self):
+        likelihood = numpy.array([0.1, 0.1, 0.95, 0.95, 0.95])
+        self.assertEqual(streamedIntervals(likelihood, 2), [(2, 4)])
+
+    def test_interval_ending_at_a_chunk_boundary(self):
+        likelihood = numpy.array([0.95, 0.95, 0.1, 0.1])
+        self.assertEqual(streamedIntervals(likelihood, 2), [(0, 2)])
+
+    def test_threshold_is_not_global(self):
+        threshold = nupic_output.ANOMALY_THRESHOLD
+        run_diff.IntervalStream(0.5).feed(numpy.array([0.6, 0.1]))
+        self.assertEqual(nupic_output.ANOMALY_THRESHOLD, threshold)
+
+
+class DiffRunsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workDir = tempfile.mkdtemp(prefix="run_diff_")
+        rng = numpy.random.RandomState(12)
+        count = 500
+        self.timestamps = (numpy.datetime64("2014-02-14T00:00") +
+                           numpy.arange(count) * numpy.timedelta64(5, "m"))
+        self.values = rng.uniform(0.0, 100.0, count)
+        self.results = {"prediction": self.values + rng.normal(0.0, 1.0, count),
+                        "anomalyScore": rng.uniform(0.0, 1.0, count),
+                        "anomalyLikelihood": rng.uniform(0.0, 1.0, count)}
+        self.results["prediction"][0] = numpy.nan
+
+    def tearDown(self):
+        shutil.rmtree(self.workDir)
+
+    def write(self, name, results):
+        path = os.path.join(self.workDir, name)
+        run_diff.writeResults(path, self.timestamps, self.values, results)
+        return path
+
+    def test_identical(self):
+        base = self.write("base.npy", self.results)
+        head = self.write("head.npy", self.results)
+        report = run_diff.diffRuns(base, head, THRESHOLD, chunkSize=64)
+        self.assertTrue(report["identical"])
+        self.assertEqual(report["compared"], len(self.values))
+
+    def test_divergence(self):
+        changed = dict((name, column.copy()) for name, column in self.results.items())
+        changed["anomalyLikelihood"][300:310] = 0.99
+        base = self.write("base.npy", self.results)
+        head = self.write("head.npy", changed)
+        report = run_diff.diffRuns(base, head, THRESHOLD, chunkSize=64)
+        self.assertFalse(report["identical"])
+        self.assertEqual(report["first_divergence"][1], "anomaly_likelihood")
+        self.assertGreaterEqual(report["first_divergence"][0], 300)
+        self.assertLess(report["first_divergence"][0], 310)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+
+"""
+Tests of writing and reading SDR traces
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import sys
+import shutil
+import datetime
+import tempfile
+import unittest
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "anomaly"))
+from sdr_recorder import SDRRecorder, SDRTrace
+
+
+"""
+Global variables
+"""
+START = datetime.datetime(2014, 2, 14, 0, 0)
+COLUMNS = 64
+
+
+class ScriptedModel(object):
+    """
+    Stand-in model whose active and predicted columns follow a seeded script
+    """
+
+    def __init__(self, seed):
+        self.rng = numpy.random.RandomState(seed)
+        self.active = []
+        self.predicted = sorted(self.rng.choice(COLUMNS, 4, replace=False))
+
+    def run(self):
+        self.active = sorted(self.rng.choice(COLUMNS, 4, replace=False))
+        self.predicted = sorted(self.rng.choice(COLUMNS, 4, replace=False))
+
+    def getActiveColumns(self):
+        return self.active
+
+    def getPredictedColumns(self):
+        return self.predicted
+
+
+class SDRRecorderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workDir = tempfile.mkdtemp(prefix="sdr_recorder_")
+        self.prefix = os.path.join(self.workDir, "run_SDR_TRACE")
+
+    def tearDown(self):
+        shutil.rmtree(self.workDir)
+
+    def write(self, model, recorder, first, count):
+        """
+        Runs and records count records from record number first, returns the
+        (active, predicted) columns expected for each
+        """
+        expected = []
+        for minutes in range(first, first + count):
+            predicted = list(model.getPredictedColumns())
+            model.run()
+            recorder.record(model, START + datetime.timedelta(minutes=minutes))
+            expected.append((list(model.getActiveColumns()), predicted))
+        return expected
+
+    def assertTrace(self, expected):
+        trace = SDRTrace(self.prefix)
+        self.assertEqual(len(trace), len(expected))
+        timestamps, active, predicted = trace.load()
+        self.assertEqual([list(columns) for columns in active],
+                         [columns for columns, _ in expected])
+        self.assertEqual([list(columns) for columns in predicted],
+                         [columns for _, columns in expected])
+        return trace
+
+    def test_round_trip(self):
+        model = ScriptedModel(1)
+        recorder = SDRRecorder(self.prefix, flushEvery=4)
+        expected = self.write(model, recorder, 0, 10)
+        recorder.close()
+        # the first record has no predicted columns without the model
+        expected[0] = (expected[0][0], [])
+        trace = self.assertTrace(expected)
+
+        timestamps, active, predicted = trace.matrix(START + datetime.timedelta(minutes=2),
+                                                     START + datetime.timedelta(minutes=4),
+                                                     COLUMNS)
+        self.assertEqual(len(timestamps), 3)
+        self.assertEqual(sorted(numpy.nonzero(active[0])[0]), expected[2][0])
+        self.assertEqual(sorted(numpy.nonzero(predicted[2])[0]), expected[4][1])
+
+    def test_append(self):
+        model = ScriptedModel(2)
+        recorder = SDRRecorder(self.prefix, model=model)
+        expected = self.write(model, recorder, 0, 5)
+        recorder.close()
+        recorder = SDRRecorder(self.prefix, append=True, model=model)
+        expected += self.write(model, recorder, 5, 5)
+        recorder.close()
+        self.assertTrace(expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
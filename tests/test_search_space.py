@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+
+"""
+Tests of the permutation search space of the local swarm
+
+Usage (from the repository root):
+    python -m pytest tests
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import sys
+import random
+import unittest
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "myswarm"))
+from search_space import (SearchSpace, PermuteFloat, PermuteInt, PermuteChoices,
+                          PermuteEncoder, PermutationSampler, parseMetric,
+                          DEFAULT_METRIC)
+
+
+"""
+Global variables
+"""
+BASE_PARAMS = {
+    "model": "HTMPrediction",
+    "modelParams": {
+        "sensorParams": {
+            "encoders": {
+                "value": {"fieldname": "value", "name": "value", "n": 100,
+                          "w": 21, "type": "RandomDistributedScalarEncoder"},
+                "timestamp_weekend": None,
+            },
+        },
+        "tmParams": {"activationThreshold": 12, "pamLength": 1},
+    },
+}
+
+
+def makeSpace(permutationFilter=None):
+    permutations = {
+        "modelParams": {
+            "sensorParams": {
+                "encoders": {
+                    "value": PermuteEncoder("value", "ScalarEncoder", w=21,
+                                            n=PermuteInt(28, 521)),
+                    "timestamp_timeOfDay": PermuteEncoder(
+                        "timestamp", "DateEncoder.timeOfDay", w=21,
+                        radius=PermuteChoices([1, 2, 4])),
+                    "timestamp_weekend": None,
+                },
+            },
+            "tmParams": {
+                "activationThreshold": PermuteInt(12, 16),
+                "pamLength": PermuteInt(1, 5),
+            },
+        },
+    }
+    return SearchSpace(permutations, BASE_PARAMS, DEFAULT_METRIC % (1, "value"),
+                       permutationFilter=permutationFilter)
+
+
+class ParseMetricTest(unittest.TestCase):
+
+    def test_default_metric(self):
+        spec = parseMetric(DEFAULT_METRIC % (1, "value"))
+        self.assertEqual(spec["inferenceElement"], "multiStepBestPredictions")
+        self.assertEqual(spec["metric"], "multiStep")
+        self.assertEqual(spec["errorMetric"], "altMAPE")
+        self.assertEqual(spec["steps"], [1])
+        self.assertEqual(spec["window"], 1000)
+        self.assertEqual(spec["field"], "value")
+
+    def test_steps_and_window(self):
+        spec = parseMetric("multiStepBestPredictions:multiStep:errorMetric='aae':"
+                           "steps=5:window=200:field=load")
+        self.assertEqual(spec["errorMetric"], "aae")
+        self.assertEqual(spec["steps"], [5])
+        self.assertEqual(spec["window"], 200)
+        self.assertEqual(spec["field"], "load")
+
+    def test_defaults_of_a_bare_metric(self):
+        spec = parseMetric("multiStepBestPredictions:multiStep")
+        self.assertEqual(spec["errorMetric"], "altMAPE")
+        self.assertEqual(spec["steps"], [1])
+
+
+class PermuteVariableTest(unittest.TestCase):
+
+    def test_float_clip_to_grid(self):
+        variable = PermuteFloat(0.0, 1.0, stepSize=0.25)
+        self.assertAlmostEqual(variable.clip(0.3), 0.25)
+        self.assertAlmostEqual(variable.clip(-1.0), 0.0)
+        self.assertAlmostEqual(variable.clip(2.0), 1.0)
+
+    def test_int_samples_cover_the_bounds(self):
+        variable = PermuteInt(1, 3)
+        rng = random.Random(1)
+        self.assertEqual(set(variable.sample(rng) for _ in range(200)), set([1, 2, 3]))
+
+
+class SearchSpaceTest(unittest.TestCase):
+
+    def test_variable_names(self):
+        space = makeSpace()
+        self.assertEqual(sorted(space.variables), [
+            "modelParams:sensorParams:encoders:timestamp_timeOfDay:radius",
+            "modelParams:sensorParams:encoders:value:n",
+            "modelParams:tmParams:activationThreshold",
+            "modelParams:tmParams:pamLength",
+        ])
+        self.assertEqual(sorted(space.encoders), [
+            "modelParams:sensorParams:encoders:timestamp_timeOfDay",
+            "modelParams:sensorParams:encoders:value",
+        ])
+
+    def test_model_params(self):
+        space = makeSpace()
+        perm = OrderedDict([
+            ("modelParams:sensorParams:encoders:timestamp_timeOfDay:radius", 4),
+            ("modelParams:sensorParams:encoders:value:n", 300),
+            ("modelParams:tmParams:activationThreshold", 13),
+            ("modelParams:tmParams:pamLength", 3),
+        ])
+        params = space.modelParams(perm)
+        encoders = params["modelParams"]["sensorParams"]["encoders"]
+        self.assertEqual(encoders["value"], {"fieldname": "value", "name": "value",
+                                             "n": 300, "w": 21, "type": "ScalarEncoder"})
+        self.assertEqual(encoders["timestamp_timeOfDay"],
+                         {"fieldname": "timestamp", "name": "timestamp_timeOfDay",
+                          "timeOfDay": (21, 4), "type": "DateEncoder"})
+        # an encoder set to None is left out of the model
+        self.assertNotIn("timestamp_weekend", encoders)
+        self.assertEqual(params["modelParams"]["tmParams"],
+                         {"activationThreshold": 13, "pamLength": 3})
+        # the base params are left untouched
+        self.assertEqual(BASE_PARAMS["modelParams"]["sensorParams"]["encoders"]["value"]["n"],
+                         100)
+
+    def test_filter_sees_short_names(self):
+        space = makeSpace(lambda perm: perm["pamLength"] < 3 and
+                          perm["value"]["n"] > 100)
+        rng = random.Random(3)
+        for _ in range(50):
+            perm = space.sampleAdmitted(rng)
+            self.assertLess(perm["modelParams:tmParams:pamLength"], 3)
+            self.assertGreater(perm["modelParams:sensorParams:encoders:value:n"], 100)
+
+    def test_sampler_draws_distinct_permutations(self):
+        space = SearchSpace({"modelParams": {"tmParams": {"pamLength": PermuteInt(1, 3)}}},
+                            BASE_PARAMS, DEFAULT_METRIC % (1, "value"))
+        sampler = PermutationSampler(space, seed=5)
+        drawn = [sampler.sample()["modelParams:tmParams:pamLength"] for _ in range(3)]
+        self.assertEqual(sorted(drawn), [1, 2, 3])
+        # every permutation was drawn
+        self.assertIsNone(sampler.sample())
+
+
+if __name__ == "__main__":
+    unittest.main()
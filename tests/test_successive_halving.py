@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+
+"""
+Tests of the successive halving and Hyperband schedulers of the local swarm
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "myswarm"))
+from search_space import SearchSpace, PermuteInt, DEFAULT_METRIC
+from successive_halving import (SuccessiveHalving, Hyperband, defaultMinRecords,
+                                rankKey, sameTask)
+
+
+"""
+Global variables
+"""
+VARIABLE = "modelParams:tmParams:pamLength"
+BASE_PARAMS = {"modelParams": {"sensorParams": {"encoders": {}},
+                               "tmParams": {"pamLength": 1}}}
+
+
+def makeSpace(maximize=False):
+    permutations = {"modelParams": {"tmParams": {"pamLength": PermuteInt(1, 1000)}}}
+    return SearchSpace(permutations, BASE_PARAMS, DEFAULT_METRIC % (1, "value"),
+                       maximize=maximize)
+
+
+def score(task):
+    """
+    Metric of a task, lowest for pamLength 500, with no effect of its budget
+    """
+    return {"trial": None, "perm": task["perm"], "records": task["records"],
+            "metric": abs(task["perm"][VARIABLE] - 500.0), "status": "completed"}
+
+
+def runStrategy(strategy):
+    """
+    Runs a strategy round by round, returns its tasks in proposal order
+    """
+    tasks = []
+    while not strategy.done():
+        proposed = []
+        task = strategy.propose()
+        while task is not None:
+            proposed.append(task)
+            task = strategy.propose()
+        if not proposed:
+            raise AssertionError("A round proposed nothing")
+        tasks.extend(proposed)
+        for task in proposed:
+            strategy.observe(score(task))
+    return tasks
+
+
+class HelpersTest(unittest.TestCase):
+
+    def test_default_min_records(self):
+        self.assertEqual(defaultMinRecords(2700, 3, 4), 100)
+        self.assertEqual(defaultMinRecords(10, 3, 4), 1)
+
+    def test_rank_key(self):
+        failed = {"status": "error", "metric": None}
+        results = [{"status": "completed", "metric": 2.0}, failed,
+                   {"status": "completed", "metric": 1.0}]
+        self.assertEqual([r["metric"] for r in sorted(results, key=rankKey)],
+                         [1.0, 2.0, None])
+        self.assertEqual([r["metric"] for r in sorted(results,
+                                                      key=lambda r: rankKey(r, True))],
+                         [2.0, 1.0, None])
+
+    def test_same_task(self):
+        self.assertTrue(sameTask({"trial": 3, "perm": {}}, {"trial": 3, "perm": {"a": 1}}))
+        self.assertTrue(sameTask({"perm": {"a": 1, "b": 2}}, {"perm": {"b": 2, "a": 1}}))
+        self.assertFalse(sameTask({"perm": {"a": 1}}, {"trial": 2, "perm": {"a": 2}}))
+
+
+class SuccessiveHalvingTest(unittest.TestCase):
+
+    def test_rounds(self):
+        strategy = SuccessiveHalving(makeSpace(), 27, 2700, seed=1,
+                                     options={"eta": 3, "minRecords": 100})
+        tasks = runStrategy(strategy)
+        budgets = [task["records"] for task in tasks]
+        self.assertEqual(budgets, [100] * 27 + [300] * 9 + [900] * 3 + [2700])
+
+        # survivors are the best of the round before
+        firstRound = sorted(tasks[:27], key=lambda task: score(task)["metric"])
+        self.assertEqual(sorted(task["perm"][VARIABLE] for task in tasks[27:36]),
+                         sorted(task["perm"][VARIABLE] for task in firstRound[:9]))
+        self.assertEqual(tasks[-1]["perm"], firstRound[0]["perm"])
+
+    def test_failed_runs_do_not_survive(self):
+        strategy = SuccessiveHalving(makeSpace(), 9, 900, seed=2,
+                                     options={"eta": 3, "minRecords": 100})
+        firstRound = []
+        task = strategy.propose()
+        while task is not None:
+            firstRound.append(task)
+            task = strategy.propose()
+        best = min(firstRound, key=lambda task: score(task)["metric"])
+        for task in firstRound:
+            result = score(task)
+            if task is best:
+                result.update(status="error", metric=None)
+            strategy.observe(result)
+        survivors = runStrategy(strategy)
+        self.assertNotIn(best["perm"], [task["perm"] for task in survivors])
+        self.assertEqual(survivors[-1]["records"], 900)
+
+    def test_maximize(self):
+        strategy = SuccessiveHalving(makeSpace(maximize=True), 9, 900, seed=3,
+                                     options={"eta": 3, "minRecords": 100})
+        tasks = runStrategy(strategy)
+        best = max(tasks[:9], key=lambda task: score(task)["metric"])
+        self.assertEqual(tasks[-1]["perm"], best["perm"])
+
+
+class HyperbandTest(unittest.TestCase):
+
+    def test_brackets(self):
+        strategy = Hyperband(makeSpace(), 1000, 2700, seed=4,
+                             options={"eta": 3, "minRecords": 100})
+        # from 27 candidates on 100 records to 4 on the whole stream
+        self.assertEqual(strategy.brackets, [(12, 300), (6, 900), (4, 2700)])
+        tasks = runStrategy(strategy)
+        self.assertEqual(sum(1 for task in tasks if task["records"] == 100), 27)
+        self.assertEqual(len(set(str(task["perm"]) for task in tasks)), 27 + 12 + 6 + 4)
+
+    def test_scaled_to_max_models(self):
+        strategy = Hyperband(makeSpace(), 20, 2700, seed=5,
+                             options={"eta": 3, "minRecords": 100})
+        tasks = runStrategy(strategy)
+        self.assertLessEqual(len(set(str(task["perm"]) for task in tasks)), 20)
+        self.assertTrue(strategy.done())
+
+
+if __name__ == "__main__":
+    unittest.main()
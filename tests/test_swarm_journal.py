@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+
+"""
+Tests of resuming a swarm from its journal
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "myswarm"))
+from swarm_journal import SwarmJournal, readJournal
+
+
+def task(trial):
+    return {"trial": trial, "perm": {"modelParams:tmParams:pamLength": trial + 1},
+            "params": {"model": "HTMPrediction"}, "records": None}
+
+
+def result(trial, metric):
+    return {"trial": trial, "perm": {"modelParams:tmParams:pamLength": trial + 1},
+            "metric": metric, "records": 100, "seconds": 1.5, "status": "ok",
+            "error": None, "metrics": {"aae": metric / 10.0}}
+
+
+class SwarmJournalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workDir = tempfile.mkdtemp(prefix="swarm_journal_")
+        self.path = os.path.join(self.workDir, "swarm_journal.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.workDir)
+
+    def interruptedSwarm(self):
+        """
+        Journals trials 0 to 2 of which only 0 and 2 finish
+        """
+        journal = SwarmJournal(self.path)
+        for trial in range(3):
+            journal.start(task(trial))
+        journal.finish(result(2, 12.0))
+        journal.finish(result(0, 10.0))
+        journal.close()
+
+    def test_resume(self):
+        self.interruptedSwarm()
+        journal = SwarmJournal(self.path)
+        self.assertEqual([entry["trial"] for entry in journal.interrupted()], [1])
+        self.assertEqual(journal.interrupted()[0]["perm"], task(1)["perm"])
+        self.assertEqual(journal.nextTrial(), 3)
+        self.assertEqual([entry["event"] for entry in journal.entries],
+                         ["start", "start", "start", "finish", "finish"])
+        self.assertEqual(journal.results(), [result(0, 10.0), result(2, 12.0)])
+
+        # the resumed swarm appends to the journal
+        journal.start(task(1))
+        journal.finish(result(1, 11.0))
+        journal.close()
+        self.assertEqual([entry["trial"] for entry in SwarmJournal(self.path).interrupted()],
+                         [])
+        self.assertEqual([entry["metric"] for entry in readJournal(self.path)],
+                         [10.0, 11.0, 12.0])
+
+    def test_line_cut_short(self):
+        self.interruptedSwarm()
+        with open(self.path, "a") as journalFile:
+            journalFile.write('{"event": "finish", "trial": 1, "met')
+        journal = SwarmJournal(self.path)
+        self.assertEqual(len(journal.entries), 5)
+        self.assertEqual([entry["trial"] for entry in journal.interrupted()], [1])
+
+    def test_fresh(self):
+        self.interruptedSwarm()
+        journal = SwarmJournal(self.path, fresh=True)
+        self.assertEqual(journal.entries, [])
+        self.assertEqual(journal.nextTrial(), 0)
+        journal.close()
+        self.assertEqual(readJournal(self.path), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
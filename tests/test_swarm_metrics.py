@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+
+"""
+Tests of the incremental swarm metrics against a brute-force window
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import sys
+import math
+import random
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "myswarm"))
+from search_space import parseMetric
+from swarm_metrics import SwarmMetrics, ERROR_METRICS
+
+
+"""
+Global variables
+"""
+METRIC = ("multiStepBestPredictions:multiStep:errorMetric='%s':steps=\\[%i\\]:"
+          "window=%i:field=value")
+
+
+def bruteForce(errorMetric, actuals, predictions, steps, window):
+    """
+    Returns an error metric over the last window (actual, prediction) pairs,
+    the prediction made at a record being for the record steps later
+    """
+    pairs = [(actuals[i], predictions[i - steps]) for i in range(steps, len(actuals))
+             if predictions[i - steps] is not None and
+             predictions[i - steps] == predictions[i - steps]]
+    pairs = pairs[-window:]
+    if not pairs:
+        return None
+    errors = [abs(actual - predicted) for actual, predicted in pairs]
+    if errorMetric == "aae":
+        return sum(errors) / len(pairs)
+    if errorMetric == "rmse":
+        return math.sqrt(sum(error * error for error in errors) / len(pairs))
+    absActual = sum(abs(actual) for actual, _ in pairs)
+    return 100.0 * sum(errors) / absActual if absActual > 0 else None
+
+
+def randomStream(count, seed):
+    """
+    Returns (actuals, predictions) with some predictions None or NaN
+    """
+    rng = random.Random(seed)
+    actuals = [rng.uniform(-5.0, 50.0) for _ in range(count)]
+    predictions = []
+    for actual in actuals:
+        draw = rng.random()
+        if draw < 0.05:
+            predictions.append(None)
+        elif draw < 0.08:
+            predictions.append(float("nan"))
+        else:
+            predictions.append(actual + rng.gauss(0.0, 3.0))
+    return actuals, predictions
+
+
+class SwarmMetricsTest(unittest.TestCase):
+
+    def check(self, errorMetric, steps, window, count, seed, reportMetrics=()):
+        metrics = SwarmMetrics(parseMetric(METRIC % (errorMetric, steps, window)),
+                               reportMetrics)
+        actuals, predictions = randomStream(count, seed)
+        for record, (actual, prediction) in enumerate(zip(actuals, predictions)):
+            metrics.update(actual, prediction)
+            if record % 37 == 0 or record == count - 1:
+                for name in ERROR_METRICS:
+                    expected = bruteForce(name, actuals[:record + 1],
+                                          predictions[:record + 1], steps, window)
+                    value = metrics.value(name)
+                    if expected is None:
+                        self.assertIsNone(value)
+                    else:
+                        self.assertAlmostEqual(value, expected, places=6)
+
+    def test_window_not_full(self):
+        self.check("altMAPE", 1, 1000, 300, seed=1)
+
+    def test_window_wraps(self):
+        self.check("aae", 1, 50, 400, seed=2)
+
+    def test_several_steps(self):
+        self.check("rmse", 5, 64, 500, seed=3)
+
+    def test_report_metrics_kept_live(self):
+        self.check("altMAPE", 1, 30, 200, seed=4, reportMetrics=("aae", "rmse"))
+
+    def test_values(self):
+        metrics = SwarmMetrics(parseMetric(METRIC % ("aae", 1, 10)), ("rmse",))
+        for actual in [1.0, 2.0, 4.0]:
+            metrics.update(actual, actual + 1.0)
+        # predictions 2 and 3 for actual values 2 and 4
+        self.assertEqual(sorted(metrics.values()), ["aae", "rmse"])
+        self.assertAlmostEqual(metrics.values()["aae"], 0.5)
+
+    def test_no_prediction(self):
+        metrics = SwarmMetrics(parseMetric(METRIC % ("aae", 1, 10)))
+        for actual in [1.0, 2.0, 3.0]:
+            metrics.update(actual, None)
+        self.assertIsNone(metrics.value())
+
+    def test_unsupported_metric(self):
+        self.assertRaises(ValueError, SwarmMetrics,
+                          parseMetric(METRIC % ("nrmse", 1, 10)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+
+"""
+Tests of the tree-structured Parzen estimator search of the local swarm
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import sys
+import math
+import random
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "myswarm"))
+from search_space import (SearchSpace, PermuteFloat, PermuteInt, PermuteChoices,
+                          PermutationSampler, DEFAULT_METRIC)
+from tpe_search import ParzenFloat, ParzenChoices, TPESearch
+
+
+"""
+Global variables
+"""
+BASE_PARAMS = {"modelParams": {"sensorParams": {"encoders": {}}, "tmParams": {}}}
+INC = "modelParams:tmParams:permanenceInc"
+PAM = "modelParams:tmParams:pamLength"
+MODE = "modelParams:tmParams:mode"
+
+
+def makeSpace():
+    permutations = {"modelParams": {"tmParams": {
+        "permanenceInc": PermuteFloat(0.0, 1.0),
+        "pamLength": PermuteInt(1, 20),
+        "mode": PermuteChoices(["a", "b", "c"]),
+    }}}
+    return SearchSpace(permutations, BASE_PARAMS, DEFAULT_METRIC % (1, "value"))
+
+
+def objective(perm):
+    return ((perm[INC] - 0.3) ** 2 + ((perm[PAM] - 12) / 20.0) ** 2 +
+            (0.0 if perm[MODE] == "b" else 0.5))
+
+
+def bestFound(strategy, batch=1):
+    """
+    Runs a strategy with `batch` tasks in flight, returns the best metric
+    """
+    best = None
+    while not strategy.done():
+        tasks = []
+        for _ in range(batch):
+            task = strategy.propose()
+            if task is not None:
+                tasks.append(task)
+        for task in tasks:
+            metric = objective(task["perm"])
+            strategy.observe({"trial": None, "perm": task["perm"], "metric": metric,
+                              "status": "completed"})
+            best = metric if best is None else min(best, metric)
+    return best
+
+
+class ParzenTest(unittest.TestCase):
+
+    def test_float_density(self):
+        density = ParzenFloat(PermuteFloat(0.0, 10.0), [2.0, 2.5, 8.0])
+        self.assertGreater(density.logDensity(2.2), density.logDensity(5.0))
+        self.assertGreater(density.logDensity(8.0), density.logDensity(10.0))
+        # the uniform prior keeps the whole range possible
+        for value in [0.0, 5.0, 10.0]:
+            self.assertGreaterEqual(density.logDensity(value), math.log(1.0 / 4.0))
+
+    def test_float_samples_stay_in_range(self):
+        variable = PermuteInt(1, 5)
+        density = ParzenFloat(variable, [1, 1, 5])
+        rng = random.Random(1)
+        samples = [density.sample(rng) for _ in range(500)]
+        self.assertTrue(all(isinstance(value, int) and 1 <= value <= 5 for value in samples))
+
+    def test_choices(self):
+        density = ParzenChoices(PermuteChoices(["a", "b", "c"]), ["b", "b", "c"])
+        self.assertAlmostEqual(math.exp(density.logDensity("b")), 3.0 / 6.0)
+        self.assertAlmostEqual(math.exp(density.logDensity("a")), 1.0 / 6.0)
+        rng = random.Random(2)
+        samples = [density.sample(rng) for _ in range(3000)]
+        self.assertAlmostEqual(samples.count("b") / 3000.0, 0.5, places=1)
+
+
+class TPESearchTest(unittest.TestCase):
+
+    def test_beats_random_search(self):
+        tpeWins = 0
+        for seed in range(10):
+            tpe = bestFound(TPESearch(makeSpace(), 60, 1000, seed, {"startupModels": 10}))
+            sampler = PermutationSampler(makeSpace(), seed)
+            randomBest = min(objective(sampler.sample()) for _ in range(60))
+            tpeWins += tpe < randomBest
+        self.assertGreaterEqual(tpeWins, 7)
+
+    def test_proposals_are_distinct(self):
+        strategy = TPESearch(makeSpace(), 40, 1000, 3, {"startupModels": 5})
+        perms = []
+        while not strategy.done():
+            task = strategy.propose()
+            perms.append(tuple(task["perm"].items()))
+            strategy.observe({"trial": None, "perm": task["perm"], "status": "completed",
+                              "metric": objective(task["perm"])})
+        self.assertEqual(len(perms), 40)
+        self.assertEqual(len(set(perms)), 40)
+
+    def test_pending_candidates_count_as_bad(self):
+        strategy = TPESearch(makeSpace(), 30, 1000, 4, {"startupModels": 5})
+        bestFound(strategy, batch=4)
+        self.assertEqual(strategy.pending, {})
+        self.assertEqual(len(strategy.observed), 30)
+
+    def test_priors_count_towards_startup(self):
+        strategy = TPESearch(makeSpace(), 10, 1000, 5, {"startupModels": 3})
+        for value in [0.1, 0.5, 0.9]:
+            perm = {INC: value, PAM: 12, MODE: "b"}
+            strategy.prior({"perm": perm, "metric": objective(perm), "status": "completed"})
+        suggested = []
+        suggest = strategy._suggest
+        strategy._suggest = lambda: suggested.append(suggest()) or suggested[-1]
+        task = strategy.propose()
+        # proposed from the densities rather than at random
+        self.assertEqual(len(suggested), 1)
+        self.assertEqual(task["perm"], suggested[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
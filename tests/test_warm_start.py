@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+
+"""
+Tests of warm starting a local swarm from tuned MODEL_PARAMS
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "myswarm"))
+from search_space import (SearchSpace, PermuteFloat, PermuteInt, PermuteChoices,
+                          PermuteEncoder, DEFAULT_METRIC)
+from warm_start import (seedPermutation, narrowVariable, narrowSpace, WarmStart,
+                        defaultWarmModels, NEIGHBOURS_PER_SEED)
+
+
+"""
+Global variables
+"""
+ENCODERS = "modelParams:sensorParams:encoders:"
+RADIUS = ENCODERS + "timestamp_timeOfDay:radius"
+N = ENCODERS + "value:n"
+THRESHOLD = "modelParams:tmParams:activationThreshold"
+INC = "modelParams:tmParams:permanenceInc"
+BASE_PARAMS = {"modelParams": {"sensorParams": {"encoders": {}}, "tmParams": {}}}
+
+
+def makeSpace():
+    permutations = {
+        "modelParams": {
+            "sensorParams": {
+                "encoders": {
+                    "value": PermuteEncoder("value", "ScalarEncoder", w=21,
+                                            n=PermuteInt(28, 521)),
+                    "timestamp_timeOfDay": PermuteEncoder(
+                        "timestamp", "DateEncoder.timeOfDay", w=21,
+                        radius=PermuteChoices([1, 2, 4])),
+                },
+            },
+            "tmParams": {
+                "activationThreshold": PermuteInt(8, 20),
+                "permanenceInc": PermuteFloat(0.0, 0.2),
+            },
+        },
+    }
+    return SearchSpace(permutations, BASE_PARAMS, DEFAULT_METRIC % (1, "value"))
+
+
+def seedParams(n=200, radius=2, threshold=12, inc=0.1):
+    return {"modelParams": {
+        "sensorParams": {"encoders": {
+            "value": {"type": "ScalarEncoder", "n": n, "w": 21},
+            "timestamp_timeOfDay": {"type": "DateEncoder", "timeOfDay": (21, radius)},
+        }},
+        "tmParams": {"activationThreshold": threshold, "permanenceInc": inc},
+    }}
+
+
+class ListStrategy(object):
+    """
+    Stand-in strategy proposing a fixed list of tasks and keeping the priors
+    """
+
+    def __init__(self, tasks):
+        self.tasks = list(tasks)
+        self.priors = []
+        self.results = []
+
+    def propose(self):
+        return self.tasks.pop(0) if self.tasks else None
+
+    def observe(self, result):
+        self.results.append(result)
+
+    def prior(self, result):
+        self.priors.append(result)
+
+    def done(self):
+        return not self.tasks
+
+
+class SeedTest(unittest.TestCase):
+
+    def test_seed_permutation(self):
+        perm = seedPermutation(makeSpace(), seedParams())
+        self.assertEqual(dict(perm), {N: 200, RADIUS: 2, THRESHOLD: 12, INC: 0.1})
+
+    def test_undefined_and_out_of_range_values(self):
+        params = seedParams(n=1000, radius=3, threshold=12)
+        del params["modelParams"]["tmParams"]["permanenceInc"]
+        perm = seedPermutation(makeSpace(), params)
+        self.assertEqual(perm[N], 521)
+        self.assertIsNone(perm[RADIUS])
+        self.assertIsNone(perm[INC])
+
+    def test_unused_encoder(self):
+        params = seedParams()
+        params["modelParams"]["sensorParams"]["encoders"]["value"] = None
+        self.assertIsNone(seedPermutation(makeSpace(), params)[N])
+
+
+class NarrowTest(unittest.TestCase):
+
+    def test_float(self):
+        variable = narrowVariable(PermuteFloat(0.0, 1.0), [0.4, 0.5], margin=0.1)
+        self.assertAlmostEqual(variable.min, 0.3)
+        self.assertAlmostEqual(variable.max, 0.6)
+
+    def test_int_and_bounds(self):
+        variable = narrowVariable(PermuteInt(0, 100), [3, None, 50], margin=0.1)
+        self.assertEqual((variable.min, variable.max), (0, 60))
+        self.assertTrue(isinstance(variable, PermuteInt))
+
+    def test_grid(self):
+        variable = narrowVariable(PermuteFloat(0.0, 1.0, stepSize=0.25), [0.5], margin=0.1)
+        self.assertEqual((variable.min, variable.max), (0.5, 0.5))
+
+    def test_unchanged(self):
+        choices = PermuteChoices([1, 2])
+        self.assertIs(narrowVariable(choices, [1]), choices)
+        floats = PermuteFloat(0.0, 1.0)
+        self.assertIs(narrowVariable(floats, [None]), floats)
+
+    def test_space(self):
+        space = makeSpace()
+        seeds = [seedPermutation(space, seedParams(n=200, threshold=12)),
+                 seedPermutation(space, seedParams(n=300, threshold=14))]
+        narrowed = narrowSpace(space, seeds, margin=0.1)
+        self.assertEqual((narrowed.variables[N].min, narrowed.variables[N].max), (150, 350))
+        self.assertEqual((narrowed.variables[THRESHOLD].min,
+                          narrowed.variables[THRESHOLD].max), (10, 16))
+        self.assertEqual(narrowed.variables[RADIUS].choices, [1, 2, 4])
+        self.assertEqual(narrowed.modelParams(seeds[0])["modelParams"]["tmParams"],
+                         {"activationThreshold": 12, "permanenceInc": 0.1})
+
+
+class WarmStartTest(unittest.TestCase):
+
+    def test_seeds_then_neighbours_then_strategy(self):
+        space = makeSpace()
+        seeds = [seedPermutation(space, seedParams(n=200)),
+                 seedPermutation(space, seedParams(n=400, radius=4))]
+        narrowed = narrowSpace(space, seeds)
+        strategyTask = {"trial": None, "perm": {"strategy": 1}, "records": None}
+        strategy = ListStrategy([strategyTask])
+        warmModels = defaultWarmModels(seeds, 100)
+        self.assertEqual(warmModels, 2 * (1 + NEIGHBOURS_PER_SEED))
+        warm = WarmStart(strategy, narrowed, seeds, warmModels, seed=1)
+
+        tasks = []
+        while not warm.done():
+            task = warm.propose()
+            tasks.append(task)
+            warm.observe({"trial": None, "perm": task["perm"], "metric": 1.0,
+                          "status": "completed"})
+        self.assertEqual([dict(task["perm"]) for task in tasks[:2]],
+                         [dict(seed) for seed in seeds])
+        self.assertIs(tasks[-1], strategyTask)
+        self.assertEqual(len(tasks), warmModels + 1)
+        for task in tasks[2:-1]:
+            for name, variable in narrowed.variables.items():
+                value = task["perm"][name]
+                if isinstance(variable, PermuteChoices):
+                    self.assertIn(value, variable.choices)
+                else:
+                    self.assertTrue(variable.min <= value <= variable.max)
+        # the warm results reach the strategy as priors
+        self.assertEqual(len(strategy.priors), warmModels)
+        self.assertEqual(len(strategy.results), 1)
+
+    def test_undefined_seed_values_are_sampled(self):
+        space = makeSpace()
+        params = seedParams()
+        del params["modelParams"]["tmParams"]["permanenceInc"]
+        seeds = [seedPermutation(space, params)]
+        warm = WarmStart(ListStrategy([]), narrowSpace(space, seeds), seeds, 1)
+        perm = warm.propose()["perm"]
+        self.assertTrue(0.0 <= perm[INC] <= 0.2)
+        self.assertEqual(perm[N], 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
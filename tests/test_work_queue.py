@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+
+"""
+Tests of the leases of the distributed swarm's work queue
+"""
+
+"""
+Importing Packages
+"""
+# general
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, "myswarm"))
+from work_queue import WorkQueue, MAX_ATTEMPTS
+
+
+"""
+Global variables
+"""
+SWARM = "swarm-1"
+# a lease already expired when it is granted
+EXPIRED = -1.0
+
+
+def task(trial):
+    return {"trial": trial, "perm": {"modelParams:tmParams:pamLength": 2},
+            "params": {"model": "HTMPrediction"}, "records": None}
+
+
+def result(trial):
+    return {"trial": trial, "perm": {"modelParams:tmParams:pamLength": 2},
+            "metric": 10.0, "records": 100, "seconds": 1.0, "status": "ok",
+            "error": None}
+
+
+class WorkQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workDir = tempfile.mkdtemp(prefix="work_queue_")
+        self.queue = WorkQueue(os.path.join(self.workDir, "swarm_queue.db"))
+
+    def tearDown(self):
+        self.queue.close()
+        shutil.rmtree(self.workDir)
+
+    def test_claim_in_trial_order(self):
+        for trial in [1, 0]:
+            self.queue.submit(task(trial), SWARM)
+        self.assertEqual(self.queue.claim("a", SWARM)["trial"], 0)
+        self.assertEqual(self.queue.claim("b", SWARM)["trial"], 1)
+        self.assertIsNone(self.queue.claim("c", SWARM))
+        self.assertIsNone(self.queue.claim("c", "swarm-2"))
+        self.assertEqual(self.queue.counts(), {"leased": 2})
+
+    def test_live_lease_is_kept(self):
+        self.queue.submit(task(0), SWARM)
+        self.queue.claim("a", SWARM)
+        self.assertEqual(self.queue.requeueExpired(), [])
+        self.assertTrue(self.queue.heartbeat(0, "a"))
+        self.assertFalse(self.queue.heartbeat(0, "b"))
+
+    def test_expired_lease_is_queued_again(self):
+        self.queue.submit(task(0), SWARM)
+        self.queue.claim("a", SWARM, lease=EXPIRED)
+        self.assertEqual(self.queue.requeueExpired(), [(0, "a")])
+        # the worker that lost the lease learns it at its next heartbeat
+        self.assertFalse(self.queue.heartbeat(0, "a"))
+        self.assertEqual(self.queue.claim("b", SWARM)["trial"], 0)
+
+    def test_late_result_still_counts(self):
+        self.queue.submit(task(0), SWARM)
+        self.queue.claim("a", SWARM, lease=EXPIRED)
+        self.queue.requeueExpired()
+        self.queue.claim("b", SWARM)
+        self.queue.complete(result(0), SWARM)
+        # the result of the second worker does not replace the first one
+        second = result(0)
+        second["metric"] = 20.0
+        self.queue.complete(second, SWARM)
+        self.assertEqual(self.queue.collect(), [result(0)])
+        self.assertEqual(self.queue.collect(), [])
+
+    def test_out_of_attempts(self):
+        self.queue.submit(task(0), SWARM)
+        for attempt in range(MAX_ATTEMPTS):
+            self.assertEqual(self.queue.claim("w%i" % attempt, SWARM, lease=EXPIRED)["trial"],
+                             0)
+            requeued = self.queue.requeueExpired()
+        self.assertEqual(requeued, [])
+        self.assertIsNone(self.queue.claim("w", SWARM))
+        results = self.queue.collect()
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]["status"], "error")
+        self.assertIn("Lease lost %i times" % MAX_ATTEMPTS, results[0]["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()